@@ -43,6 +43,54 @@ class Settings(BaseSettings):
     # Partitioning Strategy (day or month)
     partition_strategy: str = Field(default="month", alias="PARTITION_STRATEGY")
     
+    # BigQuery load path: True = load Arrow table thẳng vào staging table,
+    # GCS backup chạy bất đồng bộ (không nằm trên critical path)
+    bq_direct_load: bool = Field(default=False, alias="BQ_DIRECT_LOAD")
+    
+    # Query budget guard: dry-run mỗi statement, abort nếu ước tính vượt số bytes này
+    # (None = tắt, không dry-run)
+    bq_query_budget_bytes: Optional[int] = Field(default=None, alias="BQ_QUERY_BUDGET_BYTES")
+    
+    # Storage backend cho bronze data: gcs = Google Cloud Storage, local = local disk
+    # (object lưu tại {LOCAL_STORAGE_ROOT}/{bucket}/{path}, cùng layout với gcs_root của DuckDB emulator)
+    storage_backend: str = Field(default="gcs", alias="STORAGE_BACKEND")
+    local_storage_root: str = Field(default="./data/storage", alias="LOCAL_STORAGE_ROOT")
+    
+    # Parquet upload lên GCS: ghi theo row group vào upload stream
+    # stream = resumable upload trực tiếp, spill = ghi local temp file rồi upload
+    parquet_row_group_size: int = Field(default=50000, alias="PARQUET_ROW_GROUP_SIZE")
+    gcs_upload_mode: str = Field(default="stream", alias="GCS_UPLOAD_MODE")
+    gcs_upload_chunk_size_mb: int = Field(default=8, alias="GCS_UPLOAD_CHUNK_SIZE_MB")
+    # Bỏ qua upload (và load BigQuery) khi data của ngày không đổi so với object hiện tại
+    gcs_skip_unchanged_uploads: bool = Field(default=True, alias="GCS_SKIP_UNCHANGED_UPLOADS")
+    # Direct load mode: GCS backup được spool ra local disk rồi upload ở background,
+    # retry với exponential backoff (delay ban đầu tính bằng giây)
+    gcs_upload_spool_dir: str = Field(default="./data/upload_spool", alias="GCS_UPLOAD_SPOOL_DIR")
+    gcs_upload_max_retries: int = Field(default=5, alias="GCS_UPLOAD_MAX_RETRIES")
+    gcs_upload_retry_delay: float = Field(default=1.0, alias="GCS_UPLOAD_RETRY_DELAY")
+    # Archive raw API records theo ngày (JSONL zstd, prefix raw/ của bronze bucket) để reprocess không gọi API
+    raw_archive_enabled: bool = Field(default=True, alias="RAW_ARCHIVE_ENABLED")
+    # Schema validation raw bills khi extract: off | full | sampled | strict_on_failure
+    # (sampled validate mỗi SCHEMA_VALIDATION_SAMPLE_EVERY records một record)
+    schema_validation_mode: str = Field(default="sampled", alias="SCHEMA_VALIDATION_MODE")
+    schema_validation_sample_every: int = Field(default=100, alias="SCHEMA_VALIDATION_SAMPLE_EVERY")
+    # Đối soát tổng tiền bill với product lines sau mỗi ngày load; bill bị đánh dấu khi
+    # chênh lệch vượt max(RECONCILIATION_TOLERANCE, RECONCILIATION_RELATIVE_TOLERANCE * tổng tiền)
+    reconciliation_enabled: bool = Field(default=True, alias="RECONCILIATION_ENABLED")
+    reconciliation_tolerance: float = Field(default=1.0, alias="RECONCILIATION_TOLERANCE")
+    reconciliation_relative_tolerance: float = Field(default=0.001, alias="RECONCILIATION_RELATIVE_TOLERANCE")
+    # Volume anomaly detection: z-score volume mỗi ngày so với cùng thứ của N tuần gần nhất,
+    # ngày bất thường được đưa vào hàng đợi re-extract (tối đa MAX_REEXTRACTS lần)
+    volume_anomaly_enabled: bool = Field(default=True, alias="VOLUME_ANOMALY_ENABLED")
+    volume_anomaly_window_weeks: int = Field(default=8, alias="VOLUME_ANOMALY_WINDOW_WEEKS")
+    volume_anomaly_z_threshold: float = Field(default=3.0, alias="VOLUME_ANOMALY_Z_THRESHOLD")
+    volume_anomaly_max_reextracts: int = Field(default=2, alias="VOLUME_ANOMALY_MAX_REEXTRACTS")
+    # Run ledger theo ngày (bronze.pipeline_run_ledger): range sync bỏ qua ngày đã completed trừ khi --force
+    run_ledger_enabled: bool = Field(default=True, alias="RUN_LEDGER_ENABLED")
+    
+    # Compaction các tháng đã đóng: số rows tối đa mỗi compacted file
+    gcs_compaction_max_rows_per_file: int = Field(default=5000000, alias="GCS_COMPACTION_MAX_ROWS_PER_FILE")
+    
     # Logging
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
 
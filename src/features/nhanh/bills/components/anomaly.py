@@ -0,0 +1,245 @@
+"""
+Volume anomaly detection cho daily extraction.
+
+Một ngày API trả về ít bills hơn bình thường (lỗi cursor khi phân trang, API chập
+chờn) vẫn trông như chạy thành công. VolumeAnomalyDetector giữ số bills, products
+và tổng tiền của mỗi ngày trong một state object nhỏ trên StorageBackend, tính
+baseline theo cùng thứ trong tuần (các tuần gần nhất), z-score ngày mới và đưa
+ngày đáng ngờ vào hàng đợi re-extract. Không cần audit query trên fact tables.
+
+State: _state/volume_stats/{platform}/{entity}.json
+    {"days": {"2024-03-15": {"bills": .., "products": .., "amount": .., "anomalous": false}},
+     "queue": {"2024-03-15": {"attempts": 0, "reasons": [...]}}}
+
+State được cập nhật bằng read-modify-write với generation-match precondition
+(như partition manifest): daily sync và re-extract chạy cùng lúc không làm mất
+history hay hàng đợi của nhau.
+"""
+import json
+import statistics
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from google.api_core.exceptions import NotFound, PreconditionFailed
+from src.config import settings
+from src.shared.logging import get_logger
+from src.shared.storage import StorageBackend
+
+logger = get_logger(__name__)
+
+STATE_PREFIX = "_state/volume_stats"
+METRICS = ("bills", "products", "amount")
+# Số lần retry read-modify-write khi state bị run khác cập nhật (412)
+MAX_UPDATE_ATTEMPTS = 5
+
+
+@dataclass
+class AnomalyResult:
+    """Kết quả kiểm tra volume của một ngày."""
+    day: date
+    values: Dict[str, float]
+    baseline: Dict[str, float] = field(default_factory=dict)
+    z_scores: Dict[str, float] = field(default_factory=dict)
+    anomalous_metrics: List[str] = field(default_factory=list)
+    history_days: int = 0
+    queued: bool = False
+
+    @property
+    def is_anomalous(self) -> bool:
+        """Có metric với |z-score| vượt ngưỡng."""
+        return bool(self.anomalous_metrics)
+
+
+class VolumeAnomalyDetector:
+    """Baseline theo thứ trong tuần + z-score cho volume extract hằng ngày."""
+
+    def __init__(
+        self,
+        backend: StorageBackend,
+        entity: str = "nhanh/bills",
+        window_weeks: Optional[int] = None,
+        z_threshold: Optional[float] = None,
+        min_history: int = 3,
+        max_attempts: Optional[int] = None
+    ):
+        """
+        Khởi tạo detector.
+
+        Args:
+            backend: Storage backend lưu state
+            entity: Tên entity (format: "platform/entity")
+            window_weeks: Số tuần gần nhất dùng làm baseline (mặc định: settings.volume_anomaly_window_weeks)
+            z_threshold: Ngưỡng |z-score| (mặc định: settings.volume_anomaly_z_threshold)
+            min_history: Số ngày cùng thứ tối thiểu để tính z-score
+            max_attempts: Số lần re-extract tối đa của một ngày (mặc định: settings.volume_anomaly_max_reextracts)
+        """
+        self.backend = backend
+        self.entity = entity
+        self.window_weeks = window_weeks or settings.volume_anomaly_window_weeks
+        self.z_threshold = z_threshold or settings.volume_anomaly_z_threshold
+        self.min_history = min_history
+        self.max_attempts = max_attempts or settings.volume_anomaly_max_reextracts
+
+    @property
+    def state_path(self) -> str:
+        """Object path của state."""
+        return f"{STATE_PREFIX}/{self.entity}.json"
+
+    def _read(self) -> Tuple[Dict[str, Any], int]:
+        """State hiện tại và generation của state object (0 nếu chưa tồn tại)."""
+        info = self.backend.stat(self.state_path)
+        state: Dict[str, Any] = {}
+        generation = 0
+        if info is not None:
+            generation = info.generation
+            try:
+                state = json.loads(self.backend.get(self.state_path, generation=generation))
+            except NotFound:
+                # Bị ghi đè giữa stat và get: write với generation cũ sẽ fail và được retry
+                state = {}
+        state.setdefault("days", {})
+        state.setdefault("queue", {})
+        return state, generation
+
+    def _load(self) -> Dict[str, Any]:
+        return self._read()[0]
+
+    def _update(self, mutate: Callable[[Dict[str, Any]], bool]) -> None:
+        """
+        Read-modify-write state với generation-match precondition.
+
+        Args:
+            mutate: Sửa state, trả về False nếu không cần ghi (được gọi lại trên bản mới nhất khi retry)
+
+        Raises:
+            PreconditionFailed: Nếu vẫn conflict sau MAX_UPDATE_ATTEMPTS lần
+        """
+        for attempt in range(1, MAX_UPDATE_ATTEMPTS + 1):
+            state, generation = self._read()
+            if not mutate(state):
+                return
+            try:
+                self.backend.put(
+                    self.state_path,
+                    json.dumps(state, sort_keys=True).encode("utf-8"),
+                    content_type="application/json",
+                    if_generation_match=generation
+                )
+                return
+            except PreconditionFailed:
+                if attempt == MAX_UPDATE_ATTEMPTS:
+                    raise
+                logger.debug("Volume stats changed concurrently, retrying", entity=self.entity, attempt=attempt)
+
+    def _baseline(self, state: Dict[str, Any], day: date) -> List[Dict[str, Any]]:
+        """Stats của các ngày cùng thứ trong window (bỏ qua ngày bất thường)."""
+        history = []
+        for weeks_back in range(1, self.window_weeks + 1):
+            stats = state["days"].get((day - timedelta(weeks=weeks_back)).isoformat())
+            if stats and not stats.get("anomalous"):
+                history.append(stats)
+        return history
+
+    def score(self, state: Dict[str, Any], day: date, values: Dict[str, float]) -> AnomalyResult:
+        """
+        Tính z-score của ngày so với baseline cùng thứ.
+
+        Args:
+            state: State hiện tại
+            day: Ngày cần kiểm tra
+            values: bills / products / amount của ngày
+
+        Returns:
+            AnomalyResult: Chưa đủ history thì không có z-score (không bất thường)
+        """
+        result = AnomalyResult(day=day, values=values)
+        history = self._baseline(state, day)
+        result.history_days = len(history)
+        if len(history) < self.min_history:
+            return result
+
+        for metric in METRICS:
+            value = values.get(metric)
+            samples = [float(stats[metric]) for stats in history if stats.get(metric) is not None]
+            # Metric không có giá trị (vd: amount không tính được) không được so sánh
+            if value is None or len(samples) < self.min_history:
+                continue
+            mean = statistics.fmean(samples)
+            # Baseline gần như không đổi: sàn 5% mean để dao động nhỏ không bị coi là bất thường
+            std = max(statistics.pstdev(samples), abs(mean) * 0.05, 1.0)
+            z_score = (float(value) - mean) / std
+            result.baseline[metric] = mean
+            result.z_scores[metric] = z_score
+            if abs(z_score) > self.z_threshold:
+                result.anomalous_metrics.append(metric)
+        return result
+
+    def observe(self, day: date, bills: int, products: int, amount: Optional[float]) -> AnomalyResult:
+        """
+        Ghi volume của ngày, kiểm tra bất thường và đưa vào hàng đợi re-extract nếu cần.
+
+        Args:
+            day: Ngày vừa extract
+            bills: Số bills
+            products: Số product lines
+            amount: Tổng tiền bills (None nếu không tính được: không ghi vào history)
+
+        Returns:
+            AnomalyResult
+        """
+        values = {"bills": bills, "products": products}
+        if amount is not None:
+            values["amount"] = float(amount)
+        results: List[AnomalyResult] = []
+
+        def mutate(state: Dict[str, Any]) -> bool:
+            result = self.score(state, day, values)
+            results.append(result)
+            key = day.isoformat()
+            state["days"][key] = {**values, "anomalous": result.is_anomalous}
+            # Chỉ giữ history trong window (+1 tuần cho ngày đang chạy)
+            oldest = (day - timedelta(weeks=self.window_weeks + 1)).isoformat()
+            state["days"] = {k: v for k, v in state["days"].items() if k >= oldest}
+
+            if result.is_anomalous:
+                entry = state["queue"].get(key, {"attempts": 0})
+                if entry["attempts"] < self.max_attempts:
+                    entry["reasons"] = result.anomalous_metrics
+                    state["queue"][key] = entry
+                    result.queued = True
+                else:
+                    state["queue"].pop(key, None)
+            else:
+                state["queue"].pop(key, None)
+            return True
+
+        self._update(mutate)
+        result = results[-1]
+        if result.is_anomalous:
+            logger.warning(
+                f"Volume anomaly on {day.isoformat()}",
+                partition_date=day.isoformat(),
+                values=values,
+                baseline=result.baseline,
+                z_scores=result.z_scores,
+                queued=result.queued
+            )
+        return result
+
+    def pending(self) -> List[date]:
+        """Các ngày đang chờ re-extract."""
+        return sorted(date.fromisoformat(key) for key in self._load()["queue"])
+
+    def mark_attempted(self, day: date) -> None:
+        """
+        Ghi nhận một lần re-extract ngày (gọi trước khi chạy lại; observe() sẽ
+        bỏ ngày khỏi hàng đợi nếu volume trở lại bình thường).
+        """
+        def mutate(state: Dict[str, Any]) -> bool:
+            entry = state["queue"].get(day.isoformat())
+            if entry is None:
+                return False
+            entry["attempts"] += 1
+            return True
+
+        self._update(mutate)
@@ -0,0 +1,226 @@
+"""
+Coverage diagnostics cho bills: so sánh số lượng data theo ngày giữa các layers
+GCS (bronze files) → Bronze External Tables → Fact Tables.
+
+Mỗi source chỉ tốn một lần đọc cho cả khoảng ngày: GCS đọc partition manifest
+(hoặc một lượt list prefix theo tháng nếu chưa có manifest), mỗi BigQuery table
+một query GROUP BY ngày. Việc so sánh giữa các layers làm trong memory.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+from google.cloud import bigquery
+from src.config import settings
+from src.shared.gcs.manifest import ManifestStore
+from src.shared.logging import get_logger
+from src.shared.storage import StorageBackend
+from .tables import BILLS_TABLE_SPEC, BILL_PRODUCTS_TABLE_SPEC
+
+logger = get_logger(__name__)
+
+# Thứ tự cột của coverage matrix
+SOURCES = [
+    "gcs_bills",
+    "gcs_products",
+    "bronze_bills",
+    "bronze_products",
+    "fact_bills",
+    "fact_products",
+]
+
+_DATA_FILE_DATE = re.compile(r"data_(\d{4}-\d{2}-\d{2})[_.]")
+
+
+@dataclass
+class CoverageReport:
+    """
+    Số lượng theo ngày của từng source.
+
+    counts[source] = None nghĩa là không đọc được source đó (lỗi query/listing).
+    GCS là số files, BigQuery là số rows.
+    """
+    dates: List[date]
+    counts: Dict[str, Optional[Dict[date, int]]] = field(default_factory=dict)
+
+    def count(self, source: str, day: date) -> Optional[int]:
+        """Số lượng của source trong ngày (None nếu source lỗi)."""
+        source_counts = self.counts.get(source)
+        if source_counts is None:
+            return None
+        return source_counts.get(day, 0)
+
+    def status(self, day: date) -> str:
+        """
+        Chẩn đoán một ngày: layer đầu tiên bị thiếu data.
+
+        Returns:
+            str: ok | missing_gcs | missing_bronze | missing_fact | partial_fact | unknown
+        """
+        layers = [
+            ("missing_gcs", ("gcs_bills", "gcs_products")),
+            ("missing_bronze", ("bronze_bills", "bronze_products")),
+            ("missing_fact", ("fact_bills", "fact_products")),
+        ]
+        for status, sources in layers:
+            values = [self.count(source, day) for source in sources]
+            if any(value is None for value in values):
+                return "unknown"
+            if all(value == 0 for value in values):
+                return status
+        # Fact ít rows hơn bronze: load chỉ thành công một phần
+        if any(
+            self.count(f"fact_{kind}", day) < self.count(f"bronze_{kind}", day)
+            for kind in ("bills", "products")
+        ):
+            return "partial_fact"
+        return "ok"
+
+    def problem_dates(self) -> Dict[str, List[date]]:
+        """Các ngày có vấn đề, nhóm theo status."""
+        problems: Dict[str, List[date]] = {}
+        for day in self.dates:
+            status = self.status(day)
+            if status != "ok":
+                problems.setdefault(status, []).append(day)
+        return problems
+
+    def format_matrix(self) -> str:
+        """Coverage matrix dạng text (một dòng mỗi ngày)."""
+        width = max(len(source) for source in SOURCES)
+        header = "date        " + " ".join(source.rjust(width) for source in SOURCES) + "  status"
+        lines = [header, "-" * len(header)]
+        for day in self.dates:
+            cells = []
+            for source in SOURCES:
+                value = self.count(source, day)
+                cells.append(("?" if value is None else f"{value:,}").rjust(width))
+            lines.append(f"{day.isoformat()}  " + " ".join(cells) + f"  {self.status(day)}")
+        return "\n".join(lines)
+
+
+class BillCoverageChecker:
+    """Tính CoverageReport cho bills và bill_products trong một khoảng ngày."""
+
+    def __init__(
+        self,
+        bq_client: Any,
+        backend: StorageBackend,
+        bronze_dataset: Optional[str] = None,
+        bills_table_id: Optional[str] = None,
+        products_table_id: Optional[str] = None
+    ):
+        """
+        Khởi tạo checker.
+
+        Args:
+            bq_client: BigQuery client
+            backend: Storage backend của bronze bucket
+            bronze_dataset: Dataset chứa bronze external tables (mặc định: settings.bronze_dataset)
+            bills_table_id: Bills fact table (mặc định: BILLS_TABLE_SPEC)
+            products_table_id: Products fact table (mặc định: BILL_PRODUCTS_TABLE_SPEC)
+        """
+        self.bq_client = bq_client
+        self.backend = backend
+        bronze_dataset = bronze_dataset or settings.bronze_dataset
+        self.bronze_bills_table_id = f"{settings.gcp_project}.{bronze_dataset}.nhanh_bills_raw"
+        self.bronze_products_table_id = f"{settings.gcp_project}.{bronze_dataset}.nhanh_bill_products_raw"
+        self.bills_table_id = bills_table_id or BILLS_TABLE_SPEC.table_id()
+        self.products_table_id = products_table_id or BILL_PRODUCTS_TABLE_SPEC.table_id()
+
+    def _gcs_file_counts(self, entity_path: str, from_date: date, to_date: date) -> Dict[date, int]:
+        """Số files mỗi ngày: từ manifest, hoặc một lượt list prefix theo tháng."""
+        manifest = ManifestStore(self.backend).load(entity_path)
+        if manifest.exists:
+            return {
+                day: len(manifest.entries(day))
+                for day in manifest.dates()
+                if from_date <= day <= to_date
+            }
+
+        counts: Dict[date, int] = {}
+        year, month = from_date.year, from_date.month
+        while (year, month) <= (to_date.year, to_date.month):
+            for info in self.backend.list(prefix=f"{entity_path}/year={year}/month={month:02d}/"):
+                match = _DATA_FILE_DATE.search(info.name)
+                if not match:
+                    continue
+                day = date.fromisoformat(match.group(1))
+                if from_date <= day <= to_date:
+                    counts[day] = counts.get(day, 0) + 1
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return counts
+
+    def _daily_counts(self, sql: str, from_date: date, to_date: date) -> Dict[date, int]:
+        """Chạy query GROUP BY ngày (cột day, cnt) với @from_date/@to_date."""
+        query_job = self.bq_client.query(
+            sql,
+            job_config=bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ScalarQueryParameter("from_date", "DATE", from_date),
+                bigquery.ScalarQueryParameter("to_date", "DATE", to_date),
+            ])
+        )
+        return {row.day: row.cnt for row in query_job.result() if row.day is not None}
+
+    def _queries(self) -> Dict[str, str]:
+        """Một query GROUP BY ngày cho mỗi BigQuery source."""
+        bronze_bill_date = "SAFE_CAST(b.date AS DATE)"
+        return {
+            "bronze_bills": f"""
+            SELECT {bronze_bill_date} AS day, COUNT(*) AS cnt
+            FROM `{self.bronze_bills_table_id}` b
+            WHERE {bronze_bill_date} BETWEEN @from_date AND @to_date
+            GROUP BY day
+            """,
+            # Bronze products không có cột date, lấy ngày từ bill
+            "bronze_products": f"""
+            SELECT {bronze_bill_date} AS day, COUNT(*) AS cnt
+            FROM `{self.bronze_products_table_id}` p
+            INNER JOIN `{self.bronze_bills_table_id}` b ON p.bill_id = b.id
+            WHERE {bronze_bill_date} BETWEEN @from_date AND @to_date
+            GROUP BY day
+            """,
+            "fact_bills": f"""
+            SELECT date AS day, COUNT(*) AS cnt
+            FROM `{self.bills_table_id}`
+            WHERE date BETWEEN @from_date AND @to_date
+            GROUP BY day
+            """,
+            # Products table partition theo bill_date: filter trực tiếp để prune partitions
+            "fact_products": f"""
+            SELECT bill_date AS day, COUNT(*) AS cnt
+            FROM `{self.products_table_id}`
+            WHERE bill_date BETWEEN @from_date AND @to_date
+            GROUP BY day
+            """,
+        }
+
+    def check(self, from_date: date, to_date: date) -> CoverageReport:
+        """
+        Tính coverage cho mọi ngày trong [from_date, to_date].
+
+        Args:
+            from_date: Ngày bắt đầu
+            to_date: Ngày kết thúc (inclusive)
+
+        Returns:
+            CoverageReport: Counts theo ngày của tất cả sources
+        """
+        dates = [from_date + timedelta(days=offset) for offset in range((to_date - from_date).days + 1)]
+        report = CoverageReport(dates=dates)
+
+        for source, entity_path in (("gcs_bills", "nhanh/bills"), ("gcs_products", "nhanh/bill_products")):
+            try:
+                report.counts[source] = self._gcs_file_counts(entity_path, from_date, to_date)
+            except Exception as e:
+                logger.error("Error counting GCS files", source=source, error=str(e))
+                report.counts[source] = None
+
+        for source, sql in self._queries().items():
+            try:
+                report.counts[source] = self._daily_counts(sql, from_date, to_date)
+            except Exception as e:
+                logger.error("Error counting rows", source=source, error=str(e))
+                report.counts[source] = None
+
+        return report
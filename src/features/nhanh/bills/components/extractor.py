@@ -5,15 +5,29 @@ Features:
 - Tự động chia date range thành các chunks 31 ngày (do API giới hạn)
 - Hỗ trợ incremental extraction dựa trên updatedAt
 - Hỗ trợ các filters: modes, type, customerId, fromDate/toDate
+- Archive raw records theo ngày (RawArchive) để reprocess không cần gọi lại API
+- Quality statistics tích lũy theo từng page, xuất QualityReport cho mỗi ngày
+- Schema validation (BillRecord) theo batch, mode cấu hình qua settings
 """
-from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from src.config import settings
+from src.quality.checks import QualityReport
+from src.quality.streaming import StreamingQualityStats
+from src.quality.validators import BillRecord, validate_records
+from src.shared.gcs import RawArchive
 from src.shared.nhanh import NhanhApiClient
 from src.shared.logging import get_logger
 from .types import BillSchema
 
 logger = get_logger(__name__)
 
+# Fields đếm null rate trong quality report (dot path trên raw bill)
+QUALITY_REQUIRED_FIELDS = ["id", "date", "depotId", "type", "mode", "payment.amount"]
+# Amount fields → (min, max) cho phép
+QUALITY_AMOUNT_FIELDS = {"payment.amount": (0, None)}
+
 
 class BillExtractor:
     """
@@ -23,11 +37,22 @@ class BillExtractor:
     chia date range thành các chunks nhỏ hơn nếu cần.
     """
     
-    def __init__(self):
-        """Khởi tạo BillExtractor với Nhanh API client."""
+    def __init__(self, raw_archive: Optional[RawArchive] = None):
+        """
+        Khởi tạo BillExtractor với Nhanh API client.
+        
+        Args:
+            raw_archive: Nếu có, raw bills của mỗi ngày được fetch đầy đủ sẽ được archive
+        """
         self.client = NhanhApiClient()
         self.platform = "nhanh"
         self.entity = "bills"
+        self.raw_archive = raw_archive
+        # QualityReport theo bill date của lần fetch_bills gần nhất
+        self.quality_reports: Dict[date, QualityReport] = {}
+        # (from, to) của các chunks fetch lỗi trong lần fetch_bills gần nhất
+        # (lỗi không raise: bills của chunk bị thiếu, caller không được coi các ngày đó là đầy đủ)
+        self.failed_chunks: List[Tuple[date, date]] = []
     
     def extract(self, **kwargs) -> List[Dict[str, Any]]:
         """
@@ -73,6 +98,9 @@ class BillExtractor:
             List[Dict[str, Any]]: Danh sách các hóa đơn
         """
         all_bills = []
+        self.quality_reports = {}
+        self.failed_chunks = []
+        quality_stats: Dict[date, StreamingQualityStats] = {}
         
         # Determine date range
         if updated_at_from and updated_at_to:
@@ -158,8 +186,21 @@ class BillExtractor:
             )
             
             try:
-                chunk_bills = self.client.fetch_paginated("/bill/list", body)
+                chunk_bills = self.client.fetch_paginated(
+                    "/bill/list",
+                    body,
+                    on_page=lambda page, day=chunk_from.date(): self._update_quality_stats(quality_stats, page, day)
+                )
                 all_bills.extend(chunk_bills)
+                self._validate_bills(chunk_bills, chunk_idx)
+                
+                # Filter theo bill date: các ngày của chunk đã đủ data → xuất report
+                if date_field == "fromDate":
+                    self._emit_quality_reports(quality_stats, chunk_from.date(), chunk_to.date())
+                
+                # Chỉ archive khi chunk chứa toàn bộ bills của các ngày (filter theo bill date, không filter khác)
+                if self.raw_archive is not None and date_field == "fromDate" and not (modes or bill_type or customer_id):
+                    self._archive_raw_bills(chunk_bills, chunk_from.date(), chunk_to.date())
                 
                 logger.info(
                     f"Completed chunk {chunk_idx}: {len(chunk_bills)} bills",
@@ -174,8 +215,16 @@ class BillExtractor:
                     error=str(e),
                     chunk=chunk_idx
                 )
+                self.failed_chunks.append((chunk_from.date(), chunk_to.date()))
+                # Chunk không đầy đủ: bỏ statistics dở dang của các ngày trong chunk
+                if date_field == "fromDate":
+                    for day in [d for d in quality_stats if chunk_from.date() <= d <= chunk_to.date()]:
+                        del quality_stats[day]
                 continue
         
+        # Filter theo updatedAt: một ngày có thể nằm ở nhiều chunks, xuất report khi fetch xong
+        self._emit_quality_reports(quality_stats)
+        
         logger.info(
             f"Completed bill extraction: {len(all_bills)} total bills",
             total_bills=len(all_bills)
@@ -183,6 +232,95 @@ class BillExtractor:
         
         return all_bills
     
+    def _validate_bills(self, bills: List[Dict[str, Any]], chunk_idx: int) -> None:
+        """Validate raw bills với BillRecord theo settings.schema_validation_mode (chỉ log, không chặn)."""
+        mode = settings.schema_validation_mode
+        if mode == "off" or not bills:
+            return
+        result = validate_records(
+            bills, BillRecord, mode=mode, sample_every=settings.schema_validation_sample_every
+        )
+        if result.invalid_records:
+            logger.warning(
+                f"Schema validation failed for {result.invalid_records} bills in chunk {chunk_idx}",
+                chunk=chunk_idx,
+                mode=result.mode,
+                validated=result.validated_records,
+                invalid=result.invalid_records,
+                examples=result.errors[:3]
+            )
+    
+    def _update_quality_stats(
+        self,
+        quality_stats: Dict[date, StreamingQualityStats],
+        page: List[Dict[str, Any]],
+        default_day: date
+    ) -> None:
+        """Cộng một page bills vào statistics của ngày tương ứng (theo field date của bill)."""
+        bills_by_day: Dict[date, List[Dict[str, Any]]] = defaultdict(list)
+        for bill in page:
+            try:
+                bills_by_day[date.fromisoformat(str(bill.get("date") or "")[:10])].append(bill)
+            except ValueError:
+                bills_by_day[default_day].append(bill)
+        
+        for day, bills in bills_by_day.items():
+            if day not in quality_stats:
+                quality_stats[day] = StreamingQualityStats(
+                    f"{self.platform}/{self.entity}",
+                    required_fields=QUALITY_REQUIRED_FIELDS,
+                    amount_fields=QUALITY_AMOUNT_FIELDS,
+                    group_field="depotId"
+                )
+            quality_stats[day].update(bills)
+    
+    def _emit_quality_reports(
+        self,
+        quality_stats: Dict[date, StreamingQualityStats],
+        from_day: Optional[date] = None,
+        to_day: Optional[date] = None
+    ) -> None:
+        """Xuất QualityReport cho các ngày trong [from_day, to_day] (mặc định: tất cả) và bỏ accumulator."""
+        for day in sorted(quality_stats):
+            if (from_day and day < from_day) or (to_day and day > to_day):
+                continue
+            report = quality_stats.pop(day).to_report()
+            self.quality_reports[day] = report
+            log = logger.info if report.passed else logger.warning
+            log(
+                f"Bill quality for {day.isoformat()}: score {report.score:.0f}",
+                partition_date=day.isoformat(),
+                total_records=report.total_records,
+                passed=report.passed,
+                failed_checks=[check.check_name for check in report.checks if not check.passed]
+            )
+    
+    def _archive_raw_bills(self, bills: List[Dict[str, Any]], from_day: date, to_day: date) -> None:
+        """
+        Archive raw bills của chunk theo ngày (theo field date của bill).
+        Mọi ngày trong chunk đều được ghi, kể cả ngày không có bill. Lỗi archive không chặn extraction.
+        """
+        bills_by_day: Dict[date, List[Dict[str, Any]]] = defaultdict(list)
+        for bill in bills:
+            bill_date = str(bill.get("date") or "")[:10]
+            try:
+                bills_by_day[date.fromisoformat(bill_date)].append(bill)
+            except ValueError:
+                bills_by_day[from_day].append(bill)
+        
+        entity_path = f"{self.platform}/{self.entity}"
+        day = from_day
+        while day <= to_day:
+            try:
+                self.raw_archive.write(entity_path, day, bills_by_day.get(day, []))
+            except Exception as e:
+                logger.warning(
+                    "Failed to archive raw bills",
+                    partition_date=day.isoformat(),
+                    error=str(e)
+                )
+            day += timedelta(days=1)
+    
     def extract_with_products(
         self,
         from_date: Optional[datetime] = None,
@@ -210,7 +348,18 @@ class BillExtractor:
             updated_at_to=updated_at_to,
             process_by_day=process_by_day
         )
+        return self.split_products(all_bills)
+    
+    def split_products(self, all_bills: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Tách products ra khỏi raw bills (từ API hoặc từ raw archive).
         
+        Args:
+            all_bills: Raw bills
+            
+        Returns:
+            tuple: (bills_list, products_list)
+        """
         bills_without_products = []
         all_products = []
         
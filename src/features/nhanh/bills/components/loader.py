@@ -4,15 +4,25 @@ Upload data lên GCS và load vào BigQuery native tables (fact tables).
 Flatten nested structures trong Python trước khi load.
 Sử dụng MERGE statement để đảm bảo idempotency.
 """
+import os
 from datetime import datetime, date
 from typing import Dict, Any, List, Optional
 import uuid
 import time
+import pyarrow as pa
 from google.cloud import bigquery
-from src.shared.gcs import GCSLoader
-from src.shared.bigquery import BigQueryExternalTableSetup
+from src.shared.gcs import GCSLoader, UploadJob, UploadQueue
+from src.shared.bigquery import (
+    BigQueryExternalTableSetup,
+    KeyedDML,
+    ArrowStagingLoader,
+    TableProvisioner,
+    InstrumentedClient,
+)
+from src.shared.parquet import records_to_table
 from src.shared.logging import get_logger
 from src.config import settings
+from .tables import BILLS_TABLE_SPEC, BILL_PRODUCTS_TABLE_SPEC
 
 logger = get_logger(__name__)
 
@@ -25,19 +35,54 @@ class BillLoader:
     - Load vào BigQuery fact tables (nhanhVN.fact_sales_bills_v3_0, nhanhVN.fact_sales_bills_product_v3_0)
     - Tránh duplicate bằng MERGE statement (idempotent, tự động UPDATE/INSERT)
     - Partition filtering trong MERGE để tối ưu performance
+    
+    Direct load mode (settings.bq_direct_load): Arrow table được load thẳng vào
+    BigQuery staging table rồi MERGE; GCS backup được spool ra local disk và
+    upload bất đồng bộ qua UploadQueue, đợi xong trong flush_archive().
     """
     
-    def __init__(self):
-        """Khởi tạo loader với GCS và BigQuery clients."""
+    def __init__(self, direct_load: Optional[bool] = None):
+        """
+        Khởi tạo loader với GCS và BigQuery clients.
+        
+        Args:
+            direct_load: Bật direct load mode (mặc định lấy từ settings.bq_direct_load)
+        """
         self.gcs_loader = GCSLoader(bucket_name=settings.bronze_bucket)
         self.bq_setup = BigQueryExternalTableSetup()
-        self.bq_client = bigquery.Client(project=settings.gcp_project)
+        # Mọi query job được gắn labels + ghi cost (xem src/shared/bigquery/instrumentation.py)
+        self.bq_client = InstrumentedClient(bigquery.Client(project=settings.gcp_project), pipeline="nhanh_bills")
+        self.keyed_dml = KeyedDML(self.bq_client)
+        self.staging_loader = ArrowStagingLoader(self.bq_client)
+        self.direct_load = settings.bq_direct_load if direct_load is None else direct_load
+        # Backup còn trong spool từ lần chạy trước được upload lại khi tạo queue
+        self.archive_queue: Optional[UploadQueue] = None
+        if self.direct_load:
+            self.archive_queue = UploadQueue(
+                self.gcs_loader,
+                spool_dir=os.path.join(settings.gcs_upload_spool_dir, settings.bronze_bucket)
+            )
         self.platform = "nhanh"
         self.entity = "bills"
         
         # Fact table IDs (nhanhVN dataset)
-        self.bills_table_id = f"{settings.gcp_project}.{settings.target_dataset}.fact_sales_bills_v3_0"
-        self.products_table_id = f"{settings.gcp_project}.{settings.target_dataset}.fact_sales_bills_product_v3_0"
+        self.bills_table_id = BILLS_TABLE_SPEC.table_id()
+        self.products_table_id = BILL_PRODUCTS_TABLE_SPEC.table_id()
+        
+        # Partitioned + clustered table provisioning
+        self.provisioner = TableProvisioner(self.bq_client, dataset=settings.target_dataset)
+        self.table_specs = {
+            self.bills_table_id: BILLS_TABLE_SPEC,
+            self.products_table_id: BILL_PRODUCTS_TABLE_SPEC,
+        }
+        self._ensured_tables = set()
+        # Arrow tables đã flatten của lần load gần nhất theo entity path (dùng cho reconciliation)
+        self.flattened_tables: Dict[str, pa.Table] = {}
+        # Tổng payment_total_amount của bills lần load gần nhất (dùng cho volume anomaly detection)
+        self.bills_amount_total: Optional[float] = None
+        # Fact tables có BigQuery load fail (load không raise để không block pipeline;
+        # pipeline đọc list này để không ghi ngày là completed)
+        self.failed_loads: List[str] = []
     
     def _flatten_bill(self, bill: Dict[str, Any], extraction_timestamp: datetime) -> Dict[str, Any]:
         """
@@ -271,6 +316,91 @@ class BillLoader:
             )
             # Không raise để không block pipeline nếu delete fail
     
+    def _delete_products_for_reload(self, bill_ids: List[int], partition_date: date) -> int:
+        """
+        Xóa products cũ trước khi MERGE lại partition trong MỘT DML statement:
+        - Records có bill_date NULL thuộc bill_ids của lần extract hiện tại
+        - Toàn bộ partition bill_date = partition_date
+
+        bill_ids được truyền qua ARRAY<INT64> query parameter (UNNEST) thay vì
+        build `IN (...)` string theo batch 1000.
+
+        Args:
+            bill_ids: Danh sách bill_id trong lần extract hiện tại
+            partition_date: Partition bill_date cần xóa
+
+        Returns:
+            int: Số rows đã xóa
+        """
+        try:
+            deleted_rows = self.keyed_dml.delete_by_keys(
+                table_id=self.products_table_id,
+                key_column="bill_id",
+                keys=bill_ids,
+                key_condition="bill_date IS NULL",
+                or_condition="bill_date = @partition_date",
+                query_parameters=[
+                    bigquery.ScalarQueryParameter("partition_date", "DATE", partition_date)
+                ]
+            )
+
+            if deleted_rows > 0:
+                logger.info(
+                    f"Deleted {deleted_rows} rows before reloading products partition",
+                    table_id=self.products_table_id,
+                    partition_date=partition_date.isoformat(),
+                    deleted_rows=deleted_rows,
+                    bill_ids_count=len(bill_ids)
+                )
+            return deleted_rows
+
+        except Exception as e:
+            logger.warning(
+                "Failed to delete products partition data, continuing with load",
+                table_id=self.products_table_id,
+                partition_date=partition_date.isoformat(),
+                error=str(e)
+            )
+            # Không raise để không block pipeline nếu delete fail
+            return 0
+
+    def _delete_products_for_bulk_reload(self, staging_table_id: str) -> int:
+        """
+        Như _delete_products_for_reload cho mọi partitions trong staging table, trong
+        MỘT DML statement: xóa records bill_date NULL của các bill_ids trong staging và
+        toàn bộ các partitions bill_date có trong staging.
+
+        Args:
+            staging_table_id: Staging table chứa products sắp MERGE
+
+        Returns:
+            int: Số rows đã xóa
+        """
+        sql = f"""
+        DELETE FROM `{self.products_table_id}`
+        WHERE bill_date IN (SELECT DISTINCT bill_date FROM `{staging_table_id}` WHERE bill_date IS NOT NULL)
+            OR (bill_date IS NULL AND bill_id IN (SELECT DISTINCT bill_id FROM `{staging_table_id}`))
+        """
+        try:
+            query_job = self.bq_client.query(sql)
+            query_job.result()
+            deleted_rows = query_job.num_dml_affected_rows or 0
+            if deleted_rows > 0:
+                logger.info(
+                    f"Deleted {deleted_rows} rows before bulk reloading products partitions",
+                    table_id=self.products_table_id,
+                    deleted_rows=deleted_rows
+                )
+            return deleted_rows
+        except Exception as e:
+            logger.warning(
+                "Failed to delete products partitions data, continuing with bulk load",
+                table_id=self.products_table_id,
+                error=str(e)
+            )
+            # Không raise: giống _delete_products_for_reload
+            return 0
+
     def _create_temp_external_table(
         self,
         gcs_uri: str,
@@ -328,7 +458,7 @@ class BillLoader:
         self,
         external_table_id: str,
         target_table_id: str,
-        partition_date: date
+        partition_date: Optional[date]
     ) -> int:
         """
         MERGE data từ external table vào bills fact table.
@@ -337,12 +467,12 @@ class BillLoader:
         Args:
             external_table_id: External table ID chứa source data
             target_table_id: Target fact table ID
-            partition_date: Partition date để filter
+            partition_date: Partition date để filter (None: source gồm nhiều partitions)
             
         Returns:
             int: Number of rows merged (inserted + updated)
         """
-        date_str = partition_date.isoformat()
+        date_str = partition_date.isoformat() if partition_date else None
         
         # Check if table is empty - if so, use optimized INSERT approach
         try:
@@ -465,7 +595,7 @@ class BillLoader:
         self,
         external_table_id: str,
         target_table_id: str,
-        partition_date: date
+        partition_date: Optional[date]
     ) -> int:
         """
         MERGE data từ external table vào products fact table.
@@ -474,12 +604,12 @@ class BillLoader:
         Args:
             external_table_id: External table ID chứa source data
             target_table_id: Target fact table ID
-            partition_date: Partition date để filter
+            partition_date: Partition date để filter (None: source gồm nhiều partitions)
             
         Returns:
             int: Number of rows merged (inserted + updated)
         """
-        date_str = partition_date.isoformat()
+        date_str = partition_date.isoformat() if partition_date else None
         
         # Check if table is empty - if so, use INSERT instead of MERGE for better compatibility
         try:
@@ -611,7 +741,7 @@ class BillLoader:
         partition_date: date,
         partition_field: str = "extraction_date",
         partition_type: str = "date"
-    ) -> None:
+    ) -> bool:
         """
         Load data từ GCS Parquet file vào BigQuery native table sử dụng MERGE.
         MERGE đảm bảo idempotency: UPDATE nếu match, INSERT nếu không.
@@ -623,9 +753,12 @@ class BillLoader:
             partition_date: Ngày partition
             partition_field: Tên field để partition (default: extraction_date)
             partition_type: Type of partition - "date" (direct DATE field) or "timestamp" (DATE(extraction_timestamp))
+            
+        Returns:
+            bool: True nếu load thành công
         """
         if not gcs_uri:
-            return
+            return False
         
         external_table_id = None
         
@@ -651,23 +784,7 @@ class BillLoader:
             external_table_id = self._create_temp_external_table(gcs_uri, table_id)
             
             # Step 4: MERGE từ external table vào fact table
-            # Determine merge method based on table type
-            if table_id == self.bills_table_id:
-                rows_affected = self._merge_bills_from_external_table(
-                    external_table_id, table_id, partition_date
-                )
-            elif table_id == self.products_table_id:
-                rows_affected = self._merge_products_from_external_table(
-                    external_table_id, table_id, partition_date
-                )
-            else:
-                # Fallback: generic merge (should not happen in normal flow)
-                logger.warning(
-                    f"Unknown table type, using generic merge",
-                    table_id=table_id
-                )
-                # For now, raise error - can be extended later
-                raise ValueError(f"Unknown table type for MERGE: {table_id}")
+            rows_affected = self._merge_into_fact_table(external_table_id, table_id, partition_date)
             
             # Step 5: Verify table exists and has partitioning after MERGE
             # Note: MERGE INSERT will create table but without partition definition
@@ -695,6 +812,7 @@ class BillLoader:
                 rows_affected=rows_affected,
                 partition_date=partition_date.isoformat()
             )
+            return True
             
         except Exception as e:
             logger.error(
@@ -706,16 +824,162 @@ class BillLoader:
             )
             # Không raise để không block pipeline nếu BigQuery load fail
             # GCS đã có backup rồi
+            return False
         finally:
             # Step 6: Cleanup temporary external table
             if external_table_id:
                 self._cleanup_external_table(external_table_id)
     
+    def _merge_into_fact_table(self, source_table_id: str, table_id: str, partition_date: Optional[date]) -> int:
+        """
+        MERGE từ source table (external table hoặc staging table) vào fact table.
+        Chọn MERGE statement dựa trên target table.
+        
+        Args:
+            source_table_id: External/staging table chứa data mới
+            table_id: Target fact table ID
+            partition_date: Partition date (None: source gồm nhiều partitions)
+            
+        Returns:
+            int: Number of rows affected
+        """
+        if table_id == self.bills_table_id:
+            return self._merge_bills_from_external_table(source_table_id, table_id, partition_date)
+        if table_id == self.products_table_id:
+            return self._merge_products_from_external_table(source_table_id, table_id, partition_date)
+        
+        # Fallback: generic merge (should not happen in normal flow)
+        logger.warning(
+            "Unknown table type, using generic merge",
+            table_id=table_id
+        )
+        # For now, raise error - can be extended later
+        raise ValueError(f"Unknown table type for MERGE: {table_id}")
+    
+    def _load_table_to_bigquery(
+        self,
+        table: pa.Table,
+        table_id: str,
+        partition_date: date,
+        partition_field: str = "extraction_date"
+    ) -> bool:
+        """
+        Load Arrow table trực tiếp vào BigQuery fact table (không qua GCS).
+        Arrow table → staging table (load_table_from_file) → MERGE → drop staging.
+        
+        Args:
+            table: Arrow table đã flatten
+            table_id: Full BigQuery table ID
+            partition_date: Ngày partition
+            partition_field: Tên field để partition
+            
+        Returns:
+            bool: True nếu load thành công
+        """
+        if table.num_rows == 0:
+            return True
+        
+        staging_table_id = None
+        
+        try:
+            self._ensure_table_exists(table_id, partition_field)
+            
+            staging_table_id = self.staging_loader.load(table, table_id)
+            rows_affected = self._merge_into_fact_table(staging_table_id, table_id, partition_date)
+            
+            logger.info(
+                "Loaded Arrow table to BigQuery using staging MERGE",
+                table_id=table_id,
+                rows=table.num_rows,
+                rows_affected=rows_affected,
+                partition_date=partition_date.isoformat()
+            )
+            return True
+            
+        except Exception as e:
+            logger.error(
+                "Failed to load Arrow table to BigQuery",
+                table_id=table_id,
+                partition_date=partition_date.isoformat(),
+                error=str(e)
+            )
+            # Không raise để không block pipeline nếu BigQuery load fail
+            # GCS backup vẫn được upload ở side path
+            return False
+        finally:
+            if staging_table_id:
+                self.staging_loader.drop(staging_table_id)
+    
+    def _archive_to_gcs_async(
+        self,
+        entity_path: str,
+        table: pa.Table,
+        partition_date: date,
+        metadata: Dict[str, Any]
+    ) -> UploadJob:
+        """
+        Spool GCS backup của Arrow table ra local disk và upload ở background.
+        Sau khi hàm này return, backup đã durable trên local spool.
+        
+        Args:
+            entity_path: Entity path (format: "platform/entity")
+            table: Arrow table cần backup
+            partition_date: Ngày partition
+            metadata: Upload metadata
+            
+        Returns:
+            UploadJob: Job upload (object_path là GCS path mà file sẽ được upload tới)
+        """
+        return self.archive_queue.submit(
+            entity=entity_path,
+            table=table,
+            partition_date=partition_date,
+            metadata=metadata,
+            object_path=self.gcs_loader.build_parquet_path(entity_path, partition_date)
+        )
+    
+    def _is_unchanged(self, entity_path: str, partition_date: date, table: pa.Table) -> bool:
+        """
+        Data của ngày không đổi so với backup trên GCS → bỏ qua cả BigQuery load và backup.
+        Lỗi khi kiểm tra không chặn load.
+        """
+        try:
+            unchanged = self.gcs_loader.is_unchanged(entity_path, partition_date, table)
+        except Exception as e:
+            logger.warning("Failed to compare with GCS backup checksum", entity=entity_path, error=str(e))
+            return False
+        if unchanged:
+            logger.info(
+                "Data unchanged since last load, skipped BigQuery load and GCS backup",
+                entity=entity_path,
+                partition_date=partition_date.isoformat(),
+                rows=table.num_rows
+            )
+        return unchanged
+    
+    def flush_archive(self) -> List[str]:
+        """
+        Đợi tất cả GCS backups đang chạy ở background hoàn tất.
+        Sau khi hàm này return, các file backup đã durable trên GCS; backup upload
+        fail sau khi hết retries vẫn nằm trong spool và được upload lại ở lần chạy sau.
+        
+        Returns:
+            List[str]: GCS paths đã upload thành công
+        """
+        if self.archive_queue is None:
+            return []
+        return self.archive_queue.flush()
+    
     def _ensure_table_exists(self, table_id: str, partition_field: str = "extraction_date") -> None:
         """
-        Ensure BigQuery dataset exists. Table sẽ được tạo tự động khi load từ Parquet.
+        Ensure BigQuery dataset và fact table tồn tại.
         Dataset: nhanhVN (target_dataset)
+        Fact tables được tạo theo TableSpec (partition + clustering), xem components/tables.py.
+        Mỗi table chỉ được check một lần cho mỗi loader instance.
         """
+        if table_id in self._ensured_tables:
+            return
+        
         try:
             dataset_id = f"{settings.gcp_project}.{settings.target_dataset}"
             dataset = self.bq_client.get_dataset(dataset_id)
@@ -728,7 +992,11 @@ class BillLoader:
             dataset = self.bq_client.create_dataset(dataset, exists_ok=True)
             logger.info(f"Created dataset {dataset_id}")
         
-        # Table sẽ được tạo tự động khi load từ Parquet với autodetect=True
+        spec = self.table_specs.get(table_id)
+        if spec:
+            self.provisioner.ensure_table(spec)
+        
+        self._ensured_tables.add(table_id)
     
     def load_bills(
         self,
@@ -767,6 +1035,7 @@ class BillLoader:
             f"Flattened {len(flattened_data)} bills",
             records=len(flattened_data)
         )
+        self.bills_amount_total = sum(bill["payment_total_amount"] or 0.0 for bill in flattened_data)
         
         upload_metadata = {
             "platform": self.platform,
@@ -776,13 +1045,43 @@ class BillLoader:
             **(metadata or {})
         }
         
+        # Bills table is partitioned by 'date' field
+        # Use the date from the first bill or partition_date
+        bill_date = partition_date
+        if flattened_data and flattened_data[0].get("date"):
+            bill_date = flattened_data[0]["date"]
+        
+        if self.direct_load:
+            # Direct load: Arrow table → BigQuery staging → MERGE, GCS backup ở background
+            table = records_to_table(entity_path, flattened_data)
+            self.flattened_tables[entity_path] = table
+            if self._is_unchanged(entity_path, partition_date, table):
+                return ""
+            archive_job = self._archive_to_gcs_async(entity_path, table, partition_date, upload_metadata)
+            loaded = self._load_table_to_bigquery(
+                table=table,
+                table_id=self.bills_table_id,
+                partition_date=bill_date,
+                partition_field="date"
+            )
+            if loaded:
+                # Checksum chỉ được commit khi load xong: ngày không bị bỏ qua nếu process dừng trước đó
+                self.archive_queue.commit_content_checksum(archive_job)
+            else:
+                self.failed_loads.append(self.bills_table_id)
+            return archive_job.object_path
+        
+        if settings.reconciliation_enabled:
+            self.flattened_tables[entity_path] = records_to_table(entity_path, flattened_data)
+        
         # Step 2: Upload flattened data to GCS (backup)
         gcs_path = self.gcs_loader.upload_parquet_by_date(
             entity=entity_path,
             data=flattened_data,
             partition_date=partition_date,
             metadata=upload_metadata,
-            overwrite_partition=True
+            overwrite_partition=True,
+            commit_checksum=False
         )
         
         logger.info(
@@ -792,16 +1091,12 @@ class BillLoader:
         )
         
         # Step 3: Load from GCS to BigQuery fact table
+        # (gcs_path rỗng: data không đổi so với lần upload đã load thành công, BigQuery đã có data này)
         if gcs_path:
             gcs_uri = f"gs://{settings.bronze_bucket}/{gcs_path}"
+            loaded = False
             try:
-                # Bills table is partitioned by 'date' field
-                # Use the date from the first bill or partition_date
-                bill_date = partition_date
-                if flattened_data and flattened_data[0].get("date"):
-                    bill_date = flattened_data[0]["date"]
-                
-                self._load_gcs_to_bigquery(
+                loaded = self._load_gcs_to_bigquery(
                     gcs_uri=gcs_uri,
                     table_id=self.bills_table_id,
                     partition_date=bill_date,
@@ -815,6 +1110,10 @@ class BillLoader:
                     error=str(e)
                 )
                 # Không raise để không block pipeline
+            if loaded:
+                self.gcs_loader.commit_content_checksum(entity_path, partition_date, gcs_path)
+            else:
+                self.failed_loads.append(self.bills_table_id)
         
         return gcs_path
     
@@ -913,13 +1212,45 @@ class BillLoader:
             **(metadata or {})
         }
         
+        # Products table is partitioned by bill_date
+        # Use bill_date from first product or partition_date as fallback
+        bill_date_for_partition = partition_date
+        if flattened_data and flattened_data[0].get("bill_date"):
+            bill_date_for_partition = flattened_data[0]["bill_date"]
+        bill_ids = [p.get("bill_id") for p in flattened_data if p.get("bill_id")]
+        
+        if self.direct_load:
+            # Direct load: Arrow table → BigQuery staging → MERGE, GCS backup ở background
+            table = records_to_table(entity_path, flattened_data)
+            self.flattened_tables[entity_path] = table
+            if self._is_unchanged(entity_path, partition_date, table):
+                return ""
+            archive_job = self._archive_to_gcs_async(entity_path, table, partition_date, upload_metadata)
+            self._delete_products_for_reload(bill_ids, bill_date_for_partition)
+            loaded = self._load_table_to_bigquery(
+                table=table,
+                table_id=self.products_table_id,
+                partition_date=bill_date_for_partition,
+                partition_field="bill_date"
+            )
+            if loaded:
+                # Checksum chỉ được commit khi load xong: ngày không bị bỏ qua nếu process dừng trước đó
+                self.archive_queue.commit_content_checksum(archive_job)
+            else:
+                self.failed_loads.append(self.products_table_id)
+            return archive_job.object_path
+        
+        if settings.reconciliation_enabled:
+            self.flattened_tables[entity_path] = records_to_table(entity_path, flattened_data)
+        
         # Step 2: Upload flattened data to GCS (backup)
         gcs_path = self.gcs_loader.upload_parquet_by_date(
             entity=entity_path,
             data=flattened_data,
             partition_date=partition_date,
             metadata=upload_metadata,
-            overwrite_partition=True
+            overwrite_partition=True,
+            commit_checksum=False
         )
         
         logger.info(
@@ -929,59 +1260,17 @@ class BillLoader:
         )
         
         # Step 3: Load from GCS to BigQuery fact table
+        # (gcs_path rỗng: data không đổi so với lần upload đã load thành công, BigQuery đã có data này)
         if gcs_path:
             gcs_uri = f"gs://{settings.bronze_bucket}/{gcs_path}"
+            loaded = False
             try:
-                # Products table is partitioned by bill_date
-                # Use bill_date from first product or partition_date as fallback
-                bill_date_for_partition = partition_date
-                if flattened_data and flattened_data[0].get("bill_date"):
-                    bill_date_for_partition = flattened_data[0]["bill_date"]
-                
                 # Delete existing partition data before MERGE to ensure clean state
                 # This is important because old records might have NULL bill_date
                 # and MERGE UPDATE might not work correctly with NULL values
-                # Also delete records with NULL bill_date that match bill_ids from current extraction
-                try:
-                    if flattened_data:
-                        # Get bill_ids from current extraction
-                        bill_ids = list(set(p.get("bill_id") for p in flattened_data if p.get("bill_id")))
-                        if bill_ids:
-                            # Delete records with these bill_ids that have NULL bill_date
-                            # Process in batches of 1000 to avoid query size limits
-                            batch_size = 1000
-                            total_deleted = 0
-                            for i in range(0, len(bill_ids), batch_size):
-                                batch = bill_ids[i:i + batch_size]
-                                bill_ids_str = ",".join(str(bid) for bid in batch)
-                                delete_sql = f"""
-                                DELETE FROM `{self.products_table_id}`
-                                WHERE bill_id IN ({bill_ids_str})
-                                  AND bill_date IS NULL
-                                """
-                                delete_job = self.bq_client.query(delete_sql)
-                                delete_job.result()
-                                deleted_count = delete_job.num_dml_affected_rows if hasattr(delete_job, 'num_dml_affected_rows') else 0
-                                total_deleted += deleted_count
-                            
-                            if total_deleted > 0:
-                                logger.info(
-                                    f"Deleted {total_deleted} rows with NULL bill_date for bill_ids in current extraction",
-                                    deleted_count=total_deleted,
-                                    bill_ids_count=len(bill_ids)
-                                )
-                except Exception as e:
-                    logger.warning(f"Failed to delete NULL bill_date records, continuing: {e}")
-                
-                # Also delete partition data by bill_date (for records that already have correct bill_date)
-                self._delete_partition_data(
-                    table_id=self.products_table_id,
-                    partition_date=bill_date_for_partition,
-                    partition_field="bill_date",
-                    partition_type="date"
-                )
-                
-                self._load_gcs_to_bigquery(
+                self._delete_products_for_reload(bill_ids, bill_date_for_partition)
+
+                loaded = self._load_gcs_to_bigquery(
                     gcs_uri=gcs_uri,
                     table_id=self.products_table_id,
                     partition_date=bill_date_for_partition,
@@ -995,9 +1284,50 @@ class BillLoader:
                     error=str(e)
                 )
                 # Không raise để không block pipeline
+            if loaded:
+                self.gcs_loader.commit_content_checksum(entity_path, partition_date, gcs_path)
+            else:
+                self.failed_loads.append(self.products_table_id)
         
         return gcs_path
     
+    def reload_from_gcs(self, gcs_uris: List[str], table_id: str) -> int:
+        """
+        Reload nhiều GCS Parquet files vào fact table: load jobs nhiều URIs vào một
+        staging table, dedupe theo merge keys, rồi một MERGE duy nhất.
+        
+        Thay cho việc tạo external table + MERGE riêng cho từng partition khi
+        cần bù nhiều partitions (vd: sync_gcs_to_bigquery --bulk). Với products
+        table, các partitions trong staging được xóa trước MERGE như load_bill_products.
+        
+        Args:
+            gcs_uris: GCS URIs của Parquet files (hoặc wildcard URIs)
+            table_id: Full BigQuery table ID (bills hoặc products fact table)
+            
+        Returns:
+            int: Number of rows affected
+        """
+        spec = self.table_specs[table_id]
+        self._ensure_table_exists(table_id, spec.partition_field)
+        
+        staging_table_id = self.staging_loader.load_uris(gcs_uris, table_id)
+        try:
+            self.staging_loader.dedupe(staging_table_id, spec.merge_keys)
+            if table_id == self.products_table_id:
+                # Product lines cũ không còn trong file (bill bị sửa) bị xóa như load từng partition
+                self._delete_products_for_bulk_reload(staging_table_id)
+            rows_affected = self._merge_into_fact_table(staging_table_id, table_id, None)
+        finally:
+            self.staging_loader.drop(staging_table_id)
+        
+        logger.info(
+            f"Reloaded {len(gcs_uris)} GCS files to BigQuery using staging MERGE",
+            table_id=table_id,
+            files=len(gcs_uris),
+            rows_affected=rows_affected
+        )
+        return rows_affected
+    
     def load_bills_from_gcs(
         self,
         gcs_uri: str,
@@ -0,0 +1,211 @@
+"""
+Reconciliation giữa bills và product lines.
+
+Với mỗi ngày, join bills và products đã flatten trong memory (Arrow group-by
+theo bill_id rồi join với bills) và đánh dấu các bills có tổng tiền lệch với
+tổng thành tiền của product lines quá tolerance:
+- amount_mismatch: payment_total_amount khác cả sum(amount) lẫn sum(amount) - payment_discount
+- missing_products: bill có tổng tiền khác 0 nhưng không có product line nào
+- missing_bill: product lines có bill_id không nằm trong bills của ngày
+
+Exceptions được ghi vào một table nhỏ bằng một load job thay partition của ngày
+(partition decorator + WRITE_TRUNCATE), nên chạy được sau mỗi lần load.
+"""
+from datetime import date, datetime, timezone
+from io import BytesIO
+from typing import Any, Optional
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from google.cloud import bigquery
+from src.config import settings
+from src.shared.bigquery import TableProvisioner
+from src.shared.logging import get_logger
+from .tables import RECONCILIATION_EXCEPTIONS_TABLE_SPEC
+
+logger = get_logger(__name__)
+
+EXCEPTIONS_SCHEMA = pa.schema([
+    ("bill_id", pa.int64()),
+    ("bill_date", pa.date32()),
+    ("depotId", pa.int64()),
+    ("reason", pa.string()),
+    ("payment_total_amount", pa.float64()),
+    ("payment_discount", pa.float64()),
+    ("line_amount_sum", pa.float64()),
+    ("line_discount_sum", pa.float64()),
+    ("line_count", pa.int64()),
+    ("difference", pa.float64()),
+    ("checked_at", pa.timestamp("us", tz="UTC")),
+])
+
+
+def _column(table: pa.Table, name: str, type_: pa.DataType) -> pa.ChunkedArray:
+    """Column cast về type_ (toàn null nếu table không có column)."""
+    if name not in table.column_names:
+        return pa.chunked_array([pa.nulls(table.num_rows, type_)])
+    return table.column(name).cast(type_)
+
+
+class BillReconciler:
+    """Đối soát tổng tiền bill với product lines và ghi exceptions vào BigQuery."""
+
+    def __init__(
+        self,
+        bq_client: Any,
+        table_id: Optional[str] = None,
+        tolerance: Optional[float] = None,
+        relative_tolerance: Optional[float] = None
+    ):
+        """
+        Khởi tạo reconciler.
+
+        Args:
+            bq_client: BigQuery client
+            table_id: Exceptions table (mặc định: RECONCILIATION_EXCEPTIONS_TABLE_SPEC)
+            tolerance: Chênh lệch tuyệt đối cho phép (mặc định: settings.reconciliation_tolerance)
+            relative_tolerance: Chênh lệch tương đối cho phép theo tổng tiền bill
+                (mặc định: settings.reconciliation_relative_tolerance)
+        """
+        self.bq_client = bq_client
+        self.table_id = table_id or RECONCILIATION_EXCEPTIONS_TABLE_SPEC.table_id()
+        self.tolerance = settings.reconciliation_tolerance if tolerance is None else tolerance
+        self.relative_tolerance = (
+            settings.reconciliation_relative_tolerance if relative_tolerance is None else relative_tolerance
+        )
+        self._table_ensured = False
+
+    def reconcile(self, bills: pa.Table, products: pa.Table, partition_date: date) -> pa.Table:
+        """
+        Tìm các bills không khớp với product lines của chúng.
+
+        Args:
+            bills: Bills đã flatten (id, depotId, payment_total_amount, payment_discount)
+            products: Products đã flatten (bill_id, amount, discount)
+            partition_date: Ngày được đối soát (bill_date của mọi exception)
+
+        Returns:
+            pa.Table: Exceptions theo EXCEPTIONS_SCHEMA
+        """
+        bills_side = pa.table({
+            "id": _column(bills, "id", pa.int64()),
+            "depotId": _column(bills, "depotId", pa.int64()),
+            "payment_total_amount": _column(bills, "payment_total_amount", pa.float64()),
+            "payment_discount": _column(bills, "payment_discount", pa.float64()),
+            "_is_bill": pa.chunked_array([pa.repeat(pa.scalar(True), bills.num_rows)]),
+        })
+        lines = pa.table({
+            "bill_id": _column(products, "bill_id", pa.int64()),
+            "amount": _column(products, "amount", pa.float64()),
+            "discount": _column(products, "discount", pa.float64()),
+        }).group_by("bill_id").aggregate([
+            ("amount", "sum"),
+            ("discount", "sum"),
+            ([], "count_all"),
+        ])
+
+        joined = bills_side.join(lines, keys="id", right_keys="bill_id", join_type="full outer")
+
+        is_bill = pc.fill_null(joined.column("_is_bill"), False)
+        has_lines = pc.is_valid(joined.column("count_all"))
+        total = joined.column("payment_total_amount")
+        line_amount = pc.fill_null(joined.column("amount_sum"), 0.0)
+        bill_discount = pc.fill_null(joined.column("payment_discount"), 0.0)
+
+        difference = pc.subtract(total, line_amount)
+        difference_after_discount = pc.subtract(total, pc.subtract(line_amount, bill_discount))
+        allowed = pc.max_element_wise(
+            pc.multiply(pc.abs(total), self.relative_tolerance),
+            pa.scalar(float(self.tolerance))
+        )
+        amount_mismatch = pc.and_(
+            pc.greater(pc.abs(difference), allowed),
+            pc.greater(pc.abs(difference_after_discount), allowed)
+        )
+
+        reason = pc.if_else(
+            pc.invert(is_bill), "missing_bill",
+            pc.if_else(
+                pc.invert(has_lines),
+                pc.if_else(pc.not_equal(pc.fill_null(total, 0.0), 0.0), "missing_products", None),
+                pc.if_else(pc.fill_null(amount_mismatch, False), "amount_mismatch", None)
+            )
+        )
+        flagged = pc.is_valid(reason)
+        exceptions = joined.append_column("reason", reason).append_column("difference", difference).filter(flagged)
+
+        num_rows = exceptions.num_rows
+        result = pa.table({
+            "bill_id": exceptions.column("id"),
+            "bill_date": pa.repeat(pa.scalar(partition_date, pa.date32()), num_rows),
+            "depotId": exceptions.column("depotId"),
+            "reason": exceptions.column("reason"),
+            "payment_total_amount": exceptions.column("payment_total_amount"),
+            "payment_discount": exceptions.column("payment_discount"),
+            "line_amount_sum": exceptions.column("amount_sum"),
+            "line_discount_sum": exceptions.column("discount_sum"),
+            "line_count": exceptions.column("count_all"),
+            "difference": exceptions.column("difference"),
+            "checked_at": pa.repeat(pa.scalar(datetime.now(timezone.utc), EXCEPTIONS_SCHEMA.field("checked_at").type), num_rows),
+        }, schema=EXCEPTIONS_SCHEMA)
+        return result.sort_by([("reason", "ascending"), ("bill_id", "ascending")])
+
+    def _ensure_table(self) -> None:
+        if self._table_ensured:
+            return
+        _, dataset, _ = self.table_id.split(".")
+        TableProvisioner(self.bq_client, dataset=dataset).ensure_table(RECONCILIATION_EXCEPTIONS_TABLE_SPEC)
+        self._table_ensured = True
+
+    def write(self, exceptions: pa.Table, partition_date: date) -> int:
+        """
+        Thay exceptions của ngày trong exceptions table bằng một load job
+        (partition decorator + WRITE_TRUNCATE; không có exception thì partition được xóa trắng).
+
+        Args:
+            exceptions: Kết quả reconcile() của ngày
+            partition_date: Ngày được đối soát
+
+        Returns:
+            int: Số exceptions đã ghi
+        """
+        self._ensure_table()
+        buffer = BytesIO()
+        pq.write_table(exceptions, buffer)
+        buffer.seek(0)
+        load_job = self.bq_client.load_table_from_file(
+            buffer,
+            f"{self.table_id}${partition_date.strftime('%Y%m%d')}",
+            job_config=bigquery.LoadJobConfig(
+                source_format=bigquery.SourceFormat.PARQUET,
+                write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE
+            )
+        )
+        load_job.result()
+        return exceptions.num_rows
+
+    def run(self, bills: pa.Table, products: pa.Table, partition_date: date) -> pa.Table:
+        """
+        Reconcile một ngày và ghi exceptions.
+
+        Args:
+            bills: Bills đã flatten của ngày
+            products: Products đã flatten của ngày
+            partition_date: Ngày được đối soát
+
+        Returns:
+            pa.Table: Exceptions của ngày
+        """
+        exceptions = self.reconcile(bills, products, partition_date)
+        self.write(exceptions, partition_date)
+        reasons = pc.value_counts(exceptions.column("reason")).to_pylist() if exceptions.num_rows else []
+        log = logger.warning if exceptions.num_rows else logger.info
+        log(
+            f"Reconciled bills for {partition_date.isoformat()}: {exceptions.num_rows} exceptions",
+            partition_date=partition_date.isoformat(),
+            bills=bills.num_rows,
+            products=products.num_rows,
+            exceptions=exceptions.num_rows,
+            reasons={item["values"]: item["counts"] for item in reasons}
+        )
+        return exceptions
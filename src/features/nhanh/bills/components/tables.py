@@ -0,0 +1,113 @@
+"""
+Table specs cho bills fact tables (nhanhVN dataset).
+
+Clustering được chọn theo pattern truy cập thực tế:
+- fact_sales_bills_v3_0: MERGE `ON T.id = S.id` và dedupe `PARTITION BY id` → cluster theo id
+  trước; depotId, customer_id là các filter phổ biến của báo cáo downstream.
+- fact_sales_bills_product_v3_0: MERGE `ON bill_id, product_id` → cluster theo (bill_id, product_id).
+"""
+from google.cloud import bigquery
+from src.shared.bigquery.provisioning import TableSpec
+
+
+BILLS_TABLE_SPEC = TableSpec(
+    table_name="fact_sales_bills_v3_0",
+    schema=[
+        bigquery.SchemaField("id", "INT64"),
+        bigquery.SchemaField("depotId", "INT64"),
+        bigquery.SchemaField("date", "DATE"),
+        bigquery.SchemaField("type", "INT64"),
+        bigquery.SchemaField("mode", "INT64"),
+
+        # Customer info (Flattened from "customer" object)
+        bigquery.SchemaField("customer_id", "INT64"),
+        bigquery.SchemaField("customer_name", "STRING"),
+        bigquery.SchemaField("customer_mobile", "STRING"),
+        bigquery.SchemaField("customer_address", "STRING"),
+
+        # Sale/Staff info
+        bigquery.SchemaField("sale_id", "INT64"),
+        bigquery.SchemaField("sale_name", "STRING"),
+        bigquery.SchemaField("created_id", "INT64"),
+        bigquery.SchemaField("created_email", "STRING"),
+
+        # Payment info (Flattened from "payment" object)
+        bigquery.SchemaField("payment_total_amount", "FLOAT64"),
+        bigquery.SchemaField("payment_customer_amount", "FLOAT64"),
+        bigquery.SchemaField("payment_discount", "FLOAT64"),
+        bigquery.SchemaField("payment_points", "FLOAT64"),
+
+        # Flattened payment methods
+        bigquery.SchemaField("payment_cash_amount", "FLOAT64"),
+        bigquery.SchemaField("payment_transfer_amount", "FLOAT64"),
+        bigquery.SchemaField("payment_transfer_account_id", "INT64"),
+        bigquery.SchemaField("payment_credit_amount", "FLOAT64"),
+
+        bigquery.SchemaField("description", "STRING"),
+        bigquery.SchemaField("extraction_timestamp", "TIMESTAMP"),
+    ],
+    partition_field="date",
+    clustering_fields=["id", "depotId", "customer_id"],
+    merge_keys=["id", "date"],
+    description="NhanhVN bills - Flattened sales data"
+)
+
+
+BILL_PRODUCTS_TABLE_SPEC = TableSpec(
+    table_name="fact_sales_bills_product_v3_0",
+    schema=[
+        bigquery.SchemaField("bill_id", "INT64"),
+
+        # Product info
+        bigquery.SchemaField("product_id", "INT64"),
+        bigquery.SchemaField("product_code", "STRING"),
+        bigquery.SchemaField("product_barcode", "STRING"),
+        bigquery.SchemaField("product_name", "STRING"),
+
+        # Transaction info
+        bigquery.SchemaField("quantity", "FLOAT64"),
+        bigquery.SchemaField("price", "FLOAT64"),
+        bigquery.SchemaField("discount", "FLOAT64"),
+        bigquery.SchemaField("vat_percent", "INT64"),
+        bigquery.SchemaField("vat_amount", "FLOAT64"),
+        bigquery.SchemaField("amount", "FLOAT64"),
+
+        # Metadata
+        bigquery.SchemaField("bill_date", "DATE"),
+        bigquery.SchemaField("extraction_timestamp", "TIMESTAMP"),
+    ],
+    partition_field="bill_date",
+    clustering_fields=["bill_id", "product_id"],
+    merge_keys=["bill_id", "product_id"],
+    description="NhanhVN bill products - Flattened product lines"
+)
+
+
+# Bills có tổng tiền không khớp với product lines (xem components/reconciliation.py).
+# Mỗi lần reconcile một ngày thay toàn bộ partition của ngày đó.
+RECONCILIATION_EXCEPTIONS_TABLE_SPEC = TableSpec(
+    table_name="fact_sales_bills_reconciliation_exceptions",
+    schema=[
+        bigquery.SchemaField("bill_id", "INT64"),
+        bigquery.SchemaField("bill_date", "DATE"),
+        bigquery.SchemaField("depotId", "INT64"),
+        bigquery.SchemaField("reason", "STRING"),
+        bigquery.SchemaField("payment_total_amount", "FLOAT64"),
+        bigquery.SchemaField("payment_discount", "FLOAT64"),
+        bigquery.SchemaField("line_amount_sum", "FLOAT64"),
+        bigquery.SchemaField("line_discount_sum", "FLOAT64"),
+        bigquery.SchemaField("line_count", "INT64"),
+        bigquery.SchemaField("difference", "FLOAT64"),
+        bigquery.SchemaField("checked_at", "TIMESTAMP"),
+    ],
+    partition_field="bill_date",
+    clustering_fields=["reason", "bill_id"],
+    merge_keys=["bill_id", "bill_date"],
+    description="NhanhVN bills - Bill/product line reconciliation exceptions"
+)
+
+
+FACT_TABLE_SPECS = {
+    "bills": BILLS_TABLE_SPEC,
+    "products": BILL_PRODUCTS_TABLE_SPEC,
+}
@@ -45,6 +45,14 @@ def main():
             process_by_day=True
         )
         
+        # Ngày có volume bất thường (kể cả ngày n-1 vừa chạy) được extract lại
+        reextract = pipeline.run_reextract_queue()
+        if reextract["days_reextracted"]:
+            logger.info(
+                f"Re-extracted {len(reextract['days_reextracted'])} anomalous days",
+                **reextract
+            )
+        
         logger.info("=" * 60)
         logger.info("✅ Daily Bills Sync Pipeline Completed Successfully!")
         logger.info(f"   - Bills extracted: {result.get('bills_extracted', 0)}")
@@ -1,11 +1,25 @@
 """
 Pipeline cho Bills feature.
 Orchestrate toàn bộ ETL flow: Extract → Load (flatten integrated in loader).
+Reprocess mode chạy lại flatten + load từ raw archive, không gọi API.
+Sau mỗi ngày load, bills được đối soát với product lines (BillReconciler) và
+volume của ngày được so với baseline cùng thứ (VolumeAnomalyDetector); ngày bất
+thường được đưa vào hàng đợi và chạy lại bằng run_reextract_queue().
+Trạng thái từng ngày được ghi vào run ledger (một MERGE mỗi run); skip_completed
+bỏ qua các ngày đã hoàn thành khi chạy lại một khoảng ngày.
 """
-from datetime import datetime, date, timedelta
+from datetime import datetime, date, timedelta, timezone
 from typing import Dict, Any, Optional
+import pyarrow as pa
+from .components.anomaly import VolumeAnomalyDetector
 from .components.extractor import BillExtractor
 from .components.loader import BillLoader
+from .components.reconciliation import BillReconciler
+from src.loaders.run_ledger import RunLedger, STATUS_COMPLETED, STATUS_FAILED
+from src.shared.bigquery import query_cost_tracker
+from src.shared.gcs import RawArchive
+from src.shared.parquet import table_checksum
+from src.config import settings
 from src.shared.logging import get_logger
 
 logger = get_logger(__name__)
@@ -20,14 +34,100 @@ class BillPipeline:
     
     def __init__(self):
         """Khởi tạo pipeline với các components."""
-        self.extractor = BillExtractor()
         self.loader = BillLoader()
+        # Raw archive nằm trên cùng bronze bucket/backend với Parquet backups
+        self.raw_archive = RawArchive(self.loader.gcs_loader.backend)
+        self.extractor = BillExtractor(
+            raw_archive=self.raw_archive if settings.raw_archive_enabled else None
+        )
+        self.reconciler = BillReconciler(self.loader.bq_client)
+        self.volume_detector = VolumeAnomalyDetector(
+            self.loader.gcs_loader.backend,
+            entity=f"{self.loader.platform}/{self.loader.entity}"
+        )
+        self.run_ledger = RunLedger(self.loader.bq_client)
+    
+    def _reconcile_day(self, partition_date: date) -> int:
+        """
+        Đối soát bills và products vừa load của ngày (lỗi chỉ log, không chặn pipeline).
+        
+        Returns:
+            int: Số exceptions của ngày
+        """
+        bills = self.loader.flattened_tables.get(f"{self.loader.platform}/{self.loader.entity}")
+        products = self.loader.flattened_tables.get(f"{self.loader.platform}/bill_products")
+        if bills is None and products is None:
+            return 0
+        try:
+            exceptions = self.reconciler.run(
+                bills if bills is not None else pa.table({}),
+                products if products is not None else pa.table({}),
+                partition_date
+            )
+            return exceptions.num_rows
+        except Exception as e:
+            logger.warning(
+                f"Day {partition_date}: Reconciliation failed",
+                partition_date=partition_date.isoformat(),
+                error=str(e)
+            )
+            return 0
+    
+    def _check_volume(self, partition_date: date, bills_count: int, products_count: int) -> bool:
+        """
+        Z-score volume của ngày vừa extract (lỗi chỉ log, không chặn pipeline).
+        
+        Returns:
+            bool: True nếu ngày bị đưa vào hàng đợi re-extract
+        """
+        # Không có bills thì load_bills không chạy và tổng tiền thật sự bằng 0
+        amount = self.loader.bills_amount_total if bills_count else 0.0
+        try:
+            return self.volume_detector.observe(partition_date, bills_count, products_count, amount).queued
+        except Exception as e:
+            logger.warning(
+                f"Day {partition_date}: Volume anomaly check failed",
+                partition_date=partition_date.isoformat(),
+                error=str(e)
+            )
+            return False
+    
+    def _completed_days(self, date_chunks) -> Dict[date, Any]:
+        """Các ngày trong date_chunks đã hoàn thành theo run ledger (lỗi đọc ledger → xử lý lại tất cả)."""
+        if not date_chunks:
+            return {}
+        try:
+            return self.run_ledger.completed_days(
+                f"{self.loader.platform}/{self.loader.entity}",
+                date_chunks[0][0].date(),
+                date_chunks[-1][0].date()
+            )
+        except Exception as e:
+            logger.warning("Failed to read run ledger, processing all days", error=str(e))
+            return {}
+    
+    def _day_checksum(self) -> Optional[str]:
+        """Content checksum của bills đã flatten của ngày (None nếu loader không giữ table)."""
+        entity_path = f"{self.loader.platform}/{self.loader.entity}"
+        bills_table = self.loader.flattened_tables.get(entity_path)
+        if bills_table is None:
+            return None
+        return table_checksum(bills_table)
+    
+    def _flush_run_ledger(self) -> None:
+        """Ghi run ledger (lỗi chỉ log, không che lỗi của pipeline)."""
+        try:
+            self.run_ledger.flush()
+        except Exception as e:
+            logger.warning("Failed to write run ledger", error=str(e))
     
     def run_extract_load(
         self,
         from_date: Optional[datetime] = None,
         to_date: Optional[datetime] = None,
-        process_by_day: bool = True
+        process_by_day: bool = True,
+        reprocess: bool = False,
+        skip_completed: bool = False
     ) -> Dict[str, Any]:
         """
         Chạy Extract và Load (Bronze layer) theo từng ngày.
@@ -36,11 +136,16 @@ class BillPipeline:
             from_date: Ngày bắt đầu
             to_date: Ngày kết thúc
             process_by_day: Xử lý theo từng ngày (default True, now enforced)
+            reprocess: Đọc raw bills từ raw archive thay vì gọi API
+                (ngày chưa được archive bị bỏ qua)
+            skip_completed: Bỏ qua các ngày đã completed trong run ledger
             
         Returns:
             Dict với kết quả extraction và loading
         """
-        logger.info("Starting Extract-Load pipeline for bills (Day-by-Day)")
+        logger.info(
+            f"Starting {'Reprocess' if reprocess else 'Extract'}-Load pipeline for bills (Day-by-Day)"
+        )
         
         # Determine date range - use client's split function
         if from_date is None:
@@ -50,65 +155,200 @@ class BillPipeline:
         
         date_chunks = self.extractor.client.split_date_range_by_day(from_date, to_date)
         
+        # Query cost report chỉ tính các jobs của run này
+        query_cost_tracker.reset()
+        
         total_bills = 0
         total_products = 0
         processed_days = 0
+        missing_days = []
+        failing_quality_days = []
+        reconciliation_exceptions = 0
+        queued_days = []
+        skipped_days = []
+        failed_extract_days = []
+        failed_load_days = []
+        entity_path = f"{self.loader.platform}/{self.loader.entity}"
+        use_ledger = settings.run_ledger_enabled
+        completed_days = self._completed_days(date_chunks) if use_ledger and skip_completed else {}
         
-        for chunk_idx, (day_start, day_end) in enumerate(date_chunks, 1):
-            partition_date = day_start.date()
-            logger.info(
-                f"Processing day {chunk_idx}/{len(date_chunks)}: {partition_date}"
-            )
-            
-            try:
-                # Step 1: Extract for this day
-                bills, products = self.extractor.extract_with_products(
-                    from_date=day_start,
-                    to_date=day_end,
-                    process_by_day=False  # Already split, don't split again
-                )
-                
+        try:
+            for chunk_idx, (day_start, day_end) in enumerate(date_chunks, 1):
+                partition_date = day_start.date()
+                if partition_date in completed_days:
+                    logger.info(f"Day {partition_date}: Already completed in run ledger, skipped")
+                    skipped_days.append(partition_date.isoformat())
+                    continue
                 logger.info(
-                    f"Day {partition_date}: Extracted {len(bills)} bills, {len(products)} products"
+                    f"Processing day {chunk_idx}/{len(date_chunks)}: {partition_date}"
                 )
                 
-                # Step 2: Load bills for this day
-                if bills:
-                    self.loader.load_bills(data=bills, partition_date=partition_date)
-                
-                # Step 3: Load products for this day
-                # Pass bills_data to create bill_id -> date mapping for bill_date
-                if products:
-                    self.loader.load_bill_products(
-                        data=products, 
-                        partition_date=partition_date,
-                        bills_data=bills
+                started_at = datetime.now(timezone.utc)
+                self.loader.flattened_tables.clear()
+                self.loader.bills_amount_total = None
+                self.loader.failed_loads.clear()
+                try:
+                    # Step 1: Extract for this day
+                    if reprocess:
+                        raw_bills = self.raw_archive.read(f"{self.loader.platform}/{self.loader.entity}", partition_date)
+                        if raw_bills is None:
+                            logger.warning(f"Day {partition_date}: No raw archive, skipped")
+                            missing_days.append(partition_date.isoformat())
+                            continue
+                        bills, products = self.extractor.split_products(raw_bills)
+                    else:
+                        bills, products = self.extractor.extract_with_products(
+                            from_date=day_start,
+                            to_date=day_end,
+                            process_by_day=False  # Already split, don't split again
+                        )
+                        # Fetch lỗi không raise (extractor trả về thiếu bills): ngày không được ghi là completed
+                        if self.extractor.failed_chunks:
+                            error = "Bill API fetch failed"
+                            logger.error(
+                                f"Day {partition_date}: {error}",
+                                partition_date=partition_date.isoformat()
+                            )
+                            failed_extract_days.append(partition_date.isoformat())
+                            if use_ledger:
+                                self.run_ledger.record(
+                                    entity_path, partition_date, STATUS_FAILED,
+                                    started_at=started_at,
+                                    error=error
+                                )
+                            continue
+                    
+                    logger.info(
+                        f"Day {partition_date}: Extracted {len(bills)} bills, {len(products)} products"
+                    )
+                    
+                    quality_report = self.extractor.quality_reports.get(partition_date)
+                    if quality_report is not None and not quality_report.passed:
+                        failing_quality_days.append(partition_date.isoformat())
+                    
+                    # Step 2: Load bills for this day
+                    if bills:
+                        with self.loader.bq_client.labels(entity="bills", day=partition_date):
+                            self.loader.load_bills(data=bills, partition_date=partition_date)
+                    
+                    # Step 3: Load products for this day
+                    # Pass bills_data to create bill_id -> date mapping for bill_date
+                    if products:
+                        with self.loader.bq_client.labels(entity="bill_products", day=partition_date):
+                            self.loader.load_bill_products(
+                                data=products, 
+                                partition_date=partition_date,
+                                bills_data=bills
+                            )
+                    
+                    # Load fail không raise (GCS backup vẫn có) nhưng ngày không được ghi là completed
+                    if self.loader.failed_loads:
+                        error = f"BigQuery load failed: {', '.join(self.loader.failed_loads)}"
+                        logger.error(
+                            f"Day {partition_date}: {error}",
+                            partition_date=partition_date.isoformat()
+                        )
+                        failed_load_days.append(partition_date.isoformat())
+                        if use_ledger:
+                            self.run_ledger.record(
+                                entity_path, partition_date, STATUS_FAILED,
+                                started_at=started_at,
+                                records_count=len(bills),
+                                line_records_count=len(products),
+                                error=error
+                            )
+                        continue
+                    
+                    # Step 4: Reconcile bill totals với product lines
+                    if settings.reconciliation_enabled:
+                        reconciliation_exceptions += self._reconcile_day(partition_date)
+                    
+                    # Step 5: Volume anomaly check (raw archive không phản ánh API hôm nay nên bỏ qua khi reprocess)
+                    if settings.volume_anomaly_enabled and not reprocess:
+                        if self._check_volume(partition_date, len(bills), len(products)):
+                            queued_days.append(partition_date.isoformat())
+                    
+                    total_bills += len(bills)
+                    total_products += len(products)
+                    processed_days += 1
+                    if use_ledger:
+                        self.run_ledger.record(
+                            entity_path, partition_date, STATUS_COMPLETED,
+                            started_at=started_at,
+                            records_count=len(bills),
+                            line_records_count=len(products),
+                            checksum=self._day_checksum()
+                        )
+                    
+                    logger.info(
+                        f"Day {partition_date}: Load completed. Running total: {total_bills} bills, {total_products} products"
                     )
                 
-                total_bills += len(bills)
-                total_products += len(products)
-                processed_days += 1
-                
-                logger.info(
-                    f"Day {partition_date}: Load completed. Running total: {total_bills} bills, {total_products} products"
-                )
-                
-            except Exception as e:
-                logger.error(
-                    f"FAILED on day {partition_date}: {e}. Stopping pipeline."
-                )
-                raise e  # Fail fast
+                except Exception as e:
+                    logger.error(
+                        f"FAILED on day {partition_date}: {e}. Stopping pipeline."
+                    )
+                    if use_ledger:
+                        self.run_ledger.record(
+                            entity_path, partition_date, STATUS_FAILED,
+                            started_at=started_at,
+                            error=str(e)
+                        )
+                    raise e  # Fail fast
+        finally:
+            # Một MERGE cho toàn bộ ngày của run, kể cả khi run dừng giữa chừng
+            if use_ledger:
+                self._flush_run_ledger()
+            # Direct load mode: GCS backups chạy ở background, đợi xong trước khi return
+            self.loader.flush_archive()
+            query_cost = query_cost_tracker.log_report()
         
         result = {
             "bills_extracted": total_bills,
             "products_extracted": total_products,
             "days_processed": processed_days,
+            "days_failing_quality": failing_quality_days,
+            "reconciliation_exceptions": reconciliation_exceptions,
+            "days_queued_for_reextract": queued_days,
+            "days_skipped_completed": skipped_days,
+            "days_failed_extract": failed_extract_days,
+            "days_failed_load": failed_load_days,
             "status": "success"
         }
+        if reprocess:
+            result["days_missing_archive"] = missing_days
         
         logger.info("Completed Extract-Load pipeline", **result)
+        result["query_cost"] = query_cost
         return result
 
+    def run_reextract_queue(self) -> Dict[str, Any]:
+        """
+        Extract lại các ngày trong hàng đợi volume anomaly.
+        
+        Mỗi ngày chỉ được chạy lại tối đa settings.volume_anomaly_max_reextracts lần;
+        ngày có volume trở lại bình thường được bỏ khỏi hàng đợi.
+        
+        Returns:
+            Dict với các ngày đã chạy lại và các ngày vẫn còn bất thường
+        """
+        pending_days = self.volume_detector.pending()
+        reextracted = []
+        for day in pending_days:
+            logger.info(f"Re-extracting day {day} (volume anomaly)", partition_date=day.isoformat())
+            self.volume_detector.mark_attempted(day)
+            self.run_extract_load(
+                from_date=datetime.combine(day, datetime.min.time()),
+                to_date=datetime.combine(day, datetime.max.time())
+            )
+            reextracted.append(day.isoformat())
+        
+        still_pending = [day.isoformat() for day in self.volume_detector.pending()]
+        return {
+            "days_reextracted": reextracted,
+            "days_still_anomalous": [day for day in still_pending if day in reextracted],
+        }
+
     def run_full_pipeline(
         self,
         from_date: Optional[datetime] = None,
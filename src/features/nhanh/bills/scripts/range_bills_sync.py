@@ -12,6 +12,16 @@ Usage:
     # Sync từ ngày cụ thể đến hôm nay
     python -m src.features.nhanh.bills.scripts.range_bills_sync 2025-11-01
     
+    # Reprocess từ raw archive (flatten + load lại, không gọi API)
+    python -m src.features.nhanh.bills.scripts.range_bills_sync 2025-11-01 2025-11-30 --reprocess
+    
+    # Chạy lại cả các ngày đã completed trong run ledger
+    python -m src.features.nhanh.bills.scripts.range_bills_sync 2025-11-01 2025-11-30 --force
+
+Các ngày đã completed trong run ledger (bronze.pipeline_run_ledger) được bỏ qua,
+nên chạy lại sau khi lỗi giữa chừng chỉ xử lý các ngày còn thiếu. --reprocess
+luôn chạy lại toàn bộ khoảng ngày.
+    
 Hoặc chạy trực tiếp:
     python src/features/nhanh/bills/scripts/range_bills_sync.py 2025-11-01 2025-11-30
 """
@@ -58,18 +68,21 @@ def main():
         logger.info("=" * 60)
         
         # Parse arguments
-        if len(sys.argv) < 2:
+        reprocess = "--reprocess" in sys.argv
+        force = "--force" in sys.argv
+        args = [arg for arg in sys.argv if arg not in ("--reprocess", "--force")]
+        if len(args) < 2:
             logger.error("Missing required arguments. Usage:")
-            logger.error("  python -m src.features.nhanh.bills.scripts.range_bills_sync <from_date> [to_date]")
+            logger.error("  python -m src.features.nhanh.bills.scripts.range_bills_sync <from_date> [to_date] [--reprocess] [--force]")
             logger.error("  Example: python -m src.features.nhanh.bills.scripts.range_bills_sync 2025-11-01 2025-11-30")
             sys.exit(1)
         
-        from_date_str = sys.argv[1]
+        from_date_str = args[1]
         from_date = parse_date(from_date_str)
         
         # Nếu có to_date thì dùng, không thì dùng hôm nay
-        if len(sys.argv) >= 3:
-            to_date_str = sys.argv[2]
+        if len(args) >= 3:
+            to_date_str = args[2]
             to_date = parse_date(to_date_str)
             # Set to end of day
             to_date = datetime.combine(to_date.date(), datetime.max.time()).replace(tzinfo=to_date.tzinfo)
@@ -91,18 +104,31 @@ def main():
         # Khởi tạo pipeline
         pipeline = BillPipeline()
         
-        # Step 1: Extract và Load (Bronze layer)
-        logger.info("Step 1: Extracting and loading bills to GCS...")
+        # Step 1: Extract (hoặc đọc raw archive) và Load (Bronze layer)
+        if reprocess:
+            logger.info("Step 1: Reprocessing bills from raw archive (no API calls)...")
+        else:
+            logger.info("Step 1: Extracting and loading bills to GCS...")
         extract_result = pipeline.run_extract_load(
             from_date=from_date,
             to_date=to_date,
-            process_by_day=True
+            process_by_day=True,
+            reprocess=reprocess,
+            skip_completed=not (force or reprocess)
         )
         
         logger.info("✅ Step 1 completed: Data extracted and loaded to GCS")
         logger.info(f"   Bills extracted: {extract_result.get('bills_extracted', 0)}")
         logger.info(f"   Products extracted: {extract_result.get('products_extracted', 0)}")
         logger.info(f"   Days processed: {extract_result.get('days_processed', 0)}")
+        if extract_result.get("days_skipped_completed"):
+            logger.info(f"   Days already completed (skipped): {len(extract_result['days_skipped_completed'])}")
+        if extract_result.get("days_failed_extract"):
+            logger.warning(f"   Days with failed API fetch (retried next run): {extract_result['days_failed_extract']}")
+        if extract_result.get("days_failed_load"):
+            logger.warning(f"   Days with failed BigQuery load (retried next run): {extract_result['days_failed_load']}")
+        if extract_result.get("days_missing_archive"):
+            logger.warning(f"   Days without raw archive (skipped): {extract_result['days_missing_archive']}")
         
         # Note: Flatten đã được tích hợp vào loader, data được load trực tiếp vào fact tables
         # Không cần setup external tables và transform step nữa
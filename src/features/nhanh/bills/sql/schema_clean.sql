@@ -37,7 +37,7 @@ CREATE OR REPLACE TABLE `{project_id}.{dataset}.fact_sales_bills_v3_0` (
     extraction_timestamp TIMESTAMP
 )
 PARTITION BY date
-CLUSTER BY depotId, type;
+CLUSTER BY id, depotId, customer_id;
 
 -- Table: fact_sales_bills_product_v3.0 (Chi tiết sản phẩm trong hóa đơn)
 CREATE OR REPLACE TABLE `{project_id}.{dataset}.fact_sales_bills_product_v3_0` (
@@ -8,6 +8,7 @@ import json
 import gzip
 from google.cloud import bigquery, storage
 from src.config import settings
+from src.shared.bigquery.instrumentation import InstrumentedClient
 from src.shared.logging import get_logger
 
 logger = get_logger(__name__)
@@ -96,7 +97,7 @@ class OneOfficeLoader:
     """
     
     def __init__(self):
-        self.client = bigquery.Client(project=settings.gcp_project)
+        self.client = InstrumentedClient(bigquery.Client(project=settings.gcp_project), pipeline="one_office")
         self.dataset_id = settings.oneoffice_dataset  # Use oneoffice dataset for native tables
         self.table_name = "hr_profile_daily_snapshot"
         self.table_id = f"{settings.gcp_project}.{self.dataset_id}.{self.table_name}"
@@ -249,7 +250,8 @@ class OneOfficeLoader:
                 job_config=bigquery.QueryJobConfig(
                     query_parameters=[
                         bigquery.ScalarQueryParameter("snapshot_date", "DATE", snapshot_date.isoformat())
-                    ]
+                    ],
+                    labels={"entity": self.table_name, "day": snapshot_date.isoformat()}
                 )
             )
             job.result()
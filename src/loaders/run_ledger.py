@@ -0,0 +1,223 @@
+"""
+Run ledger theo ngày cho range syncs.
+File này ghi trạng thái xử lý của từng (entity, partition date): status, số
+records, content checksum và thời điểm bắt đầu/kết thúc. Khác với
+extraction_watermarks (một row mỗi entity), ledger cho biết chính xác ngày nào
+của một khoảng đã hoàn thành, nên chạy lại sau lỗi ở ngày 47/90 chỉ xử lý các
+ngày còn thiếu.
+
+Các entries được buffer trong memory và ghi bằng một MERGE duy nhất mỗi run
+(staging table load từ Arrow → MERGE theo (entity, partition_date)).
+"""
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
+import pyarrow as pa
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery
+from src.config import settings
+from src.shared.bigquery.provisioning import TableProvisioner, TableSpec
+from src.shared.bigquery.staging import ArrowStagingLoader
+from src.shared.logging import get_logger
+
+logger = get_logger(__name__)
+
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+RUN_LEDGER_TABLE_SPEC = TableSpec(
+    table_name="pipeline_run_ledger",
+    schema=[
+        bigquery.SchemaField("entity", "STRING"),
+        bigquery.SchemaField("partition_date", "DATE"),
+        bigquery.SchemaField("status", "STRING"),
+        bigquery.SchemaField("run_id", "STRING"),
+        bigquery.SchemaField("records_count", "INT64"),
+        bigquery.SchemaField("line_records_count", "INT64"),
+        bigquery.SchemaField("checksum", "STRING"),
+        bigquery.SchemaField("started_at", "TIMESTAMP"),
+        bigquery.SchemaField("finished_at", "TIMESTAMP"),
+        bigquery.SchemaField("error", "STRING"),
+    ],
+    partition_field="partition_date",
+    clustering_fields=["entity", "status"],
+    merge_keys=["entity", "partition_date"],
+    description="Per-day run ledger cho range syncs"
+)
+
+LEDGER_ARROW_SCHEMA = pa.schema([
+    ("entity", pa.string()),
+    ("partition_date", pa.date32()),
+    ("status", pa.string()),
+    ("run_id", pa.string()),
+    ("records_count", pa.int64()),
+    ("line_records_count", pa.int64()),
+    ("checksum", pa.string()),
+    ("started_at", pa.timestamp("us", tz="UTC")),
+    ("finished_at", pa.timestamp("us", tz="UTC")),
+    ("error", pa.string()),
+])
+
+
+@dataclass
+class LedgerEntry:
+    """Trạng thái xử lý của một (entity, partition date)."""
+    entity: str
+    partition_date: date
+    status: str
+    run_id: Optional[str] = None
+    records_count: Optional[int] = None
+    line_records_count: Optional[int] = None
+    checksum: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class RunLedger:
+    """
+    Đọc/ghi run ledger trong bronze dataset.
+
+    record() chỉ buffer entry (entry sau cùng của một ngày thắng); flush() ghi
+    toàn bộ buffer trong một MERGE.
+    """
+
+    def __init__(self, client: Any, table_id: Optional[str] = None):
+        """
+        Khởi tạo ledger.
+
+        Args:
+            client: BigQuery client
+            table_id: Full ledger table ID (mặc định: RUN_LEDGER_TABLE_SPEC trong bronze dataset)
+        """
+        self.client = client
+        self.table_id = table_id or RUN_LEDGER_TABLE_SPEC.table_id(dataset=settings.bronze_dataset)
+        self.run_id = str(uuid.uuid4())
+        self.staging_loader = ArrowStagingLoader(client, staging_dataset=self.table_id.split(".")[1])
+        self._pending: Dict[tuple, LedgerEntry] = {}
+        self._table_ensured = False
+
+    def _ensure_table(self) -> None:
+        if self._table_ensured:
+            return
+        _, dataset, _ = self.table_id.split(".")
+        TableProvisioner(self.client, dataset=dataset).ensure_table(RUN_LEDGER_TABLE_SPEC)
+        self._table_ensured = True
+
+    def completed_days(self, entity: str, from_date: date, to_date: date) -> Dict[date, LedgerEntry]:
+        """
+        Các ngày đã hoàn thành của entity trong khoảng [from_date, to_date] (một query).
+
+        Args:
+            entity: Tên entity (format: "platform/entity")
+            from_date: Ngày đầu
+            to_date: Ngày cuối
+
+        Returns:
+            Dict[date, LedgerEntry]: Partition date → entry completed
+        """
+        sql = f"""
+        SELECT *
+        FROM `{self.table_id}`
+        WHERE entity = @entity
+          AND status = @status
+          AND partition_date BETWEEN @from_date AND @to_date
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("entity", "STRING", entity),
+            bigquery.ScalarQueryParameter("status", "STRING", STATUS_COMPLETED),
+            bigquery.ScalarQueryParameter("from_date", "DATE", from_date),
+            bigquery.ScalarQueryParameter("to_date", "DATE", to_date),
+        ])
+        try:
+            rows = self.client.query(sql, job_config=job_config).result()
+        except NotFound:
+            return {}
+        fields = [field.name for field in RUN_LEDGER_TABLE_SPEC.schema]
+        return {row.partition_date: LedgerEntry(**{name: row[name] for name in fields}) for row in rows}
+
+    def record(
+        self,
+        entity: str,
+        partition_date: date,
+        status: str,
+        started_at: Optional[datetime] = None,
+        records_count: Optional[int] = None,
+        line_records_count: Optional[int] = None,
+        checksum: Optional[str] = None,
+        error: Optional[str] = None
+    ) -> LedgerEntry:
+        """
+        Buffer trạng thái của một ngày (ghi khi flush()).
+
+        Args:
+            entity: Tên entity (format: "platform/entity")
+            partition_date: Ngày được xử lý
+            status: STATUS_COMPLETED hoặc STATUS_FAILED
+            started_at: Thời điểm bắt đầu xử lý ngày
+            records_count: Số records chính (vd: bills)
+            line_records_count: Số records con (vd: product lines)
+            checksum: Content checksum của data đã load
+            error: Lỗi (khi failed)
+
+        Returns:
+            LedgerEntry: Entry đã buffer
+        """
+        entry = LedgerEntry(
+            entity=entity,
+            partition_date=partition_date,
+            status=status,
+            run_id=self.run_id,
+            records_count=records_count,
+            line_records_count=line_records_count,
+            checksum=checksum,
+            started_at=started_at,
+            finished_at=datetime.now(timezone.utc),
+            error=error
+        )
+        self._pending[(entity, partition_date)] = entry
+        return entry
+
+    @property
+    def pending(self) -> List[LedgerEntry]:
+        """Entries chưa được ghi."""
+        return list(self._pending.values())
+
+    def flush(self) -> int:
+        """
+        Ghi các entries đã buffer bằng một MERGE theo (entity, partition_date).
+
+        Returns:
+            int: Số entries đã ghi
+        """
+        if not self._pending:
+            return 0
+        self._ensure_table()
+        entries = self.pending
+        table = pa.Table.from_pylist([asdict(entry) for entry in entries], schema=LEDGER_ARROW_SCHEMA)
+        staging_table_id = self.staging_loader.load(table, self.table_id)
+        update_columns = [name for name in LEDGER_ARROW_SCHEMA.names if name not in RUN_LEDGER_TABLE_SPEC.merge_keys]
+        sql = f"""
+        MERGE `{self.table_id}` T
+        USING `{staging_table_id}` S
+        ON T.entity = S.entity AND T.partition_date = S.partition_date
+        WHEN MATCHED THEN
+            UPDATE SET {", ".join(f"{name} = S.{name}" for name in update_columns)}
+        WHEN NOT MATCHED THEN
+            INSERT ROW
+        """
+        try:
+            self.client.query(sql).result()
+        finally:
+            self.staging_loader.drop(staging_table_id)
+        self._pending.clear()
+
+        logger.info(
+            f"Flushed {len(entries)} run ledger entries",
+            table_id=self.table_id,
+            run_id=self.run_id,
+            completed=sum(1 for entry in entries if entry.status == STATUS_COMPLETED),
+            failed=sum(1 for entry in entries if entry.status == STATUS_FAILED)
+        )
+        return len(entries)
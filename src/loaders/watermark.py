@@ -2,123 +2,302 @@
 Watermark tracking cho incremental extraction.
 File này quản lý việc track timestamp của lần extraction cuối cùng
 để hỗ trợ incremental extraction (chỉ lấy data mới).
-Watermark được lưu trong BigQuery table.
+
+WatermarkTracker đọc toàn bộ watermarks bằng một query ở lần truy cập đầu, trả
+get_watermark() từ memory và buffer update_watermark() cho tới flush(): mọi
+updates của run được ghi trong một MERGE. Concurrency kiểu optimistic: mỗi update
+mang updated_at đã đọc được, row bị run khác ghi trong lúc đó không bị ghi đè
+(watermark mới hơn được giữ, cũ hơn thì update được áp dụng lại).
+
+Store mặc định là BigQuery table extraction_watermarks; LocalWatermarkStore lưu
+cùng dữ liệu dưới dạng JSON trên một StorageBackend (tests, chạy offline).
 """
+import json
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Dict, List, Optional
+from google.api_core.exceptions import NotFound, PreconditionFailed
 from google.cloud import bigquery
 from src.config import settings
+from src.shared.bigquery.instrumentation import InstrumentedClient
 from src.shared.logging import get_logger
 from src.shared.exceptions import WatermarkError
+from src.shared.storage import StorageBackend
 
 logger = get_logger(__name__)
 
+WATERMARK_TABLE = "extraction_watermarks"
+WATERMARK_SCHEMA = [
+    bigquery.SchemaField("entity", "STRING", mode="REQUIRED"),
+    bigquery.SchemaField("last_extracted_at", "TIMESTAMP", mode="REQUIRED"),
+    bigquery.SchemaField("last_successful_run", "TIMESTAMP", mode="REQUIRED"),
+    bigquery.SchemaField("records_count", "INTEGER", mode="NULLABLE"),
+    bigquery.SchemaField("updated_at", "TIMESTAMP", mode="REQUIRED"),
+]
+
+# Số lần thử lại flush khi có conflict với run khác
+MAX_FLUSH_ATTEMPTS = 3
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Datetime timezone-aware (naive được coi là UTC)."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+@dataclass
+class Watermark:
+    """Một row watermark (updated_at đồng thời là version cho optimistic concurrency)."""
+    entity: str
+    last_extracted_at: datetime
+    last_successful_run: datetime
+    records_count: Optional[int]
+    updated_at: datetime
+
+
+class WatermarkStore(ABC):
+    """Nơi lưu watermarks."""
+
+    @abstractmethod
+    def load_all(self) -> Dict[str, Watermark]:
+        """Đọc toàn bộ watermarks (entity → Watermark)."""
+
+    @abstractmethod
+    def save(self, updates: List[Watermark], expected: Dict[str, Optional[datetime]]) -> int:
+        """
+        Ghi updates; update của entity chỉ được áp dụng khi updated_at hiện tại
+        bằng expected[entity] (None = entity chưa có watermark).
+
+        Returns:
+            int: Số updates đã áp dụng
+        """
+
+
+class BigQueryWatermarkStore(WatermarkStore):
+    """Watermarks trong BigQuery table (bronze dataset)."""
+
+    def __init__(self, client: Any, table_id: Optional[str] = None):
+        """
+        Khởi tạo store.
+
+        Args:
+            client: BigQuery client
+            table_id: Full table ID (mặc định: {project}.{bronze_dataset}.extraction_watermarks)
+        """
+        self.client = client
+        self.table_id = table_id or f"{settings.gcp_project}.{settings.bronze_dataset}.{WATERMARK_TABLE}"
+
+    def _ensure_table(self) -> None:
+        """Tạo dataset (đúng location) và watermark table nếu chưa có."""
+        project, dataset_id, _ = self.table_id.split(".")
+        dataset = bigquery.Dataset(f"{project}.{dataset_id}")
+        dataset.location = settings.gcp_region
+        self.client.create_dataset(dataset, exists_ok=True)
+        self.client.create_table(bigquery.Table(self.table_id, schema=WATERMARK_SCHEMA), exists_ok=True)
+        logger.info(f"Ensured watermark table: {self.table_id}")
+
+    def load_all(self) -> Dict[str, Watermark]:
+        sql = f"""
+        SELECT entity, last_extracted_at, last_successful_run, records_count, updated_at
+        FROM `{self.table_id}`
+        WHERE TRUE
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY entity ORDER BY updated_at DESC) = 1
+        """
+        try:
+            rows = self.client.query(sql).result()
+        except NotFound:
+            return {}
+        return {
+            row.entity: Watermark(
+                entity=row.entity,
+                last_extracted_at=_utc(row.last_extracted_at),
+                last_successful_run=_utc(row.last_successful_run),
+                records_count=row.records_count,
+                updated_at=_utc(row.updated_at)
+            )
+            for row in rows
+        }
+
+    def save(self, updates: List[Watermark], expected: Dict[str, Optional[datetime]]) -> int:
+        if not updates:
+            return 0
+        selects = []
+        params = []
+        for idx, update in enumerate(updates):
+            selects.append(
+                f"SELECT @entity_{idx} AS entity, @extracted_at_{idx} AS last_extracted_at, "
+                f"@successful_run_{idx} AS last_successful_run, @records_count_{idx} AS records_count, "
+                f"@updated_at_{idx} AS updated_at, @expected_{idx} AS expected_updated_at"
+            )
+            params.extend([
+                bigquery.ScalarQueryParameter(f"entity_{idx}", "STRING", update.entity),
+                bigquery.ScalarQueryParameter(f"extracted_at_{idx}", "TIMESTAMP", update.last_extracted_at),
+                bigquery.ScalarQueryParameter(f"successful_run_{idx}", "TIMESTAMP", update.last_successful_run),
+                bigquery.ScalarQueryParameter(f"records_count_{idx}", "INT64", update.records_count),
+                bigquery.ScalarQueryParameter(f"updated_at_{idx}", "TIMESTAMP", update.updated_at),
+                bigquery.ScalarQueryParameter(f"expected_{idx}", "TIMESTAMP", expected.get(update.entity)),
+            ])
+        source = "\n            UNION ALL ".join(selects)
+        sql = f"""
+        MERGE `{self.table_id}` AS target
+        USING (
+            {source}
+        ) AS source
+        ON target.entity = source.entity
+        WHEN MATCHED AND target.updated_at = source.expected_updated_at THEN
+            UPDATE SET
+                last_extracted_at = source.last_extracted_at,
+                last_successful_run = source.last_successful_run,
+                records_count = source.records_count,
+                updated_at = source.updated_at
+        WHEN NOT MATCHED AND source.expected_updated_at IS NULL THEN
+            INSERT (entity, last_extracted_at, last_successful_run, records_count, updated_at)
+            VALUES (source.entity, source.last_extracted_at, source.last_successful_run, source.records_count, source.updated_at)
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=params)
+        try:
+            query_job = self.client.query(sql, job_config=job_config)
+            query_job.result()
+        except NotFound:
+            self._ensure_table()
+            query_job = self.client.query(sql, job_config=job_config)
+            query_job.result()
+        return query_job.num_dml_affected_rows or 0
+
+
+class LocalWatermarkStore(WatermarkStore):
+    """
+    Watermarks trong một JSON object trên StorageBackend (LocalStorageBackend cho tests).
+
+    Ghi dùng generation precondition nên hai runs cùng ghi không làm mất update của nhau.
+    """
+
+    def __init__(self, backend: StorageBackend, path: str = "_state/watermarks.json"):
+        self.backend = backend
+        self.path = path
+
+    def _read(self) -> tuple:
+        info = self.backend.stat(self.path)
+        if info is None:
+            return {}, 0
+        raw = json.loads(self.backend.get(self.path, generation=info.generation))
+        watermarks = {
+            entity: Watermark(
+                entity=entity,
+                last_extracted_at=datetime.fromisoformat(row["last_extracted_at"]),
+                last_successful_run=datetime.fromisoformat(row["last_successful_run"]),
+                records_count=row.get("records_count"),
+                updated_at=datetime.fromisoformat(row["updated_at"])
+            )
+            for entity, row in raw.items()
+        }
+        return watermarks, info.generation
+
+    def load_all(self) -> Dict[str, Watermark]:
+        return self._read()[0]
+
+    def save(self, updates: List[Watermark], expected: Dict[str, Optional[datetime]]) -> int:
+        if not updates:
+            return 0
+        while True:
+            watermarks, generation = self._read()
+            applied = 0
+            for update in updates:
+                current = watermarks.get(update.entity)
+                if (current.updated_at if current else None) == expected.get(update.entity):
+                    watermarks[update.entity] = update
+                    applied += 1
+            if not applied:
+                return 0
+            payload = {
+                entity: {
+                    "last_extracted_at": wm.last_extracted_at.isoformat(),
+                    "last_successful_run": wm.last_successful_run.isoformat(),
+                    "records_count": wm.records_count,
+                    "updated_at": wm.updated_at.isoformat(),
+                }
+                for entity, wm in watermarks.items()
+            }
+            try:
+                self.backend.put(
+                    self.path,
+                    json.dumps(payload, sort_keys=True).encode("utf-8"),
+                    content_type="application/json",
+                    if_generation_match=generation
+                )
+                return applied
+            except PreconditionFailed:
+                # Run khác vừa ghi: đọc lại và kiểm tra expected với bản mới
+                continue
+
 
 class WatermarkTracker:
     """
     Track extraction watermarks cho incremental processing.
-    
-    Watermark được lưu trong BigQuery table với thông tin:
+
+    Watermark được lưu với thông tin:
     - entity: Tên entity (bills, products, customers)
     - last_extracted_at: Timestamp của lần extraction cuối
     - last_successful_run: Timestamp của lần chạy thành công cuối
     - records_count: Số lượng records đã extract
+
+    Reads phục vụ từ cache trong memory; updates chỉ được ghi khi gọi flush().
     """
-    
-    def __init__(self):
-        """
-        Khởi tạo watermark tracker.
-        
-        Tự động tạo BigQuery dataset và table nếu chưa tồn tại.
-        """
-        self.client = bigquery.Client(project=settings.gcp_project)
-        self.dataset_id = settings.bronze_dataset
-        self.table_id = "extraction_watermarks"
-        self._ensure_dataset_exists()
-        self._ensure_table()
-    
-    def _ensure_dataset_exists(self):
-        """Đảm bảo Bronze dataset tồn tại với location đúng."""
-        dataset_id = f"{settings.gcp_project}.{self.dataset_id}"
-        try:
-            self.client.get_dataset(dataset_id)
-        except Exception:
-            logger.info(f"Dataset {dataset_id} not found, creating in {settings.gcp_region}...")
-            dataset = bigquery.Dataset(dataset_id)
-            dataset.location = settings.gcp_region  # Set location to asia-southeast1
-            self.client.create_dataset(dataset, exists_ok=True)
-            logger.info(f"Created dataset {dataset_id} in {settings.gcp_region}")
-    
-    def _ensure_table(self):
-        """
-        Đảm bảo watermark table tồn tại.
-        
-        Tạo table với schema nếu chưa có.
-        """
-        dataset_ref = self.client.dataset(self.dataset_id)
-        table_ref = dataset_ref.table(self.table_id)
-        
+
+    def __init__(self, client: Any = None, store: Optional[WatermarkStore] = None):
+        """
+        Khởi tạo watermark tracker (không gọi BigQuery cho tới lần đọc/ghi đầu tiên).
+
+        Args:
+            client: BigQuery client (mặc định: InstrumentedClient mới)
+            store: Watermark store (mặc định: BigQueryWatermarkStore với client)
+        """
+        if store is None:
+            client = client or InstrumentedClient(bigquery.Client(project=settings.gcp_project), pipeline="watermark")
+            store = BigQueryWatermarkStore(client)
+        self.store = store
+        self._cache: Optional[Dict[str, Watermark]] = None
+        self._pending: Dict[str, Watermark] = {}
+
+    def load(self) -> Dict[str, Watermark]:
+        """
+        Đọc lại toàn bộ watermarks từ store (một query).
+
+        Raises:
+            WatermarkError: Nếu đọc store thất bại
+        """
         try:
-            self.client.get_table(table_ref)
-        except Exception:
-            # Create table if it doesn't exist
-            schema = [
-                bigquery.SchemaField("entity", "STRING", mode="REQUIRED"),
-                bigquery.SchemaField("last_extracted_at", "TIMESTAMP", mode="REQUIRED"),
-                bigquery.SchemaField("last_successful_run", "TIMESTAMP", mode="REQUIRED"),
-                bigquery.SchemaField("records_count", "INTEGER", mode="NULLABLE"),
-                bigquery.SchemaField("updated_at", "TIMESTAMP", mode="REQUIRED"),
-            ]
-            
-            table = bigquery.Table(table_ref, schema=schema)
-            table = self.client.create_table(table)
-            
-            logger.info(f"Created watermark table: {self.table_id}")
-    
+            self._cache = self.store.load_all()
+        except Exception as e:
+            logger.error("Error loading watermarks", error=str(e))
+            raise WatermarkError(f"Failed to load watermarks: {str(e)}")
+        return self._cache
+
+    def _watermarks(self) -> Dict[str, Watermark]:
+        if self._cache is None:
+            self.load()
+        return self._cache
+
     def get_watermark(self, entity: str) -> Optional[datetime]:
         """
         Lấy watermark của lần extraction cuối cùng cho entity.
-        
+
+        Update chưa flush của run hiện tại được trả về trước.
+
         Args:
             entity: Tên entity (ví dụ: 'bills', 'products', 'customers')
-            
+
         Returns:
             Optional[datetime]: Timestamp của lần extraction cuối, hoặc None nếu chưa có
-            
+
         Raises:
-            WatermarkError: Nếu có lỗi khi query BigQuery
-        """
-        query = f"""
-        SELECT last_extracted_at
-        FROM `{settings.gcp_project}.{self.dataset_id}.{self.table_id}`
-        WHERE entity = @entity
-        ORDER BY last_extracted_at DESC
-        LIMIT 1
-        """
-        
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("entity", "STRING", entity)
-            ]
-        )
-        
-        try:
-            query_job = self.client.query(query, job_config=job_config)
-            results = query_job.result()
-            
-            row = next(results, None)
-            if row:
-                # Ensure timezone-aware datetime
-                watermark = row.last_extracted_at
-                if watermark and watermark.tzinfo is None:
-                    watermark = watermark.replace(tzinfo=timezone.utc)
-                return watermark
-            return None
-        
-        except Exception as e:
-            logger.error(f"Error getting watermark for {entity}", error=str(e))
-            raise WatermarkError(f"Failed to get watermark: {str(e)}")
-    
+            WatermarkError: Nếu có lỗi khi đọc store
+        """
+        watermark = self._pending.get(entity) or self._watermarks().get(entity)
+        return watermark.last_extracted_at if watermark else None
+
     def update_watermark(
         self,
         entity: str,
@@ -126,64 +305,86 @@ class WatermarkTracker:
         records_count: Optional[int] = None
     ):
         """
-        Cập nhật watermark sau khi extraction thành công.
-        
+        Buffer watermark mới sau khi extraction thành công (ghi khi flush()).
+
         Args:
             entity: Tên entity
             extracted_at: Timestamp của extraction
             records_count: Số lượng records đã extract (tùy chọn)
-            
-        Raises:
-            WatermarkError: Nếu có lỗi khi update BigQuery
         """
         now = datetime.now(timezone.utc)
-        
-        query = f"""
-        MERGE `{settings.gcp_project}.{self.dataset_id}.{self.table_id}` AS target
-        USING (
-            SELECT
-                @entity AS entity,
-                @extracted_at AS last_extracted_at,
-                @now AS last_successful_run,
-                @records_count AS records_count,
-                @now AS updated_at
-        ) AS source
-        ON target.entity = source.entity
-        WHEN MATCHED THEN
-            UPDATE SET
-                last_extracted_at = source.last_extracted_at,
-                last_successful_run = source.last_successful_run,
-                records_count = source.records_count,
-                updated_at = source.updated_at
-        WHEN NOT MATCHED THEN
-            INSERT (entity, last_extracted_at, last_successful_run, records_count, updated_at)
-            VALUES (source.entity, source.last_extracted_at, source.last_successful_run, source.records_count, source.updated_at)
-        """
-        
-        job_config = bigquery.QueryJobConfig(
-            query_parameters=[
-                bigquery.ScalarQueryParameter("entity", "STRING", entity),
-                bigquery.ScalarQueryParameter("extracted_at", "TIMESTAMP", extracted_at),
-                bigquery.ScalarQueryParameter("now", "TIMESTAMP", now),
-                bigquery.ScalarQueryParameter("records_count", "INTEGER", records_count),
-            ]
+        self._pending[entity] = Watermark(
+            entity=entity,
+            last_extracted_at=_utc(extracted_at),
+            last_successful_run=now,
+            records_count=records_count,
+            updated_at=now
         )
-        
+
+    def flush(self) -> int:
+        """
+        Ghi mọi watermarks đã buffer trong một MERGE.
+
+        Entity bị run khác cập nhật từ lần đọc trước: nếu watermark của run kia
+        mới hơn thì giữ nguyên, ngược lại update được áp dụng lại với version mới.
+
+        Returns:
+            int: Số watermarks đã ghi
+
+        Raises:
+            WatermarkError: Nếu ghi thất bại hoặc vẫn conflict sau MAX_FLUSH_ATTEMPTS lần
+        """
+        if not self._pending:
+            return 0
+        current = self._watermarks()
+        pending = dict(self._pending)
+        written = 0
         try:
-            query_job = self.client.query(query, job_config=job_config)
-            query_job.result()  # Wait for completion
-            
-            logger.info(
-                f"Updated watermark for {entity}",
-                entity=entity,
-                extracted_at=extracted_at.isoformat(),
-                records_count=records_count
-            )
-        
+            for _ in range(MAX_FLUSH_ATTEMPTS):
+                expected = {entity: (current[entity].updated_at if entity in current else None) for entity in pending}
+                applied = self.store.save(list(pending.values()), expected)
+                written += applied
+                if applied == len(pending):
+                    current.update(pending)
+                    pending = {}
+                    break
+
+                current = self.load()
+                retry = {}
+                for entity, update in pending.items():
+                    remote = current.get(entity)
+                    if remote is not None and remote.updated_at == update.updated_at:
+                        continue  # Update này đã được áp dụng
+                    if remote is not None and remote.last_extracted_at >= update.last_extracted_at:
+                        logger.warning(
+                            f"Watermark for {entity} advanced by another run, keeping it",
+                            entity=entity,
+                            remote=remote.last_extracted_at.isoformat(),
+                            local=update.last_extracted_at.isoformat()
+                        )
+                        continue
+                    retry[entity] = replace(update, updated_at=datetime.now(timezone.utc))
+                pending = retry
+                if not pending:
+                    break
         except Exception as e:
-            logger.error(f"Error updating watermark for {entity}", error=str(e))
-            raise WatermarkError(f"Failed to update watermark: {str(e)}")
-    
+            logger.error("Error flushing watermarks", error=str(e))
+            raise WatermarkError(f"Failed to update watermarks: {str(e)}")
+
+        if pending:
+            raise WatermarkError(f"Watermark conflict not resolved for: {sorted(pending)}")
+
+        flushed = list(self._pending.values())
+        self._pending.clear()
+        # Cache phản ánh store sau flush, run tiếp theo không cần đọc lại
+        self._cache = current
+        logger.info(
+            f"Flushed {len(flushed)} watermarks",
+            entities=[wm.entity for wm in flushed],
+            written=written
+        )
+        return len(flushed)
+
     def get_incremental_range(
         self,
         entity: str,
@@ -191,17 +392,17 @@ class WatermarkTracker:
     ) -> tuple[Optional[datetime], datetime]:
         """
         Lấy date range cho incremental extraction.
-        
+
         Args:
             entity: Tên entity
             lookback_hours: Số giờ lookback nếu không có watermark (mặc định: 1 giờ)
-            
+
         Returns:
             tuple: (from_date, to_date) - from_date có thể là None nếu không có watermark
         """
         watermark = self.get_watermark(entity)
         to_date = datetime.now(timezone.utc)
-        
+
         if watermark:
             # Ensure both are timezone-aware
             if watermark.tzinfo is None:
@@ -223,5 +424,5 @@ class WatermarkTracker:
                 from_date=from_date.isoformat(),
                 to_date=to_date.isoformat()
             )
-        
+
         return from_date, to_date
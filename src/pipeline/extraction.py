@@ -110,6 +110,9 @@ def extract_entity(
             platform, entity, extractor, loader, watermark_tracker,
             incremental, from_date, **extractor_kwargs
         )
+    
+    # Tất cả watermarks của run (vd: bills + bill_products) được ghi trong một MERGE
+    watermark_tracker.flush()
 
 
 def _extract_nhanh_bills(
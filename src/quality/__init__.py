@@ -3,6 +3,7 @@ Quality module cho data validation và quality checks.
 Package này cung cấp:
 - Schema validation với Pydantic
 - Data quality checks (nulls, duplicates, types)
+- Streaming quality statistics tích lũy theo page trong lúc extract
 """
 from src.quality.validators import (
     BillRecord,
@@ -12,6 +13,7 @@ from src.quality.validators import (
     ValidationResult
 )
 from src.quality.checks import DataQualityChecker, QualityReport
+from src.quality.streaming import StreamingQualityStats
 
 __all__ = [
     'BillRecord',
@@ -20,5 +22,6 @@ __all__ = [
     'validate_records',
     'ValidationResult',
     'DataQualityChecker',
-    'QualityReport'
+    'QualityReport',
+    'StreamingQualityStats'
 ]
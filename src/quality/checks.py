@@ -5,14 +5,29 @@ File này cung cấp các checks để đảm bảo chất lượng data:
 - Duplicate detection
 - Data type validation
 - Range checks
+
+Checker nhận list of dicts hoặc pa.Table đã build sẵn (vd: table trước khi ghi
+Parquet). Với pa.Table, các checks chạy vectorized bằng pyarrow.compute thay vì
+lặp từng record, nên quality gate chạy inline được trên data cả ngày.
 """
-from typing import Dict, Any, List, Optional, Set
+from typing import Dict, Any, List, Optional, Set, Tuple, Union
 from dataclasses import dataclass, field
 from datetime import datetime
-from src.utils.logging import get_logger
+import pyarrow as pa
+import pyarrow.compute as pc
+from src.shared.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Python type trong type_specs → predicate trên Arrow column type
+_ARROW_TYPE_PREDICATES = {
+    int: pa.types.is_integer,
+    float: pa.types.is_floating,
+    str: lambda t: pa.types.is_string(t) or pa.types.is_large_string(t),
+    bool: pa.types.is_boolean,
+    bytes: lambda t: pa.types.is_binary(t) or pa.types.is_large_binary(t),
+}
+
 
 @dataclass
 class QualityCheck:
@@ -25,11 +40,16 @@ class QualityCheck:
 
 @dataclass
 class QualityReport:
-    """Báo cáo tổng hợp quality checks."""
+    """
+    Báo cáo tổng hợp quality checks.
+    
+    metrics chứa statistics không phải pass/fail (vd: min/max amounts, counts theo depot).
+    """
     entity: str
     total_records: int
     checks: List[QualityCheck] = field(default_factory=list)
     timestamp: datetime = field(default_factory=datetime.utcnow)
+    metrics: Dict[str, Any] = field(default_factory=dict)
     
     @property
     def passed(self) -> bool:
@@ -52,6 +72,7 @@ class QualityReport:
             'passed': self.passed,
             'score': self.score,
             'timestamp': self.timestamp.isoformat(),
+            'metrics': self.metrics,
             'checks': [
                 {
                     'name': c.check_name,
@@ -72,24 +93,144 @@ class DataQualityChecker:
     - check_nulls: Kiểm tra null values trong required fields
     - check_duplicates: Kiểm tra duplicate records
     - check_data_types: Validate data types
+    - check_ranges: Kiểm tra giá trị nằm trong khoảng cho phép
     - run_all_checks: Chạy tất cả checks
     """
     
-    def __init__(self, entity: str, records: List[Dict[str, Any]]):
+    def __init__(self, entity: str, records: Union[List[Dict[str, Any]], pa.Table]):
         """
         Khởi tạo checker.
         
         Args:
             entity: Tên entity (bills, products, customers)
-            records: Danh sách records cần check
+            records: Danh sách records hoặc pa.Table cần check
         """
         self.entity = entity
-        self.records = records
+        self.table = records if isinstance(records, pa.Table) else None
+        self.records = [] if self.table is not None else records
         self.report = QualityReport(
             entity=entity,
-            total_records=len(records)
+            total_records=self.table.num_rows if self.table is not None else len(records)
         )
     
+    @property
+    def _is_empty(self) -> bool:
+        return self.report.total_records == 0
+    
+    def _column(self, field_name: str) -> Optional[pa.ChunkedArray]:
+        """Column của pa.Table (None nếu table không có field này)."""
+        if field_name not in self.table.column_names:
+            return None
+        return self.table.column(field_name)
+    
+    def _null_counts(self, required_fields: List[str]) -> Dict[str, int]:
+        """Số records null hoặc chuỗi rỗng của mỗi field."""
+        if self.table is None:
+            null_counts = {field: 0 for field in required_fields}
+            for record in self.records:
+                for field_name in required_fields:
+                    value = record.get(field_name)
+                    if value is None or value == '':
+                        null_counts[field_name] += 1
+            return null_counts
+        
+        null_counts = {}
+        for field_name in required_fields:
+            column = self._column(field_name)
+            if column is None:
+                null_counts[field_name] = self.table.num_rows
+                continue
+            count = column.null_count
+            if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+                count += pc.sum(pc.equal(column, '')).as_py() or 0
+            null_counts[field_name] = count
+        return null_counts
+    
+    def _duplicates(self, key_fields: List[str]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Số records trùng key (tính từ lần xuất hiện thứ hai) và tối đa 5 keys ví dụ."""
+        if self.table is None:
+            seen_keys: Set[tuple] = set()
+            duplicates = 0
+            duplicate_examples = []
+            for record in self.records:
+                key = tuple(record.get(f) for f in key_fields)
+                if key in seen_keys:
+                    duplicates += 1
+                    if len(duplicate_examples) < 5:
+                        duplicate_examples.append({f: record.get(f) for f in key_fields})
+                else:
+                    seen_keys.add(key)
+            return duplicates, duplicate_examples
+        
+        # Field không có trong table: mọi record đều None, không phân biệt được keys
+        present = [f for f in key_fields if f in self.table.column_names]
+        if not present:
+            return self.table.num_rows - 1, []
+        groups = self.table.select(present).group_by(present).aggregate([([], "count_all")])
+        duplicates = self.table.num_rows - groups.num_rows
+        repeated = groups.filter(pc.greater(groups.column("count_all"), 1)).slice(0, 5)
+        duplicate_examples = [
+            {f: row.get(f) for f in key_fields}
+            for row in repeated.select(present).to_pylist()
+        ]
+        return duplicates, duplicate_examples
+    
+    def _type_errors(self, type_specs: Dict[str, type]) -> Dict[str, int]:
+        """Số giá trị (không null) sai type của mỗi field."""
+        if self.table is None:
+            type_errors = {field: 0 for field in type_specs}
+            for record in self.records:
+                for field_name, expected_type in type_specs.items():
+                    value = record.get(field_name)
+                    if value is not None and not isinstance(value, expected_type):
+                        type_errors[field_name] += 1
+            return type_errors
+        
+        type_errors = {}
+        for field_name, expected_type in type_specs.items():
+            column = self._column(field_name)
+            if column is None:
+                type_errors[field_name] = 0
+                continue
+            predicate = _ARROW_TYPE_PREDICATES.get(expected_type)
+            if predicate is not None:
+                # Arrow column có một type duy nhất: đúng thì 0 lỗi, sai thì mọi giá trị đều lỗi
+                type_errors[field_name] = 0 if predicate(column.type) else len(column) - column.null_count
+            else:
+                type_errors[field_name] = sum(
+                    1 for value in column.to_pylist()
+                    if value is not None and not isinstance(value, expected_type)
+                )
+        return type_errors
+    
+    def _out_of_range(self, range_specs: Dict[str, Tuple[Any, Any]]) -> Dict[str, int]:
+        """Số giá trị (không null) nằm ngoài [min, max] của mỗi field."""
+        if self.table is None:
+            out_of_range = {field: 0 for field in range_specs}
+            for record in self.records:
+                for field_name, (min_value, max_value) in range_specs.items():
+                    value = record.get(field_name)
+                    if value is None:
+                        continue
+                    if (min_value is not None and value < min_value) or (max_value is not None and value > max_value):
+                        out_of_range[field_name] += 1
+            return out_of_range
+        
+        out_of_range = {}
+        for field_name, (min_value, max_value) in range_specs.items():
+            column = self._column(field_name)
+            if column is None:
+                out_of_range[field_name] = 0
+                continue
+            mask = None
+            if min_value is not None:
+                mask = pc.less(column, pa.scalar(min_value).cast(column.type))
+            if max_value is not None:
+                above = pc.greater(column, pa.scalar(max_value).cast(column.type))
+                mask = above if mask is None else pc.or_(mask, above)
+            out_of_range[field_name] = (pc.sum(mask).as_py() or 0) if mask is not None else 0
+        return out_of_range
+    
     def check_nulls(
         self,
         required_fields: List[str],
@@ -105,23 +246,17 @@ class DataQualityChecker:
         Returns:
             QualityCheck result
         """
-        if not self.records:
+        if self._is_empty:
             return QualityCheck(
                 check_name='null_check',
                 passed=True,
                 message='No records to check'
             )
         
-        null_counts = {field: 0 for field in required_fields}
-        
-        for record in self.records:
-            for field_name in required_fields:
-                value = record.get(field_name)
-                if value is None or value == '':
-                    null_counts[field_name] += 1
+        null_counts = self._null_counts(required_fields)
         
         # Calculate completeness rate
-        total_checks = len(required_fields) * len(self.records)
+        total_checks = len(required_fields) * self.report.total_records
         total_nulls = sum(null_counts.values())
         completeness = 1 - (total_nulls / total_checks) if total_checks > 0 else 1.0
         
@@ -164,27 +299,16 @@ class DataQualityChecker:
         Returns:
             QualityCheck result
         """
-        if not self.records:
+        if self._is_empty:
             return QualityCheck(
                 check_name='duplicate_check',
                 passed=True,
                 message='No records to check'
             )
         
-        seen_keys: Set[tuple] = set()
-        duplicates = 0
-        duplicate_examples = []
+        duplicates, duplicate_examples = self._duplicates(key_fields)
         
-        for record in self.records:
-            key = tuple(record.get(f) for f in key_fields)
-            if key in seen_keys:
-                duplicates += 1
-                if len(duplicate_examples) < 5:
-                    duplicate_examples.append({f: record.get(f) for f in key_fields})
-            else:
-                seen_keys.add(key)
-        
-        duplicate_rate = duplicates / len(self.records) if self.records else 0
+        duplicate_rate = duplicates / self.report.total_records
         passed = duplicate_rate <= max_duplicate_rate
         
         check = QualityCheck(
@@ -223,22 +347,16 @@ class DataQualityChecker:
         Returns:
             QualityCheck result
         """
-        if not self.records:
+        if self._is_empty:
             return QualityCheck(
                 check_name='type_check',
                 passed=True,
                 message='No records to check'
             )
         
-        type_errors = {field: 0 for field in type_specs}
-        
-        for record in self.records:
-            for field_name, expected_type in type_specs.items():
-                value = record.get(field_name)
-                if value is not None and not isinstance(value, expected_type):
-                    type_errors[field_name] += 1
+        type_errors = self._type_errors(type_specs)
         
-        total_checks = len(type_specs) * len(self.records)
+        total_checks = len(type_specs) * self.report.total_records
         total_errors = sum(type_errors.values())
         type_correctness = 1 - (total_errors / total_checks) if total_checks > 0 else 1.0
         
@@ -266,6 +384,58 @@ class DataQualityChecker:
         
         return check
     
+    def check_ranges(
+        self,
+        range_specs: Dict[str, Tuple[Any, Any]],
+        threshold: float = 0.99
+    ) -> QualityCheck:
+        """
+        Kiểm tra giá trị của các fields nằm trong khoảng cho phép.
+        
+        Args:
+            range_specs: Dict mapping field name -> (min, max); None = không giới hạn phía đó
+            threshold: Tỷ lệ tối thiểu giá trị nằm trong khoảng (0-1)
+            
+        Returns:
+            QualityCheck result
+        """
+        if self._is_empty:
+            return QualityCheck(
+                check_name='range_check',
+                passed=True,
+                message='No records to check'
+            )
+        
+        out_of_range = self._out_of_range(range_specs)
+        
+        total_checks = len(range_specs) * self.report.total_records
+        total_errors = sum(out_of_range.values())
+        in_range_rate = 1 - (total_errors / total_checks) if total_checks > 0 else 1.0
+        
+        passed = in_range_rate >= threshold
+        
+        check = QualityCheck(
+            check_name='range_check',
+            passed=passed,
+            message=f'In range: {in_range_rate:.2%} (threshold: {threshold:.2%})',
+            details={
+                'out_of_range': out_of_range,
+                'in_range_rate': in_range_rate,
+                'threshold': threshold
+            }
+        )
+        
+        self.report.checks.append(check)
+        
+        logger.info(
+            "Range check completed",
+            entity=self.entity,
+            passed=passed,
+            in_range_rate=in_range_rate
+        )
+        
+        return check
+    
     def run_all_checks(self) -> QualityReport:
         """
         Chạy tất cả quality checks dựa trên entity type.
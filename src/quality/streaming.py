@@ -0,0 +1,188 @@
+"""
+Streaming quality metrics.
+File này tích lũy quality statistics theo từng page trong lúc extractor stream
+records từ API (null counts, duplicate ids, min/max amounts, counts theo nhóm),
+rồi xuất ra QualityReport khi kết thúc một ngày. Không cần thêm lượt đọc nào
+trên data sau khi load.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from src.quality.checks import QualityCheck, QualityReport
+
+# Số ví dụ duplicate giữ lại trong report (giống DataQualityChecker)
+MAX_DUPLICATE_EXAMPLES = 5
+
+
+def get_path(record: Dict[str, Any], path: str) -> Any:
+    """
+    Lấy giá trị theo dot path trong record lồng nhau (vd: 'payment.amount').
+
+    Returns:
+        Any: Giá trị, None nếu một cấp trung gian không phải dict
+    """
+    value: Any = record
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+class StreamingQualityStats:
+    """
+    Accumulator quality statistics cho records của một ngày.
+
+    Gọi update() với từng page records; to_report() tạo QualityReport với cùng
+    checks/details như DataQualityChecker (null_check, duplicate_check, range_check)
+    và các metrics tổng hợp (null rates, min/max, counts theo nhóm).
+    Duplicate ids dùng hash set: số ids của một ngày đủ nhỏ để giữ trong memory.
+    """
+
+    def __init__(
+        self,
+        entity: str,
+        required_fields: List[str],
+        key_field: str = "id",
+        amount_fields: Optional[Dict[str, Tuple[Any, Any]]] = None,
+        group_field: Optional[str] = None
+    ):
+        """
+        Khởi tạo accumulator.
+
+        Args:
+            entity: Tên entity
+            required_fields: Fields (dot path) cần đếm null/chuỗi rỗng
+            key_field: Field xác định unique record
+            amount_fields: Dict mapping field (dot path) -> (min, max) cho phép; None = không giới hạn
+            group_field: Field để đếm records theo nhóm (vd: depotId)
+        """
+        self.entity = entity
+        self.required_fields = required_fields
+        self.key_field = key_field
+        self.amount_fields = amount_fields or {}
+        self.group_field = group_field
+
+        self.total_records = 0
+        self.null_counts = {field: 0 for field in required_fields}
+        self.seen_keys: Set[Any] = set()
+        self.duplicate_count = 0
+        self.duplicate_examples: List[Dict[str, Any]] = []
+        self.amount_min: Dict[str, Optional[float]] = {field: None for field in self.amount_fields}
+        self.amount_max: Dict[str, Optional[float]] = {field: None for field in self.amount_fields}
+        self.out_of_range = {field: 0 for field in self.amount_fields}
+        self.group_counts: Dict[str, int] = {}
+
+    def update(self, records: Iterable[Dict[str, Any]]) -> None:
+        """
+        Cập nhật statistics với một page records.
+
+        Args:
+            records: Records của page
+        """
+        for record in records:
+            self.total_records += 1
+
+            for field_name in self.required_fields:
+                value = get_path(record, field_name)
+                if value is None or value == '':
+                    self.null_counts[field_name] += 1
+
+            key = record.get(self.key_field)
+            if key in self.seen_keys:
+                self.duplicate_count += 1
+                if len(self.duplicate_examples) < MAX_DUPLICATE_EXAMPLES:
+                    self.duplicate_examples.append({self.key_field: key})
+            else:
+                self.seen_keys.add(key)
+
+            for field_name, (min_value, max_value) in self.amount_fields.items():
+                value = get_path(record, field_name)
+                if value is None:
+                    continue
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    self.out_of_range[field_name] += 1
+                    continue
+                if self.amount_min[field_name] is None or value < self.amount_min[field_name]:
+                    self.amount_min[field_name] = value
+                if self.amount_max[field_name] is None or value > self.amount_max[field_name]:
+                    self.amount_max[field_name] = value
+                if (min_value is not None and value < min_value) or (max_value is not None and value > max_value):
+                    self.out_of_range[field_name] += 1
+
+            if self.group_field:
+                group = str(get_path(record, self.group_field))
+                self.group_counts[group] = self.group_counts.get(group, 0) + 1
+
+    def to_report(
+        self,
+        null_threshold: float = 0.95,
+        max_duplicate_rate: float = 0.01,
+        range_threshold: float = 0.99
+    ) -> QualityReport:
+        """
+        Tạo QualityReport từ statistics đã tích lũy.
+
+        Args:
+            null_threshold: Tỷ lệ tối thiểu required fields có giá trị (0-1)
+            max_duplicate_rate: Tỷ lệ duplicate tối đa cho phép (0-1)
+            range_threshold: Tỷ lệ tối thiểu amounts nằm trong khoảng cho phép (0-1)
+
+        Returns:
+            QualityReport: Report của ngày
+        """
+        report = QualityReport(entity=self.entity, total_records=self.total_records)
+        report.metrics = {
+            "null_rates": {
+                field: (count / self.total_records if self.total_records else 0.0)
+                for field, count in self.null_counts.items()
+            },
+            "amount_min": dict(self.amount_min),
+            "amount_max": dict(self.amount_max),
+        }
+        if self.group_field:
+            report.metrics[f"{self.group_field}_counts"] = dict(self.group_counts)
+        if not self.total_records:
+            return report
+
+        total_checks = len(self.required_fields) * self.total_records
+        completeness = 1 - (sum(self.null_counts.values()) / total_checks) if total_checks else 1.0
+        report.checks.append(QualityCheck(
+            check_name='null_check',
+            passed=completeness >= null_threshold,
+            message=f'Completeness: {completeness:.2%} (threshold: {null_threshold:.2%})',
+            details={
+                'null_counts': dict(self.null_counts),
+                'completeness': completeness,
+                'threshold': null_threshold
+            }
+        ))
+
+        duplicate_rate = self.duplicate_count / self.total_records
+        report.checks.append(QualityCheck(
+            check_name='duplicate_check',
+            passed=duplicate_rate <= max_duplicate_rate,
+            message=f'Duplicate rate: {duplicate_rate:.2%} ({self.duplicate_count} duplicates)',
+            details={
+                'duplicate_count': self.duplicate_count,
+                'duplicate_rate': duplicate_rate,
+                'max_allowed': max_duplicate_rate,
+                'examples': list(self.duplicate_examples)
+            }
+        ))
+
+        if self.amount_fields:
+            total_checks = len(self.amount_fields) * self.total_records
+            in_range_rate = 1 - (sum(self.out_of_range.values()) / total_checks)
+            report.checks.append(QualityCheck(
+                check_name='range_check',
+                passed=in_range_rate >= range_threshold,
+                message=f'In range: {in_range_rate:.2%} (threshold: {range_threshold:.2%})',
+                details={
+                    'out_of_range': dict(self.out_of_range),
+                    'in_range_rate': in_range_rate,
+                    'threshold': range_threshold
+                }
+            ))
+
+        return report
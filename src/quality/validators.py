@@ -3,26 +3,42 @@ Pydantic validators cho schema validation.
 File này cung cấp các Pydantic models để validate data từ Nhanh API
 trước khi load vào Bronze/Silver layer.
 """
+import random
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 from datetime import datetime
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, field_validator
 from dataclasses import dataclass
 
+# Validation modes của validate_records
+VALIDATION_MODES = ("full", "sampled", "strict_on_failure")
+
 
 @dataclass
 class ValidationResult:
-    """Kết quả validation cho một batch records."""
+    """
+    Kết quả validation cho một batch records.
+    
+    Với mode sampled, chỉ validated_records records được validate:
+    valid_records/invalid_records tính trên các records đó.
+    """
     total_records: int
     valid_records: int
     invalid_records: int
     errors: List[Dict[str, Any]]
+    validated_records: Optional[int] = None
+    mode: str = "full"
+    
+    def __post_init__(self):
+        if self.validated_records is None:
+            self.validated_records = self.total_records
     
     @property
     def success_rate(self) -> float:
-        """Tính tỷ lệ thành công."""
-        if self.total_records == 0:
+        """Tính tỷ lệ thành công (trên các records đã validate)."""
+        if self.validated_records == 0:
             return 0.0
-        return self.valid_records / self.total_records
+        return self.valid_records / self.validated_records
 
 
 class BillRecord(BaseModel):
@@ -109,39 +125,117 @@ class CustomerRecord(BaseModel):
     }
 
 
-def validate_records(
+@lru_cache(maxsize=None)
+def _list_adapter(model_class: type[BaseModel]) -> TypeAdapter:
+    """TypeAdapter(List[model_class]) được build một lần cho mỗi model."""
+    return TypeAdapter(List[model_class])
+
+
+def _batch_errors(
     records: List[Dict[str, Any]],
+    indexes: List[int],
     model_class: type[BaseModel]
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Validate records[indexes] trong một lần gọi pydantic-core.
+    
+    Returns:
+        Dict[int, List[Dict[str, Any]]]: Index trong records → các lỗi của record đó
+    """
+    batch = records if len(indexes) == len(records) else [records[i] for i in indexes]
+    try:
+        _list_adapter(model_class).validate_python(batch)
+        return {}
+    except ValidationError as e:
+        errors: Dict[int, List[Dict[str, Any]]] = {}
+        for error in e.errors(include_url=False):
+            # loc bắt đầu bằng vị trí của record trong batch
+            position = error['loc'][0] if error['loc'] and isinstance(error['loc'][0], int) else 0
+            errors.setdefault(indexes[position], []).append(error)
+        return errors
+
+
+def _format_errors(model_class: type[BaseModel], errors: List[Dict[str, Any]]) -> str:
+    """Format lỗi của một record (tương tự str(ValidationError))."""
+    lines = [f"{len(errors)} validation error{'s' if len(errors) > 1 else ''} for {model_class.__name__}"]
+    for error in errors:
+        field_path = ".".join(str(part) for part in error['loc'][1:]) or "__root__"
+        lines.append(f"{field_path}\n  {error['msg']} [type={error['type']}]")
+    return "\n".join(lines)
+
+
+def _sample_indexes(
+    total: int,
+    sample_every: int,
+    sample_size: Optional[int],
+    seed: Optional[int]
+) -> List[int]:
+    """Index các records được validate ở mode sampled."""
+    if sample_size is not None:
+        if sample_size >= total:
+            return list(range(total))
+        return sorted(random.Random(seed).sample(range(total), sample_size))
+    return list(range(0, total, max(1, sample_every)))
+
+
+def validate_records(
+    records: List[Dict[str, Any]],
+    model_class: type[BaseModel],
+    mode: str = "full",
+    sample_every: int = 100,
+    sample_size: Optional[int] = None,
+    seed: Optional[int] = None
 ) -> ValidationResult:
     """
     Validate danh sách records với Pydantic model.
     
+    Records được validate theo batch qua TypeAdapter(List[model_class]) (một lần
+    gọi vào pydantic-core cho cả batch) thay vì model_validate từng record.
+    
+    Modes:
+    - full: validate tất cả records
+    - sampled: chỉ validate mẫu (mỗi sample_every records một record, hoặc
+      sample_size records ngẫu nhiên nếu sample_size được truyền vào)
+    - strict_on_failure: validate mẫu như sampled; nếu mẫu có lỗi thì validate
+      lại toàn bộ để có đầy đủ danh sách lỗi
+    
     Args:
         records: Danh sách records cần validate
         model_class: Pydantic model class để validate
+        mode: full | sampled | strict_on_failure
+        sample_every: Khoảng cách giữa các records được validate (mode sampled)
+        sample_size: Số records ngẫu nhiên được validate (thay cho sample_every)
+        seed: Seed cho random sample
         
     Returns:
         ValidationResult với thông tin validation
     """
-    valid_count = 0
-    invalid_count = 0
-    errors = []
+    if mode not in VALIDATION_MODES:
+        raise ValueError(f"Unknown validation mode: {mode}. Expected one of {VALIDATION_MODES}")
     
-    for idx, record in enumerate(records):
-        try:
-            model_class.model_validate(record)
-            valid_count += 1
-        except Exception as e:
-            invalid_count += 1
-            errors.append({
-                'index': idx,
-                'record_id': record.get('id', 'unknown'),
-                'error': str(e)
-            })
+    indexes = list(range(len(records)))
+    if mode != "full":
+        indexes = _sample_indexes(len(records), sample_every, sample_size, seed)
+    errors_by_index = _batch_errors(records, indexes, model_class) if indexes else {}
+    
+    if mode == "strict_on_failure" and errors_by_index and len(indexes) < len(records):
+        indexes = list(range(len(records)))
+        errors_by_index = _batch_errors(records, indexes, model_class)
+    
+    errors = []
+    for idx in sorted(errors_by_index):
+        record = records[idx]
+        errors.append({
+            'index': idx,
+            'record_id': record.get('id', 'unknown') if isinstance(record, dict) else 'unknown',
+            'error': _format_errors(model_class, errors_by_index[idx])
+        })
     
     return ValidationResult(
         total_records=len(records),
-        valid_records=valid_count,
-        invalid_records=invalid_count,
-        errors=errors
+        valid_records=len(indexes) - len(errors),
+        invalid_records=len(errors),
+        errors=errors,
+        validated_records=len(indexes),
+        mode=mode
     )
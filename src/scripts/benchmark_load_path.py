@@ -0,0 +1,122 @@
+"""
+Benchmark offline cho bills load path (BillLoader → BigQuery) trên DuckDB emulator.
+
+Sinh synthetic bills/products cho N ngày, chạy BillLoader (direct load mode) với
+DuckDBBigQueryClient thay cho bigquery.Client, rồi in thời gian load và số jobs
+theo statement type. Không cần GCP project; GCS backup được bỏ qua.
+
+Usage:
+    python -m src.scripts.benchmark_load_path --days 7 --bills-per-day 5000
+"""
+import argparse
+import sys
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.config import settings
+from src.shared.bigquery.emulator import DuckDBBigQueryClient
+from src.shared.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def generate_day(partition_date: date, bills_per_day: int, products_per_bill: int, start_id: int):
+    """Sinh raw bills + products (cùng format Nhanh API) cho một ngày."""
+    bills = []
+    products = []
+    for offset in range(bills_per_day):
+        bill_id = start_id + offset
+        bills.append({
+            "id": bill_id,
+            "depotId": bill_id % 20,
+            "date": partition_date.isoformat(),
+            "type": 2,
+            "mode": 1,
+            "customer": {"id": bill_id % 5000, "name": f"Customer {bill_id % 5000}"},
+            "payment": {"amount": 150000.0, "cash": {"amount": 150000.0}},
+        })
+        for product_idx in range(products_per_bill):
+            products.append({
+                "bill_id": bill_id,
+                "id": 1000 + product_idx,
+                "code": f"SKU{product_idx}",
+                "name": f"Product {product_idx}",
+                "quantity": 1.0,
+                "price": 50000.0,
+                "amount": 50000.0,
+                "vat": {"percent": 10, "amount": 5000.0},
+            })
+    return bills, products
+
+
+def run_benchmark(days: int, bills_per_day: int, products_per_bill: int, reruns: int, database: str):
+    """Chạy load path trên emulator và trả về timing."""
+    from src.features.nhanh.bills.components.loader import BillLoader
+
+    emulator = DuckDBBigQueryClient(project=settings.gcp_project, database=database, gcs_root=tempfile.mkdtemp())
+    with patch("google.cloud.bigquery.Client", return_value=emulator), \
+            patch("src.features.nhanh.bills.components.loader.GCSLoader"):
+        loader = BillLoader(direct_load=True)
+
+    start_date = date.today() - timedelta(days=days)
+    dataset = [
+        generate_day(start_date + timedelta(days=i), bills_per_day, products_per_bill, start_id=i * bills_per_day)
+        for i in range(days)
+    ]
+
+    timings = []
+    for run in range(1 + reruns):
+        started = time.perf_counter()
+        for i, (bills, products) in enumerate(dataset):
+            partition_date = start_date + timedelta(days=i)
+            loader.load_bills(data=bills, partition_date=partition_date)
+            loader.load_bill_products(data=products, partition_date=partition_date, bills_data=bills)
+        timings.append(time.perf_counter() - started)
+
+    bills_rows = emulator.get_table(loader.bills_table_id).num_rows
+    products_rows = emulator.get_table(loader.products_table_id).num_rows
+    statements = Counter(getattr(job, "statement_type", None) or "LOAD" for job in emulator.jobs)
+    emulator.close()
+
+    return {
+        "timings": timings,
+        "bills_rows": bills_rows,
+        "products_rows": products_rows,
+        "statements": dict(statements),
+    }
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Offline benchmark cho bills load path (DuckDB emulator)")
+    parser.add_argument("--days", type=int, default=3, help="Số ngày (partitions) cần load")
+    parser.add_argument("--bills-per-day", type=int, default=2000, help="Số bills mỗi ngày")
+    parser.add_argument("--products-per-bill", type=int, default=3, help="Số product lines mỗi bill")
+    parser.add_argument("--reruns", type=int, default=1, help="Số lần chạy lại (đo idempotent MERGE path)")
+    parser.add_argument("--database", default=":memory:", help="DuckDB database file (mặc định: in-memory)")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.days, args.bills_per_day, args.products_per_bill, args.reruns, args.database)
+
+    print("=" * 80)
+    print("BILLS LOAD PATH BENCHMARK (DuckDB emulator)")
+    print("=" * 80)
+    for run, elapsed in enumerate(result["timings"]):
+        label = "initial load" if run == 0 else f"rerun {run}"
+        print(f"  {label}: {elapsed:.2f}s")
+    print(f"  Bills rows: {result['bills_rows']:,}")
+    print(f"  Products rows: {result['products_rows']:,}")
+    print(f"  Jobs: {result['statements']}")
+    print("=" * 80)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Benchmark Parquet write options (codec, row-group size, dictionary, sort order) trên synthetic days.
+
+Với mỗi entity (nhanh/bills, nhanh/bill_products) và mỗi variant write options,
+script ghi N file ngày bằng StreamingParquetWriter rồi đo:
+- File size (tổng bytes)
+- Write time
+- Scan time: DuckDB read_parquet trên các files (aggregate theo depot/product và
+  point lookup theo id) - proxy offline cho external-table scan của BigQuery.
+  Với --bigquery, các files được upload lên bucket tạm và scan qua BigQuery
+  external table (cần GCP credentials).
+
+Usage:
+    python -m src.scripts.benchmark_parquet_options --days 7 --bills-per-day 20000
+"""
+import argparse
+import sys
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+import duckdb
+from src.shared.logging import get_logger
+from src.shared.parquet.schemas import DEFAULT_WRITE_OPTIONS, ParquetWriteOptions, get_write_options
+from src.shared.parquet.writer import StreamingParquetWriter
+
+logger = get_logger(__name__)
+
+CUSTOMER_NAMES = [f"Khách hàng {i}" for i in range(3000)]
+SALE_NAMES = [f"Nhân viên {i}" for i in range(60)]
+PRODUCT_NAMES = [f"Sản phẩm {i} - Size {size}" for i in range(800) for size in ("S", "M", "L")]
+
+
+def generate_bills(partition_date: date, count: int, start_id: int, rng: random.Random) -> Iterator[Dict[str, Any]]:
+    """Sinh bills đã flatten (theo BILLS_SCHEMA) cho một ngày, thứ tự id ngẫu nhiên như API trả về."""
+    ids = list(range(start_id, start_id + count))
+    rng.shuffle(ids)
+    extraction_timestamp = datetime.combine(partition_date + timedelta(days=1), datetime.min.time())
+    for bill_id in ids:
+        customer_idx = rng.randrange(len(CUSTOMER_NAMES))
+        sale_idx = rng.randrange(len(SALE_NAMES))
+        total = float(rng.randrange(50, 5000) * 1000)
+        yield {
+            "id": bill_id,
+            "depotId": rng.randrange(20),
+            "date": partition_date,
+            "type": 2,
+            "mode": rng.choice((1, 2, 6)),
+            "customer_id": customer_idx,
+            "customer_name": CUSTOMER_NAMES[customer_idx],
+            "customer_mobile": f"09{customer_idx:08d}",
+            "customer_address": f"{customer_idx} Đường số {customer_idx % 50}, Quận {customer_idx % 12}",
+            "sale_id": sale_idx,
+            "sale_name": SALE_NAMES[sale_idx],
+            "created_id": sale_idx,
+            "created_email": f"staff{sale_idx}@example.com",
+            "payment_total_amount": total,
+            "payment_customer_amount": total,
+            "payment_discount": 0.0,
+            "payment_points": 0.0,
+            "payment_cash_amount": total,
+            "payment_transfer_amount": 0.0,
+            "payment_transfer_account_id": None,
+            "payment_credit_amount": 0.0,
+            "description": None,
+            "extraction_timestamp": extraction_timestamp,
+        }
+
+
+def generate_bill_products(
+    partition_date: date,
+    count: int,
+    start_id: int,
+    products_per_bill: int,
+    rng: random.Random
+) -> Iterator[Dict[str, Any]]:
+    """Sinh bill_products đã flatten (theo BILL_PRODUCTS_SCHEMA) cho một ngày."""
+    extraction_timestamp = datetime.combine(partition_date + timedelta(days=1), datetime.min.time())
+    for bill_id in range(start_id, start_id + count):
+        for _ in range(products_per_bill):
+            product_idx = rng.randrange(len(PRODUCT_NAMES))
+            price = float((product_idx % 40 + 1) * 10000)
+            quantity = float(rng.randrange(1, 4))
+            yield {
+                "bill_id": bill_id,
+                "product_id": product_idx,
+                "product_code": f"SKU{product_idx:05d}",
+                "product_barcode": f"893{product_idx:010d}",
+                "product_name": PRODUCT_NAMES[product_idx],
+                "quantity": quantity,
+                "price": price,
+                "discount": 0.0,
+                "amount": price * quantity,
+                "vat_percent": 10,
+                "vat_amount": price * quantity * 0.1,
+                "bill_date": partition_date,
+                "extraction_timestamp": extraction_timestamp,
+            }
+
+
+def build_variants(entity: str) -> Dict[str, ParquetWriteOptions]:
+    """Các write options cần so sánh cho entity."""
+    tuned = get_write_options(entity)
+    return {
+        "snappy (baseline)": DEFAULT_WRITE_OPTIONS,
+        "zstd-1": DEFAULT_WRITE_OPTIONS.with_overrides(compression="zstd", compression_level=1),
+        "zstd-3": DEFAULT_WRITE_OPTIONS.with_overrides(compression="zstd", compression_level=3),
+        "zstd-9": DEFAULT_WRITE_OPTIONS.with_overrides(compression="zstd", compression_level=9),
+        "schema options": tuned,
+        "schema options, 10k row groups": tuned.with_overrides(row_group_size=10000),
+    }
+
+
+def write_days(entity: str, days: List[List[Dict[str, Any]]], options: ParquetWriteOptions, output_dir: str) -> Dict[str, Any]:
+    """Ghi mỗi ngày thành một file Parquet, trả về size + write time."""
+    os.makedirs(output_dir, exist_ok=True)
+    total_bytes = 0
+    started = time.perf_counter()
+    for index, records in enumerate(days):
+        path = os.path.join(output_dir, f"data_{index:03d}.parquet")
+        with open(path, "wb") as sink:
+            with StreamingParquetWriter(sink, entity, options=options) as writer:
+                writer.write_records(records)
+            total_bytes += sink.tell()
+    return {"bytes": total_bytes, "write_seconds": time.perf_counter() - started}
+
+
+def scan_duckdb(entity: str, output_dir: str, repeat: int) -> float:
+    """Đo thời gian scan trung bình (aggregate + point lookup) bằng DuckDB."""
+    pattern = os.path.join(output_dir, "*.parquet")
+    if entity == "nhanh/bills":
+        queries = [
+            f"SELECT depotId, COUNT(*), SUM(payment_total_amount) FROM read_parquet('{pattern}') GROUP BY depotId",
+            f"SELECT * FROM read_parquet('{pattern}') WHERE id = 12345",
+        ]
+    else:
+        queries = [
+            f"SELECT product_name, SUM(amount) FROM read_parquet('{pattern}') GROUP BY product_name",
+            f"SELECT * FROM read_parquet('{pattern}') WHERE bill_id = 12345",
+        ]
+
+    connection = duckdb.connect()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for sql in queries:
+            connection.execute(sql).fetchall()
+    connection.close()
+    return (time.perf_counter() - started) / repeat
+
+
+def scan_bigquery(entity: str, output_dir: str, bucket_name: str, prefix: str) -> float:
+    """Upload files lên GCS và đo thời gian aggregate query qua BigQuery external table."""
+    from google.cloud import bigquery, storage
+    from src.config import settings
+
+    bucket = storage.Client(project=settings.gcp_project).bucket(bucket_name)
+    for name in sorted(os.listdir(output_dir)):
+        bucket.blob(f"{prefix}/{name}").upload_from_filename(os.path.join(output_dir, name))
+
+    client = bigquery.Client(project=settings.gcp_project)
+    external_config = bigquery.ExternalConfig("PARQUET")
+    external_config.source_uris = [f"gs://{bucket_name}/{prefix}/*.parquet"]
+    group_column = "depotId" if entity == "nhanh/bills" else "product_name"
+    job_config = bigquery.QueryJobConfig(
+        table_definitions={"bench": external_config},
+        use_query_cache=False
+    )
+    started = time.perf_counter()
+    client.query(f"SELECT {group_column}, COUNT(*) FROM bench GROUP BY {group_column}", job_config=job_config).result()
+    elapsed = time.perf_counter() - started
+
+    for blob in bucket.list_blobs(prefix=f"{prefix}/"):
+        blob.delete()
+    return elapsed
+
+
+def run_benchmark(
+    days: int,
+    bills_per_day: int,
+    products_per_bill: int,
+    repeat: int,
+    bigquery_bucket: str = None
+) -> List[Dict[str, Any]]:
+    """Chạy benchmark cho cả bills và bill_products, trả về kết quả từng variant."""
+    rng = random.Random(42)
+    start_date = date.today() - timedelta(days=days)
+    datasets = {
+        "nhanh/bills": [
+            list(generate_bills(start_date + timedelta(days=i), bills_per_day, i * bills_per_day, rng))
+            for i in range(days)
+        ],
+        "nhanh/bill_products": [
+            list(generate_bill_products(start_date + timedelta(days=i), bills_per_day, i * bills_per_day, products_per_bill, rng))
+            for i in range(days)
+        ],
+    }
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for entity, day_records in datasets.items():
+            for variant_index, (variant, options) in enumerate(build_variants(entity).items()):
+                output_dir = os.path.join(workdir, entity.replace("/", "_"), str(variant_index))
+                result = write_days(entity, day_records, options, output_dir)
+                result.update({
+                    "entity": entity,
+                    "variant": variant,
+                    "rows": sum(len(records) for records in day_records),
+                    "scan_seconds": scan_duckdb(entity, output_dir, repeat),
+                })
+                if bigquery_bucket:
+                    prefix = f"_benchmarks/parquet_options/{entity.replace('/', '_')}/{variant_index}"
+                    result["bq_scan_seconds"] = scan_bigquery(entity, output_dir, bigquery_bucket, prefix)
+                results.append(result)
+                logger.info("Benchmarked Parquet write options", **result)
+    return results
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Benchmark Parquet write options trên synthetic days")
+    parser.add_argument("--days", type=int, default=3, help="Số ngày (files) mỗi entity")
+    parser.add_argument("--bills-per-day", type=int, default=10000, help="Số bills mỗi ngày")
+    parser.add_argument("--products-per-bill", type=int, default=3, help="Số product lines mỗi bill")
+    parser.add_argument("--repeat", type=int, default=3, help="Số lần lặp scan queries")
+    parser.add_argument("--bigquery", metavar="BUCKET", default=None,
+                        help="Đo thêm scan time qua BigQuery external table (upload tạm lên bucket này)")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.days, args.bills_per_day, args.products_per_bill, args.repeat, args.bigquery)
+
+    print("=" * 100)
+    print("PARQUET WRITE OPTIONS BENCHMARK")
+    print("=" * 100)
+    header = f"{'entity':<22} {'variant':<32} {'size (MB)':>10} {'write (s)':>10} {'scan (s)':>10}"
+    if args.bigquery:
+        header += f" {'bq scan (s)':>12}"
+    print(header)
+    for result in results:
+        line = (
+            f"{result['entity']:<22} {result['variant']:<32} "
+            f"{result['bytes'] / 1024 / 1024:>10.2f} {result['write_seconds']:>10.2f} {result['scan_seconds']:>10.3f}"
+        )
+        if args.bigquery:
+            line += f" {result['bq_scan_seconds']:>12.2f}"
+        print(line)
+    print("=" * 100)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
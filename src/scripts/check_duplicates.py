@@ -4,6 +4,7 @@ Check duplicate dựa trên primary key của mỗi table.
 """
 from google.cloud import bigquery
 from src.config import settings
+from src.shared.bigquery.instrumentation import create_instrumented_client, query_cost_tracker
 from datetime import date, timedelta
 from typing import Dict, List, Optional
 
@@ -211,8 +212,8 @@ def main():
             sys.exit(1)
     
     # Initialize BigQuery client
-    client = bigquery.Client(
-        project=settings.gcp_project,
+    client = create_instrumented_client(
+        pipeline="check_duplicates",
         location=settings.gcp_region
     )
     
@@ -282,6 +283,10 @@ def main():
     else:
         print("[OK] KHONG CO DUPLICATE - Du lieu sach!")
     
+    
+    cost = query_cost_tracker.report()
+    print(f"BigQuery: {cost['jobs']} jobs, {cost['bytes_processed']:,} bytes processed, "
+          f"{cost['bytes_billed']:,} bytes billed")
     print("=" * 80)
 
 
@@ -0,0 +1,96 @@
+"""
+Compact Parquet files của các tháng đã đóng thành vài file lớn.
+
+Rewrite các file ngày (data_{date}.parquet) của mỗi tháng thành
+compacted_{YYYY-MM}_*.parquet (mỗi ngày là các row groups riêng), cập nhật
+partition manifest rồi xóa các file nguồn. Upload lại một ngày sau khi compact
+vẫn thay thế đúng ngày đó (xem PartitionCompactor.split_out_day).
+
+Usage:
+    python -m src.scripts.compact_gcs_partitions                       # tháng trước
+    python -m src.scripts.compact_gcs_partitions --from-month 2025-01 --to-month 2025-06
+    python -m src.scripts.compact_gcs_partitions --month 2025-03 --entity nhanh/bills --dry-run
+"""
+import argparse
+import sys
+import os
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.config import settings
+from src.shared.gcs import GCSLoader
+from src.shared.logging import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_ENTITIES = ["nhanh/bills", "nhanh/bill_products"]
+
+
+def parse_month(value: str) -> Tuple[int, int]:
+    """Parse 'YYYY-MM' thành (year, month)."""
+    parsed = datetime.strptime(value, "%Y-%m")
+    return parsed.year, parsed.month
+
+
+def month_range(from_month: Tuple[int, int], to_month: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """Danh sách (year, month) từ from_month đến to_month (bao gồm cả hai đầu)."""
+    months = []
+    year, month = from_month
+    while (year, month) <= to_month:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Compact GCS Parquet partitions của các tháng đã đóng")
+    parser.add_argument("--entity", action="append", help="Entity path (format: platform/entity); có thể truyền nhiều lần")
+    parser.add_argument("--month", action="append", help="Tháng cần compact (YYYY-MM); có thể truyền nhiều lần")
+    parser.add_argument("--from-month", help="Tháng bắt đầu (YYYY-MM)")
+    parser.add_argument("--to-month", help="Tháng kết thúc (YYYY-MM), mặc định bằng --from-month")
+    parser.add_argument("--max-rows-per-file", type=int, default=None,
+                        help="Số rows tối đa mỗi compacted file (mặc định: GCS_COMPACTION_MAX_ROWS_PER_FILE)")
+    parser.add_argument("--force", action="store_true", help="Cho phép compact tháng chưa đóng")
+    parser.add_argument("--dry-run", action="store_true", help="Chỉ in kế hoạch, không ghi/xóa")
+    args = parser.parse_args()
+
+    if args.from_month:
+        months = month_range(parse_month(args.from_month), parse_month(args.to_month or args.from_month))
+    elif args.month:
+        months = [parse_month(value) for value in args.month]
+    else:
+        previous_month = datetime.utcnow().date().replace(day=1) - timedelta(days=1)
+        months = [(previous_month.year, previous_month.month)]
+
+    loader = GCSLoader(bucket_name=settings.bronze_bucket)
+    failed = 0
+    for entity in args.entity or DEFAULT_ENTITIES:
+        for year, month in months:
+            try:
+                result = loader.compactor.compact_month(
+                    entity,
+                    year,
+                    month,
+                    max_rows_per_file=args.max_rows_per_file,
+                    force=args.force,
+                    dry_run=args.dry_run
+                )
+            except Exception as e:
+                failed += 1
+                logger.error("Compaction failed", entity=entity, month=f"{year:04d}-{month:02d}", error=str(e))
+                print(f"❌ {entity} {year:04d}-{month:02d}: {e}")
+                continue
+            print(
+                f"✅ {entity} {result['month']}: {result['status']} - {result['days']} days, "
+                f"{result['rows']:,} rows, {result['source_objects']} → {result['compacted_objects']} objects"
+            )
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
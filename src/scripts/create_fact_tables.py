@@ -1,22 +1,51 @@
 """
 Script để tạo fact tables cho bills feature trong BigQuery.
-Chạy SQL schema để tạo các tables: fact_sales_bills_v3_0 và fact_sales_bills_product_v3_0
+Tạo các tables: fact_sales_bills_v3_0 và fact_sales_bills_product_v3_0 theo TableSpec
+(partition + clustering) trong src/features/nhanh/bills/components/tables.py.
+
+Với tables đã tồn tại, dùng --recluster để migrate sang clustering spec mới
+và rewrite data cũ (theo khoảng partition --from-date/--to-date).
+
+Usage:
+    python -m src.scripts.create_fact_tables
+    python -m src.scripts.create_fact_tables --recluster --table bills --from-date 2024-01-01
 """
+import argparse
 import sys
 import os
+from datetime import datetime
 
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from google.cloud import bigquery
 from src.config import settings
+from src.features.nhanh.bills.components.tables import FACT_TABLE_SPECS
+from src.shared.bigquery.provisioning import TableProvisioner
 from src.shared.logging import get_logger
 
 logger = get_logger(__name__)
 
 
-def create_fact_tables():
-    """Tạo fact tables cho bills feature."""
+def _parse_date(value: str):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def create_fact_tables(
+    tables=None,
+    recluster: bool = False,
+    from_date=None,
+    to_date=None
+):
+    """
+    Tạo fact tables cho bills feature.
+
+    Args:
+        tables: Danh sách keys trong FACT_TABLE_SPECS (None = tất cả)
+        recluster: Migrate clustering spec + rewrite data cho tables đã tồn tại
+        from_date: Partition bắt đầu khi recluster
+        to_date: Partition kết thúc khi recluster
+    """
     bq_client = bigquery.Client(project=settings.gcp_project)
     
     project_id = settings.gcp_project
@@ -35,99 +64,55 @@ def create_fact_tables():
         bq_client.create_dataset(dataset_obj, exists_ok=True)
         logger.info(f"Created dataset {dataset_id}")
     
-    # SQL for fact_sales_bills_v3_0
-    bills_table_sql = f"""
-    CREATE TABLE IF NOT EXISTS `{project_id}.{dataset}.fact_sales_bills_v3_0` (
-        id INT64,
-        depotId INT64,
-        date DATE,
-        type INT64,
-        mode INT64,
-        
-        -- Customer info (Flattened from "customer" object)
-        customer_id INT64,
-        customer_name STRING,
-        customer_mobile STRING,
-        customer_address STRING,
-        
-        -- Sale/Staff info
-        sale_id INT64,
-        sale_name STRING,
-        created_id INT64,
-        created_email STRING,
-        
-        -- Payment info (Flattened from "payment" object)
-        payment_total_amount FLOAT64,
-        payment_customer_amount FLOAT64,
-        payment_discount FLOAT64,
-        payment_points FLOAT64,
-        
-        -- Flattened payment methods
-        payment_cash_amount FLOAT64,
-        payment_transfer_amount FLOAT64,
-        payment_transfer_account_id INT64,
-        payment_credit_amount FLOAT64,
-        
-        description STRING,
-        extraction_timestamp TIMESTAMP
-    )
-    PARTITION BY date
-    CLUSTER BY depotId, type;
-    """
-    
-    # SQL for fact_sales_bills_product_v3_0
-    products_table_sql = f"""
-    CREATE TABLE IF NOT EXISTS `{project_id}.{dataset}.fact_sales_bills_product_v3_0` (
-        bill_id INT64,
-        
-        -- Product info
-        product_id INT64,
-        product_code STRING,
-        product_barcode STRING,
-        product_name STRING,
-        
-        -- Transaction info
-        quantity FLOAT64,
-        price FLOAT64,
-        discount FLOAT64,
-        vat_percent INT64,
-        vat_amount FLOAT64,
-        amount FLOAT64,
-        
-        -- Metadata
-        bill_date DATE,
-        extraction_timestamp TIMESTAMP
-    )
-    PARTITION BY bill_date
-    CLUSTER BY bill_id, product_id;
-    """
-    
-    # Execute SQL
-    try:
-        logger.info(f"Creating table fact_sales_bills_v3_0...")
-        query_job = bq_client.query(bills_table_sql)
-        query_job.result()
-        logger.info(f"Successfully created table fact_sales_bills_v3_0")
-    except Exception as e:
-        logger.error(f"Error creating fact_sales_bills_v3_0: {e}")
-        raise
+    provisioner = TableProvisioner(bq_client, dataset=dataset)
     
-    try:
-        logger.info(f"Creating table fact_sales_bills_product_v3_0...")
-        query_job = bq_client.query(products_table_sql)
-        query_job.result()
-        logger.info(f"Successfully created table fact_sales_bills_product_v3_0")
-    except Exception as e:
-        logger.error(f"Error creating fact_sales_bills_product_v3_0: {e}")
-        raise
+    for key in tables or list(FACT_TABLE_SPECS.keys()):
+        spec = FACT_TABLE_SPECS[key]
+        try:
+            logger.info(f"Creating table {spec.table_name}...")
+            created = provisioner.ensure_table(spec)
+            if created:
+                logger.info(f"Successfully created table {spec.table_name}")
+            elif recluster:
+                result = provisioner.recluster(spec, from_date=from_date, to_date=to_date)
+                logger.info(
+                    f"Successfully re-clustered table {spec.table_name}",
+                    **result
+                )
+        except Exception as e:
+            logger.error(f"Error creating {spec.table_name}: {e}")
+            raise
     
     logger.info("All fact tables created successfully!")
 
 
 def main():
     """Main function."""
+    parser = argparse.ArgumentParser(description="Create/migrate bills fact tables")
+    parser.add_argument(
+        "--table",
+        choices=["all"] + list(FACT_TABLE_SPECS.keys()),
+        default="all",
+        help="Table cần tạo/migrate (default: all)"
+    )
+    parser.add_argument(
+        "--recluster",
+        action="store_true",
+        help="Áp dụng clustering spec mới cho tables đã tồn tại và rewrite data cũ"
+    )
+    parser.add_argument("--from-date", type=_parse_date, help="Partition bắt đầu khi recluster (YYYY-MM-DD)")
+    parser.add_argument("--to-date", type=_parse_date, help="Partition kết thúc khi recluster (YYYY-MM-DD)")
+    args = parser.parse_args()
+    
+    tables = None if args.table == "all" else [args.table]
+    
     try:
-        create_fact_tables()
+        create_fact_tables(
+            tables=tables,
+            recluster=args.recluster,
+            from_date=args.from_date,
+            to_date=args.to_date
+        )
         print("Successfully created all fact tables!")
         return 0
     except Exception as e:
@@ -137,4 +122,3 @@ def main():
 
 if __name__ == "__main__":
     sys.exit(main())
-
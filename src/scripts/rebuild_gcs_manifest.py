@@ -0,0 +1,54 @@
+"""
+Build lại partition manifest ({entity}/_manifest.json) từ listing GCS.
+
+Dùng một lần cho các entities có file từ trước khi GCSLoader ghi manifest,
+hoặc khi manifest bị lệch với bucket. Sau khi rebuild, manifest được đánh dấu
+complete và các upload sau không cần list prefix để tìm file cũ.
+
+Usage:
+    python -m src.scripts.rebuild_gcs_manifest --entity nhanh/bills --entity nhanh/bill_products
+"""
+import argparse
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from src.config import settings
+from src.shared.gcs.manifest import ManifestStore
+from src.shared.logging import get_logger
+from src.shared.storage import get_storage_backend
+
+logger = get_logger(__name__)
+
+DEFAULT_ENTITIES = ["nhanh/bills", "nhanh/bill_products"]
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Rebuild GCS partition manifests")
+    parser.add_argument(
+        "--entity",
+        action="append",
+        help="Entity path (format: platform/entity); có thể truyền nhiều lần. Mặc định: bills + bill_products"
+    )
+    parser.add_argument("--bucket", default=None, help="GCS bucket (mặc định: settings.bronze_bucket)")
+    args = parser.parse_args()
+
+    bucket_name = args.bucket or settings.bronze_bucket
+    backend = get_storage_backend(bucket_name)
+    store = ManifestStore(backend)
+
+    for entity in args.entity or DEFAULT_ENTITIES:
+        manifest = store.rebuild(entity)
+        total_rows = sum(manifest.row_count(partition_date) for partition_date in manifest.dates())
+        print(
+            f"{backend.uri(store.manifest_path(entity))}: "
+            f"{len(manifest.partitions)} partitions, {total_rows:,} rows"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,16 @@
 """
 Script để xóa duplicate records trong BigQuery fact tables.
 Giữ lại record mới nhất (extraction_timestamp cao nhất) và xóa các record cũ hơn.
+
+--incremental: chỉ xử lý partitions thay đổi từ lần chạy trước (xem
+src.shared.bigquery.dedupe), không hỏi lại nên dùng được cho job hàng đêm.
 """
 from google.cloud import bigquery
 from src.config import settings
+from src.features.nhanh.bills.components.tables import BILLS_TABLE_SPEC, BILL_PRODUCTS_TABLE_SPEC
+from src.shared.bigquery import IncrementalDeduper, TableSpec
+from src.shared.bigquery.instrumentation import create_instrumented_client, query_cost_tracker
+from src.shared.gcs import GCSLoader
 from datetime import date
 from typing import Optional
 import time
@@ -179,6 +186,73 @@ def remove_duplicates_products(
         }
 
 
+def remove_duplicates_incremental(
+    client: bigquery.Client,
+    spec: TableSpec,
+    state_backend,
+    dry_run: bool = False,
+    full: bool = False
+) -> dict:
+    """
+    Xóa duplicate chỉ trong các partitions thay đổi từ lần chạy trước.
+
+    Args:
+        client: BigQuery client
+        spec: Table spec (partition field + merge keys)
+        state_backend: Storage backend lưu high-water mark
+        dry_run: Chỉ đếm duplicate, không xóa
+        full: Bỏ qua high-water mark, kiểm tra mọi partition
+
+    Returns:
+        Dict với thông tin kết quả
+    """
+    try:
+        result = IncrementalDeduper(client, spec, state_backend).run(dry_run=dry_run, full=full)
+        return {
+            "table": spec.table_name,
+            "since": result.since.isoformat() if result.since else "all",
+            "changed_partitions": len(result.changed_partitions),
+            "rewritten_partitions": [d.isoformat() for d in result.rewritten_partitions],
+            "deleted_rows": 0 if dry_run else result.total_excess_rows,
+            "excess_rows": result.total_excess_rows,
+            "dry_run": dry_run,
+            "success": True
+        }
+    except Exception as e:
+        return {
+            "table": spec.table_name,
+            "error": str(e),
+            "success": False
+        }
+
+
+def run_incremental(client: bigquery.Client, table: str, dry_run: bool, full: bool) -> list:
+    """Chạy incremental dedupe cho các tables được chọn và in kết quả."""
+    state_backend = GCSLoader(bucket_name=settings.bronze_bucket).backend
+    specs = []
+    if table in ["bills", "all"]:
+        specs.append(BILLS_TABLE_SPEC)
+    if table in ["products", "all"]:
+        specs.append(BILL_PRODUCTS_TABLE_SPEC)
+
+    results = []
+    for spec in specs:
+        print(f"[{spec.table_name}] Incremental dedupe...")
+        result = remove_duplicates_incremental(client, spec, state_backend, dry_run=dry_run, full=full)
+        results.append(result)
+        if "error" in result:
+            print(f"  [ERROR] {result['error']}")
+            continue
+        print(f"  Since: {result['since']}, changed partitions: {result['changed_partitions']}")
+        if dry_run:
+            print(f"  [DRY RUN] {result['excess_rows']:,} duplicate rows would be deleted")
+        else:
+            print(f"  [OK] Deleted {result['deleted_rows']:,} duplicate rows "
+                  f"in {len(result['rewritten_partitions'])} partitions")
+        print()
+    return results
+
+
 def main():
     """Main function để xóa duplicate."""
     import sys
@@ -207,6 +281,16 @@ def main():
         action="store_true",
         help="Confirm deletion (required if not dry-run)"
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only process partitions modified since the last run (no interactive prompt)"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="With --incremental: ignore the high-water mark and check every partition"
+    )
     
     args = parser.parse_args()
     
@@ -226,11 +310,21 @@ def main():
         sys.exit(1)
     
     # Initialize BigQuery client
-    client = bigquery.Client(
-        project=settings.gcp_project,
+    client = create_instrumented_client(
+        pipeline="remove_duplicates",
         location=settings.gcp_region
     )
     
+    if args.incremental:
+        if check_date:
+            print("[ERROR] --date cannot be combined with --incremental")
+            sys.exit(1)
+        results = run_incremental(client, args.table, dry_run=args.dry_run, full=args.full)
+        cost = query_cost_tracker.report()
+        print(f"BigQuery: {cost['jobs']} jobs, {cost['bytes_processed']:,} bytes processed, "
+              f"{cost['bytes_billed']:,} bytes billed")
+        sys.exit(1 if any("error" in r for r in results) else 0)
+    
     print("=" * 80)
     if args.dry_run:
         print("DRY RUN - PREVIEW DELETE OPERATIONS")
@@ -317,6 +411,10 @@ def main():
             print(f"[OK] Da xoa {total_deleted:,} duplicate rows")
             print(f"     Thoi gian: {elapsed_time:.2f} seconds")
     
+    
+    cost = query_cost_tracker.report()
+    print(f"BigQuery: {cost['jobs']} jobs, {cost['bytes_processed']:,} bytes processed, "
+          f"{cost['bytes_billed']:,} bytes billed")
     print("=" * 80)
 
 
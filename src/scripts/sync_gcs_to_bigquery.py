@@ -3,15 +3,26 @@ Script để đồng bộ data từ GCS sang BigQuery.
 
 Kiểm tra xem GCS có những partition nào mà BigQuery chưa có,
 sau đó load data từ GCS sang BigQuery cho các partition đó.
+
+Usage:
+    # Từng partition: external table + MERGE riêng
+    python -m src.scripts.sync_gcs_to_bigquery
+    
+    # Bulk: mỗi table một staging load (nhiều URIs) + một MERGE, các tables chạy song song
+    python -m src.scripts.sync_gcs_to_bigquery --bulk [--max-workers 2]
 """
+import argparse
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
-from pathlib import Path
-from typing import Dict, List, Set, Tuple
-from google.cloud import storage, bigquery
+from typing import Any, Dict, List, Set, Tuple
+from google.cloud import bigquery
 from google.api_core.exceptions import NotFound
 from src.config import settings
+from src.shared.bigquery.instrumentation import create_instrumented_client, query_cost_tracker
+from src.shared.gcs.manifest import ManifestStore
 from src.shared.logging import get_logger
+from src.shared.storage import get_storage_backend
 from src.features.nhanh.bills.components.loader import BillLoader
 
 logger = get_logger(__name__)
@@ -21,6 +32,9 @@ def list_gcs_parquet_files(bucket_name: str, prefix: str) -> List[str]:
     """
     List tất cả parquet files trong GCS với prefix.
     
+    Đọc partition manifest của entity trước (một object, không phân trang);
+    chỉ list toàn bộ prefix khi entity chưa có manifest.
+    
     Args:
         bucket_name: Tên GCS bucket
         prefix: Prefix path (ví dụ: 'nhanh/bills/')
@@ -28,27 +42,71 @@ def list_gcs_parquet_files(bucket_name: str, prefix: str) -> List[str]:
     Returns:
         List[str]: Danh sách GCS URIs của các parquet files
     """
-    storage_client = storage.Client(project=settings.gcp_project)
-    bucket = storage_client.bucket(bucket_name)
+    backend = get_storage_backend(bucket_name)
+    
+    manifest = ManifestStore(backend).load(prefix)
+    if manifest.exists:
+        parquet_files = [
+            backend.uri(entry.object_name)
+            for partition_date in manifest.dates()
+            for entry in manifest.entries(partition_date)
+        ]
+        logger.info(f"Found {len(parquet_files)} parquet files in manifest of gs://{bucket_name}/{prefix}")
+        return parquet_files
     
-    blobs = bucket.list_blobs(prefix=prefix)
     parquet_files = []
     
-    for blob in blobs:
-        if blob.name.endswith('.parquet'):
-            gcs_uri = f"gs://{bucket_name}/{blob.name}"
-            parquet_files.append(gcs_uri)
+    for info in backend.list(prefix=prefix):
+        if info.name.endswith('.parquet'):
+            parquet_files.append(backend.uri(info.name))
     
     logger.info(f"Found {len(parquet_files)} parquet files in gs://{bucket_name}/{prefix}")
     return parquet_files
 
 
+def list_gcs_partitions(bucket_name: str, prefix: str, entity_type: str) -> Dict[date, str]:
+    """
+    Map partition date → GCS URI của file chứa partition đó.
+    
+    Dùng partition manifest nếu có (bao gồm cả compacted files chứa nhiều ngày);
+    nếu chưa có manifest thì list prefix và parse date từ tên file.
+    
+    Args:
+        bucket_name: Tên GCS bucket
+        prefix: Prefix path (ví dụ: 'nhanh/bills/')
+        entity_type: 'bills' hoặc 'bill_products'
+        
+    Returns:
+        Dict[date, str]: Partition date → GCS URI
+    """
+    backend = get_storage_backend(bucket_name)
+    manifest = ManifestStore(backend).load(prefix)
+    if manifest.exists:
+        return {
+            partition_date: backend.uri(manifest.entries(partition_date)[-1].object_name)
+            for partition_date in manifest.dates()
+            if manifest.entries(partition_date)
+        }
+    
+    gcs_partitions: Dict[date, str] = {}
+    for gcs_uri in list_gcs_parquet_files(bucket_name, prefix):
+        try:
+            partition_date = extract_partition_date_from_path(gcs_uri, entity_type)
+            # Nếu có nhiều files cho cùng partition, giữ file mới nhất (theo tên)
+            if partition_date not in gcs_partitions or gcs_uri > gcs_partitions[partition_date]:
+                gcs_partitions[partition_date] = gcs_uri
+        except Exception as e:
+            logger.warning(f"Could not extract date from {gcs_uri}: {e}")
+            continue
+    return gcs_partitions
+
+
 def extract_partition_date_from_path(gcs_uri: str, entity_type: str) -> date:
     """
     Extract partition date từ GCS path.
     
-    Path format: gs://bucket/nhanh/bills/year=2025/month=11/data_2025-11-01_...
-    hoặc: gs://bucket/nhanh/bill_products/year=2025/month=11/data_2025-11-01_...
+    Path format: gs://bucket/nhanh/bills/year=2025/month=11/data_2025-11-01.parquet
+    hoặc (file cũ có timestamp): gs://bucket/nhanh/bill_products/year=2025/month=11/data_2025-11-01_...
     
     Args:
         gcs_uri: GCS URI của parquet file
@@ -57,8 +115,8 @@ def extract_partition_date_from_path(gcs_uri: str, entity_type: str) -> date:
     Returns:
         date: Partition date
     """
-    # Extract date từ filename: data_2025-11-01_...
-    match = re.search(r'data_(\d{4}-\d{2}-\d{2})_', gcs_uri)
+    # Extract date từ filename: data_2025-11-01.parquet hoặc data_2025-11-01_...
+    match = re.search(r'data_(\d{4}-\d{2}-\d{2})[_.]', gcs_uri)
     if match:
         date_str = match.group(1)
         return datetime.strptime(date_str, '%Y-%m-%d').date()
@@ -165,9 +223,128 @@ def sync_partition(
         return False
 
 
-def main():
+def sync_partitions_bulk(
+    loader: BillLoader,
+    gcs_partitions: Dict[date, str],
+    partitions_to_sync: Set[date],
+    entity_type: str
+) -> bool:
+    """
+    Sync tất cả partitions thiếu của một entity bằng một staging load + một MERGE.
+    
+    Args:
+        loader: BillLoader instance
+        gcs_partitions: Partition date → GCS URI
+        partitions_to_sync: Các partition cần sync
+        entity_type: 'bills' hoặc 'bill_products'
+        
+    Returns:
+        bool: True nếu sync thành công
+    """
+    # Compacted file chứa nhiều ngày chỉ cần load một lần
+    gcs_uris = sorted({gcs_partitions[partition_date] for partition_date in partitions_to_sync})
+    table_id = loader.bills_table_id if entity_type == "bills" else loader.products_table_id
+    try:
+        logger.info(f"Bulk syncing {len(partitions_to_sync)} {entity_type} partitions from {len(gcs_uris)} files")
+        loader.reload_from_gcs(gcs_uris, table_id)
+        return True
+    except Exception as e:
+        logger.error(
+            f"Failed to bulk sync {entity_type} partitions: {e}",
+            files=len(gcs_uris),
+            error=str(e)
+        )
+        return False
+
+
+def sync_entity(
+    entity: Dict[str, Any],
+    loader: BillLoader,
+    bq_client: bigquery.Client,
+    bulk: bool = False
+) -> Tuple[int, int]:
+    """
+    So sánh partitions GCS với BigQuery và sync các partitions thiếu của một entity.
+    
+    Args:
+        entity: Entity config (type, gcs_prefix, table_id, partition_field)
+        loader: BillLoader instance
+        bq_client: BigQuery client
+        bulk: Dùng một staging load + một MERGE cho tất cả partitions thiếu
+        
+    Returns:
+        Tuple[int, int]: (số partitions synced, số partitions failed)
+    """
+    entity_type = entity["type"]
+    gcs_prefix = entity["gcs_prefix"]
+    table_id = entity["table_id"]
+    partition_field = entity["partition_field"]
+    
+    logger.info(f"Processing {entity_type}")
+    
+    # 1-2. Partition dates → GCS file (manifest hoặc listing)
+    logger.info(f"Listing partitions in gs://{settings.bronze_bucket}/{gcs_prefix}")
+    gcs_partitions = list_gcs_partitions(settings.bronze_bucket, gcs_prefix, entity_type)
+    
+    if not gcs_partitions:
+        logger.info(f"No parquet files found for {entity_type}")
+        return 0, 0
+    
+    logger.info(f"Found {len(gcs_partitions)} unique partitions in GCS for {entity_type}")
+    
+    # 3. Get partitions đã có trong BigQuery
+    bq_partitions = get_bigquery_partitions(bq_client, table_id, partition_field)
+    
+    # 4. Tìm partitions cần sync (có trong GCS nhưng chưa có trong BigQuery)
+    partitions_to_sync = set(gcs_partitions.keys()) - bq_partitions
+    
+    if not partitions_to_sync:
+        logger.info(f"All {len(gcs_partitions)} partitions already exist in BigQuery for {entity_type}")
+        return 0, 0
+    
+    logger.info(f"Found {len(partitions_to_sync)} partitions to sync for {entity_type}")
+    logger.info(f"Partitions to sync: {sorted(partitions_to_sync)}")
+    
+    if bulk:
+        success = sync_partitions_bulk(loader, gcs_partitions, partitions_to_sync, entity_type)
+        return (len(partitions_to_sync), 0) if success else (0, len(partitions_to_sync))
+    
+    # 5. Sync từng partition
+    # Compacted file chứa nhiều ngày: MERGE cả file một lần là đủ cho mọi ngày trong đó
+    synced, failed = 0, 0
+    synced_uris: Dict[str, bool] = {}
+    for partition_date in sorted(partitions_to_sync):
+        gcs_uri = gcs_partitions[partition_date]
+        if gcs_uri in synced_uris:
+            success = synced_uris[gcs_uri]
+        else:
+            success = sync_partition(loader, gcs_uri, partition_date, entity_type)
+            synced_uris[gcs_uri] = success
+        
+        if success:
+            synced += 1
+        else:
+            failed += 1
+    return synced, failed
+
+
+def main(argv: List[str] = None):
     """Main function để sync data từ GCS sang BigQuery."""
-    bq_client = bigquery.Client(project=settings.gcp_project, location=settings.gcp_region)
+    parser = argparse.ArgumentParser(description="Sync missing partitions from GCS to BigQuery")
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Mỗi table một staging load nhiều URIs + một MERGE (thay vì từng partition)"
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=2,
+        help="Số entities (tables độc lập) sync song song (chỉ với --bulk)"
+    )
+    args = parser.parse_args(argv)
+    
+    bq_client = create_instrumented_client(pipeline="sync_gcs_to_bigquery", location=settings.gcp_region)
     loader = BillLoader()
     
     dataset_id = f"{settings.gcp_project}.{settings.target_dataset}"
@@ -190,63 +367,19 @@ def main():
         }
     ]
     
-    total_synced = 0
-    total_failed = 0
+    if args.bulk:
+        # Mỗi entity ghi vào table riêng nên các entities chạy song song không tranh chấp DML;
+        # reload_from_gcs không dùng state theo ngày của loader (flattened_tables, failed_loads)
+        with ThreadPoolExecutor(max_workers=max(1, args.max_workers), thread_name_prefix="sync-entity") as executor:
+            results = list(executor.map(
+                lambda entity: sync_entity(entity, loader, bq_client, bulk=True),
+                entities
+            ))
+    else:
+        results = [sync_entity(entity, loader, bq_client) for entity in entities]
     
-    for entity in entities:
-        entity_type = entity["type"]
-        gcs_prefix = entity["gcs_prefix"]
-        table_id = entity["table_id"]
-        partition_field = entity["partition_field"]
-        
-        logger.info(f"\n{'='*60}")
-        logger.info(f"Processing {entity_type}")
-        logger.info(f"{'='*60}")
-        
-        # 1. List parquet files trong GCS
-        logger.info(f"Listing parquet files in gs://{settings.bronze_bucket}/{gcs_prefix}")
-        gcs_files = list_gcs_parquet_files(settings.bronze_bucket, gcs_prefix)
-        
-        if not gcs_files:
-            logger.info(f"No parquet files found for {entity_type}")
-            continue
-        
-        # 2. Extract partition dates từ GCS files
-        gcs_partitions: Dict[date, str] = {}
-        for gcs_uri in gcs_files:
-            try:
-                partition_date = extract_partition_date_from_path(gcs_uri, entity_type)
-                # Nếu có nhiều files cho cùng partition, giữ file mới nhất (theo tên)
-                if partition_date not in gcs_partitions or gcs_uri > gcs_partitions[partition_date]:
-                    gcs_partitions[partition_date] = gcs_uri
-            except Exception as e:
-                logger.warning(f"Could not extract date from {gcs_uri}: {e}")
-                continue
-        
-        logger.info(f"Found {len(gcs_partitions)} unique partitions in GCS for {entity_type}")
-        
-        # 3. Get partitions đã có trong BigQuery
-        bq_partitions = get_bigquery_partitions(bq_client, table_id, partition_field)
-        
-        # 4. Tìm partitions cần sync (có trong GCS nhưng chưa có trong BigQuery)
-        partitions_to_sync = set(gcs_partitions.keys()) - bq_partitions
-        
-        if not partitions_to_sync:
-            logger.info(f"All {len(gcs_partitions)} partitions already exist in BigQuery for {entity_type}")
-            continue
-        
-        logger.info(f"Found {len(partitions_to_sync)} partitions to sync for {entity_type}")
-        logger.info(f"Partitions to sync: {sorted(partitions_to_sync)}")
-        
-        # 5. Sync từng partition
-        for partition_date in sorted(partitions_to_sync):
-            gcs_uri = gcs_partitions[partition_date]
-            success = sync_partition(loader, gcs_uri, partition_date, entity_type)
-            
-            if success:
-                total_synced += 1
-            else:
-                total_failed += 1
+    total_synced = sum(synced for synced, _ in results)
+    total_failed = sum(failed for _, failed in results)
     
     # Summary
     logger.info(f"\n{'='*60}")
@@ -255,8 +388,8 @@ def main():
     logger.info(f"Total partitions synced: {total_synced}")
     logger.info(f"Total partitions failed: {total_failed}")
     logger.info(f"{'='*60}")
+    query_cost_tracker.log_report()
 
 
 if __name__ == "__main__":
     main()
-
@@ -4,5 +4,34 @@ Chứa BigQuery client và các utilities chung.
 """
 from .client import BigQueryClient
 from .external_tables import BigQueryExternalTableSetup
+from .dml import KeyedDML, batch_keys_by_size
+from .staging import ArrowStagingLoader, LocalStagingClient
+from .provisioning import TableSpec, TableProvisioner
+from .dedupe import DedupeResult, IncrementalDeduper
+from .emulator import DuckDBBigQueryClient
+from .instrumentation import (
+    InstrumentedClient,
+    QueryBudgetExceeded,
+    QueryCostTracker,
+    create_instrumented_client,
+    query_cost_tracker,
+)
 
-__all__ = ['BigQueryClient', 'BigQueryExternalTableSetup']
+__all__ = [
+    'BigQueryClient',
+    'BigQueryExternalTableSetup',
+    'KeyedDML',
+    'batch_keys_by_size',
+    'ArrowStagingLoader',
+    'LocalStagingClient',
+    'TableSpec',
+    'TableProvisioner',
+    'DedupeResult',
+    'IncrementalDeduper',
+    'DuckDBBigQueryClient',
+    'InstrumentedClient',
+    'QueryBudgetExceeded',
+    'QueryCostTracker',
+    'create_instrumented_client',
+    'query_cost_tracker',
+]
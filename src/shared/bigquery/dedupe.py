@@ -0,0 +1,311 @@
+"""
+Incremental dedupe cho partitioned fact tables.
+
+Thay vì quét toàn bộ table (`GROUP BY id` / `ROW_NUMBER() OVER (PARTITION BY id ...)`),
+IncrementalDeduper đọc `INFORMATION_SCHEMA.PARTITIONS.last_modified_time` để chỉ xử
+lý các partitions bị ghi từ lần chạy trước (high-water mark lưu trên StorageBackend).
+Trong các partitions đó, một query tìm partitions có duplicate và một MERGE duy nhất
+rewrite tất cả chúng (giữ row mới nhất theo extraction_timestamp), nên chi phí
+dedupe hàng đêm tỷ lệ với số partitions thay đổi thay vì kích thước table.
+
+Duplicate được xác định trong phạm vi một partition (partition field + merge keys);
+row trùng key nằm ở partition khác không bị động tới.
+
+High-water mark được ghi bằng read-modify-write với generation-match precondition và
+không bao giờ lùi: hai lần `--incremental` chạy chồng nhau giữ mốc lớn hơn thay vì
+lần ghi sau đè lên lần ghi trước.
+"""
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from google.api_core.exceptions import NotFound, PreconditionFailed
+from google.cloud import bigquery
+from src.shared.logging import get_logger
+from src.shared.storage import StorageBackend
+from .provisioning import TableSpec
+
+logger = get_logger(__name__)
+
+STATE_PREFIX = "_state/dedupe"
+DEFAULT_ORDER_FIELD = "extraction_timestamp"
+MAX_UPDATE_ATTEMPTS = 5
+
+
+@dataclass
+class DedupeResult:
+    """
+    Kết quả một lần dedupe.
+
+    excess_rows là số rows thừa (mỗi key giữ lại một row) theo từng partition.
+    """
+    table_id: str
+    since: Optional[datetime]
+    high_water_mark: Optional[datetime]
+    changed_partitions: List[date] = field(default_factory=list)
+    excess_rows: Dict[date, int] = field(default_factory=dict)
+    rewritten_partitions: List[date] = field(default_factory=list)
+    dry_run: bool = False
+
+    @property
+    def total_excess_rows(self) -> int:
+        """Tổng số rows thừa trong các partitions đã kiểm tra."""
+        return sum(self.excess_rows.values())
+
+
+class IncrementalDeduper:
+    """Tìm và xóa duplicate chỉ trong các partitions thay đổi từ lần chạy trước."""
+
+    def __init__(
+        self,
+        client: Any,
+        spec: TableSpec,
+        state_backend: StorageBackend,
+        table_id: Optional[str] = None,
+        order_field: str = DEFAULT_ORDER_FIELD
+    ):
+        """
+        Khởi tạo deduper.
+
+        Args:
+            client: BigQuery client
+            spec: Table spec (cần partition_field và merge_keys)
+            state_backend: Storage backend lưu high-water mark
+            table_id: Full table ID (mặc định: spec.table_id())
+            order_field: Cột quyết định row được giữ lại (giá trị lớn nhất)
+        """
+        if not spec.partition_field or not spec.merge_keys:
+            raise ValueError(f"Table {spec.table_name} needs partition_field and merge_keys for dedupe")
+        self.client = client
+        self.spec = spec
+        self.state_backend = state_backend
+        self.table_id = table_id or spec.table_id()
+        self.order_field = order_field
+
+    @property
+    def state_path(self) -> str:
+        """Object path của high-water mark."""
+        return f"{STATE_PREFIX}/{self.table_id}.json"
+
+    def _read_state(self) -> Tuple[Optional[datetime], int]:
+        """High-water mark hiện tại và generation của state object (0 nếu chưa tồn tại)."""
+        info = self.state_backend.stat(self.state_path)
+        if info is None:
+            return None, 0
+        try:
+            state = json.loads(self.state_backend.get(self.state_path, generation=info.generation))
+        except NotFound:
+            # Bị ghi đè giữa stat và get: write với generation cũ sẽ fail và được retry
+            return None, info.generation
+        return datetime.fromisoformat(state["high_water_mark"]), info.generation
+
+    def load_high_water_mark(self) -> Optional[datetime]:
+        """
+        Đọc high-water mark của lần chạy trước.
+
+        Returns:
+            Optional[datetime]: last_modified_time lớn nhất đã xử lý, None nếu chưa chạy lần nào
+        """
+        return self._read_state()[0]
+
+    def save_high_water_mark(self, high_water_mark: datetime) -> datetime:
+        """
+        Lưu high-water mark nếu nó lớn hơn mốc đang lưu.
+
+        Mốc của mỗi lần chạy bao phủ từ mốc nó đọc lúc bắt đầu, nên giữ giá trị lớn hơn
+        khi hai lần chạy chồng nhau vẫn không bỏ sót partition nào.
+
+        Args:
+            high_water_mark: last_modified_time lớn nhất đã xử lý
+
+        Returns:
+            datetime: High-water mark đang lưu sau khi ghi
+
+        Raises:
+            PreconditionFailed: Nếu vẫn conflict sau MAX_UPDATE_ATTEMPTS lần
+        """
+        for attempt in range(1, MAX_UPDATE_ATTEMPTS + 1):
+            current, generation = self._read_state()
+            if current is not None and current >= high_water_mark:
+                return current
+            state = {
+                "table_id": self.table_id,
+                "high_water_mark": high_water_mark.isoformat(),
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }
+            try:
+                self.state_backend.put(
+                    self.state_path,
+                    json.dumps(state).encode("utf-8"),
+                    content_type="application/json",
+                    if_generation_match=generation
+                )
+                return high_water_mark
+            except PreconditionFailed:
+                if attempt == MAX_UPDATE_ATTEMPTS:
+                    raise
+                logger.debug("Dedupe high-water mark changed concurrently, retrying", table_id=self.table_id, attempt=attempt)
+
+    def _partition_times(self, since: Optional[datetime] = None) -> Dict[date, datetime]:
+        """
+        Đọc last_modified_time của các partitions (chỉ metadata, không quét data).
+
+        Args:
+            since: Chỉ lấy partitions có last_modified_time > since (None = tất cả)
+
+        Returns:
+            Dict[date, datetime]: Partition date → last_modified_time
+        """
+        project, dataset, table_name = self.table_id.split(".")
+        sql = f"""
+        SELECT partition_id, last_modified_time
+        FROM `{project}.{dataset}.INFORMATION_SCHEMA.PARTITIONS`
+        WHERE table_name = @table_name
+          AND partition_id NOT IN ('__NULL__', '__UNPARTITIONED__')
+          AND (@since IS NULL OR last_modified_time > @since)
+        """
+        query_job = self.client.query(
+            sql,
+            job_config=bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ScalarQueryParameter("table_name", "STRING", table_name),
+                bigquery.ScalarQueryParameter("since", "TIMESTAMP", since),
+            ])
+        )
+        partitions = {}
+        for row in query_job.result():
+            modified = row.last_modified_time
+            if modified.tzinfo is None:
+                modified = modified.replace(tzinfo=timezone.utc)
+            partitions[datetime.strptime(row.partition_id, "%Y%m%d").date()] = modified
+        return partitions
+
+    def _window(self) -> str:
+        keys = ", ".join([self.spec.partition_field] + self.spec.merge_keys)
+        return f"ROW_NUMBER() OVER (PARTITION BY {keys} ORDER BY {self.order_field} DESC)"
+
+    def count_excess_rows(self, partitions: List[date]) -> Dict[date, int]:
+        """
+        Đếm rows thừa theo partition (chỉ quét các partitions được truyền vào).
+
+        Args:
+            partitions: Partition dates cần kiểm tra
+
+        Returns:
+            Dict[date, int]: Partition date → số rows thừa (chỉ partitions có duplicate)
+        """
+        if not partitions:
+            return {}
+        partition_field = self.spec.partition_field
+        sql = f"""
+        SELECT {partition_field} AS partition_date, COUNT(*) AS excess_rows
+        FROM (
+            SELECT {partition_field}, {self._window()} AS rn
+            FROM `{self.table_id}`
+            WHERE {partition_field} IN UNNEST(@partitions)
+        )
+        WHERE rn > 1
+        GROUP BY partition_date
+        """
+        query_job = self.client.query(
+            sql,
+            job_config=bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ArrayQueryParameter("partitions", "DATE", sorted(partitions)),
+            ])
+        )
+        return {row.partition_date: row.excess_rows for row in query_job.result()}
+
+    def rewrite_partitions(self, partitions: List[date]) -> int:
+        """
+        Rewrite các partitions trong một MERGE: xóa toàn bộ rows cũ và insert lại
+        một row mỗi key (row có order_field lớn nhất). Khác với DELETE theo
+        (key, extraction_timestamp), cách này cũng xử lý được rows trùng hoàn toàn.
+
+        Args:
+            partitions: Partition dates cần rewrite
+
+        Returns:
+            int: num_dml_affected_rows của MERGE
+        """
+        if not partitions:
+            return 0
+        partition_field = self.spec.partition_field
+        sql = f"""
+        MERGE `{self.table_id}` T
+        USING (
+            SELECT *
+            FROM `{self.table_id}`
+            WHERE {partition_field} IN UNNEST(@partitions)
+            QUALIFY {self._window()} = 1
+        ) S
+        ON FALSE
+        WHEN NOT MATCHED BY SOURCE AND T.{partition_field} IN UNNEST(@partitions) THEN
+            DELETE
+        WHEN NOT MATCHED THEN
+            INSERT ROW
+        """
+        query_job = self.client.query(
+            sql,
+            job_config=bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ArrayQueryParameter("partitions", "DATE", sorted(partitions)),
+            ])
+        )
+        query_job.result()
+        return query_job.num_dml_affected_rows or 0
+
+    def run(self, dry_run: bool = False, full: bool = False) -> DedupeResult:
+        """
+        Dedupe các partitions thay đổi từ lần chạy trước và cập nhật high-water mark.
+
+        Args:
+            dry_run: Chỉ đếm duplicate, không rewrite và không cập nhật high-water mark
+            full: Bỏ qua high-water mark, kiểm tra mọi partition
+
+        Returns:
+            DedupeResult: Partitions đã kiểm tra / rewrite
+        """
+        since = None if full else self.load_high_water_mark()
+        changed = self._partition_times(since)
+        result = DedupeResult(
+            table_id=self.table_id,
+            since=since,
+            high_water_mark=max(changed.values()) if changed else since,
+            changed_partitions=sorted(changed),
+            dry_run=dry_run
+        )
+        if not changed:
+            logger.info("No partitions changed since last dedupe", table_id=self.table_id)
+            return result
+
+        result.excess_rows = self.count_excess_rows(result.changed_partitions)
+        if dry_run:
+            return result
+
+        result.rewritten_partitions = sorted(result.excess_rows)
+        if result.rewritten_partitions:
+            self.rewrite_partitions(result.rewritten_partitions)
+            # Chính MERGE cũng cập nhật last_modified_time của các partitions đã rewrite:
+            # lấy lại mốc sau rewrite để lần chạy sau không xử lý lại chúng. Chỉ tính
+            # partitions đã rewrite; partition do load khác ghi trong lúc chạy chưa được
+            # kiểm tra nên phải nằm sau high-water mark cho lần chạy sau.
+            modified = self._partition_times(result.high_water_mark)
+            rewritten = [modified[day] for day in result.rewritten_partitions if day in modified]
+            concurrent = [
+                modified_time for day, modified_time in modified.items()
+                if day not in result.rewritten_partitions
+            ]
+            if rewritten:
+                high_water_mark = max(rewritten)
+                if concurrent:
+                    # Mốc phải nằm trước partition ghi đồng thời sớm nhất
+                    high_water_mark = min(high_water_mark, min(concurrent) - timedelta(microseconds=1))
+                result.high_water_mark = max(result.high_water_mark, high_water_mark)
+
+        result.high_water_mark = self.save_high_water_mark(result.high_water_mark)
+        logger.info(
+            f"Dedupe finished for {self.table_id}",
+            table_id=self.table_id,
+            changed_partitions=len(result.changed_partitions),
+            rewritten_partitions=len(result.rewritten_partitions),
+            excess_rows=result.total_excess_rows
+        )
+        return result
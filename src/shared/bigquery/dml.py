@@ -0,0 +1,226 @@
+"""
+Keyed DML helper cho BigQuery.
+Thay vì build `WHERE id IN (1,2,3,...)` bằng string và chạy mỗi batch 1000 ids
+như một job riêng, module này truyền danh sách keys qua một query parameter
+`ARRAY<INT64>` duy nhất và dùng `IN UNNEST(@keys)`.
+
+Batch được chia theo giới hạn kích thước request của BigQuery (không phải theo
+số lượng cố định), nên vài nghìn - vài trăm nghìn ids chỉ tốn 1 job.
+"""
+from typing import Any, Iterable, Iterator, List, Optional, Sequence
+from google.cloud import bigquery
+from src.shared.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+# BigQuery giới hạn request (SQL + query parameters) ở 10 MB.
+# Giữ margin để chừa chỗ cho phần JSON envelope của request.
+MAX_REQUEST_BYTES = 8 * 1024 * 1024
+
+# Mỗi phần tử của array parameter được serialize thành {"value": "<key>"}
+PARAM_ELEMENT_OVERHEAD_BYTES = 16
+
+
+def estimate_key_bytes(key: Any) -> int:
+    """
+    Ước lượng số bytes một key chiếm trong request JSON.
+
+    Args:
+        key: Giá trị key (int hoặc str)
+
+    Returns:
+        int: Số bytes ước lượng
+    """
+    return len(str(key).encode('utf-8')) + PARAM_ELEMENT_OVERHEAD_BYTES
+
+
+def batch_keys_by_size(
+    keys: Sequence[Any],
+    max_bytes: int = MAX_REQUEST_BYTES,
+    reserved_bytes: int = 0
+) -> Iterator[List[Any]]:
+    """
+    Chia keys thành các batch sao cho mỗi request không vượt quá max_bytes.
+
+    Args:
+        keys: Danh sách keys
+        max_bytes: Kích thước tối đa của một request
+        reserved_bytes: Bytes đã dùng cho SQL text và các parameters khác
+
+    Yields:
+        List[Any]: Từng batch keys
+    """
+    budget = max_bytes - reserved_bytes
+    if budget <= 0:
+        raise ValueError(f"reserved_bytes ({reserved_bytes}) exceeds max_bytes ({max_bytes})")
+
+    batch: List[Any] = []
+    batch_bytes = 0
+    for key in keys:
+        key_bytes = estimate_key_bytes(key)
+        if batch and batch_bytes + key_bytes > budget:
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(key)
+        batch_bytes += key_bytes
+
+    if batch:
+        yield batch
+
+
+class KeyedDML:
+    """
+    Thực thi DML theo danh sách keys với một ARRAY query parameter.
+
+    Ví dụ:
+        dml = KeyedDML(bq_client)
+        dml.delete_by_keys(
+            table_id=products_table_id,
+            key_column="bill_id",
+            keys=bill_ids,
+            key_condition="bill_date IS NULL",
+            or_condition="bill_date = @partition_date",
+            query_parameters=[bigquery.ScalarQueryParameter("partition_date", "DATE", d)]
+        )
+    """
+
+    def __init__(self, client: bigquery.Client, max_request_bytes: int = MAX_REQUEST_BYTES):
+        """
+        Khởi tạo helper.
+
+        Args:
+            client: BigQuery client
+            max_request_bytes: Kích thước tối đa mỗi request (SQL + parameters)
+        """
+        self.client = client
+        self.max_request_bytes = max_request_bytes
+
+    @staticmethod
+    def _dedupe(keys: Iterable[Any]) -> List[Any]:
+        """Loại bỏ keys None/trùng, giữ nguyên thứ tự."""
+        return list(dict.fromkeys(k for k in keys if k is not None))
+
+    def _run(self, sql: str, query_parameters: List[Any]) -> int:
+        """Chạy một DML statement và trả về số rows bị ảnh hưởng."""
+        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+        query_job = self.client.query(sql, job_config=job_config)
+        query_job.result()
+        return getattr(query_job, 'num_dml_affected_rows', None) or 0
+
+    def execute(
+        self,
+        sql: str,
+        keys: Iterable[Any],
+        key_type: str = "INT64",
+        param_name: str = "keys",
+        query_parameters: Optional[List[Any]] = None
+    ) -> int:
+        """
+        Chạy một DML statement có chứa `@{param_name}` cho từng batch keys.
+
+        Args:
+            sql: DML statement, tham chiếu keys qua `UNNEST(@{param_name})`
+            keys: Danh sách keys
+            key_type: BigQuery type của keys (INT64, STRING)
+            param_name: Tên query parameter chứa keys
+            query_parameters: Các query parameters khác của statement
+
+        Returns:
+            int: Tổng số rows bị ảnh hưởng
+        """
+        unique_keys = self._dedupe(keys)
+        if not unique_keys:
+            return 0
+
+        extra_params = list(query_parameters or [])
+        total_affected = 0
+        batches = 0
+        for batch in batch_keys_by_size(
+            unique_keys,
+            max_bytes=self.max_request_bytes,
+            reserved_bytes=len(sql.encode('utf-8'))
+        ):
+            params = [bigquery.ArrayQueryParameter(param_name, key_type, batch)] + extra_params
+            total_affected += self._run(sql, params)
+            batches += 1
+
+        logger.debug(
+            "Executed keyed DML",
+            keys=len(unique_keys),
+            batches=batches,
+            rows_affected=total_affected
+        )
+        return total_affected
+
+    def delete_by_keys(
+        self,
+        table_id: str,
+        key_column: str,
+        keys: Iterable[Any],
+        key_type: str = "INT64",
+        key_condition: Optional[str] = None,
+        or_condition: Optional[str] = None,
+        query_parameters: Optional[List[Any]] = None
+    ) -> int:
+        """
+        DELETE các rows có key_column nằm trong keys.
+
+        Statement sinh ra có dạng:
+            DELETE FROM `table`
+            WHERE (key_column IN UNNEST(@keys) AND key_condition) OR (or_condition)
+
+        `or_condition` không phụ thuộc vào keys nên chỉ được gắn vào batch đầu tiên;
+        nếu không có keys thì vẫn chạy một statement chỉ với `or_condition`.
+
+        Args:
+            table_id: Full table ID
+            key_column: Tên cột key
+            keys: Danh sách keys cần xóa
+            key_type: BigQuery type của keys
+            key_condition: Điều kiện bổ sung cho các rows khớp key (ví dụ: "bill_date IS NULL")
+            or_condition: Điều kiện độc lập gộp vào cùng statement (ví dụ: partition delete)
+            query_parameters: Query parameters cho key_condition/or_condition
+
+        Returns:
+            int: Tổng số rows đã xóa
+        """
+        unique_keys = self._dedupe(keys)
+        extra_params = list(query_parameters or [])
+
+        key_predicate = f"{key_column} IN UNNEST(@keys)"
+        if key_condition:
+            key_predicate = f"({key_predicate} AND {key_condition})"
+
+        if not unique_keys:
+            if not or_condition:
+                return 0
+            sql = f"DELETE FROM `{table_id}` WHERE {or_condition}"
+            return self._run(sql, extra_params)
+
+        first_sql = f"DELETE FROM `{table_id}` WHERE {key_predicate}"
+        if or_condition:
+            first_sql += f" OR ({or_condition})"
+        rest_sql = f"DELETE FROM `{table_id}` WHERE {key_predicate}"
+
+        total_deleted = 0
+        batches = 0
+        for batch in batch_keys_by_size(
+            unique_keys,
+            max_bytes=self.max_request_bytes,
+            reserved_bytes=len(first_sql.encode('utf-8'))
+        ):
+            sql = first_sql if batches == 0 else rest_sql
+            params = [bigquery.ArrayQueryParameter("keys", key_type, batch)] + extra_params
+            total_deleted += self._run(sql, params)
+            batches += 1
+
+        logger.debug(
+            "Deleted rows by keys",
+            table_id=table_id,
+            keys=len(unique_keys),
+            batches=batches,
+            deleted_rows=total_deleted
+        )
+        return total_deleted
@@ -0,0 +1,632 @@
+"""
+Local BigQuery emulator backed by DuckDB.
+
+DuckDBBigQueryClient là stand-in cho bigquery.Client, chỉ implement phần API mà
+BillLoader, WatermarkTracker, OneOfficeLoader và scripts đang dùng, để chạy và
+benchmark toàn bộ load path offline (không cần GCP project):
+
+- query(): CREATE [OR REPLACE] EXTERNAL TABLE over local Parquet, MERGE, DELETE,
+  UPDATE, SELECT, DROP; query parameters (@name, UNNEST(@array));
+  num_dml_affected_rows, statement_type
+- get/create/update/delete_table, get/create_dataset, dataset()
+- load_table_from_file / load_table_from_uri (Parquet) với WRITE_TRUNCATE /
+  WRITE_APPEND và partition decorator (`table$YYYYMMDD`)
+- insert_rows_json
+
+Mapping: `project.dataset.table` → DuckDB `"dataset"."table"` (project bị bỏ qua).
+GCS URIs `gs://bucket/path` được map sang `{gcs_root}/bucket/path` trên local disk.
+
+Requires: duckdb (optional dependency, chỉ cần cho offline tests/benchmarks).
+"""
+import os
+import re
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import pyarrow as pa
+import pyarrow.parquet as pq
+from google.api_core.exceptions import BadRequest, Conflict, NotFound
+from google.cloud import bigquery
+from src.shared.logging import get_logger
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - optional dependency
+    duckdb = None
+
+logger = get_logger(__name__)
+
+
+# BigQuery type → DuckDB type (DDL / create_table)
+_BQ_TO_DUCKDB_TYPES = {
+    "INT64": "BIGINT",
+    "INTEGER": "BIGINT",
+    "FLOAT64": "DOUBLE",
+    "FLOAT": "DOUBLE",
+    "NUMERIC": "DECIMAL(38, 9)",
+    "BIGNUMERIC": "DOUBLE",
+    "BOOL": "BOOLEAN",
+    "BOOLEAN": "BOOLEAN",
+    "STRING": "VARCHAR",
+    "BYTES": "BLOB",
+    "DATE": "DATE",
+    "DATETIME": "TIMESTAMP",
+    "TIMESTAMP": "TIMESTAMP",
+    "TIME": "TIME",
+    "JSON": "JSON",
+}
+
+# DuckDB type (prefix) → BigQuery legacy type name (get_table)
+_DUCKDB_TO_BQ_TYPES = [
+    ("BIGINT", "INTEGER"),
+    ("INTEGER", "INTEGER"),
+    ("SMALLINT", "INTEGER"),
+    ("TINYINT", "INTEGER"),
+    ("HUGEINT", "INTEGER"),
+    ("UBIGINT", "INTEGER"),
+    ("DOUBLE", "FLOAT"),
+    ("FLOAT", "FLOAT"),
+    ("DECIMAL", "NUMERIC"),
+    ("BOOLEAN", "BOOLEAN"),
+    ("VARCHAR", "STRING"),
+    ("BLOB", "BYTES"),
+    ("DATE", "DATE"),
+    ("TIMESTAMP", "TIMESTAMP"),
+    ("TIME", "TIME"),
+    ("JSON", "JSON"),
+]
+
+_DML_STATEMENTS = {"INSERT", "UPDATE", "DELETE", "MERGE"}
+
+_BACKTICK_IDENTIFIER = re.compile(r"`([^`]+)`")
+_EXTERNAL_TABLE = re.compile(
+    r"CREATE\s+(OR\s+REPLACE\s+)?EXTERNAL\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?(`[^`]+`|[\w.]+)"
+    r"\s*OPTIONS\s*\((?P<options>.*)\)\s*;?\s*$",
+    re.IGNORECASE | re.DOTALL
+)
+_EXTERNAL_URIS = re.compile(r"uris\s*=\s*\[(?P<uris>[^\]]*)\]", re.IGNORECASE | re.DOTALL)
+_DROP_TABLE = re.compile(
+    r"^\s*DROP\s+(?:EXTERNAL\s+)?TABLE\s+(IF\s+EXISTS\s+)?`?([\w.-]+)`?\s*;?\s*$",
+    re.IGNORECASE
+)
+_UNNEST_PARAM = re.compile(r"\bIN\s+UNNEST\s*\(\s*@(\w+)\s*\)", re.IGNORECASE)
+_NAMED_PARAM = re.compile(r"@(\w+)")
+_MERGE_WITHOUT_INTO = re.compile(r"^\s*MERGE\s+(?!INTO\b)", re.IGNORECASE)
+_INSERT_ROW = re.compile(r"\bINSERT\s+ROW\b", re.IGNORECASE)
+_DDL_TRAILING_CLAUSES = re.compile(
+    r"\)\s*(PARTITION\s+BY\b.*|CLUSTER\s+BY\b.*|OPTIONS\s*\(.*)$",
+    re.IGNORECASE | re.DOTALL
+)
+_DDL_TYPES = re.compile(
+    r"\b(INT64|FLOAT64|BIGNUMERIC|NUMERIC|BOOL|STRING|BYTES|DATETIME)\b",
+    re.IGNORECASE
+)
+_FUNCTION_RENAMES = [
+    (re.compile(r"\bSAFE_CAST\s*\(", re.IGNORECASE), "TRY_CAST("),
+    (re.compile(r"\bCOUNTIF\s*\(", re.IGNORECASE), "count_if("),
+]
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+
+
+def _split_table_id(table_id: str, default_project: str) -> Tuple[str, str, str, Optional[str]]:
+    """
+    Tách table ID thành (project, dataset, table, partition decorator).
+
+    Hỗ trợ `project.dataset.table`, `dataset.table` và `table$YYYYMMDD`.
+    """
+    decorator = None
+    if "$" in table_id:
+        table_id, decorator = table_id.split("$", 1)
+    parts = table_id.split(".")
+    if len(parts) == 3:
+        return parts[0], parts[1], parts[2], decorator
+    if len(parts) == 2:
+        return default_project, parts[0], parts[1], decorator
+    raise BadRequest(f"Invalid table ID: {table_id}")
+
+
+def _to_table_id(table: Any) -> str:
+    """Chuẩn hóa str / Table / TableReference thành table ID string."""
+    if isinstance(table, str):
+        return table
+    if isinstance(table, (bigquery.Table, bigquery.TableReference)):
+        return f"{table.project}.{table.dataset_id}.{table.table_id}"
+    return str(table)
+
+
+def _to_dataset_id(dataset: Any) -> str:
+    """Chuẩn hóa str / Dataset / DatasetReference thành dataset name."""
+    if isinstance(dataset, str):
+        return dataset.split(".")[-1]
+    return dataset.dataset_id
+
+
+def _duckdb_to_bq_type(duckdb_type: str) -> str:
+    duckdb_type = duckdb_type.upper()
+    for prefix, bq_type in _DUCKDB_TO_BQ_TYPES:
+        if duckdb_type.startswith(prefix):
+            return bq_type
+    return "STRING"
+
+
+class _DuckDBQueryJob:
+    """Query job đã hoàn thành (DuckDB thực thi đồng bộ)."""
+
+    def __init__(
+        self,
+        columns: List[str],
+        rows: List[tuple],
+        statement_type: Optional[str],
+        num_dml_affected_rows: Optional[int],
+        started: datetime,
+        ended: datetime,
+        dry_run: bool = False,
+        labels: Optional[Dict[str, str]] = None,
+        arrow_table: Optional[pa.Table] = None
+    ):
+        self.job_id = f"duckdb_{uuid.uuid4().hex[:12]}"
+        self.columns = columns
+        self.rows = rows
+        self.statement_type = statement_type
+        self.num_dml_affected_rows = num_dml_affected_rows
+        self.started = started
+        self.ended = ended
+        self.created = started
+        self.dry_run = dry_run
+        self.labels = labels or {}
+        self.total_bytes_processed = 0
+        self.total_bytes_billed = 0
+        self.slot_millis = 0
+        self.cache_hit = False
+        self.state = "DONE"
+        self.error_result = None
+        self._arrow_table = arrow_table
+
+    def done(self) -> bool:
+        return True
+
+    def result(self, *args, **kwargs) -> Iterator[bigquery.Row]:
+        field_to_index = {name: idx for idx, name in enumerate(self.columns)}
+        return iter([bigquery.Row(row, field_to_index) for row in self.rows])
+
+    def to_arrow(self, *args, **kwargs) -> pa.Table:
+        if self._arrow_table is not None:
+            return self._arrow_table
+        return pa.Table.from_pylist([dict(zip(self.columns, row)) for row in self.rows])
+
+    def to_dataframe(self, *args, **kwargs):
+        return self.to_arrow().to_pandas()
+
+
+class _DuckDBLoadJob:
+    """Load job đã hoàn thành."""
+
+    def __init__(self, destination: str, output_rows: int):
+        self.job_id = f"duckdb_load_{uuid.uuid4().hex[:12]}"
+        self.destination = destination
+        self.output_rows = output_rows
+        self.state = "DONE"
+        self.error_result = None
+
+    def done(self) -> bool:
+        return True
+
+    def result(self, *args, **kwargs) -> "_DuckDBLoadJob":
+        return self
+
+
+class DuckDBBigQueryClient:
+    """
+    bigquery.Client-compatible stand-in chạy trên DuckDB.
+
+    Table metadata BigQuery-specific (time_partitioning, clustering_fields,
+    description) được giữ trong memory cạnh DuckDB catalog.
+    """
+
+    def __init__(
+        self,
+        project: str = "local-project",
+        database: str = ":memory:",
+        gcs_root: Optional[str] = None,
+        location: Optional[str] = None
+    ):
+        """
+        Khởi tạo emulator.
+
+        Args:
+            project: Project ID trả về trong table references
+            database: DuckDB database path (mặc định: in-memory)
+            gcs_root: Thư mục local thay cho GCS (gs://bucket/path → {gcs_root}/bucket/path)
+            location: Giữ cho tương thích với bigquery.Client (không dùng)
+        """
+        if duckdb is None:
+            raise ImportError("duckdb is required for DuckDBBigQueryClient (pip install duckdb)")
+        self.project = project
+        self.location = location
+        self.gcs_root = gcs_root
+        self.connection = duckdb.connect(database)
+        self.connection.execute("SET TimeZone = 'UTC'")
+        self._lock = threading.RLock()
+        self._table_metadata: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.jobs: List[Any] = []
+
+    # ------------------------------------------------------------------
+    # Naming helpers
+    # ------------------------------------------------------------------
+
+    def _qualified(self, table_id: str) -> str:
+        _, dataset, table, _ = _split_table_id(table_id, self.project)
+        return f'"{dataset}"."{table}"'
+
+    def _local_path(self, uri: str) -> str:
+        """Map GCS URI sang local path."""
+        if uri.startswith("gs://"):
+            if not self.gcs_root:
+                raise BadRequest(f"gcs_root is not configured, cannot read {uri}")
+            return os.path.join(self.gcs_root, uri[len("gs://"):])
+        if uri.startswith("file://"):
+            return uri[len("file://"):]
+        return uri
+
+    def _table_exists(self, dataset: str, table: str) -> bool:
+        rows = self.connection.execute(
+            "SELECT 1 FROM information_schema.tables WHERE table_schema = ? AND table_name = ?",
+            [dataset, table]
+        ).fetchall()
+        return bool(rows)
+
+    def _ensure_schema(self, dataset: str) -> None:
+        self.connection.execute(f'CREATE SCHEMA IF NOT EXISTS "{dataset}"')
+
+    # ------------------------------------------------------------------
+    # SQL translation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _translate_identifiers(sql: str) -> str:
+        def _replace(match: re.Match) -> str:
+            parts = match.group(1).split(".")
+            if len(parts) >= 2:
+                return f'"{parts[-2]}"."{parts[-1]}"'
+            return f'"{parts[0]}"'
+
+        return _BACKTICK_IDENTIFIER.sub(_replace, sql)
+
+    def _translate_external_table(self, match: re.Match) -> str:
+        uris_match = _EXTERNAL_URIS.search(match.group("options"))
+        if not uris_match:
+            raise BadRequest("CREATE EXTERNAL TABLE requires uris option")
+        uris = [uri.strip().strip("'\"") for uri in uris_match.group("uris").split(",") if uri.strip()]
+        paths = ", ".join(f"'{self._local_path(uri)}'" for uri in uris)
+        target = self._translate_identifiers(match.group(3))
+        replace = "OR REPLACE " if match.group(1) else ""
+        if_not_exists = "IF NOT EXISTS " if match.group(2) else ""
+        return f"CREATE {replace}VIEW {if_not_exists}{target} AS SELECT * FROM read_parquet([{paths}])"
+
+    def translate(self, sql: str) -> str:
+        """
+        Chuyển BigQuery Standard SQL (subset pipeline dùng) sang DuckDB SQL.
+
+        Args:
+            sql: BigQuery SQL
+
+        Returns:
+            str: DuckDB SQL
+        """
+        external = _EXTERNAL_TABLE.search(sql.strip())
+        if external:
+            return self._translate_external_table(external)
+
+        # Không đụng vào string literals khi rewrite params/functions
+        literals: List[str] = []
+
+        def _stash(match: re.Match) -> str:
+            literals.append(match.group(0))
+            return f"\x00{len(literals) - 1}\x00"
+
+        sql = _STRING_LITERAL.sub(_stash, sql)
+        sql = self._translate_identifiers(sql)
+        sql = _MERGE_WITHOUT_INTO.sub("MERGE INTO ", sql)
+        sql = _INSERT_ROW.sub("INSERT", sql)
+        sql = _UNNEST_PARAM.sub(lambda m: f"IN (SELECT UNNEST(${m.group(1)}))", sql)
+        sql = _NAMED_PARAM.sub(lambda m: f"${m.group(1)}", sql)
+        for pattern, replacement in _FUNCTION_RENAMES:
+            sql = pattern.sub(replacement, sql)
+
+        if re.match(r"^\s*CREATE\s+(OR\s+REPLACE\s+)?TABLE\b", sql, re.IGNORECASE):
+            sql = _DDL_TRAILING_CLAUSES.sub(")", sql.rstrip().rstrip(";"))
+            sql = _DDL_TYPES.sub(lambda m: _BQ_TO_DUCKDB_TYPES[m.group(1).upper()], sql)
+
+        return re.sub("\x00(\\d+)\x00", lambda m: literals[int(m.group(1))], sql)
+
+    @staticmethod
+    def _query_parameters(job_config: Optional[bigquery.QueryJobConfig]) -> Dict[str, Any]:
+        params: Dict[str, Any] = {}
+        if job_config is None:
+            return params
+        for param in job_config.query_parameters or []:
+            if isinstance(param, bigquery.ArrayQueryParameter):
+                params[param.name] = list(param.values)
+            else:
+                params[param.name] = param.value
+        return params
+
+    # ------------------------------------------------------------------
+    # Query API
+    # ------------------------------------------------------------------
+
+    def query(
+        self,
+        query: str,
+        job_config: Optional[bigquery.QueryJobConfig] = None,
+        **kwargs
+    ) -> _DuckDBQueryJob:
+        """
+        Thực thi query (đồng bộ) và trả về job đã hoàn thành.
+
+        Raises:
+            BadRequest: SQL không hợp lệ / không được hỗ trợ
+            NotFound: Table không tồn tại
+        """
+        statement = query.strip().split(None, 1)[0].upper() if query.strip() else None
+        statement_type = statement if statement in _DML_STATEMENTS else ("SELECT" if statement in ("SELECT", "WITH") else statement)
+        labels = dict(job_config.labels) if job_config is not None and job_config.labels else {}
+        started = datetime.now(timezone.utc)
+
+        if job_config is not None and job_config.dry_run:
+            job = _DuckDBQueryJob([], [], statement_type, None, started, started, dry_run=True, labels=labels)
+            self.jobs.append(job)
+            return job
+
+        drop = _DROP_TABLE.match(query)
+        if drop:
+            # External tables là DuckDB views → DROP TABLE phải map theo object type
+            self.delete_table(drop.group(2), not_found_ok=bool(drop.group(1)))
+            job = _DuckDBQueryJob([], [], "DROP_TABLE", None, started, datetime.now(timezone.utc), labels=labels)
+            self.jobs.append(job)
+            return job
+
+        sql = self.translate(query)
+        params = self._query_parameters(job_config)
+        used_params = {name: value for name, value in params.items() if f"${name}" in sql}
+
+        with self._lock:
+            if statement == "CREATE":
+                # BigQuery yêu cầu dataset tồn tại; emulator tạo schema on demand
+                for dataset in re.findall(r'"([^"]+)"\."[^"]+"', sql):
+                    self._ensure_schema(dataset)
+            try:
+                cursor = self.connection.execute(sql, used_params or None)
+                columns = [column[0] for column in cursor.description] if cursor.description else []
+                rows = cursor.fetchall() if cursor.description else []
+            except duckdb.CatalogException as e:
+                raise NotFound(str(e))
+            except duckdb.Error as e:
+                raise BadRequest(f"{e}\nTranslated SQL:\n{sql}")
+
+        num_dml_affected_rows = None
+        if statement_type in _DML_STATEMENTS:
+            num_dml_affected_rows = int(rows[0][0]) if rows else 0
+            columns, rows = [], []
+
+        job = _DuckDBQueryJob(
+            columns, rows, statement_type, num_dml_affected_rows,
+            started, datetime.now(timezone.utc), labels=labels
+        )
+        self.jobs.append(job)
+        return job
+
+    # ------------------------------------------------------------------
+    # Dataset API
+    # ------------------------------------------------------------------
+
+    def dataset(self, dataset_id: str, project: Optional[str] = None) -> bigquery.DatasetReference:
+        return bigquery.DatasetReference(project or self.project, dataset_id)
+
+    def get_dataset(self, dataset_ref: Any) -> bigquery.Dataset:
+        dataset = _to_dataset_id(dataset_ref)
+        rows = self.connection.execute(
+            "SELECT 1 FROM information_schema.schemata WHERE schema_name = ?", [dataset]
+        ).fetchall()
+        if not rows:
+            raise NotFound(f"Dataset {self.project}:{dataset} not found")
+        return bigquery.Dataset(f"{self.project}.{dataset}")
+
+    def create_dataset(self, dataset: Any, exists_ok: bool = False, **kwargs) -> bigquery.Dataset:
+        dataset_id = _to_dataset_id(dataset)
+        with self._lock:
+            try:
+                self.get_dataset(dataset_id)
+                if not exists_ok:
+                    raise Conflict(f"Already Exists: Dataset {self.project}:{dataset_id}")
+            except NotFound:
+                self._ensure_schema(dataset_id)
+        return bigquery.Dataset(f"{self.project}.{dataset_id}")
+
+    # ------------------------------------------------------------------
+    # Table API
+    # ------------------------------------------------------------------
+
+    def get_table(self, table: Any) -> bigquery.Table:
+        table_id = _to_table_id(table)
+        _, dataset, name, _ = _split_table_id(table_id, self.project)
+        with self._lock:
+            columns = self.connection.execute(
+                "SELECT column_name, data_type FROM information_schema.columns "
+                "WHERE table_schema = ? AND table_name = ? ORDER BY ordinal_position",
+                [dataset, name]
+            ).fetchall()
+            if not columns:
+                raise NotFound(f"Not found: Table {self.project}:{dataset}.{name}")
+            num_rows = self.connection.execute(f'SELECT COUNT(*) FROM "{dataset}"."{name}"').fetchone()[0]
+
+        result = bigquery.Table(
+            f"{self.project}.{dataset}.{name}",
+            schema=[bigquery.SchemaField(column, _duckdb_to_bq_type(data_type)) for column, data_type in columns]
+        )
+        metadata = self._table_metadata.get((dataset, name), {})
+        if metadata.get("partition_field"):
+            result.time_partitioning = bigquery.TimePartitioning(
+                type_=bigquery.TimePartitioningType.DAY,
+                field=metadata["partition_field"]
+            )
+        if metadata.get("clustering_fields"):
+            result.clustering_fields = metadata["clustering_fields"]
+        if metadata.get("description"):
+            result.description = metadata["description"]
+        result._properties["numRows"] = str(num_rows)
+        return result
+
+    def create_table(self, table: Any, exists_ok: bool = False, **kwargs) -> bigquery.Table:
+        if isinstance(table, str):
+            table = bigquery.Table(table)
+        table_id = _to_table_id(table)
+        _, dataset, name, _ = _split_table_id(table_id, self.project)
+
+        with self._lock:
+            if self._table_exists(dataset, name):
+                if exists_ok:
+                    return self.get_table(table_id)
+                raise Conflict(f"Already Exists: Table {self.project}:{dataset}.{name}")
+            if not table.schema:
+                raise BadRequest(f"Table {table_id} requires a schema")
+
+            self._ensure_schema(dataset)
+            columns = ", ".join(
+                f'"{field.name}" {_BQ_TO_DUCKDB_TYPES.get(field.field_type.upper(), "VARCHAR")}'
+                for field in table.schema
+            )
+            self.connection.execute(f'CREATE TABLE "{dataset}"."{name}" ({columns})')
+            self._table_metadata[(dataset, name)] = {
+                "partition_field": table.time_partitioning.field if table.time_partitioning else None,
+                "clustering_fields": list(table.clustering_fields or []),
+                "description": table.description,
+            }
+        return self.get_table(table_id)
+
+    def update_table(self, table: bigquery.Table, fields: Sequence[str], **kwargs) -> bigquery.Table:
+        table_id = _to_table_id(table)
+        _, dataset, name, _ = _split_table_id(table_id, self.project)
+        metadata = self._table_metadata.setdefault((dataset, name), {})
+        if "clustering_fields" in fields:
+            metadata["clustering_fields"] = list(table.clustering_fields or [])
+        if "description" in fields:
+            metadata["description"] = table.description
+        if "time_partitioning" in fields:
+            metadata["partition_field"] = table.time_partitioning.field if table.time_partitioning else None
+        return self.get_table(table_id)
+
+    def delete_table(self, table: Any, not_found_ok: bool = False, **kwargs) -> None:
+        table_id = _to_table_id(table)
+        _, dataset, name, _ = _split_table_id(table_id, self.project)
+        with self._lock:
+            kind = self.connection.execute(
+                "SELECT table_type FROM information_schema.tables WHERE table_schema = ? AND table_name = ?",
+                [dataset, name]
+            ).fetchone()
+            if not kind:
+                if not_found_ok:
+                    return
+                raise NotFound(f"Not found: Table {self.project}:{dataset}.{name}")
+            object_type = "VIEW" if kind[0] == "VIEW" else "TABLE"
+            self.connection.execute(f'DROP {object_type} "{dataset}"."{name}"')
+            self._table_metadata.pop((dataset, name), None)
+
+    def insert_rows_json(self, table: Any, json_rows: List[Dict[str, Any]], **kwargs) -> List[Dict[str, Any]]:
+        """Streaming insert (append). Trả về [] (không có row errors)."""
+        if not json_rows:
+            return []
+        target = self.get_table(table)
+        columns = [field.name for field in target.schema]
+        arrow_table = pa.Table.from_pylist([{col: row.get(col) for col in columns} for row in json_rows])
+        self._write_arrow(arrow_table, _to_table_id(table), bigquery.WriteDisposition.WRITE_APPEND)
+        return []
+
+    # ------------------------------------------------------------------
+    # Load API
+    # ------------------------------------------------------------------
+
+    def _write_arrow(self, arrow_table: pa.Table, destination: str, write_disposition: Optional[str]) -> int:
+        """Ghi Arrow table vào destination theo write disposition + partition decorator."""
+        _, dataset, name, decorator = _split_table_id(destination, self.project)
+        target = f'"{dataset}"."{name}"'
+        view_name = f"_load_{uuid.uuid4().hex[:8]}"
+
+        with self._lock:
+            self._ensure_schema(dataset)
+            self.connection.register(view_name, arrow_table)
+            # Load job là atomic: DELETE partition + INSERT trong cùng transaction
+            self.connection.begin()
+            try:
+                if not self._table_exists(dataset, name):
+                    self.connection.execute(f"CREATE TABLE {target} AS SELECT * FROM {view_name}")
+                elif write_disposition == bigquery.WriteDisposition.WRITE_TRUNCATE and not decorator:
+                    # WRITE_TRUNCATE thay cả data lẫn schema
+                    self.connection.execute(f"CREATE OR REPLACE TABLE {target} AS SELECT * FROM {view_name}")
+                else:
+                    if write_disposition == bigquery.WriteDisposition.WRITE_TRUNCATE:
+                        partition_field = self._table_metadata.get((dataset, name), {}).get("partition_field")
+                        if not partition_field:
+                            raise BadRequest(f"Partition decorator requires a partitioned table: {destination}")
+                        partition_date = datetime.strptime(decorator, "%Y%m%d").date()
+                        self.connection.execute(
+                            f'DELETE FROM {target} WHERE CAST("{partition_field}" AS DATE) = ?',
+                            [partition_date]
+                        )
+                    elif write_disposition == bigquery.WriteDisposition.WRITE_EMPTY:
+                        count = self.connection.execute(f"SELECT COUNT(*) FROM {target}").fetchone()[0]
+                        if count:
+                            raise Conflict(f"Table {destination} is not empty (WRITE_EMPTY)")
+                    self.connection.execute(f"INSERT INTO {target} BY NAME SELECT * FROM {view_name}")
+                self.connection.commit()
+            except duckdb.Error as e:
+                self.connection.rollback()
+                raise BadRequest(f"Load into {destination} failed: {e}")
+            except Exception:
+                self.connection.rollback()
+                raise
+            finally:
+                self.connection.unregister(view_name)
+        return arrow_table.num_rows
+
+    def load_table_from_file(
+        self,
+        file_obj,
+        destination: Any,
+        job_config: Optional[bigquery.LoadJobConfig] = None,
+        **kwargs
+    ) -> _DuckDBLoadJob:
+        """Load Parquet file object vào table (mặc định WRITE_APPEND như BigQuery)."""
+        arrow_table = pq.read_table(file_obj)
+        destination = _to_table_id(destination)
+        write_disposition = job_config.write_disposition if job_config else None
+        rows = self._write_arrow(arrow_table, destination, write_disposition)
+        job = _DuckDBLoadJob(destination, rows)
+        self.jobs.append(job)
+        return job
+
+    def load_table_from_uri(
+        self,
+        source_uris: Union[str, Sequence[str]],
+        destination: Any,
+        job_config: Optional[bigquery.LoadJobConfig] = None,
+        **kwargs
+    ) -> _DuckDBLoadJob:
+        """Load một hoặc nhiều Parquet URIs (gs:// → gcs_root) vào table."""
+        if isinstance(source_uris, str):
+            source_uris = [source_uris]
+        paths = [self._local_path(uri) for uri in source_uris]
+        with self._lock:
+            arrow_table = self.connection.execute(
+                "SELECT * FROM read_parquet(?)", [paths]
+            ).fetch_arrow_table()
+        destination = _to_table_id(destination)
+        write_disposition = job_config.write_disposition if job_config else None
+        rows = self._write_arrow(arrow_table, destination, write_disposition)
+        job = _DuckDBLoadJob(destination, rows)
+        self.jobs.append(job)
+        return job
+
+    def close(self) -> None:
+        self.connection.close()
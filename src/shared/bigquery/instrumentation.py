@@ -0,0 +1,349 @@
+"""
+Query cost instrumentation cho BigQuery jobs.
+
+InstrumentedClient bọc bigquery.Client để:
+- Gắn labels (pipeline/entity/day) cho mọi query job
+- Ghi lại bytes processed/billed, slot-ms và duration của từng job
+- (Tùy chọn) dry-run trước mỗi statement và abort nếu vượt byte budget
+
+Các số liệu được gom vào QueryCostTracker để log report cuối mỗi run.
+Mọi method khác (get_table, load_table_from_file, ...) được delegate nguyên vẹn
+cho client gốc nên InstrumentedClient dùng thay thế trực tiếp bigquery.Client.
+"""
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional
+from google.cloud import bigquery
+from src.config import settings
+from src.shared.logging import get_logger
+
+logger = get_logger(__name__)
+
+# BigQuery label: lowercase letters, digits, '_' và '-', tối đa 63 ký tự
+_LABEL_INVALID_CHARS = re.compile(r"[^a-z0-9_-]")
+_LABEL_MAX_LENGTH = 63
+
+
+class QueryBudgetExceeded(Exception):
+    """Exception được raise khi dry-run ước tính vượt quá byte budget."""
+
+    def __init__(self, message: str, estimated_bytes: int = None, budget_bytes: int = None):
+        super().__init__(message)
+        self.estimated_bytes = estimated_bytes
+        self.budget_bytes = budget_bytes
+
+
+def sanitize_label(value: Any) -> str:
+    """
+    Chuẩn hóa giá trị thành BigQuery label value hợp lệ.
+
+    Args:
+        value: Giá trị bất kỳ (str, date, int...)
+
+    Returns:
+        str: Label value (lowercase, ký tự không hợp lệ thay bằng '_')
+    """
+    if isinstance(value, (date, datetime)):
+        value = value.strftime("%Y%m%d")
+    return _LABEL_INVALID_CHARS.sub("_", str(value).lower())[:_LABEL_MAX_LENGTH]
+
+
+@dataclass
+class QueryStats:
+    """Số liệu cost của một query job."""
+    job_id: Optional[str]
+    labels: Dict[str, str]
+    statement_type: Optional[str] = None
+    bytes_processed: int = 0
+    bytes_billed: int = 0
+    slot_ms: int = 0
+    duration_ms: int = 0
+    cache_hit: bool = False
+
+
+@dataclass
+class QueryCostTracker:
+    """
+    Gom QueryStats của một run và build report theo pipeline/entity.
+    Thread-safe để dùng chung giữa các loaders trong cùng process.
+    """
+    records: List[QueryStats] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def record(self, stats: QueryStats) -> None:
+        """Thêm số liệu của một job."""
+        with self._lock:
+            self.records.append(stats)
+
+    def reset(self) -> None:
+        """Xóa số liệu (gọi đầu mỗi run)."""
+        with self._lock:
+            self.records = []
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Tổng hợp số liệu cost của run.
+
+        Returns:
+            Dict: totals + breakdown theo "pipeline/entity"
+        """
+        with self._lock:
+            records = list(self.records)
+
+        def _empty() -> Dict[str, int]:
+            return {"jobs": 0, "bytes_processed": 0, "bytes_billed": 0, "slot_ms": 0, "duration_ms": 0}
+
+        totals = _empty()
+        by_entity: Dict[str, Dict[str, int]] = {}
+        for stats in records:
+            key = f"{stats.labels.get('pipeline', 'unknown')}/{stats.labels.get('entity', 'unknown')}"
+            for bucket in (totals, by_entity.setdefault(key, _empty())):
+                bucket["jobs"] += 1
+                bucket["bytes_processed"] += stats.bytes_processed
+                bucket["bytes_billed"] += stats.bytes_billed
+                bucket["slot_ms"] += stats.slot_ms
+                bucket["duration_ms"] += stats.duration_ms
+
+        return {**totals, "by_entity": by_entity}
+
+    def log_report(self) -> Dict[str, Any]:
+        """Log report của run và trả về report."""
+        report = self.report()
+        logger.info(
+            "BigQuery query cost report",
+            jobs=report["jobs"],
+            bytes_processed=report["bytes_processed"],
+            bytes_billed=report["bytes_billed"],
+            slot_ms=report["slot_ms"],
+            duration_ms=report["duration_ms"],
+            by_entity=report["by_entity"]
+        )
+        return report
+
+
+# Tracker mặc định dùng chung cho cả process (một run = một process)
+query_cost_tracker = QueryCostTracker()
+
+
+class _InstrumentedQueryJob:
+    """Proxy cho QueryJob: ghi số liệu cost khi job hoàn thành (result())."""
+
+    def __init__(self, job: Any, client: "InstrumentedClient", labels: Dict[str, str], started_at: float):
+        self._job = job
+        self._client = client
+        self._labels = labels
+        self._started_at = started_at
+        self._recorded = False
+
+    def result(self, *args, **kwargs):
+        rows = self._job.result(*args, **kwargs)
+        self._record()
+        return rows
+
+    def to_dataframe(self, *args, **kwargs):
+        df = self._job.to_dataframe(*args, **kwargs)
+        self._record()
+        return df
+
+    def _record(self) -> None:
+        if self._recorded:
+            return
+        self._recorded = True
+        self._client._record_job(self._job, self._labels, self._started_at)
+
+    def __getattr__(self, name):
+        return getattr(self._job, name)
+
+
+class InstrumentedClient:
+    """
+    Wrapper quanh bigquery.Client.query với labels, cost tracking và budget guard.
+
+    Labels của job = {"pipeline": ...} + labels trong context hiện tại
+    (xem labels()) + labels truyền vào query().
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        pipeline: str,
+        tracker: Optional[QueryCostTracker] = None,
+        budget_bytes: Optional[int] = None
+    ):
+        """
+        Khởi tạo instrumented client.
+
+        Args:
+            client: bigquery.Client gốc
+            pipeline: Tên pipeline (label "pipeline")
+            tracker: Tracker nhận số liệu (mặc định: query_cost_tracker)
+            budget_bytes: Byte budget cho mỗi statement (mặc định: settings.bq_query_budget_bytes;
+                None/0 = không dry-run)
+        """
+        self.client = client
+        self.pipeline = pipeline
+        self.tracker = tracker or query_cost_tracker
+        self.budget_bytes = settings.bq_query_budget_bytes if budget_bytes is None else budget_bytes
+        self._context = threading.local()
+
+    @contextmanager
+    def labels(self, **labels) -> Iterator[None]:
+        """
+        Gắn thêm labels (entity, day, ...) cho mọi query trong block.
+
+        Example:
+            with client.labels(entity="bills", day=partition_date):
+                client.query(sql).result()
+        """
+        previous = getattr(self._context, "labels", {})
+        self._context.labels = {**previous, **labels}
+        try:
+            yield
+        finally:
+            self._context.labels = previous
+
+    def _build_labels(self, job_config: Optional[bigquery.QueryJobConfig], labels: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        merged: Dict[str, Any] = {"pipeline": self.pipeline}
+        merged.update(getattr(self._context, "labels", {}))
+        if job_config is not None and job_config.labels:
+            merged.update(job_config.labels)
+        if labels:
+            merged.update(labels)
+        return {
+            sanitize_label(key): sanitize_label(value)
+            for key, value in merged.items()
+            if value is not None
+        }
+
+    def dry_run(self, sql: str, job_config: Optional[bigquery.QueryJobConfig] = None, **kwargs) -> int:
+        """
+        Ước tính số bytes statement sẽ scan (không tính phí).
+
+        Args:
+            sql: SQL statement
+            job_config: Job config gốc (query parameters được giữ nguyên)
+
+        Returns:
+            int: total_bytes_processed ước tính
+        """
+        dry_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+        if job_config is not None and job_config.query_parameters:
+            dry_config.query_parameters = job_config.query_parameters
+        job = self.client.query(sql, job_config=dry_config, **kwargs)
+        return job.total_bytes_processed or 0
+
+    def query(
+        self,
+        sql: str,
+        job_config: Optional[bigquery.QueryJobConfig] = None,
+        labels: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> _InstrumentedQueryJob:
+        """
+        Submit query job với labels; abort nếu dry-run vượt byte budget.
+
+        Args:
+            sql: SQL statement
+            job_config: QueryJobConfig (labels sẽ được merge)
+            labels: Labels bổ sung cho job này
+            **kwargs: Arguments khác cho bigquery.Client.query
+
+        Returns:
+            QueryJob proxy (ghi số liệu cost khi gọi result())
+
+        Raises:
+            QueryBudgetExceeded: Nếu ước tính vượt budget_bytes
+        """
+        job_labels = self._build_labels(job_config, labels)
+
+        if self.budget_bytes:
+            estimated_bytes = self.dry_run(sql, job_config=job_config, **kwargs)
+            if estimated_bytes > self.budget_bytes:
+                logger.error(
+                    "Query aborted: estimated bytes exceed budget",
+                    estimated_bytes=estimated_bytes,
+                    budget_bytes=self.budget_bytes,
+                    labels=job_labels
+                )
+                raise QueryBudgetExceeded(
+                    f"Query would process {estimated_bytes} bytes "
+                    f"(budget: {self.budget_bytes} bytes)",
+                    estimated_bytes=estimated_bytes,
+                    budget_bytes=self.budget_bytes
+                )
+
+        # Labels gắn trên bản sao: config của caller có thể được dùng lại cho job khác
+        job_config = (
+            bigquery.QueryJobConfig.from_api_repr(job_config.to_api_repr())
+            if job_config is not None else bigquery.QueryJobConfig()
+        )
+        job_config.labels = job_labels
+
+        started_at = time.monotonic()
+        job = self.client.query(sql, job_config=job_config, **kwargs)
+        return _InstrumentedQueryJob(job, self, job_labels, started_at)
+
+    def _record_job(self, job: Any, labels: Dict[str, str], started_at: float) -> None:
+        """Đọc statistics từ job đã hoàn thành và ghi vào tracker."""
+        try:
+            if job.started and job.ended:
+                duration_ms = int((job.ended - job.started).total_seconds() * 1000)
+            else:
+                duration_ms = int((time.monotonic() - started_at) * 1000)
+
+            stats = QueryStats(
+                job_id=job.job_id,
+                labels=labels,
+                statement_type=job.statement_type,
+                bytes_processed=job.total_bytes_processed or 0,
+                bytes_billed=job.total_bytes_billed or 0,
+                slot_ms=job.slot_millis or 0,
+                duration_ms=duration_ms,
+                cache_hit=bool(job.cache_hit)
+            )
+        except Exception as e:
+            logger.warning("Failed to read query job statistics (non-critical)", error=str(e))
+            return
+
+        self.tracker.record(stats)
+        logger.debug(
+            "Query job completed",
+            job_id=stats.job_id,
+            statement_type=stats.statement_type,
+            bytes_processed=stats.bytes_processed,
+            bytes_billed=stats.bytes_billed,
+            slot_ms=stats.slot_ms,
+            duration_ms=stats.duration_ms,
+            **labels
+        )
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def create_instrumented_client(
+    pipeline: str,
+    project: Optional[str] = None,
+    location: Optional[str] = None
+) -> InstrumentedClient:
+    """
+    Tạo bigquery.Client đã được instrument.
+
+    Args:
+        pipeline: Tên pipeline (label "pipeline")
+        project: GCP project (mặc định: settings.gcp_project)
+        location: Job location (mặc định: để BigQuery tự xác định)
+
+    Returns:
+        InstrumentedClient
+    """
+    kwargs = {"project": project or settings.gcp_project}
+    if location:
+        kwargs["location"] = location
+    return InstrumentedClient(bigquery.Client(**kwargs), pipeline=pipeline)
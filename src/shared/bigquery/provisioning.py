@@ -0,0 +1,199 @@
+"""
+Provisioning cho BigQuery native tables với partitioning + clustering.
+
+TableSpec mô tả schema, partition field và clustering fields của một table.
+TableProvisioner dùng spec để:
+- Tạo table nếu chưa tồn tại (partition + cluster ngay từ đầu)
+- Migrate table đã tồn tại sang clustering spec mới và re-cluster data cũ
+"""
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, List, Optional
+from google.cloud import bigquery
+from src.config import settings
+from src.shared.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class TableSpec:
+    """
+    Định nghĩa một native table: schema, partitioning và clustering.
+
+    merge_keys là các cột MERGE dùng để match row (dedupe source trước khi MERGE).
+    """
+    table_name: str
+    schema: List[bigquery.SchemaField]
+    partition_field: Optional[str] = None
+    clustering_fields: List[str] = field(default_factory=list)
+    description: Optional[str] = None
+    merge_keys: List[str] = field(default_factory=list)
+
+    def table_id(self, project_id: Optional[str] = None, dataset: Optional[str] = None) -> str:
+        """Full table ID (mặc định trong target dataset)."""
+        project_id = project_id or settings.gcp_project
+        dataset = dataset or settings.target_dataset
+        return f"{project_id}.{dataset}.{self.table_name}"
+
+
+class TableProvisioner:
+    """
+    Tạo và migrate tables theo TableSpec.
+
+    Clustering chỉ áp dụng cho data ghi SAU khi spec thay đổi; để các block cũ
+    cũng được sắp xếp lại, recluster() rewrite data theo từng khoảng partition.
+    """
+
+    def __init__(self, client: bigquery.Client, dataset: Optional[str] = None):
+        """
+        Khởi tạo provisioner.
+
+        Args:
+            client: BigQuery client
+            dataset: Dataset chứa tables (mặc định: target dataset)
+        """
+        self.client = client
+        self.dataset = dataset or settings.target_dataset
+
+    def _table_id(self, spec: TableSpec) -> str:
+        return spec.table_id(dataset=self.dataset)
+
+    def build_table(self, spec: TableSpec) -> bigquery.Table:
+        """
+        Build bigquery.Table object từ spec.
+
+        Args:
+            spec: Table spec
+
+        Returns:
+            bigquery.Table: Table chưa được tạo
+        """
+        table = bigquery.Table(self._table_id(spec), schema=spec.schema)
+        if spec.partition_field:
+            table.time_partitioning = bigquery.TimePartitioning(
+                type_=bigquery.TimePartitioningType.DAY,
+                field=spec.partition_field
+            )
+        if spec.clustering_fields:
+            table.clustering_fields = spec.clustering_fields
+        if spec.description:
+            table.description = spec.description
+        return table
+
+    def ensure_table(self, spec: TableSpec) -> bool:
+        """
+        Tạo table theo spec nếu chưa tồn tại.
+
+        Args:
+            spec: Table spec
+
+        Returns:
+            bool: True nếu table vừa được tạo, False nếu đã tồn tại
+        """
+        table_id = self._table_id(spec)
+        try:
+            self.client.get_table(table_id)
+            logger.debug(f"Table {table_id} already exists")
+            return False
+        except Exception:
+            pass
+
+        self.client.create_table(self.build_table(spec), exists_ok=True)
+        logger.info(
+            f"Created table {table_id}",
+            table_id=table_id,
+            partition_field=spec.partition_field,
+            clustering_fields=spec.clustering_fields
+        )
+        return True
+
+    def apply_clustering(self, spec: TableSpec) -> bool:
+        """
+        Cập nhật clustering spec của table đã tồn tại nếu khác với spec.
+        Chỉ thay đổi metadata; data ghi mới sẽ được cluster theo spec mới.
+
+        Args:
+            spec: Table spec
+
+        Returns:
+            bool: True nếu clustering spec đã được thay đổi
+        """
+        table_id = self._table_id(spec)
+        table = self.client.get_table(table_id)
+        current = list(table.clustering_fields or [])
+
+        if current == list(spec.clustering_fields):
+            logger.info("Clustering already up to date", table_id=table_id, clustering_fields=current)
+            return False
+
+        table.clustering_fields = spec.clustering_fields or None
+        self.client.update_table(table, ["clustering_fields"])
+        logger.info(
+            "Updated clustering spec",
+            table_id=table_id,
+            old_clustering_fields=current,
+            new_clustering_fields=spec.clustering_fields
+        )
+        return True
+
+    def recluster(
+        self,
+        spec: TableSpec,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        Migrate table sang clustering spec mới và rewrite data cũ để re-cluster.
+
+        Rewrite dùng `UPDATE ... SET col = col` (no-op về giá trị) trong khoảng
+        partition [from_date, to_date], nên table giữ nguyên schema, partition
+        expiration, descriptions và permissions.
+
+        Args:
+            spec: Table spec
+            from_date: Partition bắt đầu (None = không giới hạn)
+            to_date: Partition kết thúc (None = không giới hạn)
+
+        Returns:
+            Dict: Kết quả migration (spec_changed, rows_rewritten)
+        """
+        table_id = self._table_id(spec)
+        spec_changed = self.apply_clustering(spec)
+
+        if not spec.clustering_fields:
+            return {"table_id": table_id, "spec_changed": spec_changed, "rows_rewritten": 0}
+
+        conditions = []
+        query_parameters = []
+        if spec.partition_field and from_date:
+            conditions.append(f"{spec.partition_field} >= @from_date")
+            query_parameters.append(bigquery.ScalarQueryParameter("from_date", "DATE", from_date))
+        if spec.partition_field and to_date:
+            conditions.append(f"{spec.partition_field} <= @to_date")
+            query_parameters.append(bigquery.ScalarQueryParameter("to_date", "DATE", to_date))
+        where_clause = " AND ".join(conditions) if conditions else "TRUE"
+
+        cluster_column = spec.clustering_fields[0]
+        sql = f"""
+        UPDATE `{table_id}`
+        SET {cluster_column} = {cluster_column}
+        WHERE {where_clause}
+        """
+
+        query_job = self.client.query(
+            sql,
+            job_config=bigquery.QueryJobConfig(query_parameters=query_parameters)
+        )
+        query_job.result()
+        rows_rewritten = getattr(query_job, 'num_dml_affected_rows', None) or 0
+
+        logger.info(
+            "Re-clustered table data",
+            table_id=table_id,
+            clustering_fields=spec.clustering_fields,
+            from_date=from_date.isoformat() if from_date else None,
+            to_date=to_date.isoformat() if to_date else None,
+            rows_rewritten=rows_rewritten
+        )
+        return {"table_id": table_id, "spec_changed": spec_changed, "rows_rewritten": rows_rewritten}
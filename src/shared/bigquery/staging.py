@@ -0,0 +1,225 @@
+"""
+Arrow-native staging loader cho BigQuery.
+Load một PyArrow Table đang nằm trong memory thẳng vào một BigQuery staging table
+(qua `load_table_from_file` với Parquet buffer), bỏ qua bước upload GCS →
+tạo external table → đọc lại từ GCS trên critical path.
+
+Staging table sau đó được dùng làm source cho MERGE giống như external table,
+và được drop sau khi MERGE xong.
+
+load_uris() load nhiều Parquet files trên GCS vào một staging table bằng load
+jobs nhiều URIs (reload hàng loạt partitions rồi MERGE một lần mỗi table).
+"""
+import time
+import uuid
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Sequence
+import pyarrow as pa
+import pyarrow.parquet as pq
+from google.cloud import bigquery
+from src.config import settings
+from src.shared.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Số source URIs tối đa của một BigQuery load job
+MAX_URIS_PER_LOAD_JOB = 10000
+
+
+class ArrowStagingLoader:
+    """
+    Load Arrow tables vào BigQuery staging tables.
+
+    Staging tables được tạo trong bronze dataset với tên unique
+    ({table_name}_staging_{timestamp}_{uuid}) để tránh conflict giữa các runs.
+    """
+
+    def __init__(self, client: Any = None, staging_dataset: Optional[str] = None):
+        """
+        Khởi tạo staging loader.
+
+        Args:
+            client: BigQuery client (hoặc LocalStagingClient cho tests)
+            staging_dataset: Dataset chứa staging tables (mặc định: bronze dataset)
+        """
+        self.client = client or bigquery.Client(project=settings.gcp_project)
+        self.staging_dataset = staging_dataset or settings.bronze_dataset
+
+    def staging_table_id(self, target_table_id: str) -> str:
+        """
+        Generate staging table ID unique cho target table.
+
+        Args:
+            target_table_id: Full ID của fact table đích
+
+        Returns:
+            str: Full staging table ID
+        """
+        timestamp = int(time.time() * 1000000)  # Microseconds
+        unique_id = str(uuid.uuid4())[:8]
+        table_name = target_table_id.split('.')[-1]
+        return f"{settings.gcp_project}.{self.staging_dataset}.{table_name}_staging_{timestamp}_{unique_id}"
+
+    def load(self, table: pa.Table, target_table_id: str) -> str:
+        """
+        Load Arrow table vào một staging table mới.
+
+        Args:
+            table: Arrow table cần load
+            target_table_id: Full ID của fact table đích (dùng để đặt tên staging table)
+
+        Returns:
+            str: Full staging table ID
+        """
+        staging_table_id = self.staging_table_id(target_table_id)
+
+        buffer = BytesIO()
+        pq.write_table(table, buffer, compression='snappy')
+        size_bytes = buffer.tell()
+        buffer.seek(0)
+
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE
+        )
+
+        load_job = self.client.load_table_from_file(
+            buffer,
+            staging_table_id,
+            job_config=job_config
+        )
+        load_job.result()
+
+        logger.debug(
+            "Loaded Arrow table into staging table",
+            staging_table_id=staging_table_id,
+            rows=table.num_rows,
+            size_bytes=size_bytes
+        )
+        return staging_table_id
+
+    def load_uris(self, uris: Sequence[str], target_table_id: str) -> str:
+        """
+        Load nhiều Parquet files trên GCS vào một staging table mới.
+
+        Mỗi load job nhận tối đa MAX_URIS_PER_LOAD_JOB URIs (có thể là wildcard URIs);
+        job đầu WRITE_TRUNCATE, các job sau WRITE_APPEND.
+
+        Args:
+            uris: GCS URIs (trùng lặp được bỏ qua)
+            target_table_id: Full ID của fact table đích (dùng để đặt tên staging table)
+
+        Returns:
+            str: Full staging table ID
+        """
+        uris = list(dict.fromkeys(uris))
+        if not uris:
+            raise ValueError("No source URIs to load")
+        staging_table_id = self.staging_table_id(target_table_id)
+
+        output_rows = 0
+        for start in range(0, len(uris), MAX_URIS_PER_LOAD_JOB):
+            job_config = bigquery.LoadJobConfig(
+                source_format=bigquery.SourceFormat.PARQUET,
+                write_disposition=(
+                    bigquery.WriteDisposition.WRITE_TRUNCATE if start == 0
+                    else bigquery.WriteDisposition.WRITE_APPEND
+                )
+            )
+            load_job = self.client.load_table_from_uri(
+                uris[start:start + MAX_URIS_PER_LOAD_JOB],
+                staging_table_id,
+                job_config=job_config
+            )
+            load_job.result()
+            output_rows += load_job.output_rows or 0
+
+        logger.debug(
+            "Loaded GCS files into staging table",
+            staging_table_id=staging_table_id,
+            uris=len(uris),
+            rows=output_rows
+        )
+        return staging_table_id
+
+    def dedupe(
+        self,
+        staging_table_id: str,
+        key_fields: List[str],
+        order_field: str = "extraction_timestamp"
+    ) -> None:
+        """
+        Giữ một row mới nhất (theo order_field) cho mỗi key trong staging table.
+
+        Cần khi staging gộp nhiều files có thể chứa cùng key (vd: compacted file và
+        file ngày thay thế sau compaction), vì MERGE fail nếu một target row match nhiều source rows.
+
+        Args:
+            staging_table_id: Full staging table ID
+            key_fields: Các cột key của MERGE
+            order_field: Cột quyết định row mới nhất
+        """
+        sql = f"""
+        CREATE OR REPLACE TABLE `{staging_table_id}` AS
+        SELECT * FROM `{staging_table_id}`
+        WHERE TRUE
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY {", ".join(key_fields)} ORDER BY {order_field} DESC) = 1
+        """
+        self.client.query(sql).result()
+
+    def drop(self, staging_table_id: str) -> None:
+        """
+        Drop staging table (non-critical, chỉ log warning nếu fail).
+
+        Args:
+            staging_table_id: Full staging table ID
+        """
+        try:
+            self.client.delete_table(staging_table_id, not_found_ok=True)
+            logger.debug("Dropped staging table", staging_table_id=staging_table_id)
+        except Exception as e:
+            logger.warning(
+                "Failed to drop staging table (non-critical)",
+                staging_table_id=staging_table_id,
+                error=str(e)
+            )
+
+
+class _LocalLoadJob:
+    """Load job giả lập cho LocalStagingClient."""
+
+    def __init__(self, destination: str, output_rows: int):
+        self.destination = destination
+        self.output_rows = output_rows
+        self.job_id = f"local_load_{uuid.uuid4().hex[:8]}"
+
+    def result(self):
+        return self
+
+
+class LocalStagingClient:
+    """
+    Stand-in cho bigquery.Client, chỉ implement phần ArrowStagingLoader cần.
+
+    Giữ các staging tables trong memory dưới dạng pa.Table để tests có thể
+    assert nội dung đã load mà không cần BigQuery project.
+    """
+
+    def __init__(self):
+        self.tables: Dict[str, pa.Table] = {}
+
+    def load_table_from_file(self, file_obj, destination, job_config=None) -> _LocalLoadJob:
+        """Đọc Parquet buffer và lưu vào memory (WRITE_TRUNCATE semantics)."""
+        destination = str(destination)
+        table = pq.read_table(file_obj)
+        self.tables[destination] = table
+        return _LocalLoadJob(destination, table.num_rows)
+
+    def delete_table(self, table_id, not_found_ok: bool = False) -> None:
+        """Xóa staging table khỏi memory."""
+        table_id = str(table_id)
+        if table_id not in self.tables:
+            if not_found_ok:
+                return
+            raise KeyError(f"Table not found: {table_id}")
+        del self.tables[table_id]
@@ -1,7 +1,23 @@
 """
 Shared GCS utilities.
-Chứa GCS loader để upload data lên Google Cloud Storage.
+Chứa GCS loader để upload data lên Google Cloud Storage, partition manifest, compaction,
+write-behind upload queue và raw API response archive.
 """
 from .loader import GCSLoader
+from .manifest import ManifestEntry, ManifestStore, PartitionManifest, schema_fingerprint
+from .compaction import CompactionConflict, PartitionCompactor
+from .upload_queue import UploadJob, UploadQueue
+from .raw_archive import RawArchive
 
-__all__ = ['GCSLoader']
+__all__ = [
+    'GCSLoader',
+    'ManifestEntry',
+    'ManifestStore',
+    'PartitionManifest',
+    'schema_fingerprint',
+    'CompactionConflict',
+    'PartitionCompactor',
+    'UploadJob',
+    'UploadQueue',
+    'RawArchive',
+]
@@ -0,0 +1,361 @@
+"""
+Compaction cho Parquet files của các tháng đã đóng.
+
+Bronze giữ một file nhỏ mỗi entity mỗi ngày; external tables và reload phải mở
+hàng trăm objects nhỏ. PartitionCompactor rewrite các file ngày của một tháng
+thành vài file lớn `compacted_{YYYY-MM}_{timestamp}_{part}.parquet` (sort và nén
+theo write options của entity), cập nhật manifest rồi xóa các file nguồn.
+
+Mỗi ngày trong compacted file là các row groups riêng (ghi bằng write_table riêng),
+manifest ghi lại row groups của từng ngày. Nhờ vậy vẫn giữ được day-level replace:
+khi upload lại một ngày đã compact (late correction), split_out_day() rewrite
+compacted file không có row groups của ngày đó và file ngày mới thay thế partition.
+Upload metadata trong footer của các file nguồn được giữ lại dưới key
+`upload_metadata.{YYYY-MM-DD}` của compacted file.
+"""
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.config import settings
+from src.shared.gcs.manifest import ManifestEntry, PartitionManifest
+from src.shared.logging import get_logger
+from src.shared.parquet.footer import day_metadata_key, encode_upload_metadata, read_upload_metadata
+from src.shared.parquet.schemas import get_schema
+from src.shared.parquet.writer import StreamingParquetWriter
+from src.shared.storage.base import StorageBackend
+
+if TYPE_CHECKING:
+    from src.shared.gcs.loader import GCSLoader
+
+logger = get_logger(__name__)
+
+COMPACTED_FILE_PREFIX = "compacted_"
+
+
+class CompactionConflict(Exception):
+    """Exception được raise khi partition bị upload lại trong lúc đang compact."""
+    pass
+
+
+def month_bounds(year: int, month: int) -> Tuple[date, date]:
+    """Ngày đầu và ngày cuối của tháng."""
+    first_day = date(year, month, 1)
+    next_month = (first_day + timedelta(days=32)).replace(day=1)
+    return first_day, next_month - timedelta(days=1)
+
+
+def is_month_closed(year: int, month: int, today: Optional[date] = None) -> bool:
+    """Tháng đã đóng (kết thúc trước tháng hiện tại) chưa."""
+    today = today or datetime.utcnow().date()
+    return month_bounds(year, month)[1] < today.replace(day=1)
+
+
+def _conform(table: pa.Table, schema: Optional[pa.Schema]) -> pa.Table:
+    """Đưa table về schema (thêm cột thiếu với null, bỏ cột thừa, cast type)."""
+    if schema is None:
+        return table
+    columns = [
+        table.column(field.name) if field.name in table.column_names else pa.nulls(table.num_rows, type=field.type)
+        for field in schema
+    ]
+    return pa.Table.from_arrays(columns, schema=schema.remove_metadata()).cast(schema)
+
+
+class _CompactedPart:
+    """Một compacted file đang được ghi (resumable upload, mỗi ngày là các row groups riêng)."""
+
+    def __init__(
+        self,
+        backend: StorageBackend,
+        path: str,
+        entity: str,
+        schema: Optional[pa.Schema],
+        key_value_metadata: Optional[Dict[bytes, bytes]] = None
+    ):
+        self.path = path
+        self.stream = backend.open_write(path, content_type='application/parquet', if_generation_match=0)
+        self.writer = StreamingParquetWriter(self.stream, entity, schema=schema, key_value_metadata=key_value_metadata)
+        self.days: Dict[date, Tuple[int, List[int]]] = {}
+
+    @property
+    def num_rows(self) -> int:
+        return self.writer.num_rows
+
+    def add_day(self, partition_date: date, table: pa.Table) -> None:
+        """Ghi data của một ngày thành các row groups mới."""
+        first_row_group = self.writer.num_row_groups
+        self.writer.write_table(table)
+        self.days[partition_date] = (table.num_rows, list(range(first_row_group, self.writer.num_row_groups)))
+
+    def close(self) -> Dict[date, ManifestEntry]:
+        """Ghi footer, hoàn tất upload và trả về manifest entries của các ngày."""
+        self.writer.close()
+        info = self.stream.commit()
+        return {
+            partition_date: ManifestEntry.from_blob(
+                info, row_count=row_count, schema=self.writer.schema, row_groups=row_groups
+            )
+            for partition_date, (row_count, row_groups) in self.days.items()
+        }
+
+    def abort(self) -> None:
+        """Hủy resumable upload (không để lại object dở dang)."""
+        self.stream.abort()
+
+
+class PartitionCompactor:
+    """
+    Compact các file ngày của một tháng thành vài file lớn.
+
+    Example:
+        compactor = PartitionCompactor(GCSLoader(settings.bronze_bucket))
+        result = compactor.compact_month("nhanh/bills", 2024, 3)
+    """
+
+    def __init__(self, loader: "GCSLoader"):
+        """
+        Khởi tạo compactor.
+
+        Args:
+            loader: GCSLoader (storage backend, manifest store, batch delete)
+        """
+        self.loader = loader
+        self.backend = loader.backend
+        self.manifests = loader.manifests
+
+    def compacted_object_path(self, entity: str, year: int, month: int, part: int) -> str:
+        """Object path cho compacted file (luôn ở month-level prefix)."""
+        partition_path = self.loader._get_partition_path(entity, datetime(year, month, 1), partition_strategy="month")
+        timestamp_str = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")
+        return f"{partition_path}{COMPACTED_FILE_PREFIX}{year:04d}-{month:02d}_{timestamp_str}_{part:03d}.parquet"
+
+    def _read_entry(self, entry: ManifestEntry) -> pa.Table:
+        """Đọc data của một manifest entry (pin generation để không đọc nhầm bản bị ghi đè)."""
+        with self.backend.open_read(entry.object_name, generation=entry.generation) as source:
+            parquet_file = pq.ParquetFile(source)
+            if entry.row_groups is None:
+                return parquet_file.read()
+            return parquet_file.read_row_groups(entry.row_groups)
+
+    def _read_day_metadata(self, partition_date: date, entries: List[ManifestEntry]) -> Dict[bytes, bytes]:
+        """Upload metadata của một ngày từ footer các file nguồn (object ghi sau cùng thắng)."""
+        day_metadata = None
+        for entry in entries:
+            with self.backend.open_read(entry.object_name, generation=entry.generation) as source:
+                day_metadata = read_upload_metadata(source, partition_date) or day_metadata
+        if day_metadata is None:
+            return {}
+        return encode_upload_metadata(day_metadata, key=day_metadata_key(partition_date))
+
+    def _read_day(self, entries: List[ManifestEntry], schema: Optional[pa.Schema]) -> pa.Table:
+        """Đọc và gộp tất cả objects của một ngày theo cùng schema."""
+        tables = [_conform(self._read_entry(entry), schema) for entry in entries]
+        if len(tables) == 1:
+            return tables[0]
+        return pa.concat_tables(tables, promote_options="default" if schema is None else "none")
+
+    def _write_days(
+        self,
+        entity: str,
+        year: int,
+        month: int,
+        days: Iterable[Tuple[date, List[ManifestEntry]]],
+        max_rows_per_file: int
+    ) -> Dict[date, ManifestEntry]:
+        """
+        Ghi các ngày vào compacted file(s); mỗi ngày là các row groups riêng.
+
+        Returns:
+            Dict[date, ManifestEntry]: Entry mới (object + row groups) của từng ngày
+        """
+        schema = get_schema(entity)
+        new_entries: Dict[date, ManifestEntry] = {}
+        completed_paths: List[str] = []
+        part: Optional[_CompactedPart] = None
+
+        # Chia ngày vào các parts theo row count trong manifest, để biết trước metadata
+        # của các ngày trong mỗi part (key-value metadata phải có khi mở writer)
+        groups: List[List[Tuple[date, List[ManifestEntry]]]] = []
+        group_rows = 0
+        for partition_date, entries in days:
+            day_rows = sum(entry.row_count for entry in entries)
+            if day_rows == 0:
+                continue
+            if not groups or (group_rows > 0 and group_rows + day_rows > max_rows_per_file):
+                groups.append([])
+                group_rows = 0
+            groups[-1].append((partition_date, entries))
+            group_rows += day_rows
+
+        try:
+            for group in groups:
+                key_value_metadata: Dict[bytes, bytes] = {}
+                for partition_date, entries in group:
+                    key_value_metadata.update(self._read_day_metadata(partition_date, entries))
+                path = self.compacted_object_path(entity, year, month, len(completed_paths))
+                part = _CompactedPart(self.backend, path, entity, schema, key_value_metadata=key_value_metadata)
+                for partition_date, entries in group:
+                    part.add_day(partition_date, self._read_day(entries, schema))
+                new_entries.update(part.close())
+                completed_paths.append(part.path)
+                part = None
+        except Exception:
+            if part is not None:
+                part.abort()
+            # Xóa các part đã ghi xong để không để lại data trùng với file nguồn
+            if completed_paths:
+                self.loader.delete_objects(completed_paths)
+            raise
+
+        return new_entries
+
+    def compact_month(
+        self,
+        entity: str,
+        year: int,
+        month: int,
+        max_rows_per_file: Optional[int] = None,
+        force: bool = False,
+        dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Compact tất cả files của một tháng đã đóng.
+
+        Args:
+            entity: Tên entity (format: "platform/entity")
+            year: Năm
+            month: Tháng
+            max_rows_per_file: Số rows tối đa mỗi compacted file
+                (mặc định: settings.gcs_compaction_max_rows_per_file)
+            force: Cho phép compact tháng chưa đóng
+            dry_run: Chỉ trả về kế hoạch, không ghi/xóa gì
+
+        Returns:
+            Dict: Kết quả (status, days, rows, source_objects, compacted_objects, deleted)
+
+        Raises:
+            ValueError: Nếu tháng chưa đóng và force=False
+            CompactionConflict: Nếu có ngày bị upload lại trong lúc compact
+        """
+        if not force and not is_month_closed(year, month):
+            raise ValueError(f"Month {year:04d}-{month:02d} is not closed yet (use force=True to override)")
+
+        max_rows_per_file = max_rows_per_file or settings.gcs_compaction_max_rows_per_file
+        first_day, last_day = month_bounds(year, month)
+        month_str = f"{year:04d}-{month:02d}"
+
+        manifest = self.manifests.load(entity)
+        if not manifest.complete:
+            # Compaction xóa file nguồn nên cần biết chắc toàn bộ files của tháng
+            manifest = self.manifests.rebuild(entity)
+
+        sources = {
+            partition_date: manifest.entries(partition_date)
+            for partition_date in manifest.dates()
+            if first_day <= partition_date <= last_day
+        }
+        source_objects = sorted({entry.object_name for entries in sources.values() for entry in entries})
+        total_rows = sum(entry.row_count for entries in sources.values() for entry in entries)
+        result = {
+            "entity": entity,
+            "month": month_str,
+            "days": len(sources),
+            "rows": total_rows,
+            "source_objects": len(source_objects),
+            "compacted_objects": 0,
+            "deleted": 0,
+        }
+
+        if not sources:
+            return {**result, "status": "empty"}
+
+        expected_parts = max(1, -(-total_rows // max_rows_per_file))
+        already_compacted = all(entry.is_compacted for entries in sources.values() for entry in entries)
+        if already_compacted and len(source_objects) <= expected_parts:
+            return {**result, "status": "already_compacted"}
+
+        if dry_run:
+            return {**result, "status": "dry_run"}
+
+        new_entries = self._write_days(
+            entity, year, month, sorted(sources.items()), max_rows_per_file
+        )
+        new_objects = sorted({entry.object_name for entry in new_entries.values()})
+
+        def mutate(current: PartitionManifest) -> None:
+            for partition_date, entries in sources.items():
+                current_objects = [(e.object_name, e.generation) for e in current.entries(partition_date)]
+                if current_objects != [(e.object_name, e.generation) for e in entries]:
+                    raise CompactionConflict(
+                        f"Partition {partition_date.isoformat()} of {entity} changed during compaction"
+                    )
+            for partition_date in sources:
+                if partition_date in new_entries:
+                    current.set_partition(partition_date, [new_entries[partition_date]])
+                else:
+                    current.remove_partition(partition_date)
+
+        try:
+            self.manifests.update(entity, mutate, manifest=manifest)
+        except Exception:
+            self.loader.delete_objects(new_objects)
+            raise
+
+        deleted = self.loader.delete_objects(source_objects)
+        result.update(status="compacted", compacted_objects=len(new_objects), deleted=deleted)
+        logger.info("Compacted GCS partitions of closed month", **result)
+        return result
+
+    def split_out_day(
+        self,
+        entity: str,
+        partition_date: date,
+        manifest: PartitionManifest
+    ) -> Tuple[Dict[date, ManifestEntry], List[str]]:
+        """
+        Tách một ngày ra khỏi compacted file(s) chứa nó (dùng khi upload lại ngày đó).
+
+        Các ngày khác trong cùng compacted file được rewrite sang compacted file mới;
+        caller cập nhật manifest bằng entries trả về rồi xóa các objects cũ.
+
+        Args:
+            entity: Tên entity
+            partition_date: Ngày được upload lại
+            manifest: Manifest hiện tại
+
+        Returns:
+            Tuple: (entries mới của các ngày còn lại, object names cũ cần xóa)
+        """
+        compacted_objects = {
+            entry.object_name for entry in manifest.entries(partition_date) if entry.is_compacted
+        }
+        if not compacted_objects:
+            return {}, []
+
+        remaining: Dict[date, List[ManifestEntry]] = {}
+        for other_date in manifest.dates():
+            if other_date == partition_date:
+                continue
+            entries = [e for e in manifest.entries(other_date) if e.object_name in compacted_objects]
+            if entries:
+                remaining[other_date] = entries
+
+        new_entries: Dict[date, ManifestEntry] = {}
+        if remaining:
+            new_entries = self._write_days(
+                entity,
+                partition_date.year,
+                partition_date.month,
+                sorted(remaining.items()),
+                max_rows_per_file=settings.gcs_compaction_max_rows_per_file
+            )
+
+        logger.info(
+            "Split re-uploaded day out of compacted file(s)",
+            entity=entity,
+            partition_date=partition_date.isoformat(),
+            compacted_objects=sorted(compacted_objects),
+            remaining_days=len(remaining)
+        )
+        return new_entries, sorted(compacted_objects)
@@ -6,19 +6,24 @@ File này xử lý việc upload data lên Google Cloud Storage với:
 - Metadata tracking
 - Idempotent uploads (không duplicate nếu file đã tồn tại)
 - Explicit schema enforcement để tránh schema evolution issues
+- Partition manifest per entity (xem src.shared.gcs.manifest)
+- Storage backend thay thế được (GCS hoặc local disk, xem src.shared.storage)
 """
 import json
 import gzip
+import tempfile
 from datetime import datetime, date
-from typing import Dict, Any, List, Optional
-from google.cloud import storage
-import pandas as pd
+from typing import Callable, Dict, Any, Iterable, List, Optional
 import pyarrow as pa
-import pyarrow.parquet as pq
-from io import BytesIO
 from src.config import settings
+from src.shared.gcs.compaction import PartitionCompactor
+from src.shared.gcs.manifest import ManifestEntry, ManifestStore, PartitionManifest
 from src.shared.logging import get_logger
-from src.shared.parquet.schemas import get_schema
+from src.shared.parquet.checksum import table_checksum
+from src.shared.parquet.footer import encode_upload_metadata, read_upload_metadata
+from src.shared.parquet.schemas import get_schema, get_write_options
+from src.shared.parquet.writer import StreamingParquetWriter, chunk_records
+from src.shared.storage import StorageBackend, get_storage_backend
 
 logger = get_logger(__name__)
 
@@ -32,33 +37,31 @@ class GCSLoader:
     - Day level: year={YYYY}/month={MM}/day={DD} (performance tốt hơn)
     
     Behavior khi re-run:
-    - Mặc định (overwrite_partition=True): Xóa tất cả file parquet cũ trong partition,
-      sau đó upload file mới. Đảm bảo mỗi partition chỉ có 1 file mới nhất.
+    - Mặc định (overwrite_partition=True): Ghi đè object deterministic data_{date}.parquet
+      (generation-match precondition) và xóa các file timestamped cũ của ngày đó
+      (batch API). Đảm bảo mỗi ngày chỉ có 1 file mới nhất.
     - Nếu overwrite_partition=False: Giữ lại file cũ, tạo file mới với timestamp khác.
+    
+    Mỗi Parquet upload cập nhật manifest của entity ({entity}/_manifest.json).
+    Upload lại một ngày đã được compact sẽ tách ngày đó ra khỏi compacted file.
+    
+    Mọi thao tác object đi qua StorageBackend (mặc định chọn theo settings.storage_backend),
+    nên cùng loader ghi được lên GCS hoặc local disk.
     """
     
-    def __init__(self, bucket_name: str):
+    def __init__(self, bucket_name: str, backend: Optional[StorageBackend] = None):
         """
         Khởi tạo GCS loader.
         
         Args:
             bucket_name: Tên GCS bucket để upload data
+            backend: Storage backend (mặc định: get_storage_backend(bucket_name))
         """
         self.bucket_name = bucket_name
-        self.storage_client = storage.Client(project=settings.gcp_project)
-        self.bucket = self.storage_client.bucket(bucket_name)
-        self._ensure_bucket_exists()
-
-    def _ensure_bucket_exists(self):
-        """Ensure the GCS bucket exists."""
-        try:
-            if not self.bucket.exists():
-                logger.info(f"Bucket {self.bucket_name} not found, creating...")
-                self.bucket.create(location=settings.gcp_region)
-                logger.info(f"Created bucket {self.bucket_name}")
-        except Exception as e:
-            # If we don't have permission to list/create, we just log and try to proceed
-            logger.warning(f"Could not verify/create bucket {self.bucket_name}: {e}")
+        self.backend = backend or get_storage_backend(bucket_name)
+        self.manifests = ManifestStore(self.backend)
+        self.compactor = PartitionCompactor(self)
+        self.backend.ensure_bucket()
     
     def _get_partition_path(
         self,
@@ -128,8 +131,7 @@ class GCSLoader:
         full_path = f"{partition_path}{filename}"
         
         # Check if file already exists (idempotency)
-        blob = self.bucket.blob(full_path)
-        if blob.exists():
+        if self.backend.stat(full_path) is not None:
             logger.warning(
                 f"File already exists, skipping upload",
                 path=full_path,
@@ -150,10 +152,7 @@ class GCSLoader:
             content_type = 'application/json'
         
         # Upload to GCS
-        blob.upload_from_string(
-            content,
-            content_type=content_type
-        )
+        self.backend.put(full_path, content, content_type=content_type)
         
         logger.info(
             f"Uploaded {len(data)} records to GCS",
@@ -174,45 +173,41 @@ class GCSLoader:
         self,
         partition_path: str,
         file_extension: str = ".parquet",
-        date_filter: Optional[date] = None
+        date_filter: Optional[date] = None,
+        manifest: Optional[PartitionManifest] = None
     ) -> int:
         """
-        Xóa file có extension cụ thể trong partition path.
+        Xóa file có extension cụ thể trong partition path (qua storage batch API).
+        
+        Với date_filter, chỉ list prefix `data_{date}_` (các file timestamped cũ
+        của đúng ngày đó) thay vì list cả partition tháng. File deterministic
+        `data_{date}.parquet` không nằm trong prefix này và được ghi đè tại chỗ.
+        Nếu manifest complete được truyền vào, lấy danh sách file từ manifest
+        và không list prefix.
         
         Args:
             partition_path: Partition path prefix
             file_extension: Extension của file cần xóa
-            date_filter: Nếu có, chỉ xóa file có chứa date này trong filename
+            date_filter: Nếu có, chỉ xóa file timestamped của ngày này
+            manifest: Manifest của entity (đã đọc trước đó)
             
         Returns:
             int: Số lượng file đã xóa
         """
-        deleted_count = 0
-        blobs = self.bucket.list_blobs(prefix=partition_path)
-        
-        date_pattern = None
+        prefix = partition_path
         if date_filter:
-            date_pattern = f"data_{date_filter.isoformat()}_"
+            prefix = f"{partition_path}data_{date_filter.isoformat()}_"
         
-        for blob in blobs:
-            if blob.name.endswith(file_extension) and not blob.name.endswith('/'):
-                if date_pattern and date_pattern not in blob.name:
-                    continue
-                
-                try:
-                    blob.delete()
-                    deleted_count += 1
-                    logger.debug(
-                        f"Deleted existing file in partition",
-                        path=blob.name,
-                        partition=partition_path
-                    )
-                except Exception as e:
-                    logger.warning(
-                        f"Failed to delete file in partition",
-                        path=blob.name,
-                        error=str(e)
-                    )
+        if date_filter and manifest is not None and manifest.complete:
+            candidates = [entry.object_name for entry in manifest.entries(date_filter)]
+        else:
+            candidates = [info.name for info in self.backend.list(prefix=prefix)]
+        names = [
+            name
+            for name in candidates
+            if name.startswith(prefix) and name.endswith(file_extension) and not name.endswith('/')
+        ]
+        deleted_count = self.delete_objects(names)
         
         if deleted_count > 0:
             logger.info(
@@ -223,6 +218,18 @@ class GCSLoader:
         
         return deleted_count
     
+    def delete_objects(self, object_names: List[str]) -> int:
+        """
+        Xóa nhiều objects (GCS: storage batch API, tối đa DELETE_BATCH_SIZE calls / HTTP request).
+        
+        Args:
+            object_names: Danh sách object paths
+            
+        Returns:
+            int: Số objects đã submit xóa thành công
+        """
+        return self.backend.delete(object_names)
+    
     def _upload_metadata(
         self,
         partition_path: str,
@@ -231,162 +238,522 @@ class GCSLoader:
     ):
         """Upload metadata file."""
         metadata_path = f"{partition_path}_metadata/{timestamp_str}.json"
-        metadata_blob = self.bucket.blob(metadata_path)
         
         metadata_content = json.dumps(metadata, ensure_ascii=False, default=str)
-        metadata_blob.upload_from_string(
+        self.backend.put(
+            metadata_path,
             metadata_content.encode('utf-8'),
             content_type='application/json'
         )
         
         logger.debug(f"Uploaded metadata", path=metadata_path)
     
+    def read_upload_metadata(
+        self,
+        object_name: str,
+        partition_date: Optional[date] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Đọc upload metadata từ footer của Parquet object (range read, không tải data).
+        
+        Args:
+            object_name: Object path của Parquet file
+            partition_date: Ngày cần đọc (bắt buộc với compacted file)
+            
+        Returns:
+            Dict metadata, hoặc None nếu object không có metadata
+        """
+        with self.backend.open_read(object_name) as source:
+            return read_upload_metadata(source, partition_date)
+    
+    def read_partition_metadata(self, entity: str, partition_date: date) -> List[Dict[str, Any]]:
+        """
+        Đọc upload metadata của tất cả objects của một partition (theo manifest, không list prefix).
+        
+        Args:
+            entity: Tên entity (format: "platform/entity")
+            partition_date: Ngày partition
+            
+        Returns:
+            List[Dict]: Metadata của từng object (bỏ qua objects không có metadata)
+        """
+        results = []
+        for entry in self.read_manifest(entity).entries(partition_date):
+            metadata = self.read_upload_metadata(entry.object_name, partition_date)
+            if metadata is not None:
+                results.append(metadata)
+        return results
+    
+    def read_manifest(self, entity: str) -> PartitionManifest:
+        """
+        Đọc partition manifest của entity (đọc một object, không list prefix).
+        
+        Args:
+            entity: Tên entity (format: "platform/entity")
+            
+        Returns:
+            PartitionManifest: Manifest (rỗng nếu chưa tồn tại)
+        """
+        return self.manifests.load(entity)
+    
+    def _load_manifest_safely(self, entity: str) -> Optional[PartitionManifest]:
+        """Đọc manifest cho upload; lỗi đọc không làm fail upload."""
+        try:
+            return self.manifests.load(entity)
+        except Exception as e:
+            logger.warning("Could not read partition manifest (non-critical)", entity=entity, error=str(e))
+            return None
+    
+    def _record_in_manifest(
+        self,
+        entity: str,
+        partition_date: date,
+        entry: ManifestEntry,
+        replace_partition: bool,
+        manifest: Optional[PartitionManifest] = None,
+        remapped: Optional[Dict[date, ManifestEntry]] = None,
+        released: Optional[List[str]] = None
+    ) -> None:
+        """
+        Ghi object vừa upload vào manifest (atomic read-modify-write).
+        
+        Args:
+            entity: Tên entity
+            partition_date: Ngày partition
+            entry: Entry của object vừa upload
+            replace_partition: True = object thay thế toàn bộ partition (overwrite),
+                False = thêm vào các objects hiện có
+            manifest: Bản manifest đã đọc trước upload
+            remapped: Entries mới của các ngày khác khi ngày này được tách khỏi compacted file
+            released: Compacted objects cũ (xóa sau khi manifest được ghi)
+        """
+        remapped = remapped or {}
+        released = released or []
+        
+        def mutate(current: PartitionManifest) -> None:
+            for other_date, new_entry in remapped.items():
+                kept = [e for e in current.entries(other_date) if e.object_name not in released]
+                current.set_partition(other_date, kept + [new_entry])
+            if replace_partition:
+                current.set_partition(partition_date, [entry])
+            else:
+                current.add_entry(partition_date, entry)
+        
+        try:
+            self.manifests.update(entity, mutate, manifest=manifest)
+        except Exception as e:
+            logger.warning(
+                "Failed to update partition manifest (non-critical)",
+                entity=entity,
+                partition_date=partition_date.isoformat(),
+                error=str(e)
+            )
+            if remapped:
+                # Giữ compacted file cũ (manifest vẫn trỏ vào nó), bỏ bản rewrite
+                self.delete_objects(sorted({e.object_name for e in remapped.values()}))
+            return
+        
+        if released:
+            self.delete_objects(released)
+    
+    @staticmethod
+    def _skip_unchanged(skip_unchanged: Optional[bool]) -> bool:
+        return settings.gcs_skip_unchanged_uploads if skip_unchanged is None else skip_unchanged
+    
+    @staticmethod
+    def _previous_checksum(
+        manifest: Optional[PartitionManifest],
+        partition_date: date,
+        object_path: str,
+        generation: int
+    ) -> Optional[str]:
+        """
+        Content checksum của partition hiện tại, nếu partition chỉ gồm đúng object
+        object_path và manifest khớp generation đang có trên GCS.
+        """
+        if manifest is None or not generation:
+            return None
+        entries = manifest.entries(partition_date)
+        if len(entries) != 1:
+            return None
+        entry = entries[0]
+        if entry.object_name != object_path or entry.is_compacted or entry.generation != generation:
+            return None
+        return entry.content_checksum
+    
+    def _log_unchanged(
+        self,
+        entity: str,
+        partition_date: date,
+        object_path: str,
+        writer: StreamingParquetWriter
+    ) -> str:
+        logger.info(
+            "Partition data unchanged, skipped upload",
+            path=object_path,
+            entity=entity,
+            records=writer.num_rows,
+            partition_date=partition_date.isoformat(),
+            content_checksum=writer.content_checksum
+        )
+        return ""
+    
+    def is_unchanged(self, entity: str, partition_date: date, table: pa.Table) -> bool:
+        """
+        Kiểm tra table có trùng data của partition đã upload (qua upload_table) không.
+        
+        Dùng trước khi load trực tiếp vào BigQuery để bỏ qua cả load lẫn backup
+        khi re-run một ngày không đổi data.
+        
+        Args:
+            entity: Tên entity (format: "platform/entity")
+            partition_date: Ngày partition
+            table: Arrow table sắp upload
+            
+        Returns:
+            bool: True nếu content checksum trùng với object hiện tại
+        """
+        if not self._skip_unchanged(None):
+            return False
+        manifest = self._load_manifest_safely(entity)
+        object_path = self.build_parquet_path(entity, partition_date)
+        previous_checksum = self._previous_checksum(
+            manifest, partition_date, object_path, self._current_generation(object_path)
+        )
+        return previous_checksum is not None and previous_checksum == table_checksum(table)
+    
+    def commit_content_checksum(self, entity: str, partition_date: date, object_path: str) -> bool:
+        """
+        Xác nhận pending checksum của object đã upload với commit_checksum=False
+        (caller gọi sau khi load downstream thành công). Chỉ checksum đã commit mới
+        làm lần upload/load sau được bỏ qua, nên process dừng giữa upload và load
+        không làm mất load của partition.
+        
+        Args:
+            entity: Tên entity (format: "platform/entity")
+            partition_date: Ngày partition
+            object_path: Object đã upload (entry của object khác trong partition không đổi)
+            
+        Returns:
+            bool: True nếu manifest được cập nhật
+        """
+        committed = []
+        
+        def mutate(current: PartitionManifest) -> None:
+            committed.clear()
+            for entry in current.entries(partition_date):
+                if entry.object_name == object_path and entry.pending_checksum:
+                    entry.content_checksum = entry.pending_checksum
+                    entry.pending_checksum = None
+                    committed.append(entry.object_name)
+        
+        try:
+            self.manifests.update(entity, mutate)
+        except Exception as e:
+            logger.warning(
+                "Failed to commit partition checksum (non-critical)",
+                entity=entity,
+                partition_date=partition_date.isoformat(),
+                error=str(e)
+            )
+            return False
+        return bool(committed)
+    
+    def build_parquet_path(self, entity: str, partition_date: date) -> str:
+        """
+        Tạo object path deterministic cho Parquet file của một ngày.
+        Re-run cùng ngày ghi đè đúng object này, không cần list/xóa partition.
+        
+        Args:
+            entity: Tên entity (format: "platform/entity")
+            partition_date: Ngày partition
+            
+        Returns:
+            str: Object path (ví dụ: 'nhanh/bills/year=2024/month=03/data_2024-03-15.parquet')
+        """
+        partition_datetime = datetime.combine(partition_date, datetime.min.time())
+        partition_path = self._get_partition_path(entity, partition_datetime)
+        return f"{partition_path}data_{partition_date.isoformat()}.parquet"
+    
+    def _build_versioned_parquet_path(self, entity: str, partition_date: date) -> str:
+        """Object path có timestamp (dùng khi overwrite_partition=False để giữ file cũ)."""
+        partition_datetime = datetime.combine(partition_date, datetime.min.time())
+        partition_path = self._get_partition_path(entity, partition_datetime)
+        timestamp_str = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")
+        return f"{partition_path}data_{partition_date.isoformat()}_{timestamp_str}.parquet"
+    
+    @staticmethod
+    def _row_group_size(entity: str) -> int:
+        """Row-group size của entity: write options của schema > settings.parquet_row_group_size."""
+        return get_write_options(entity).row_group_size or settings.parquet_row_group_size
+    
+    def _current_generation(self, object_path: str) -> int:
+        """
+        Lấy generation hiện tại của object (0 nếu chưa tồn tại) để làm precondition
+        cho lần ghi đè tiếp theo. Chỉ tốn một GET metadata, không list prefix.
+        """
+        info = self.backend.stat(object_path)
+        return info.generation if info is not None else 0
+    
     def upload_parquet(
         self,
         entity: str,
-        data: List[Dict[str, Any]],
+        data: Iterable[Dict[str, Any]],
         partition_date: Optional[date] = None,
         metadata: Optional[Dict[str, Any]] = None,
         overwrite_partition: bool = True,
-        schema: Optional[pa.Schema] = None
+        schema: Optional[pa.Schema] = None,
+        skip_unchanged: Optional[bool] = None,
+        commit_checksum: bool = True
     ) -> str:
         """
         Upload data dưới dạng Parquet lên GCS với partitioning.
         
+        Records được ghi theo từng row group (write options của entity hoặc
+        settings.parquet_row_group_size) vào
+        upload stream, không build toàn bộ DataFrame/Arrow table/Parquet file trong memory.
+        
         Args:
             entity: Tên entity (format: "platform/entity", e.g., "nhanh/bill_products")
-            data: Danh sách records để upload
+            data: Records để upload (list hoặc generator)
             partition_date: Ngày để partition (mặc định: hôm nay)
             metadata: Metadata tùy chọn
             overwrite_partition: Nếu True, xóa file cũ trước khi upload
             schema: Explicit PyArrow schema (nếu None, sẽ lookup từ registry hoặc infer)
+            skip_unchanged: Bỏ qua upload nếu data không đổi
+                (mặc định: settings.gcs_skip_unchanged_uploads)
+            commit_checksum: False = content checksum chỉ được ghi là pending, caller
+                gọi commit_content_checksum() sau khi load downstream thành công
             
         Returns:
-            str: GCS path của file đã upload
+            str: GCS path của file đã upload ("" nếu không có data hoặc data không đổi)
         """
-        if not data:
+        chunks = chunk_records(data, self._row_group_size(entity))
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
             logger.warning(f"No data to upload for {entity}", entity=entity)
             return ""
         
+        def write(writer: StreamingParquetWriter) -> None:
+            writer.write_records(first_chunk)
+            for chunk in chunks:
+                writer.write_records(chunk)
+        
+        return self._upload_parquet_stream(
+            entity=entity,
+            write=write,
+            partition_date=partition_date,
+            metadata=metadata,
+            overwrite_partition=overwrite_partition,
+            schema=schema,
+            schema_enforced=(schema is not None or get_schema(entity) is not None),
+            skip_unchanged=skip_unchanged,
+            commit_checksum=commit_checksum
+        )
+    
+    def upload_table(
+        self,
+        entity: str,
+        table: pa.Table,
+        partition_date: Optional[date] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        overwrite_partition: bool = True,
+        object_path: Optional[str] = None,
+        schema_enforced: bool = True,
+        skip_unchanged: Optional[bool] = None,
+        commit_checksum: bool = True
+    ) -> str:
+        """
+        Upload một Arrow table đã build sẵn dưới dạng Parquet lên GCS.
+        
+        Args:
+            entity: Tên entity (format: "platform/entity")
+            table: Arrow table cần upload
+            partition_date: Ngày để partition (mặc định: hôm nay)
+            metadata: Metadata tùy chọn
+            overwrite_partition: Nếu True, xóa file cũ trước khi upload
+            object_path: Path định trước (từ build_parquet_path); nếu None sẽ tự tạo
+            schema_enforced: Table có được build với explicit schema không (chỉ để log)
+            skip_unchanged: Bỏ qua upload nếu data không đổi
+                (mặc định: settings.gcs_skip_unchanged_uploads)
+            commit_checksum: False = content checksum chỉ được ghi là pending, caller
+                gọi commit_content_checksum() sau khi load downstream thành công
+            
+        Returns:
+            str: GCS path của file đã upload ("" nếu không có data hoặc data không đổi)
+        """
+        if table.num_rows == 0:
+            logger.warning(f"No data to upload for {entity}", entity=entity)
+            return ""
+        
+        return self._upload_parquet_stream(
+            entity=entity,
+            write=lambda writer: writer.write_table(table),
+            partition_date=partition_date,
+            metadata=metadata,
+            overwrite_partition=overwrite_partition,
+            object_path=object_path,
+            schema_enforced=schema_enforced,
+            skip_unchanged=skip_unchanged,
+            commit_checksum=commit_checksum
+        )
+    
+    def _upload_parquet_stream(
+        self,
+        entity: str,
+        write: Callable[[StreamingParquetWriter], None],
+        partition_date: Optional[date] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        overwrite_partition: bool = True,
+        object_path: Optional[str] = None,
+        schema: Optional[pa.Schema] = None,
+        schema_enforced: bool = True,
+        skip_unchanged: Optional[bool] = None,
+        commit_checksum: bool = True
+    ) -> str:
+        """
+        Ghi Parquet object bằng StreamingParquetWriter và upload lên GCS.
+        
+        settings.gcs_upload_mode:
+        - "stream": row groups được ghi thẳng vào backend.open_write (GCS resumable upload),
+          upload bắt đầu khi buffer đủ một chunk
+        - "spill": row groups được ghi vào local temp file, sau đó upload file
+        
+        Khi overwrite một ngày mà content checksum (data không tính cột volatile)
+        trùng với checksum của object hiện tại trong manifest, object không được
+        ghi lại, manifest không đổi và hàm trả về "" để caller bỏ qua load downstream.
+        
+        Args:
+            entity: Tên entity (format: "platform/entity")
+            write: Callback ghi data vào writer
+            partition_date: Ngày để partition (mặc định: hôm nay)
+            metadata: Metadata tùy chọn
+            overwrite_partition: Nếu True, xóa file cũ trước khi upload
+            object_path: Path định trước (từ build_parquet_path); nếu None sẽ tự tạo
+            schema: Explicit PyArrow schema
+            schema_enforced: Có dùng explicit schema không (chỉ để log)
+            skip_unchanged: Bỏ qua upload nếu data không đổi
+                (mặc định: settings.gcs_skip_unchanged_uploads)
+            commit_checksum: False = content checksum chỉ được ghi là pending, caller
+                gọi commit_content_checksum() sau khi load downstream thành công
+            
+        Returns:
+            str: GCS path của file đã upload ("" nếu data không đổi và upload bị bỏ qua)
+        """
         if partition_date is None:
             partition_date = datetime.utcnow().date()
         
         partition_datetime = datetime.combine(partition_date, datetime.min.time())
         partition_path = self._get_partition_path(entity, partition_datetime)
+        manifest = self._load_manifest_safely(entity)
         
+        deleted_count = 0
         if overwrite_partition:
-            self._delete_partition_files(
+            deleted_count = self._delete_partition_files(
                 partition_path, 
                 file_extension=".parquet",
-                date_filter=partition_date
+                date_filter=partition_date,
+                manifest=manifest
             )
         
-        timestamp_str = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")
-        filename = f"data_{partition_date.isoformat()}_{timestamp_str}.parquet"
-        full_path = f"{partition_path}{filename}"
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
-        
-        # Normalize timestamps trong DataFrame: convert datetime64[ns] → datetime64[us]
-        # BigQuery TIMESTAMP chỉ hỗ trợ microsecond precision, không hỗ trợ nanosecond
-        # PyArrow sẽ tự động tạo nanosecond precision nếu DataFrame có datetime64[ns]
-        # Fix này đảm bảo tất cả timestamp columns có microsecond precision
-        for col in df.columns:
-            if df[col].dtype == 'datetime64[ns]':
-                # Convert nanosecond precision to microsecond precision
-                # Use astype to force datetime64[us] instead of just floor
-                df[col] = df[col].dt.floor('us').astype('datetime64[us]')
-        
-        # Get schema: explicit > registry lookup > inference
-        if schema is None:
-            schema = get_schema(entity)
-        
-        # Create PyArrow table with or without explicit schema
-        if schema:
-            # CRITICAL FIX: Đảm bảo DataFrame có TẤT CẢ schema fields trước khi write Parquet
-            # Nếu thiếu cột nào, thêm vào với giá trị None để đảm bảo schema consistency
-            schema_column_names = {field.name for field in schema}
-            df_column_names = set(df.columns)
-            
-            # Thêm các cột thiếu với giá trị None
-            missing_columns = schema_column_names - df_column_names
-            if missing_columns:
-                for col in missing_columns:
-                    df[col] = None
-                logger.debug(
-                    f"Added missing schema columns to DataFrame",
-                    entity=entity,
-                    missing_columns=list(missing_columns),
-                    total_schema_fields=len(schema_column_names),
-                    df_columns_before=len(df_column_names),
-                    df_columns_after=len(df.columns)
-                )
-            
-            # Use explicit schema - enforces types and handles coercion
-            # Giờ tất cả schema fields đã có trong DataFrame, không cần filter nữa
-            # Nhưng vẫn filter để đảm bảo chỉ dùng fields có trong schema (tránh extra fields)
-            df_columns = set(df.columns)
-            schema_fields = [field for field in schema if field.name in df_columns]
-            
-            if schema_fields:
-                # Create filtered schema with only fields present in data
-                # Override timestamp fields to use microsecond precision (not nanosecond)
-                schema_fields_fixed = []
-                for field in schema_fields:
-                    if pa.types.is_timestamp(field.type):
-                        # Force microsecond precision for BigQuery compatibility
-                        schema_fields_fixed.append(
-                            pa.field(field.name, pa.timestamp('us'), nullable=field.nullable)
-                        )
-                    else:
-                        schema_fields_fixed.append(field)
-                
-                filtered_schema = pa.schema(schema_fields_fixed)
-                table = pa.Table.from_pandas(df, schema=filtered_schema)
-                logger.debug(
-                    f"Using explicit schema for Parquet write",
-                    entity=entity,
-                    schema_fields=len(schema_fields),
-                    total_schema_fields=len(schema)
+        if object_path:
+            full_path = object_path
+        elif overwrite_partition:
+            full_path = self.build_parquet_path(entity, partition_date)
+        else:
+            full_path = self._build_versioned_parquet_path(entity, partition_date)
+        # Generation-match precondition: nếu object bị ghi bởi writer khác sau khi đọc
+        # generation, upload fail với 412 thay vì ghi đè mất dữ liệu của writer đó
+        generation = self._current_generation(full_path) if overwrite_partition else 0
+        previous_checksum = None
+        if overwrite_partition and deleted_count == 0 and self._skip_unchanged(skip_unchanged):
+            previous_checksum = self._previous_checksum(manifest, partition_date, full_path, generation)
+        row_group_size = self._row_group_size(entity)
+        # Upload metadata nằm trong footer thay vì một object _metadata/*.json riêng
+        key_value_metadata = encode_upload_metadata(metadata) if metadata else None
+        
+        if settings.gcs_upload_mode == "spill":
+            with tempfile.TemporaryFile() as spill_file:
+                writer = StreamingParquetWriter(
+                    spill_file,
+                    entity,
+                    schema=schema,
+                    row_group_size=row_group_size,
+                    key_value_metadata=key_value_metadata
                 )
-            else:
-                # No matching fields, fallback to inference
-                table = pa.Table.from_pandas(df)
-                logger.debug(
-                    f"Schema defined but no matching fields in data, using inference",
-                    entity=entity
+                with writer:
+                    write(writer)
+                if writer.content_checksum == previous_checksum:
+                    return self._log_unchanged(entity, partition_date, full_path, writer)
+                size_bytes = spill_file.tell()
+                spill_file.seek(0)
+                info = self.backend.put(
+                    full_path,
+                    spill_file,
+                    content_type='application/parquet',
+                    if_generation_match=generation
                 )
         else:
-            # Fallback to inference (backward compatibility)
-            table = pa.Table.from_pandas(df)
-            logger.debug(
-                f"Using inferred schema for Parquet write",
-                entity=entity
+            upload_stream = self.backend.open_write(
+                full_path,
+                content_type='application/parquet',
+                if_generation_match=generation
             )
-        
-        parquet_buffer = BytesIO()
-        pq.write_table(table, parquet_buffer, compression='snappy')
-        parquet_bytes = parquet_buffer.getvalue()
-        
-        blob = self.bucket.blob(full_path)
-        blob.upload_from_string(
-            parquet_bytes,
-            content_type='application/parquet'
-        )
+            try:
+                writer = StreamingParquetWriter(
+                    upload_stream,
+                    entity,
+                    schema=schema,
+                    row_group_size=row_group_size,
+                    key_value_metadata=key_value_metadata
+                )
+                with writer:
+                    write(writer)
+                if writer.content_checksum == previous_checksum:
+                    # Không commit object: file nhỏ hơn một chunk chưa được gửi đi byte nào
+                    upload_stream.abort()
+                    return self._log_unchanged(entity, partition_date, full_path, writer)
+                size_bytes = upload_stream.tell()
+                info = upload_stream.commit()
+            except Exception:
+                # Hủy resumable upload để không để lại object dở dang
+                upload_stream.abort()
+                raise
         
         logger.info(
-            f"Uploaded {len(data)} records to GCS as Parquet",
+            f"Uploaded {writer.num_rows} records to GCS as Parquet",
             path=full_path,
             entity=entity,
-            records=len(data),
+            records=writer.num_rows,
+            row_groups=writer.num_row_groups,
             partition_date=partition_date.isoformat(),
-            size_bytes=len(parquet_bytes),
-            schema_enforced=(schema is not None)
+            size_bytes=size_bytes,
+            upload_mode=settings.gcs_upload_mode,
+            schema_enforced=schema_enforced
         )
         
-        if metadata:
-            self._upload_metadata(partition_path, timestamp_str, metadata)
+        remapped: Dict[date, ManifestEntry] = {}
+        released: List[str] = []
+        if overwrite_partition and manifest is not None \
+                and any(entry.is_compacted for entry in manifest.entries(partition_date)):
+            # Ngày đã được compact: rewrite compacted file không có ngày này để file mới thay thế partition
+            remapped, released = self.compactor.split_out_day(entity, partition_date, manifest)
+        
+        self._record_in_manifest(
+            entity,
+            partition_date,
+            ManifestEntry.from_blob(
+                info,
+                row_count=writer.num_rows,
+                schema=writer.schema,
+                content_checksum=writer.content_checksum if commit_checksum else None,
+                pending_checksum=None if commit_checksum else writer.content_checksum
+            ),
+            replace_partition=overwrite_partition,
+            manifest=manifest,
+            remapped=remapped,
+            released=released
+        )
         
         return full_path
     
@@ -398,7 +765,9 @@ class GCSLoader:
         date_field: str = "date",
         metadata: Optional[Dict[str, Any]] = None,
         overwrite_partition: bool = True,
-        schema: Optional[pa.Schema] = None
+        schema: Optional[pa.Schema] = None,
+        skip_unchanged: Optional[bool] = None,
+        commit_checksum: bool = True
     ) -> str:
         """
         Upload data dưới dạng Parquet, group theo ngày từ date_field.
@@ -411,9 +780,13 @@ class GCSLoader:
             metadata: Metadata tùy chọn
             overwrite_partition: Nếu True, xóa file cũ
             schema: Explicit PyArrow schema (nếu None, sẽ lookup từ registry)
+            skip_unchanged: Bỏ qua upload nếu data không đổi
+                (mặc định: settings.gcs_skip_unchanged_uploads)
+            commit_checksum: False = content checksum chỉ được ghi là pending, caller
+                gọi commit_content_checksum() sau khi load downstream thành công
             
         Returns:
-            str: GCS path của file đã upload
+            str: GCS path của file đã upload ("" nếu không có data hoặc data không đổi)
         """
         if not data:
             logger.warning(f"No data to upload for {entity}", entity=entity)
@@ -446,5 +819,7 @@ class GCSLoader:
             partition_date=partition_date,
             metadata=metadata,
             overwrite_partition=overwrite_partition,
-            schema=schema
+            schema=schema,
+            skip_unchanged=skip_unchanged,
+            commit_checksum=commit_checksum
         )
@@ -0,0 +1,354 @@
+"""
+Partition manifest cho GCS entities.
+
+Mỗi entity (vd: nhanh/bills) có một index object `{entity}/_manifest.json` ghi lại
+partition date → các Parquet objects của ngày đó (object name, row count, bytes,
+schema fingerprint, checksum; với compacted files thêm các row groups của ngày đó).
+Tools trả lời "đã có những ngày nào" bằng một GET thay vì list toàn bộ prefix và
+regex-parse tên file.
+
+Manifest được cập nhật bằng read-modify-write với generation-match precondition:
+nếu writer khác ghi manifest trong lúc đó, write fail với 412 và được retry trên
+bản mới nhất, nên không mất entry của writer khác.
+"""
+import hashlib
+import json
+import re
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+from google.api_core.exceptions import PreconditionFailed
+from src.shared.logging import get_logger
+from src.shared.parquet.schemas import get_partition_column
+from src.shared.storage.base import ObjectInfo, StorageBackend
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = "_manifest.json"
+MANIFEST_VERSION = 1
+# Số lần retry read-modify-write khi manifest bị writer khác cập nhật (412)
+MAX_UPDATE_ATTEMPTS = 5
+
+_PARTITION_FILE_PATTERN = re.compile(r"data_(\d{4}-\d{2}-\d{2})(?:_[^/]*)?\.parquet$")
+# Compacted files (xem src.shared.gcs.compaction): một file chứa nhiều ngày, mỗi ngày là các row groups riêng
+_COMPACTED_FILE_PATTERN = re.compile(r"compacted_\d{4}-\d{2}_[^/]*\.parquet$")
+
+
+def schema_fingerprint(schema: pa.Schema) -> str:
+    """
+    Fingerprint của Arrow schema (tên cột, type, nullability; bỏ qua metadata).
+
+    Args:
+        schema: PyArrow schema
+
+    Returns:
+        str: 16 ký tự hex đầu của sha256
+    """
+    canonical = schema.remove_metadata().to_string(show_field_metadata=False, show_schema_metadata=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class ManifestEntry:
+    """
+    Một Parquet object của partition.
+
+    row_groups = None: cả object thuộc partition (file ngày). Với compacted file,
+    row_groups là các row groups của partition trong object; size_bytes, checksum
+    và generation là của cả object. content_checksum là checksum của data (không
+    tính cột volatile như extraction_timestamp), dùng để bỏ qua upload không đổi.
+    pending_checksum là checksum của object đã upload nhưng caller chưa xác nhận
+    load downstream thành công (xem GCSLoader.commit_content_checksum); không được
+    dùng để bỏ qua upload.
+    """
+    object_name: str
+    row_count: int
+    size_bytes: int
+    schema_fingerprint: Optional[str] = None
+    crc32c: Optional[str] = None
+    md5_hash: Optional[str] = None
+    generation: Optional[int] = None
+    updated_at: Optional[str] = None
+    row_groups: Optional[List[int]] = None
+    content_checksum: Optional[str] = None
+    pending_checksum: Optional[str] = None
+
+    @property
+    def is_compacted(self) -> bool:
+        """Entry trỏ vào một phần (row groups) của compacted file."""
+        return self.row_groups is not None
+
+    @classmethod
+    def from_blob(
+        cls,
+        blob: Any,
+        row_count: int,
+        schema: Optional[pa.Schema] = None,
+        row_groups: Optional[List[int]] = None,
+        content_checksum: Optional[str] = None,
+        pending_checksum: Optional[str] = None
+    ) -> "ManifestEntry":
+        """
+        Tạo entry từ object đã upload (size, checksum, generation lấy từ object metadata).
+
+        Args:
+            blob: ObjectInfo (hoặc storage.Blob) của object đã upload
+            row_count: Số rows của partition trong object
+            schema: Arrow schema của object (để tính fingerprint)
+            row_groups: Row groups của partition (chỉ cho compacted file)
+            content_checksum: Checksum của data (xem StreamingParquetWriter.content_checksum)
+            pending_checksum: Checksum của data chờ commit sau khi load downstream xong
+        """
+        return cls(
+            object_name=blob.name,
+            row_count=row_count,
+            size_bytes=blob.size or 0,
+            schema_fingerprint=schema_fingerprint(schema) if schema is not None else None,
+            crc32c=blob.crc32c,
+            md5_hash=blob.md5_hash,
+            generation=blob.generation,
+            updated_at=datetime.utcnow().isoformat(),
+            row_groups=row_groups,
+            content_checksum=content_checksum,
+            pending_checksum=pending_checksum
+        )
+
+
+@dataclass
+class PartitionManifest:
+    """
+    Index các partitions của một entity.
+
+    complete=True nghĩa là manifest được build từ một lần list đầy đủ (rebuild)
+    và được cập nhật sau mỗi upload, nên có thể dùng thay cho listing để tìm
+    objects cần xóa. Manifest chỉ được build dần từ uploads (complete=False)
+    có thể thiếu các file cũ có từ trước khi có manifest.
+    """
+    entity: str
+    partitions: Dict[str, List[ManifestEntry]] = field(default_factory=dict)
+    complete: bool = False
+    updated_at: Optional[str] = None
+    # Generation của manifest object lúc đọc (0 = chưa tồn tại); không serialize
+    generation: int = 0
+
+    @property
+    def exists(self) -> bool:
+        """Manifest object đã tồn tại trên GCS chưa."""
+        return self.generation > 0
+
+    def dates(self) -> List[date]:
+        """Danh sách partition dates (tăng dần)."""
+        return sorted(date.fromisoformat(key) for key in self.partitions)
+
+    def entries(self, partition_date: date) -> List[ManifestEntry]:
+        """Các objects của một partition (rỗng nếu không có)."""
+        return list(self.partitions.get(partition_date.isoformat(), []))
+
+    def row_count(self, partition_date: date) -> int:
+        """Tổng số rows của một partition."""
+        return sum(entry.row_count for entry in self.entries(partition_date))
+
+    def set_partition(self, partition_date: date, entries: List[ManifestEntry]) -> None:
+        """Thay toàn bộ objects của partition (overwrite)."""
+        self.partitions[partition_date.isoformat()] = list(entries)
+
+    def add_entry(self, partition_date: date, entry: ManifestEntry) -> None:
+        """Thêm object vào partition (append); entry cùng object_name được thay thế."""
+        key = partition_date.isoformat()
+        entries = [e for e in self.partitions.get(key, []) if e.object_name != entry.object_name]
+        entries.append(entry)
+        self.partitions[key] = entries
+
+    def remove_partition(self, partition_date: date) -> None:
+        """Xóa partition khỏi manifest."""
+        self.partitions.pop(partition_date.isoformat(), None)
+
+    def to_json(self) -> str:
+        """Serialize manifest (keys được sort để diff dễ đọc)."""
+        payload = {
+            "version": MANIFEST_VERSION,
+            "entity": self.entity,
+            "complete": self.complete,
+            "updated_at": self.updated_at,
+            "partitions": {
+                key: [asdict(entry) for entry in entries]
+                for key, entries in sorted(self.partitions.items())
+            }
+        }
+        return json.dumps(payload, ensure_ascii=False, sort_keys=True)
+
+    @classmethod
+    def from_json(cls, entity: str, content: str, generation: int = 0) -> "PartitionManifest":
+        """Parse manifest từ JSON content."""
+        payload = json.loads(content)
+        partitions = {
+            key: [ManifestEntry(**entry) for entry in entries]
+            for key, entries in payload.get("partitions", {}).items()
+        }
+        return cls(
+            entity=payload.get("entity", entity),
+            partitions=partitions,
+            complete=bool(payload.get("complete", False)),
+            updated_at=payload.get("updated_at"),
+            generation=generation
+        )
+
+
+class ManifestStore:
+    """Đọc/ghi PartitionManifest của các entities trong một bucket."""
+
+    def __init__(self, backend: StorageBackend):
+        """
+        Khởi tạo store.
+
+        Args:
+            backend: Storage backend của bucket chứa data
+        """
+        self.backend = backend
+
+    @staticmethod
+    def manifest_path(entity: str) -> str:
+        """Object path của manifest (ví dụ: 'nhanh/bills/_manifest.json')."""
+        return f"{entity.strip('/')}/{MANIFEST_NAME}"
+
+    def load(self, entity: str) -> PartitionManifest:
+        """
+        Đọc manifest của entity (một GET metadata + một GET content).
+
+        Args:
+            entity: Tên entity (format: "platform/entity")
+
+        Returns:
+            PartitionManifest: Manifest rỗng (generation=0) nếu chưa tồn tại
+        """
+        entity = entity.strip('/')
+        path = self.manifest_path(entity)
+        info = self.backend.stat(path)
+        if info is None:
+            return PartitionManifest(entity=entity)
+
+        content = self.backend.get(path, generation=info.generation)
+        return PartitionManifest.from_json(entity, content.decode("utf-8"), generation=info.generation)
+
+    def save(self, manifest: PartitionManifest) -> PartitionManifest:
+        """
+        Ghi manifest với precondition generation đã đọc.
+
+        Raises:
+            PreconditionFailed: Nếu manifest đã bị writer khác cập nhật
+        """
+        manifest.updated_at = datetime.utcnow().isoformat()
+        info = self.backend.put(
+            self.manifest_path(manifest.entity),
+            manifest.to_json().encode("utf-8"),
+            content_type="application/json",
+            if_generation_match=manifest.generation
+        )
+        manifest.generation = info.generation
+        return manifest
+
+    def update(
+        self,
+        entity: str,
+        mutate: Callable[[PartitionManifest], None],
+        manifest: Optional[PartitionManifest] = None
+    ) -> PartitionManifest:
+        """
+        Cập nhật manifest theo kiểu read-modify-write atomic.
+
+        Args:
+            entity: Tên entity
+            mutate: Callback sửa manifest (được gọi lại trên bản mới nhất khi retry)
+            manifest: Bản đã đọc trước đó (tránh GET thêm ở lần thử đầu)
+
+        Returns:
+            PartitionManifest: Manifest đã ghi
+
+        Raises:
+            PreconditionFailed: Nếu vẫn conflict sau MAX_UPDATE_ATTEMPTS lần
+        """
+        for attempt in range(1, MAX_UPDATE_ATTEMPTS + 1):
+            if manifest is None:
+                manifest = self.load(entity)
+            mutate(manifest)
+            try:
+                return self.save(manifest)
+            except PreconditionFailed:
+                if attempt == MAX_UPDATE_ATTEMPTS:
+                    raise
+                logger.debug("Manifest changed concurrently, retrying", entity=entity, attempt=attempt)
+                manifest = None
+
+    def rebuild(self, entity: str) -> PartitionManifest:
+        """
+        Build lại manifest từ một lần list toàn bộ prefix của entity.
+
+        Row count và schema được đọc từ Parquet footer của từng object (range read,
+        không tải cả file). Với compacted file, row groups được map về ngày theo
+        min statistics của partition column. Dùng một lần để backfill các file có
+        từ trước khi có manifest; manifest kết quả được đánh dấu complete.
+
+        Args:
+            entity: Tên entity (format: "platform/entity")
+
+        Returns:
+            PartitionManifest: Manifest đã ghi
+        """
+        entity = entity.strip('/')
+        current = self.load(entity)
+        manifest = PartitionManifest(entity=entity, complete=True, generation=current.generation)
+
+        for info in self.backend.list(prefix=f"{entity}/"):
+            match = _PARTITION_FILE_PATTERN.search(info.name)
+            if match:
+                with self.backend.open_read(info.name) as source:
+                    metadata = pq.ParquetFile(source).metadata
+                manifest.add_entry(
+                    date.fromisoformat(match.group(1)),
+                    ManifestEntry.from_blob(info, row_count=metadata.num_rows, schema=metadata.schema.to_arrow_schema())
+                )
+            elif _COMPACTED_FILE_PATTERN.search(info.name):
+                for partition_date, entry in self._compacted_entries(entity, info).items():
+                    manifest.add_entry(partition_date, entry)
+
+        self.save(manifest)
+        logger.info(
+            "Rebuilt GCS partition manifest",
+            entity=entity,
+            partitions=len(manifest.partitions),
+            path=self.manifest_path(entity)
+        )
+        return manifest
+
+    def _compacted_entries(self, entity: str, info: ObjectInfo) -> Dict[date, ManifestEntry]:
+        """Map row groups của compacted file về ngày (theo statistics của partition column)."""
+        partition_column = get_partition_column(entity)
+        if partition_column is None:
+            logger.warning("No partition column registered, skipping compacted file", entity=entity, path=info.name)
+            return {}
+
+        with self.backend.open_read(info.name) as source:
+            metadata = pq.ParquetFile(source).metadata
+        schema = metadata.schema.to_arrow_schema()
+        column_index = schema.get_field_index(partition_column)
+
+        row_groups: Dict[date, List[int]] = {}
+        row_counts: Dict[date, int] = {}
+        for index in range(metadata.num_row_groups):
+            row_group = metadata.row_group(index)
+            statistics = row_group.column(column_index).statistics
+            if statistics is None or not statistics.has_min_max:
+                logger.warning("Compacted row group has no statistics", path=info.name, row_group=index)
+                continue
+            partition_date = statistics.min
+            row_groups.setdefault(partition_date, []).append(index)
+            row_counts[partition_date] = row_counts.get(partition_date, 0) + row_group.num_rows
+
+        return {
+            partition_date: ManifestEntry.from_blob(
+                info, row_count=row_counts[partition_date], schema=schema, row_groups=indexes
+            )
+            for partition_date, indexes in row_groups.items()
+        }
@@ -0,0 +1,103 @@
+"""
+Raw API response archive.
+
+Bronze Parquet chỉ chứa data đã flatten; khi đổi logic flatten hoặc schema, muốn
+build lại lịch sử phải gọi lại API (bị rate limit, mất hàng giờ). RawArchive lưu
+records gốc từ API theo từng ngày dưới dạng JSONL nén zstd, để reprocess chạy
+lại flatten + load với tốc độ disk/CPU, không gọi API.
+
+Layout: raw/{platform}/{entity}/year=YYYY/month=MM/{entity}_{YYYY-MM-DD}.jsonl.zst
+(prefix raw/ tách khỏi Parquet partitions nên manifest/compaction không thấy).
+Một ngày không có records vẫn được ghi (file rỗng) để phân biệt với ngày chưa archive.
+"""
+import json
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+import pyarrow as pa
+from google.api_core.exceptions import NotFound
+from src.shared.logging import get_logger
+from src.shared.storage import StorageBackend
+
+logger = get_logger(__name__)
+
+RAW_PREFIX = "raw"
+_COMPRESSION = "zstd"
+
+
+class RawArchive:
+    """Đọc/ghi raw API records theo ngày trên một StorageBackend."""
+
+    def __init__(self, backend: StorageBackend):
+        """
+        Khởi tạo archive.
+
+        Args:
+            backend: Storage backend (thường là bronze bucket của GCSLoader)
+        """
+        self.backend = backend
+
+    def object_path(self, entity: str, partition_date: date) -> str:
+        """
+        Object path của archive một ngày.
+
+        Args:
+            entity: Tên entity (format: "platform/entity")
+            partition_date: Ngày
+
+        Returns:
+            str: Ví dụ 'raw/nhanh/bills/year=2024/month=03/bills_2024-03-15.jsonl.zst'
+        """
+        entity_name = entity.rsplit("/", 1)[-1]
+        return (
+            f"{RAW_PREFIX}/{entity}/year={partition_date.year}/month={partition_date.month:02d}/"
+            f"{entity_name}_{partition_date.isoformat()}.jsonl.zst"
+        )
+
+    def write(self, entity: str, partition_date: date, records: Iterable[Dict[str, Any]]) -> str:
+        """
+        Ghi (ghi đè) raw records của một ngày.
+
+        Args:
+            entity: Tên entity (format: "platform/entity")
+            partition_date: Ngày
+            records: Records nguyên gốc từ API
+
+        Returns:
+            str: Object path đã ghi
+        """
+        sink = pa.BufferOutputStream()
+        count = 0
+        with pa.CompressedOutputStream(sink, _COMPRESSION) as stream:
+            for record in records:
+                stream.write(json.dumps(record, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+                count += 1
+        data = sink.getvalue().to_pybytes()
+
+        object_path = self.object_path(entity, partition_date)
+        self.backend.put(object_path, data, content_type="application/zstd")
+        logger.debug(
+            f"Archived {count} raw records",
+            entity=entity,
+            partition_date=partition_date.isoformat(),
+            path=object_path,
+            size_bytes=len(data)
+        )
+        return object_path
+
+    def read(self, entity: str, partition_date: date) -> Optional[List[Dict[str, Any]]]:
+        """
+        Đọc raw records của một ngày.
+
+        Args:
+            entity: Tên entity (format: "platform/entity")
+            partition_date: Ngày
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Records, None nếu ngày chưa được archive
+        """
+        try:
+            data = self.backend.get(self.object_path(entity, partition_date))
+        except NotFound:
+            return None
+        content = pa.input_stream(pa.py_buffer(data), compression=_COMPRESSION).read()
+        return [json.loads(line) for line in content.splitlines() if line]
@@ -0,0 +1,284 @@
+"""
+Write-behind upload queue cho GCS backups.
+
+submit() ghi Arrow table vào local spool directory (Arrow IPC file + job JSON)
+rồi return ngay; một worker thread upload lên GCS qua GCSLoader.upload_table,
+retry với exponential backoff, và xóa spool files khi upload thành công.
+
+Durability:
+- submit() return: data đã durable trên local disk (spool).
+- flush() return: mọi job đã submit đã lên GCS, trừ các job hết retries
+  (vẫn nằm trong spool, được log).
+- Job còn trong spool (process crash, upload fail) được upload lại khi một
+  UploadQueue mới được tạo trên cùng spool directory. Job cũ hơn object hiện
+  tại trên GCS (đã có lần chạy sau ghi đè) bị bỏ qua.
+- Content checksum của object chỉ được ghi là pending; caller gọi
+  commit_content_checksum(job) sau khi load downstream thành công, nên process
+  dừng trước khi load xong không làm lần chạy sau bỏ qua ngày đó.
+
+Worker chỉ có một thread nên các jobs chạy theo thứ tự submit.
+"""
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
+import pyarrow as pa
+from src.config import settings
+from src.shared.logging import get_logger
+
+logger = get_logger(__name__)
+
+_JOB_SUFFIX = ".json"
+_DATA_SUFFIX = ".arrow"
+
+
+@dataclass
+class UploadJob:
+    """Một Arrow table chờ upload (được lưu trong spool)."""
+    job_id: str
+    entity: str
+    partition_date: date
+    object_path: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    created_at: str = ""
+    commit_checksum: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["partition_date"] = self.partition_date.isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "UploadJob":
+        data = dict(data)
+        data["partition_date"] = date.fromisoformat(data["partition_date"])
+        return cls(**data)
+
+
+class UploadQueue:
+    """
+    Queue upload bất đồng bộ có spool trên local disk.
+
+    Args:
+        gcs_loader: GCSLoader dùng để upload
+        spool_dir: Thư mục spool (mỗi bucket nên dùng thư mục riêng)
+        max_retries: Số lần retry tối đa mỗi job (mặc định: settings.gcs_upload_max_retries)
+        retry_delay: Delay ban đầu giữa các retries, giây (mặc định: settings.gcs_upload_retry_delay)
+    """
+
+    def __init__(
+        self,
+        gcs_loader: Any,
+        spool_dir: str,
+        max_retries: Optional[int] = None,
+        retry_delay: Optional[float] = None
+    ):
+        self.gcs_loader = gcs_loader
+        self.spool_dir = spool_dir
+        self.max_retries = settings.gcs_upload_max_retries if max_retries is None else max_retries
+        self.retry_delay = settings.gcs_upload_retry_delay if retry_delay is None else retry_delay
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gcs-upload")
+        self._futures: List[Future] = []
+        # Bảo vệ job JSON: commit_content_checksum() cập nhật trong lúc worker có thể xóa spool
+        self._lock = threading.Lock()
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.recover()
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.spool_dir, job_id + _JOB_SUFFIX)
+
+    def _data_path(self, job_id: str) -> str:
+        return os.path.join(self.spool_dir, job_id + _DATA_SUFFIX)
+
+    def _write_job(self, job: UploadJob) -> None:
+        """Ghi job JSON (atomic). Job chỉ được recover khi JSON tồn tại."""
+        temp_path = self._job_path(job.job_id) + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(job.to_dict(), f, default=str)
+        os.replace(temp_path, self._job_path(job.job_id))
+
+    def _remove_spool(self, job: UploadJob) -> None:
+        with self._lock:
+            for path in (self._job_path(job.job_id), self._data_path(job.job_id)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def submit(
+        self,
+        entity: str,
+        table: pa.Table,
+        partition_date: date,
+        metadata: Optional[Dict[str, Any]] = None,
+        object_path: Optional[str] = None
+    ) -> UploadJob:
+        """
+        Spool table và đưa vào queue upload.
+
+        Args:
+            entity: Tên entity (format: "platform/entity")
+            table: Arrow table cần upload
+            partition_date: Ngày partition
+            metadata: Upload metadata
+            object_path: Object path (mặc định: gcs_loader.build_parquet_path)
+
+        Returns:
+            UploadJob: Job đã spool (object_path là path sẽ được upload tới)
+        """
+        # Tên job tăng dần theo thời gian để recover() chạy lại đúng thứ tự submit
+        job = UploadJob(
+            job_id=f"{time.time_ns():020d}_{uuid.uuid4().hex[:8]}",
+            entity=entity,
+            partition_date=partition_date,
+            object_path=object_path or self.gcs_loader.build_parquet_path(entity, partition_date),
+            metadata=dict(metadata or {}),
+            created_at=datetime.now(timezone.utc).isoformat()
+        )
+        data_path = self._data_path(job.job_id)
+        with pa.OSFile(data_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        self._write_job(job)
+
+        self._futures.append(self._executor.submit(self._run, job))
+        return job
+
+    def commit_content_checksum(self, job: UploadJob) -> None:
+        """
+        Commit content checksum của partition sau khi job upload xong (caller gọi khi
+        BigQuery load thành công). Flag được lưu vào spool nên vẫn có hiệu lực nếu job
+        được upload lại bởi lần chạy sau.
+        """
+        with self._lock:
+            job.commit_checksum = True
+            if os.path.exists(self._job_path(job.job_id)):
+                self._write_job(job)
+        self._futures.append(self._executor.submit(
+            self.gcs_loader.commit_content_checksum, job.entity, job.partition_date, job.object_path
+        ))
+
+    def _run(self, job: UploadJob) -> str:
+        """Upload một job (retry với backoff), xóa spool khi thành công."""
+        with pa.memory_map(self._data_path(job.job_id), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                path = self.gcs_loader.upload_table(
+                    entity=job.entity,
+                    table=table,
+                    partition_date=job.partition_date,
+                    metadata=job.metadata,
+                    overwrite_partition=True,
+                    object_path=job.object_path,
+                    commit_checksum=job.commit_checksum
+                )
+                break
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    logger.error(
+                        f"Upload failed after {attempt + 1} attempts, kept in spool",
+                        entity=job.entity,
+                        partition_date=job.partition_date.isoformat(),
+                        job_id=job.job_id,
+                        error=str(e)
+                    )
+                    raise
+                delay = self.retry_delay * (2 ** attempt) + random.uniform(0, 0.5)
+                logger.warning(
+                    f"Upload failed (attempt {attempt + 1}/{self.max_retries + 1}), retrying in {delay:.2f}s",
+                    entity=job.entity,
+                    partition_date=job.partition_date.isoformat(),
+                    error=str(e)
+                )
+                time.sleep(delay)
+
+        self._remove_spool(job)
+        return path
+
+    def _is_stale(self, job: UploadJob) -> bool:
+        """Object trên GCS được ghi sau khi job được tạo → job đã lỗi thời."""
+        info = self.gcs_loader.backend.stat(job.object_path)
+        return (
+            info is not None
+            and info.updated is not None
+            and info.updated > datetime.fromisoformat(job.created_at)
+        )
+
+    def recover(self) -> int:
+        """
+        Đưa các jobs còn trong spool (từ lần chạy trước) vào queue.
+
+        Returns:
+            int: Số jobs được submit lại
+        """
+        recovered = 0
+        for filename in sorted(os.listdir(self.spool_dir)):
+            if not filename.endswith(_JOB_SUFFIX):
+                continue
+            try:
+                with open(os.path.join(self.spool_dir, filename), encoding="utf-8") as f:
+                    job = UploadJob.from_dict(json.load(f))
+                if not os.path.exists(self._data_path(job.job_id)):
+                    raise FileNotFoundError(self._data_path(job.job_id))
+                if self._is_stale(job):
+                    logger.info(
+                        "Discarded stale spooled upload",
+                        entity=job.entity,
+                        partition_date=job.partition_date.isoformat(),
+                        job_id=job.job_id
+                    )
+                    self._remove_spool(job)
+                    continue
+            except Exception as e:
+                logger.warning("Skipped unreadable spool job", file=filename, error=str(e))
+                continue
+            self._futures.append(self._executor.submit(self._run, job))
+            recovered += 1
+
+        if recovered:
+            logger.info(f"Recovered {recovered} spooled uploads", spool_dir=self.spool_dir)
+        return recovered
+
+    def flush(self) -> List[str]:
+        """
+        Đợi tất cả jobs đã submit hoàn tất.
+
+        Returns:
+            List[str]: GCS paths đã upload thành công
+        """
+        uploaded = []
+        futures, self._futures = self._futures, []
+        failed = 0
+        for future in futures:
+            try:
+                path = future.result()
+                if isinstance(path, str) and path:
+                    uploaded.append(path)
+            except Exception as e:
+                failed += 1
+                logger.warning("GCS backup upload failed", error=str(e))
+
+        if futures:
+            logger.info(
+                f"Flushed {len(uploaded)} GCS backups",
+                uploaded=len(uploaded),
+                failed=failed,
+                pending_in_spool=self.pending()
+            )
+        return uploaded
+
+    def pending(self) -> int:
+        """Số jobs còn trong spool (chưa upload thành công)."""
+        return sum(1 for filename in os.listdir(self.spool_dir) if filename.endswith(_JOB_SUFFIX))
+
+    def close(self) -> List[str]:
+        """Flush rồi dừng worker thread."""
+        uploaded = self.flush()
+        self._executor.shutdown(wait=True)
+        return uploaded
@@ -9,7 +9,7 @@ File này cung cấp lớp cơ sở với các tính năng:
 """
 import time
 import random
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Optional, List
 import requests
 from datetime import datetime, timedelta
 from src.config import settings, get_nhanh_credentials
@@ -264,7 +264,8 @@ class NhanhApiClient:
         self,
         endpoint: str,
         body: Dict[str, Any],
-        data_key: str = "data"
+        data_key: str = "data",
+        on_page: Optional[Callable[[List[Dict[str, Any]]], None]] = None
     ) -> List[Dict[str, Any]]:
         """
         Lấy tất cả các pages của data sử dụng pagination.
@@ -273,6 +274,7 @@ class NhanhApiClient:
             endpoint: API endpoint
             body: Initial request body
             data_key: Key trong response chứa data array
+            on_page: Callback nhận records của từng page ngay khi fetch xong
             
         Returns:
             List[Dict[str, Any]]: Danh sách tất cả records
@@ -301,6 +303,8 @@ class NhanhApiClient:
                     break
                 
                 all_data.extend(page_data)
+                if on_page is not None:
+                    on_page(page_data)
                 # Log page fetch details at DEBUG level to reduce verbosity
                 logger.debug(
                     f"Fetched page {page_num}: {len(page_data)} records",
@@ -1,17 +1,47 @@
 """
-Parquet schema utilities for enforcing consistent data types.
+Parquet schema utilities for enforcing consistent data types and per-entity write options.
 """
 from src.shared.parquet.schemas import (
     get_schema,
     register_schema,
     SCHEMA_REGISTRY,
     BILL_PRODUCTS_SCHEMA,
+    ParquetWriteOptions,
+    DEFAULT_WRITE_OPTIONS,
+    WRITE_OPTIONS_REGISTRY,
+    get_write_options,
+    register_write_options,
 )
+from src.shared.parquet.checksum import ContentChecksum, VOLATILE_COLUMNS, table_checksum
+from src.shared.parquet.footer import (
+    UPLOAD_METADATA_KEY,
+    encode_upload_metadata,
+    read_footer_metadata,
+    read_upload_metadata,
+)
+from src.shared.parquet.tables import records_to_table, table_to_parquet_bytes
+from src.shared.parquet.writer import StreamingParquetWriter, chunk_records
 
 __all__ = [
     'get_schema',
     'register_schema',
     'SCHEMA_REGISTRY',
     'BILL_PRODUCTS_SCHEMA',
+    'ParquetWriteOptions',
+    'DEFAULT_WRITE_OPTIONS',
+    'WRITE_OPTIONS_REGISTRY',
+    'get_write_options',
+    'register_write_options',
+    'ContentChecksum',
+    'VOLATILE_COLUMNS',
+    'table_checksum',
+    'UPLOAD_METADATA_KEY',
+    'encode_upload_metadata',
+    'read_footer_metadata',
+    'read_upload_metadata',
+    'records_to_table',
+    'table_to_parquet_bytes',
+    'StreamingParquetWriter',
+    'chunk_records',
 ]
 
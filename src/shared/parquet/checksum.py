@@ -0,0 +1,93 @@
+"""
+Content checksum cho Parquet data.
+
+Bytes của Parquet file thay đổi mỗi lần chạy dù data không đổi: cột
+extraction_timestamp và upload metadata trong footer luôn mang thời điểm chạy.
+ContentChecksum hash phần data ổn định (bỏ các cột volatile) như một multiset
+rows: mỗi row được hash riêng và các hash được cộng dồn, nên checksum không phụ
+thuộc thứ tự rows hay cách chia chunk/row group (thứ tự page API, số lần
+write_table). Cùng data cho cùng checksum và re-run một ngày không đổi data có
+thể bỏ qua upload và load.
+"""
+import hashlib
+import json
+from typing import Sequence
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Cột mang thời điểm extract, khác nhau giữa các lần chạy với cùng data
+VOLATILE_COLUMNS = ("extraction_timestamp",)
+
+# Hai hash keys độc lập (16 ký tự) → 128 bit mỗi row
+_HASH_KEYS = ("content_chk_key1", "content_chk_key2")
+_UINT64_MASK = (1 << 64) - 1
+
+
+def _hashable_frame(table: pa.Table) -> pd.DataFrame:
+    """DataFrame để hash theo row; column lồng nhau (list/struct/map) được đổi sang JSON."""
+    columns = {}
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_nested(column.type):
+            columns[name] = pd.Series(
+                [json.dumps(value, sort_keys=True, default=str) for value in column.to_pylist()],
+                dtype=object
+            )
+        else:
+            columns[name] = column.to_pandas()
+    return pd.DataFrame(columns)
+
+
+class ContentChecksum:
+    """
+    Checksum của data (bỏ cột volatile), cập nhật dần theo từng table được ghi.
+
+    Không phụ thuộc thứ tự rows: cùng tập rows (kể cả duplicates) cho cùng
+    checksum dù được ghi trong một hay nhiều write_table, theo thứ tự nào.
+    """
+
+    def __init__(self, exclude_columns: Sequence[str] = VOLATILE_COLUMNS):
+        self.exclude_columns = tuple(exclude_columns)
+        self._schema = None
+        self._num_rows = 0
+        self._sums = [0] * len(_HASH_KEYS)
+
+    def update(self, table: pa.Table) -> None:
+        """Thêm rows của table vào checksum."""
+        dropped = [name for name in self.exclude_columns if name in table.column_names]
+        table = table.drop_columns(dropped).replace_schema_metadata(None)
+        if self._schema is None:
+            self._schema = table.schema.to_string(show_field_metadata=False)
+        if table.num_rows == 0:
+            return
+        frame = _hashable_frame(table)
+        for idx, hash_key in enumerate(_HASH_KEYS):
+            row_hashes = pd.util.hash_pandas_object(frame, index=False, hash_key=hash_key).to_numpy()
+            # uint64 sum tràn số = cộng modulo 2^64, giao hoán nên không phụ thuộc thứ tự
+            with np.errstate(over="ignore"):
+                self._sums[idx] = (self._sums[idx] + int(row_hashes.sum(dtype=np.uint64))) & _UINT64_MASK
+        self._num_rows += table.num_rows
+
+    def hexdigest(self) -> str:
+        """Checksum hiện tại (hex)."""
+        digest = hashlib.md5()
+        digest.update((self._schema or "").encode("utf-8"))
+        digest.update(f"|{self._num_rows}|".encode("utf-8"))
+        for value in self._sums:
+            digest.update(value.to_bytes(8, "big"))
+        return digest.hexdigest()
+
+
+def table_checksum(table: pa.Table) -> str:
+    """
+    Checksum của table (bằng checksum của StreamingParquetWriter khi ghi cùng data).
+
+    Args:
+        table: Arrow table
+
+    Returns:
+        str: MD5 hex
+    """
+    checksum = ContentChecksum()
+    checksum.update(table)
+    return checksum.hexdigest()
@@ -0,0 +1,77 @@
+"""
+Upload metadata trong Parquet footer (key-value metadata).
+
+Metadata của mỗi upload (platform, entity, extraction_timestamp, record_count...)
+được ghi thẳng vào footer của Parquet file thay vì một object `_metadata/*.json`
+riêng. Đọc lại chỉ cần range read phần footer cuối file, không tải data.
+
+Compacted files (nhiều ngày) lưu metadata của từng ngày dưới key
+`upload_metadata.{YYYY-MM-DD}`.
+"""
+import json
+from datetime import date
+from typing import Any, BinaryIO, Dict, Optional, Union
+import pyarrow.parquet as pq
+
+UPLOAD_METADATA_KEY = "upload_metadata"
+
+
+def day_metadata_key(partition_date: date) -> str:
+    """Key metadata của một ngày trong compacted file."""
+    return f"{UPLOAD_METADATA_KEY}.{partition_date.isoformat()}"
+
+
+def encode_upload_metadata(metadata: Dict[str, Any], key: str = UPLOAD_METADATA_KEY) -> Dict[bytes, bytes]:
+    """
+    Encode upload metadata thành Parquet key-value metadata.
+
+    Args:
+        metadata: Metadata (JSON-serializable, giá trị khác được str())
+        key: Key trong footer
+
+    Returns:
+        Dict[bytes, bytes]: Key-value metadata cho Arrow schema
+    """
+    content = json.dumps(metadata, ensure_ascii=False, default=str, sort_keys=True)
+    return {key.encode("utf-8"): content.encode("utf-8")}
+
+
+def read_footer_metadata(source: Union[str, BinaryIO, pq.ParquetFile]) -> Dict[str, Dict[str, Any]]:
+    """
+    Đọc tất cả upload metadata trong footer của một Parquet file.
+
+    Args:
+        source: Path, file-like object (seekable, vd: GCS BlobReader) hoặc ParquetFile
+
+    Returns:
+        Dict[str, Dict]: key → metadata (chỉ các key upload_metadata*)
+    """
+    parquet_file = source if isinstance(source, pq.ParquetFile) else pq.ParquetFile(source)
+    key_value_metadata = parquet_file.metadata.metadata or {}
+
+    result = {}
+    for raw_key, raw_value in key_value_metadata.items():
+        key = raw_key.decode("utf-8")
+        if key == UPLOAD_METADATA_KEY or key.startswith(f"{UPLOAD_METADATA_KEY}."):
+            result[key] = json.loads(raw_value.decode("utf-8"))
+    return result
+
+
+def read_upload_metadata(
+    source: Union[str, BinaryIO, pq.ParquetFile],
+    partition_date: Optional[date] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Đọc upload metadata từ footer.
+
+    Args:
+        source: Path, file-like object hoặc ParquetFile
+        partition_date: Ngày cần đọc (bắt buộc với compacted file nhiều ngày)
+
+    Returns:
+        Dict metadata, hoặc None nếu file không có metadata
+    """
+    footer_metadata = read_footer_metadata(source)
+    if partition_date is not None and day_metadata_key(partition_date) in footer_metadata:
+        return footer_metadata[day_metadata_key(partition_date)]
+    return footer_metadata.get(UPLOAD_METADATA_KEY)
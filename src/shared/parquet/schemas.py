@@ -10,9 +10,14 @@ khi write Parquet files. Sử dụng explicit schemas đảm bảo:
 - Timestamp fields luôn dùng microsecond precision (pa.timestamp('us')) để tương thích BigQuery
 
 Schemas được register trong SCHEMA_REGISTRY và tự động lookup qua get_schema(entity_path).
+
+Write options (codec, row-group size, dictionary columns, sort order, page statistics)
+được register per-entity trong WRITE_OPTIONS_REGISTRY và lookup qua get_write_options(entity_path).
 """
 import pyarrow as pa
-from typing import Dict, Optional
+import pyarrow.parquet as pq
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional, Tuple
 
 
 # Schema for nhanh/bill_products
@@ -117,3 +122,151 @@ def register_schema(entity_path: str, schema: pa.Schema):
     """
     SCHEMA_REGISTRY[entity_path] = schema
 
+
+@dataclass(frozen=True)
+class ParquetWriteOptions:
+    """
+    Tuỳ chọn ghi Parquet cho một entity.
+    
+    Attributes:
+        compression: Codec ('snappy', 'zstd', 'gzip', ...)
+        compression_level: Level của codec (vd: zstd 1-22); None = mặc định của codec
+        row_group_size: Số rows mỗi row group; None = settings.parquet_row_group_size
+        dictionary_columns: Columns dùng dictionary encoding; None = tất cả columns (mặc định pyarrow)
+        sort_by: Sort order trong mỗi row group, vd: (('id', 'ascending'),); ghi vào footer
+            dưới dạng sorting_columns để reader biết data đã được sắp xếp
+        statistics_columns: Columns ghi min/max statistics; None = tất cả columns
+        write_page_index: Ghi column/offset index để reader prune theo page
+        data_page_size: Kích thước data page (bytes); None = mặc định pyarrow (1MB)
+    """
+    compression: str = 'snappy'
+    compression_level: Optional[int] = None
+    row_group_size: Optional[int] = None
+    dictionary_columns: Optional[Tuple[str, ...]] = None
+    sort_by: Tuple[Tuple[str, str], ...] = ()
+    statistics_columns: Optional[Tuple[str, ...]] = None
+    write_page_index: bool = False
+    data_page_size: Optional[int] = None
+    
+    def with_overrides(self, **overrides: Any) -> "ParquetWriteOptions":
+        """
+        Trả về bản copy với các field được override (dùng cho benchmark/tuning).
+        Đổi codec mà không truyền compression_level thì level được reset về mặc định của codec mới.
+        """
+        if 'compression' in overrides and 'compression_level' not in overrides:
+            overrides['compression_level'] = None
+        return replace(self, **overrides)
+    
+    def sort_table(self, table: pa.Table) -> pa.Table:
+        """Sắp xếp table theo sort_by (bỏ qua các sort keys không có trong table)."""
+        sort_keys = [(name, order) for name, order in self.sort_by if name in table.column_names]
+        if not sort_keys or table.num_rows < 2:
+            return table
+        return table.sort_by(sort_keys)
+    
+    def writer_kwargs(self, schema: pa.Schema) -> Dict[str, Any]:
+        """
+        Build kwargs cho pq.ParquetWriter / pq.write_table.
+        
+        Args:
+            schema: Schema của file (để map sort_by sang column index và
+                lọc các columns không tồn tại)
+            
+        Returns:
+            Dict: kwargs (compression, compression_level, use_dictionary, ...)
+        """
+        names = set(schema.names)
+        kwargs: Dict[str, Any] = {
+            'compression': self.compression,
+            'write_page_index': self.write_page_index,
+        }
+        if self.compression_level is not None:
+            kwargs['compression_level'] = self.compression_level
+        if self.dictionary_columns is not None:
+            kwargs['use_dictionary'] = [name for name in self.dictionary_columns if name in names] or False
+        if self.statistics_columns is not None:
+            kwargs['write_statistics'] = [name for name in self.statistics_columns if name in names] or False
+        if self.data_page_size is not None:
+            kwargs['data_page_size'] = self.data_page_size
+        sorting_columns = [
+            pq.SortingColumn(schema.get_field_index(name), descending=(order == 'descending'))
+            for name, order in self.sort_by
+            if name in names
+        ]
+        if sorting_columns:
+            kwargs['sorting_columns'] = sorting_columns
+        return kwargs
+
+
+# Partition column (DATE) của từng entity - dùng để map row groups → ngày
+# trong compacted files
+PARTITION_COLUMN_REGISTRY: Dict[str, str] = {
+    'nhanh/bill_products': 'bill_date',
+    'nhanh/bills': 'date',
+}
+
+
+def get_partition_column(entity_path: str) -> Optional[str]:
+    """
+    Get partition (DATE) column for an entity path.
+    
+    Args:
+        entity_path: Entity path in format "{platform}/{entity}"
+        
+    Returns:
+        Tên column nếu đã register, None otherwise
+    """
+    return PARTITION_COLUMN_REGISTRY.get(entity_path)
+
+
+# Mặc định cho entity chưa register: giữ nguyên behavior cũ (snappy, dictionary cho mọi column)
+DEFAULT_WRITE_OPTIONS = ParquetWriteOptions()
+
+# bills: sort theo id (clustering key đầu tiên, dùng cho MERGE/lookup). id đã sort và
+# unique nên ghi PLAIN (dictionary chỉ làm file lớn hơn); các cột lặp lại nhiều
+# (tên khách/nhân viên, depot, type/mode...) dùng dictionary encoding.
+BILLS_WRITE_OPTIONS = ParquetWriteOptions(
+    compression='zstd',
+    compression_level=3,
+    dictionary_columns=tuple(name for name in BILLS_SCHEMA.names if name != 'id'),
+    sort_by=(('id', 'ascending'),),
+)
+
+# bill_products: sort theo (bill_id, product_id) để các dòng của một bill nằm liền nhau;
+# bill_id đã sort nên không cần dictionary.
+BILL_PRODUCTS_WRITE_OPTIONS = ParquetWriteOptions(
+    compression='zstd',
+    compression_level=3,
+    dictionary_columns=tuple(name for name in BILL_PRODUCTS_SCHEMA.names if name != 'bill_id'),
+    sort_by=(('bill_id', 'ascending'), ('product_id', 'ascending')),
+)
+
+# Write options registry - maps entity paths to options
+WRITE_OPTIONS_REGISTRY: Dict[str, ParquetWriteOptions] = {
+    'nhanh/bill_products': BILL_PRODUCTS_WRITE_OPTIONS,
+    'nhanh/bills': BILLS_WRITE_OPTIONS,
+}
+
+
+def get_write_options(entity_path: str) -> ParquetWriteOptions:
+    """
+    Get Parquet write options for an entity path.
+    
+    Args:
+        entity_path: Entity path in format "{platform}/{entity}"
+        
+    Returns:
+        ParquetWriteOptions đã register, hoặc DEFAULT_WRITE_OPTIONS
+    """
+    return WRITE_OPTIONS_REGISTRY.get(entity_path, DEFAULT_WRITE_OPTIONS)
+
+
+def register_write_options(entity_path: str, options: ParquetWriteOptions):
+    """
+    Register Parquet write options for an entity path.
+    
+    Args:
+        entity_path: Entity path in format "{platform}/{entity}"
+        options: Write options to use
+    """
+    WRITE_OPTIONS_REGISTRY[entity_path] = options
@@ -0,0 +1,144 @@
+"""
+Chuyển đổi records (list dict) sang PyArrow Table và Parquet bytes.
+
+Logic này trước đây nằm trong GCSLoader.upload_parquet; tách ra để cả GCS upload
+lẫn BigQuery direct load (không qua GCS) dùng chung một cách build Arrow table
+với explicit schema.
+"""
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.shared.logging import get_logger
+from src.shared.parquet.schemas import ParquetWriteOptions, get_schema
+
+logger = get_logger(__name__)
+
+
+def records_to_table(
+    entity: str,
+    data: List[Dict[str, Any]],
+    schema: Optional[pa.Schema] = None
+) -> pa.Table:
+    """
+    Build PyArrow Table từ danh sách records.
+
+    Args:
+        entity: Tên entity (format: "platform/entity"), dùng để lookup schema
+        data: Danh sách records
+        schema: Explicit PyArrow schema (nếu None, sẽ lookup từ registry hoặc infer)
+
+    Returns:
+        pa.Table: Arrow table với timestamp microsecond precision
+    """
+    # Convert to DataFrame
+    df = pd.DataFrame(data)
+
+    # Normalize timestamps trong DataFrame: convert datetime64[ns] → datetime64[us]
+    # BigQuery TIMESTAMP chỉ hỗ trợ microsecond precision, không hỗ trợ nanosecond
+    # PyArrow sẽ tự động tạo nanosecond precision nếu DataFrame có datetime64[ns]
+    # Fix này đảm bảo tất cả timestamp columns có microsecond precision
+    for col in df.columns:
+        if df[col].dtype == 'datetime64[ns]':
+            # Convert nanosecond precision to microsecond precision
+            # Use astype to force datetime64[us] instead of just floor
+            df[col] = df[col].dt.floor('us').astype('datetime64[us]')
+
+    # Get schema: explicit > registry lookup > inference
+    if schema is None:
+        schema = get_schema(entity)
+
+    # Create PyArrow table with or without explicit schema
+    if schema:
+        # CRITICAL FIX: Đảm bảo DataFrame có TẤT CẢ schema fields trước khi write Parquet
+        # Nếu thiếu cột nào, thêm vào với giá trị None để đảm bảo schema consistency
+        schema_column_names = {field.name for field in schema}
+        df_column_names = set(df.columns)
+
+        # Thêm các cột thiếu với giá trị None
+        missing_columns = schema_column_names - df_column_names
+        if missing_columns:
+            for col in missing_columns:
+                df[col] = None
+            logger.debug(
+                "Added missing schema columns to DataFrame",
+                entity=entity,
+                missing_columns=list(missing_columns),
+                total_schema_fields=len(schema_column_names),
+                df_columns_before=len(df_column_names),
+                df_columns_after=len(df.columns)
+            )
+
+        # Use explicit schema - enforces types and handles coercion
+        # Giờ tất cả schema fields đã có trong DataFrame, không cần filter nữa
+        # Nhưng vẫn filter để đảm bảo chỉ dùng fields có trong schema (tránh extra fields)
+        df_columns = set(df.columns)
+        schema_fields = [field for field in schema if field.name in df_columns]
+
+        if schema_fields:
+            # Create filtered schema with only fields present in data
+            # Override timestamp fields to use microsecond precision (not nanosecond)
+            schema_fields_fixed = []
+            for field in schema_fields:
+                if pa.types.is_timestamp(field.type):
+                    # Force microsecond precision for BigQuery compatibility
+                    schema_fields_fixed.append(
+                        pa.field(field.name, pa.timestamp('us'), nullable=field.nullable)
+                    )
+                else:
+                    schema_fields_fixed.append(field)
+
+            filtered_schema = pa.schema(schema_fields_fixed)
+            table = pa.Table.from_pandas(df, schema=filtered_schema)
+            logger.debug(
+                "Using explicit schema for Parquet write",
+                entity=entity,
+                schema_fields=len(schema_fields),
+                total_schema_fields=len(schema)
+            )
+        else:
+            # No matching fields, fallback to inference
+            table = pa.Table.from_pandas(df)
+            logger.debug(
+                "Schema defined but no matching fields in data, using inference",
+                entity=entity
+            )
+    else:
+        # Fallback to inference (backward compatibility)
+        table = pa.Table.from_pandas(df)
+        logger.debug(
+            "Using inferred schema for Parquet write",
+            entity=entity
+        )
+
+    return table
+
+
+def table_to_parquet_bytes(
+    table: pa.Table,
+    compression: str = 'snappy',
+    options: Optional[ParquetWriteOptions] = None
+) -> bytes:
+    """
+    Serialize Arrow table thành Parquet bytes (in-memory).
+
+    Args:
+        table: Arrow table
+        compression: Parquet compression codec (bị bỏ qua nếu có options)
+        options: Write options (codec, dictionary, sort order, statistics)
+
+    Returns:
+        bytes: Nội dung Parquet file
+    """
+    parquet_buffer = BytesIO()
+    if options is None:
+        pq.write_table(table, parquet_buffer, compression=compression)
+    else:
+        pq.write_table(
+            options.sort_table(table),
+            parquet_buffer,
+            row_group_size=options.row_group_size,
+            **options.writer_kwargs(table.schema)
+        )
+    return parquet_buffer.getvalue()
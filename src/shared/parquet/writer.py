@@ -0,0 +1,153 @@
+"""
+Streaming Parquet writer.
+
+Ghi records theo từng row group qua `pq.ParquetWriter` vào một file-like sink
+(GCS BlobWriter resumable upload, local spill file, BytesIO...). Mỗi lần chỉ
+giữ một row group trong memory, nên peak memory không tăng theo kích thước data
+và sink có thể bắt đầu upload trước khi serialize xong.
+"""
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.shared.logging import get_logger
+from src.shared.parquet.checksum import ContentChecksum
+from src.shared.parquet.schemas import ParquetWriteOptions, get_write_options
+from src.shared.parquet.tables import records_to_table
+
+logger = get_logger(__name__)
+
+DEFAULT_ROW_GROUP_SIZE = 50000
+
+
+def chunk_records(records: Iterable[Dict[str, Any]], chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Chia iterable records thành các list tối đa chunk_size phần tử.
+
+    Args:
+        records: Iterable records (list, generator...)
+        chunk_size: Số records mỗi chunk
+
+    Yields:
+        List[Dict]: Chunk records
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class StreamingParquetWriter:
+    """
+    Ghi Parquet file theo từng row group vào sink.
+
+    Schema được cố định ở row group đầu tiên (explicit schema > registry > infer
+    từ chunk đầu); các row group sau được build/cast theo cùng schema đó.
+    Codec, dictionary columns, sort order và statistics lấy từ write options
+    của entity (xem get_write_options); sort order áp dụng trong từng write_table.
+    content_checksum không phụ thuộc thứ tự rows giữa các write_table (xem ContentChecksum).
+
+    Example:
+        with StreamingParquetWriter(sink, entity="nhanh/bills") as writer:
+            writer.write_records(records_iter)
+    """
+
+    def __init__(
+        self,
+        sink: BinaryIO,
+        entity: str,
+        schema: Optional[pa.Schema] = None,
+        options: Optional[ParquetWriteOptions] = None,
+        row_group_size: Optional[int] = None,
+        key_value_metadata: Optional[Dict[bytes, bytes]] = None
+    ):
+        """
+        Khởi tạo writer.
+
+        Args:
+            sink: File-like object (writable, binary)
+            entity: Tên entity (format: "platform/entity"), dùng để lookup schema và write options
+            schema: Explicit PyArrow schema (nếu None, sẽ lookup từ registry hoặc infer)
+            options: Write options (nếu None, lookup từ registry theo entity)
+            row_group_size: Số rows mỗi row group (mặc định: options.row_group_size
+                hoặc DEFAULT_ROW_GROUP_SIZE)
+            key_value_metadata: Metadata ghi vào footer (xem src.shared.parquet.footer)
+        """
+        self.sink = sink
+        self.entity = entity
+        self.schema = schema
+        self.options = options or get_write_options(entity)
+        self.row_group_size = row_group_size or self.options.row_group_size or DEFAULT_ROW_GROUP_SIZE
+        self.key_value_metadata = key_value_metadata
+        self.num_rows = 0
+        self.num_row_groups = 0
+        self.checksum = ContentChecksum()
+        self._writer: Optional[pq.ParquetWriter] = None
+
+    def _open(self, schema: pa.Schema) -> None:
+        if self.key_value_metadata:
+            schema = schema.with_metadata({**(schema.metadata or {}), **self.key_value_metadata})
+        self.schema = schema
+        self._writer = pq.ParquetWriter(self.sink, schema, **self.options.writer_kwargs(schema))
+
+    def write_table(self, table: pa.Table) -> None:
+        """
+        Ghi Arrow table (chia thành row groups theo row_group_size).
+
+        Args:
+            table: Arrow table
+        """
+        if table.num_rows == 0:
+            return
+        if self._writer is None:
+            self._open(table.schema)
+        elif table.schema != self.schema:
+            table = table.select(self.schema.names).cast(self.schema)
+
+        table = self.options.sort_table(table)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        self.checksum.update(table)
+        self.num_rows += table.num_rows
+        self.num_row_groups += -(-table.num_rows // self.row_group_size)
+
+    @property
+    def content_checksum(self) -> str:
+        """Checksum của data đã ghi (bỏ cột volatile, xem src.shared.parquet.checksum)."""
+        return self.checksum.hexdigest()
+
+    def write_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Ghi records theo từng chunk row_group_size (mỗi chunk = một row group).
+
+        Args:
+            records: Iterable records (có thể là generator)
+
+        Returns:
+            int: Số rows đã ghi trong lần gọi này
+        """
+        written = 0
+        for chunk in chunk_records(records, self.row_group_size):
+            table = records_to_table(self.entity, chunk, schema=self.schema)
+            self.write_table(table)
+            written += table.num_rows
+        return written
+
+    def close(self) -> None:
+        """Ghi footer và đóng ParquetWriter (không đóng sink)."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self) -> "StreamingParquetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        elif self._writer is not None:
+            # Không ghi footer cho file lỗi; caller chịu trách nhiệm hủy sink
+            self._writer = None
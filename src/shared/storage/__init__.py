@@ -0,0 +1,36 @@
+"""
+Shared object storage backends.
+Chứa StorageBackend interface và các implementation (GCS, local disk) dùng bởi GCSLoader.
+"""
+from src.config import settings
+from .base import ObjectInfo, ObjectWriter, StorageBackend
+from .gcs import GCSStorageBackend
+from .local import LocalStorageBackend
+
+
+def get_storage_backend(bucket_name: str) -> StorageBackend:
+    """
+    Tạo storage backend cho bucket theo settings.storage_backend.
+
+    Args:
+        bucket_name: Tên bucket
+
+    Returns:
+        StorageBackend: GCSStorageBackend ("gcs") hoặc LocalStorageBackend ("local",
+            lưu tại settings.local_storage_root)
+    """
+    if settings.storage_backend == "local":
+        return LocalStorageBackend(settings.local_storage_root, bucket_name)
+    if settings.storage_backend != "gcs":
+        raise ValueError(f"Unknown storage backend: {settings.storage_backend}")
+    return GCSStorageBackend(bucket_name)
+
+
+__all__ = [
+    'ObjectInfo',
+    'ObjectWriter',
+    'StorageBackend',
+    'GCSStorageBackend',
+    'LocalStorageBackend',
+    'get_storage_backend',
+]
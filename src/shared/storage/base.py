@@ -0,0 +1,143 @@
+"""
+Storage backend interface.
+
+GCSLoader, ManifestStore và PartitionCompactor chỉ làm việc qua StorageBackend
+(put/get/list/delete/compose + stream read/write), nên cùng code chạy được trên
+GCS hoặc local disk (offline benchmarks, backfill ra disk nhanh, spool).
+
+Precondition dùng generation như GCS: mỗi lần ghi object có generation mới,
+if_generation_match=0 nghĩa là object chưa tồn tại. Vi phạm precondition raise
+google.api_core.exceptions.PreconditionFailed, object không tồn tại raise NotFound
+ở mọi backend để caller xử lý thống nhất.
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+
+@dataclass
+class ObjectInfo:
+    """Metadata của một object (cùng tên thuộc tính với storage.Blob)."""
+    name: str
+    size: Optional[int] = None
+    generation: Optional[int] = None
+    md5_hash: Optional[str] = None
+    crc32c: Optional[str] = None
+    updated: Optional[datetime] = None
+
+
+class ObjectWriter(ABC):
+    """
+    File-like sink ghi một object theo stream.
+
+    Object chỉ xuất hiện sau commit(); abort() hủy upload và không để lại gì.
+    """
+
+    @abstractmethod
+    def write(self, data: bytes) -> int:
+        """Ghi thêm bytes."""
+
+    @abstractmethod
+    def tell(self) -> int:
+        """Số bytes đã ghi."""
+
+    def flush(self) -> None:
+        """No-op: data chỉ được commit khi gọi commit()."""
+
+    @property
+    def closed(self) -> bool:
+        return False
+
+    @abstractmethod
+    def commit(self) -> ObjectInfo:
+        """
+        Hoàn tất object.
+
+        Raises:
+            PreconditionFailed: Nếu generation của object đã thay đổi
+        """
+
+    @abstractmethod
+    def abort(self) -> None:
+        """Hủy upload."""
+
+
+class StorageBackend(ABC):
+    """Interface object storage dùng bởi GCSLoader (một bucket)."""
+
+    bucket_name: str
+
+    @abstractmethod
+    def uri(self, name: str) -> str:
+        """URI của object (gs://bucket/name) để load vào BigQuery / emulator."""
+
+    def ensure_bucket(self) -> None:
+        """Tạo bucket nếu chưa có (mặc định: không làm gì)."""
+
+    @abstractmethod
+    def stat(self, name: str) -> Optional[ObjectInfo]:
+        """Metadata của object, None nếu không tồn tại."""
+
+    @abstractmethod
+    def put(
+        self,
+        name: str,
+        data: Union[bytes, BinaryIO],
+        content_type: Optional[str] = None,
+        if_generation_match: Optional[int] = None
+    ) -> ObjectInfo:
+        """
+        Ghi object từ bytes hoặc file-like object (đọc từ vị trí hiện tại đến hết).
+
+        Raises:
+            PreconditionFailed: Nếu if_generation_match không khớp
+        """
+
+    @abstractmethod
+    def open_write(
+        self,
+        name: str,
+        content_type: Optional[str] = None,
+        if_generation_match: Optional[int] = None
+    ) -> ObjectWriter:
+        """Mở stream ghi object (precondition được kiểm tra khi commit)."""
+
+    @abstractmethod
+    def get(self, name: str, generation: Optional[int] = None) -> bytes:
+        """
+        Đọc toàn bộ object.
+
+        Args:
+            name: Object name
+            generation: Nếu có, chỉ đọc đúng generation này
+
+        Raises:
+            NotFound: Nếu object (hoặc generation) không tồn tại
+        """
+
+    @abstractmethod
+    def open_read(self, name: str, generation: Optional[int] = None) -> BinaryIO:
+        """Mở object để đọc theo range (seekable), vd: đọc Parquet footer."""
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> Iterator[ObjectInfo]:
+        """List objects theo prefix (thứ tự tên tăng dần)."""
+
+    @abstractmethod
+    def delete(self, names: List[str]) -> int:
+        """
+        Xóa nhiều objects; object không tồn tại được bỏ qua.
+
+        Returns:
+            int: Số objects đã submit xóa
+        """
+
+    @abstractmethod
+    def compose(
+        self,
+        sources: List[str],
+        destination: str,
+        content_type: Optional[str] = None
+    ) -> ObjectInfo:
+        """Nối bytes của các sources (theo thứ tự) thành object destination."""
@@ -0,0 +1,167 @@
+"""
+Google Cloud Storage backend.
+"""
+from typing import Any, BinaryIO, Iterator, List, Optional, Union
+from google.cloud import storage
+from src.config import settings
+from src.shared.logging import get_logger
+from src.shared.storage.base import ObjectInfo, ObjectWriter, StorageBackend
+
+logger = get_logger(__name__)
+
+# Số delete calls tối đa trong một storage batch request (API giới hạn 1000)
+DELETE_BATCH_SIZE = 100
+# Số sources tối đa của một compose request
+COMPOSE_MAX_SOURCES = 32
+
+
+def _object_info(blob: Any) -> ObjectInfo:
+    return ObjectInfo(
+        name=blob.name,
+        size=blob.size,
+        generation=blob.generation,
+        md5_hash=blob.md5_hash,
+        crc32c=blob.crc32c,
+        updated=blob.updated
+    )
+
+
+class _GCSObjectWriter(ObjectWriter):
+    """Resumable upload qua blob.open("wb"); upload bắt đầu khi buffer đủ một chunk."""
+
+    def __init__(self, blob: Any, content_type: Optional[str], if_generation_match: Optional[int]):
+        self.blob = blob
+        self.stream = blob.open(
+            "wb",
+            chunk_size=settings.gcs_upload_chunk_size_mb * 1024 * 1024,
+            ignore_flush=True,
+            content_type=content_type,
+            if_generation_match=if_generation_match
+        )
+
+    def write(self, data: bytes) -> int:
+        return self.stream.write(data)
+
+    def tell(self) -> int:
+        return self.stream.tell()
+
+    def commit(self) -> ObjectInfo:
+        self.stream.close()
+        # BlobWriter không cập nhật blob properties (generation, checksums) sau khi upload xong
+        self.blob.reload()
+        return _object_info(self.blob)
+
+    def abort(self) -> None:
+        self.stream.terminate()
+
+
+class GCSStorageBackend(StorageBackend):
+    """StorageBackend trên một GCS bucket."""
+
+    def __init__(self, bucket_name: str, client: Optional[Any] = None):
+        """
+        Khởi tạo backend.
+
+        Args:
+            bucket_name: Tên GCS bucket
+            client: storage.Client (mặc định: tạo mới với settings.gcp_project)
+        """
+        self.bucket_name = bucket_name
+        self.client = client or storage.Client(project=settings.gcp_project)
+        self.bucket = self.client.bucket(bucket_name)
+
+    def uri(self, name: str) -> str:
+        return f"gs://{self.bucket_name}/{name}"
+
+    def ensure_bucket(self) -> None:
+        try:
+            if not self.bucket.exists():
+                logger.info(f"Bucket {self.bucket_name} not found, creating...")
+                self.bucket.create(location=settings.gcp_region)
+                logger.info(f"Created bucket {self.bucket_name}")
+        except Exception as e:
+            # If we don't have permission to list/create, we just log and try to proceed
+            logger.warning(f"Could not verify/create bucket {self.bucket_name}: {e}")
+
+    def stat(self, name: str) -> Optional[ObjectInfo]:
+        blob = self.bucket.get_blob(name)
+        return _object_info(blob) if blob is not None else None
+
+    def put(
+        self,
+        name: str,
+        data: Union[bytes, BinaryIO],
+        content_type: Optional[str] = None,
+        if_generation_match: Optional[int] = None
+    ) -> ObjectInfo:
+        blob = self.bucket.blob(name)
+        if isinstance(data, (bytes, bytearray)):
+            blob.upload_from_string(data, content_type=content_type, if_generation_match=if_generation_match)
+        else:
+            # Truyền size để client chọn upload type mà không cần đọc trước file
+            position = data.tell()
+            size = data.seek(0, 2) - position
+            data.seek(position)
+            blob.upload_from_file(
+                data, size=size, content_type=content_type, if_generation_match=if_generation_match
+            )
+        return _object_info(blob)
+
+    def open_write(
+        self,
+        name: str,
+        content_type: Optional[str] = None,
+        if_generation_match: Optional[int] = None
+    ) -> ObjectWriter:
+        return _GCSObjectWriter(self.bucket.blob(name), content_type, if_generation_match)
+
+    def get(self, name: str, generation: Optional[int] = None) -> bytes:
+        return self.bucket.blob(name, generation=generation).download_as_bytes()
+
+    def open_read(self, name: str, generation: Optional[int] = None) -> BinaryIO:
+        return self.bucket.blob(name, generation=generation).open("rb")
+
+    def list(self, prefix: str = "") -> Iterator[ObjectInfo]:
+        for blob in self.bucket.list_blobs(prefix=prefix):
+            yield _object_info(blob)
+
+    def delete(self, names: List[str]) -> int:
+        """Xóa qua storage batch API (tối đa DELETE_BATCH_SIZE calls / HTTP request)."""
+        deleted_count = 0
+        for start in range(0, len(names), DELETE_BATCH_SIZE):
+            batch_names = names[start:start + DELETE_BATCH_SIZE]
+            try:
+                with self.client.batch():
+                    for name in batch_names:
+                        self.bucket.blob(name).delete()
+                deleted_count += len(batch_names)
+                logger.debug(
+                    "Deleted objects in batch",
+                    batch_size=len(batch_names),
+                    first_path=batch_names[0]
+                )
+            except Exception as e:
+                # Batch raise khi có call lỗi (vd: object đã bị xóa - 404); các call khác vẫn được thực hiện
+                logger.warning(
+                    "Batch delete completed with errors",
+                    batch_size=len(batch_names),
+                    first_path=batch_names[0],
+                    error=str(e)
+                )
+        return deleted_count
+
+    def compose(
+        self,
+        sources: List[str],
+        destination: str,
+        content_type: Optional[str] = None
+    ) -> ObjectInfo:
+        """Compose theo từng nhóm COMPOSE_MAX_SOURCES (nhóm sau nối vào destination)."""
+        blob = self.bucket.blob(destination)
+        blob.content_type = content_type
+        blob.compose([self.bucket.blob(name) for name in sources[:COMPOSE_MAX_SOURCES]])
+        remaining = sources[COMPOSE_MAX_SOURCES:]
+        while remaining:
+            chunk, remaining = remaining[:COMPOSE_MAX_SOURCES - 1], remaining[COMPOSE_MAX_SOURCES - 1:]
+            blob.compose([self.bucket.blob(destination)] + [self.bucket.blob(name) for name in chunk])
+        return _object_info(blob)
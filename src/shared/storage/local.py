@@ -0,0 +1,207 @@
+"""
+Local filesystem backend.
+
+Object `name` của bucket được lưu tại `{root}/{bucket}/{name}`, cùng layout với
+gcs_root của DuckDBBigQueryClient, nên `gs://bucket/name` do backend trả về được
+emulator đọc trực tiếp (load path GCS → BigQuery chạy offline hoàn toàn).
+
+Generation là mtime (ns) của file, luôn tăng sau mỗi lần ghi. Ghi object là
+atomic (temp file + os.replace); precondition được kiểm tra dưới lock của
+backend, nên chỉ đảm bảo giữa các threads trong cùng một process.
+"""
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import BinaryIO, Iterator, List, Optional, Union
+from google.api_core.exceptions import NotFound, PreconditionFailed
+from src.shared.storage.base import ObjectInfo, ObjectWriter, StorageBackend
+
+_COPY_BUFFER_SIZE = 1024 * 1024
+# Thư mục chứa temp files của các upload đang ghi (ngoài thư mục bucket để không bị list)
+_UPLOADS_DIR = ".uploads"
+
+
+class _LocalObjectWriter(ObjectWriter):
+    """Ghi vào temp file; commit() move file vào vị trí object."""
+
+    def __init__(self, backend: "LocalStorageBackend", name: str, if_generation_match: Optional[int]):
+        self.backend = backend
+        self.name = name
+        self.if_generation_match = if_generation_match
+        self._file = backend._temp_file()
+        self._md5 = hashlib.md5()
+        self._size = 0
+
+    def write(self, data: bytes) -> int:
+        self._md5.update(data)
+        self._size += len(data)
+        return self._file.write(data)
+
+    def tell(self) -> int:
+        return self._size
+
+    def commit(self) -> ObjectInfo:
+        self._file.close()
+        try:
+            return self.backend._commit(self._file.name, self.name, self.if_generation_match, self._md5)
+        except Exception:
+            self.abort()
+            raise
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self._file.name):
+            os.remove(self._file.name)
+
+
+class LocalStorageBackend(StorageBackend):
+    """StorageBackend trên local disk."""
+
+    def __init__(self, root: str, bucket_name: str):
+        """
+        Khởi tạo backend.
+
+        Args:
+            root: Thư mục gốc (tương đương gcs_root của emulator)
+            bucket_name: Tên bucket (thư mục con của root)
+        """
+        self.root = os.path.abspath(root)
+        self.bucket_name = bucket_name
+        self.bucket_path = os.path.join(self.root, bucket_name)
+        self._lock = threading.Lock()
+
+    def path(self, name: str) -> str:
+        """Đường dẫn file của object."""
+        return os.path.join(self.bucket_path, *name.split("/"))
+
+    def uri(self, name: str) -> str:
+        return f"gs://{self.bucket_name}/{name}"
+
+    def ensure_bucket(self) -> None:
+        os.makedirs(self.bucket_path, exist_ok=True)
+
+    def _temp_file(self):
+        uploads_path = os.path.join(self.root, _UPLOADS_DIR, self.bucket_name)
+        os.makedirs(uploads_path, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=uploads_path, delete=False)
+
+    def _info(self, name: str, md5_hash: Optional[str] = None) -> Optional[ObjectInfo]:
+        try:
+            stat = os.stat(self.path(name))
+        except FileNotFoundError:
+            return None
+        return ObjectInfo(
+            name=name,
+            size=stat.st_size,
+            generation=stat.st_mtime_ns,
+            md5_hash=md5_hash,
+            updated=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+        )
+
+    def _commit(self, temp_path: str, name: str, if_generation_match: Optional[int], md5) -> ObjectInfo:
+        """Move temp file vào vị trí object nếu precondition thỏa mãn."""
+        path = self.path(name)
+        with self._lock:
+            current = self._info(name)
+            current_generation = current.generation if current is not None else 0
+            if if_generation_match is not None and if_generation_match != current_generation:
+                raise PreconditionFailed(
+                    f"Precondition failed for {name}: generation {current_generation} != {if_generation_match}"
+                )
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+            if os.stat(path).st_mtime_ns <= current_generation:
+                # mtime có độ phân giải thấp: đảm bảo generation luôn tăng
+                os.utime(path, ns=(current_generation + 1, current_generation + 1))
+            return self._info(name, md5_hash=base64.b64encode(md5.digest()).decode("ascii"))
+
+    def stat(self, name: str) -> Optional[ObjectInfo]:
+        return self._info(name)
+
+    def put(
+        self,
+        name: str,
+        data: Union[bytes, BinaryIO],
+        content_type: Optional[str] = None,
+        if_generation_match: Optional[int] = None
+    ) -> ObjectInfo:
+        writer = self.open_write(name, content_type=content_type, if_generation_match=if_generation_match)
+        try:
+            if isinstance(data, (bytes, bytearray)):
+                writer.write(bytes(data))
+            else:
+                for block in iter(lambda: data.read(_COPY_BUFFER_SIZE), b""):
+                    writer.write(block)
+        except Exception:
+            writer.abort()
+            raise
+        return writer.commit()
+
+    def open_write(
+        self,
+        name: str,
+        content_type: Optional[str] = None,
+        if_generation_match: Optional[int] = None
+    ) -> ObjectWriter:
+        return _LocalObjectWriter(self, name, if_generation_match)
+
+    def _check_generation(self, name: str, generation: Optional[int]) -> None:
+        info = self._info(name)
+        if info is None or (generation is not None and info.generation != generation):
+            raise NotFound(f"Object {name} (generation {generation}) not found")
+
+    def get(self, name: str, generation: Optional[int] = None) -> bytes:
+        self._check_generation(name, generation)
+        with open(self.path(name), "rb") as source:
+            return source.read()
+
+    def open_read(self, name: str, generation: Optional[int] = None) -> BinaryIO:
+        self._check_generation(name, generation)
+        return open(self.path(name), "rb")
+
+    def list(self, prefix: str = "") -> Iterator[ObjectInfo]:
+        # Chỉ walk thư mục ứng với phần directory của prefix (vd: partition tháng)
+        start_path = self.path(prefix.rsplit("/", 1)[0]) if "/" in prefix else self.bucket_path
+        if not os.path.isdir(start_path):
+            return
+        names = []
+        for directory, _, filenames in os.walk(start_path):
+            relative = os.path.relpath(directory, self.bucket_path)
+            for filename in filenames:
+                name = filename if relative == "." else f"{relative.replace(os.sep, '/')}/{filename}"
+                if name.startswith(prefix):
+                    names.append(name)
+        for name in sorted(names):
+            info = self._info(name)
+            if info is not None:
+                yield info
+
+    def delete(self, names: List[str]) -> int:
+        deleted_count = 0
+        for name in names:
+            try:
+                os.remove(self.path(name))
+            except FileNotFoundError:
+                continue
+            deleted_count += 1
+        return deleted_count
+
+    def compose(
+        self,
+        sources: List[str],
+        destination: str,
+        content_type: Optional[str] = None
+    ) -> ObjectInfo:
+        writer = self.open_write(destination, content_type=content_type)
+        try:
+            for name in sources:
+                with self.open_read(name) as source:
+                    for block in iter(lambda: source.read(_COPY_BUFFER_SIZE), b""):
+                        writer.write(block)
+        except Exception:
+            writer.abort()
+            raise
+        return writer.commit()
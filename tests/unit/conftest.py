@@ -0,0 +1,33 @@
+"""
+Shared fixtures cho unit tests.
+"""
+from unittest.mock import patch
+
+import pytest
+
+from src.config import settings
+
+
+@pytest.fixture
+def emulator(tmp_path):
+    """DuckDB-backed BigQuery emulator (skip nếu chưa cài duckdb); GCS URIs đọc từ tmp_path."""
+    pytest.importorskip("duckdb")
+    from src.shared.bigquery.emulator import DuckDBBigQueryClient
+
+    client = DuckDBBigQueryClient(project=settings.gcp_project, gcs_root=str(tmp_path))
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def bill_loader(emulator, tmp_path):
+    """BillLoader direct load vào emulator; GCS backup được mock (luôn load)."""
+    from src.features.nhanh.bills.components.loader import BillLoader
+
+    with patch("google.cloud.bigquery.Client", return_value=emulator), \
+            patch.object(settings, "gcs_upload_spool_dir", str(tmp_path / "spool")), \
+            patch("src.features.nhanh.bills.components.loader.GCSLoader") as mock_gcs_loader:
+        # Không có backup trước đó trên GCS: luôn load
+        mock_gcs_loader.return_value.is_unchanged.return_value = False
+        mock_gcs_loader.return_value.build_parquet_path.return_value = "nhanh/bills/data.parquet"
+        yield BillLoader(direct_load=True)
@@ -0,0 +1,104 @@
+"""
+Unit tests cho volume anomaly detection.
+File này test VolumeAnomalyDetector với LocalStorageBackend: baseline theo
+cùng thứ trong tuần, hàng đợi re-extract, giới hạn số lần chạy lại và ghi state
+khi hai runs cập nhật cùng lúc.
+"""
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from src.features.nhanh.bills.components.anomaly import VolumeAnomalyDetector
+from src.shared.storage import LocalStorageBackend
+
+DAY = date(2024, 3, 15)
+
+
+@pytest.fixture
+def detector(tmp_path):
+    detector = VolumeAnomalyDetector(
+        LocalStorageBackend(str(tmp_path), 'state'),
+        window_weeks=4,
+        z_threshold=3.0,
+        max_attempts=2
+    )
+    # Baseline: 4 tuần cùng thứ, ~1000 bills / ngày
+    for weeks_back, bills in zip(range(4, 0, -1), [990, 1010, 1000, 1005]):
+        detector.observe(DAY - timedelta(weeks=weeks_back), bills, bills * 3, bills * 100_000.0)
+    return detector
+
+
+class TestVolumeAnomalyDetector:
+    """Test suite cho VolumeAnomalyDetector."""
+
+    def test_not_enough_history_is_not_anomalous(self, tmp_path):
+        """Chưa đủ min_history ngày cùng thứ thì không tính z-score."""
+        detector = VolumeAnomalyDetector(LocalStorageBackend(str(tmp_path), 'state'), window_weeks=4)
+        result = detector.observe(DAY, 10, 30, 1000.0)
+        assert not result.is_anomalous
+        assert result.history_days == 0
+        assert detector.pending() == []
+
+    def test_normal_day_passes(self, detector):
+        """Ngày trong dao động bình thường không bị đưa vào hàng đợi."""
+        result = detector.observe(DAY, 1002, 3006, 100_200_000.0)
+        assert result.history_days == 4
+        assert not result.is_anomalous
+        assert detector.pending() == []
+
+    def test_drop_is_queued_and_cleared_after_reextract(self, detector):
+        """Ngày thiếu ~30% bills được đưa vào hàng đợi; re-extract bình thường thì bỏ khỏi hàng đợi."""
+        result = detector.observe(DAY, 700, 2100, 70_000_000.0)
+        assert result.queued
+        assert set(result.anomalous_metrics) == {"bills", "products", "amount"}
+        assert result.z_scores["bills"] < -3
+        assert detector.pending() == [DAY]
+
+        detector.mark_attempted(DAY)
+        detector.observe(DAY, 1001, 3003, 100_100_000.0)
+        assert detector.pending() == []
+
+    def test_anomalous_day_excluded_from_baseline_and_attempts_limited(self, detector):
+        """Ngày bất thường không vào baseline tuần sau; hết số lần re-extract thì bỏ khỏi hàng đợi."""
+        detector.observe(DAY, 700, 2100, 70_000_000.0)
+        next_week = detector.observe(DAY + timedelta(weeks=1), 1000, 3000, 100_000_000.0)
+        assert next_week.history_days == 3
+        assert not next_week.is_anomalous
+
+        detector.mark_attempted(DAY)
+        assert detector.observe(DAY, 700, 2100, 70_000_000.0).queued
+        detector.mark_attempted(DAY)
+        assert not detector.observe(DAY, 700, 2100, 70_000_000.0).queued
+        assert detector.pending() == []
+
+    def test_missing_amount_is_not_recorded(self, detector):
+        """Amount không tính được (None) không vào history và không được so sánh."""
+        result = detector.observe(DAY, 1000, 3000, None)
+        assert "amount" not in result.z_scores
+        assert not result.is_anomalous
+
+        # Tuần sau: baseline amount chỉ còn 3 ngày có giá trị, vẫn đủ min_history
+        next_week = detector.observe(DAY + timedelta(weeks=1), 1000, 3000, 60_000_000.0)
+        assert next_week.history_days == 4
+        assert next_week.baseline["amount"] == pytest.approx((1010 + 1000 + 1005) * 100_000.0 / 3)
+        assert next_week.anomalous_metrics == ["amount"]
+
+    def test_concurrent_updates_keep_both_runs(self, detector):
+        """Run khác ghi state giữa lúc đọc và ghi → write bị từ chối, observe retry trên bản mới."""
+        other = VolumeAnomalyDetector(detector.backend, window_weeks=4, z_threshold=3.0, max_attempts=2)
+        put = detector.backend.put
+        interleaved = []
+
+        def put_after_other_run(*args, **kwargs):
+            if not interleaved:
+                interleaved.append(True)
+                other.observe(DAY - timedelta(days=1), 700, 2100, None)
+            return put(*args, **kwargs)
+
+        with patch.object(detector.backend, 'put', side_effect=put_after_other_run):
+            detector.observe(DAY, 700, 2100, 70_000_000.0)
+
+        state = detector._load()
+        assert {DAY.isoformat(), (DAY - timedelta(days=1)).isoformat()} <= set(state["days"])
+        assert detector.pending() == [DAY]
@@ -0,0 +1,121 @@
+"""
+Unit tests cho keyed DML helper.
+File này test việc chia batch theo kích thước request và SQL sinh ra bởi KeyedDML.
+"""
+import pytest
+from datetime import date
+from unittest.mock import MagicMock
+from google.cloud import bigquery
+
+from src.shared.bigquery.dml import KeyedDML, batch_keys_by_size, estimate_key_bytes
+
+
+def _mock_client(affected_rows: int = 0) -> MagicMock:
+    """Tạo mock BigQuery client với query job trả về affected_rows."""
+    mock_job = MagicMock()
+    mock_job.num_dml_affected_rows = affected_rows
+    mock_client = MagicMock()
+    mock_client.query.return_value = mock_job
+    return mock_client
+
+
+class TestBatchKeysBySize:
+    """Test suite cho batch_keys_by_size."""
+
+    def test_single_batch_when_under_limit(self):
+        """Nhiều nghìn ids vẫn nằm gọn trong một batch."""
+        keys = list(range(5000))
+        batches = list(batch_keys_by_size(keys))
+        assert len(batches) == 1
+        assert batches[0] == keys
+
+    def test_splits_by_bytes(self):
+        """Chia batch khi vượt quá max_bytes."""
+        keys = list(range(100, 200))
+        per_key = estimate_key_bytes(100)
+        batches = list(batch_keys_by_size(keys, max_bytes=per_key * 30))
+        assert [len(b) for b in batches] == [30, 30, 30, 10]
+        assert sum(batches, []) == keys
+
+    def test_reserved_bytes_exceeds_limit(self):
+        """Raise khi SQL text đã chiếm hết budget."""
+        with pytest.raises(ValueError):
+            list(batch_keys_by_size([1, 2], max_bytes=100, reserved_bytes=200))
+
+
+class TestKeyedDML:
+    """Test suite cho KeyedDML."""
+
+    def test_delete_combines_key_and_partition_conditions(self):
+        """NULL-bill_date cleanup và partition delete nằm trong cùng một statement."""
+        client = _mock_client(affected_rows=7)
+        dml = KeyedDML(client)
+
+        deleted = dml.delete_by_keys(
+            table_id="p.d.products",
+            key_column="bill_id",
+            keys=list(range(3000)),
+            key_condition="bill_date IS NULL",
+            or_condition="bill_date = @partition_date",
+            query_parameters=[
+                bigquery.ScalarQueryParameter("partition_date", "DATE", date(2024, 3, 15))
+            ]
+        )
+
+        assert deleted == 7
+        assert client.query.call_count == 1
+        sql = client.query.call_args[0][0]
+        assert "bill_id IN UNNEST(@keys)" in sql
+        assert "bill_date IS NULL" in sql
+        assert "OR (bill_date = @partition_date)" in sql
+
+        job_config = client.query.call_args[1]['job_config']
+        keys_param = job_config.query_parameters[0]
+        assert keys_param.name == "keys"
+        assert keys_param.array_type == "INT64"
+        assert len(keys_param.values) == 3000
+
+    def test_delete_dedupes_keys(self):
+        """Keys trùng hoặc None bị loại bỏ trước khi gửi."""
+        client = _mock_client()
+        dml = KeyedDML(client)
+
+        dml.delete_by_keys("p.d.t", "id", [1, 1, None, 2])
+
+        job_config = client.query.call_args[1]['job_config']
+        assert job_config.query_parameters[0].values == [1, 2]
+
+    def test_delete_without_keys_runs_or_condition(self):
+        """Không có keys vẫn chạy partition delete."""
+        client = _mock_client()
+        dml = KeyedDML(client)
+
+        dml.delete_by_keys("p.d.t", "id", [], or_condition="d = @d")
+
+        sql = client.query.call_args[0][0]
+        assert "UNNEST" not in sql
+        assert "WHERE d = @d" in sql
+
+    def test_delete_without_keys_or_condition_is_noop(self):
+        """Không có keys và or_condition thì không chạy query nào."""
+        client = _mock_client()
+        dml = KeyedDML(client)
+
+        assert dml.delete_by_keys("p.d.t", "id", []) == 0
+        client.query.assert_not_called()
+
+    def test_or_condition_only_in_first_batch(self):
+        """or_condition chỉ gắn vào batch đầu tiên khi phải chia nhiều batch."""
+        client = _mock_client(affected_rows=1)
+        per_key = estimate_key_bytes(1000)
+        dml = KeyedDML(client, max_request_bytes=per_key * 10 + 400)
+
+        deleted = dml.delete_by_keys(
+            "p.d.t", "id", list(range(1000, 1050)), or_condition="d = @d"
+        )
+
+        sqls = [call[0][0] for call in client.query.call_args_list]
+        assert len(sqls) > 1
+        assert deleted == len(sqls)
+        assert "OR (d = @d)" in sqls[0]
+        assert all("OR (d = @d)" not in sql for sql in sqls[1:])
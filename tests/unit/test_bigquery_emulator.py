@@ -0,0 +1,174 @@
+"""
+Unit tests cho DuckDB-backed BigQuery emulator.
+File này chạy load path thật (BillLoader, KeyedDML) trên DuckDBBigQueryClient, không cần GCP project.
+"""
+import os
+from datetime import date, datetime
+from io import BytesIO
+from unittest.mock import patch
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery
+
+from src.shared.bigquery.dml import KeyedDML
+from src.shared.parquet import records_to_table
+
+
+def _raw_bills(bill_date: str, ids):
+    return [
+        {
+            "id": bill_id,
+            "depotId": 10,
+            "date": bill_date,
+            "type": 2,
+            "customer": {"id": 100 + bill_id, "name": f"Customer {bill_id}"},
+            "payment": {"totalAmount": 1000.0 * bill_id},
+        }
+        for bill_id in ids
+    ]
+
+
+class TestDuckDBBigQueryClient:
+    """Test suite cho DuckDBBigQueryClient."""
+
+    def test_external_table_merge_and_drop(self, emulator, tmp_path):
+        """CREATE EXTERNAL TABLE over local Parquet → MERGE → DROP."""
+        os.makedirs(tmp_path / "bucket" / "nhanh")
+        pq.write_table(
+            pa.table({"id": [1, 2], "amount": [10.0, 20.0]}),
+            str(tmp_path / "bucket" / "nhanh" / "data.parquet")
+        )
+        emulator.create_table(bigquery.Table(
+            "p.nhanhVN.facts",
+            schema=[bigquery.SchemaField("id", "INT64"), bigquery.SchemaField("amount", "FLOAT64")]
+        ))
+
+        emulator.query(
+            "CREATE OR REPLACE EXTERNAL TABLE `p.bronze.ext` "
+            "OPTIONS (format = 'PARQUET', uris = ['gs://bucket/nhanh/data.parquet'])"
+        ).result()
+        job = emulator.query(
+            "MERGE `p.nhanhVN.facts` T USING (SELECT id, amount FROM `p.bronze.ext`) S "
+            "ON FALSE WHEN NOT MATCHED THEN INSERT ROW"
+        )
+        emulator.query("DROP TABLE IF EXISTS `p.bronze.ext`").result()
+
+        assert job.num_dml_affected_rows == 2
+        rows = list(emulator.query("SELECT COUNT(*) AS cnt FROM `p.nhanhVN.facts`").result())
+        assert rows[0].cnt == 2
+        with pytest.raises(NotFound):
+            emulator.get_table("p.bronze.ext")
+
+    def test_keyed_delete_with_array_parameter(self, emulator):
+        """KeyedDML (UNNEST(@keys) + scalar params) chạy được trên emulator."""
+        emulator.query("CREATE TABLE `p.d.products` (bill_id INT64, bill_date DATE)").result()
+        emulator.query(
+            "INSERT INTO `p.d.products` VALUES (1, NULL), (2, NULL), (3, DATE '2024-03-15'), (4, DATE '2024-03-16')"
+        ).result()
+
+        deleted = KeyedDML(emulator).delete_by_keys(
+            table_id="p.d.products",
+            key_column="bill_id",
+            keys=[1],
+            key_condition="bill_date IS NULL",
+            or_condition="bill_date = @partition_date",
+            query_parameters=[bigquery.ScalarQueryParameter("partition_date", "DATE", date(2024, 3, 15))]
+        )
+
+        assert deleted == 2
+        remaining = [row.bill_id for row in emulator.query("SELECT bill_id FROM `p.d.products` ORDER BY 1").result()]
+        assert remaining == [2, 4]
+
+    def test_partition_decorator_replaces_only_that_partition(self, emulator):
+        """Load vào `table$YYYYMMDD` với WRITE_TRUNCATE chỉ thay partition đó."""
+        table = bigquery.Table("p.d.t", schema=[bigquery.SchemaField("id", "INT64"), bigquery.SchemaField("date", "DATE")])
+        table.time_partitioning = bigquery.TimePartitioning(field="date")
+        emulator.create_table(table)
+        emulator.query("INSERT INTO `p.d.t` VALUES (1, DATE '2024-03-15'), (2, DATE '2024-03-16')").result()
+
+        buffer = BytesIO()
+        pq.write_table(pa.table({"id": [3], "date": [date(2024, 3, 15)]}), buffer)
+        buffer.seek(0)
+        emulator.load_table_from_file(
+            buffer, "p.d.t$20240315",
+            job_config=bigquery.LoadJobConfig(write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE)
+        ).result()
+
+        ids = [row.id for row in emulator.query("SELECT id FROM `p.d.t` ORDER BY id").result()]
+        assert ids == [2, 3]
+
+    def test_bill_loader_direct_load_is_idempotent(self, bill_loader, emulator):
+        """BillLoader direct load: staging → MERGE, chạy lại không tạo duplicate."""
+        bills = _raw_bills("2024-03-15", [1, 2, 3])
+
+        bill_loader.load_bills(bills, partition_date=date(2024, 3, 15))
+        bill_loader.load_bills(bills, partition_date=date(2024, 3, 15))
+
+        table = emulator.get_table(bill_loader.bills_table_id)
+        assert table.num_rows == 3
+        assert table.clustering_fields == ["id", "depotId", "customer_id"]
+        rows = list(emulator.query(
+            f"SELECT customer_id FROM `{bill_loader.bills_table_id}` WHERE id = 2"
+        ).result())
+        assert rows[0].customer_id == 102
+
+    def test_bill_loader_records_failed_load(self, bill_loader, emulator):
+        """Load fail không raise nhưng fact table được ghi vào failed_loads."""
+        bills = _raw_bills("2024-03-15", [1, 2])
+
+        with patch.object(bill_loader.staging_loader, "load", side_effect=RuntimeError("quota exceeded")):
+            bill_loader.load_bills(bills, partition_date=date(2024, 3, 15))
+        assert bill_loader.failed_loads == [bill_loader.bills_table_id]
+
+        bill_loader.failed_loads.clear()
+        bill_loader.load_bills(bills, partition_date=date(2024, 3, 15))
+        assert bill_loader.failed_loads == []
+        assert emulator.get_table(bill_loader.bills_table_id).num_rows == 2
+
+    def test_bill_loader_bulk_reload_from_many_files(self, bill_loader, emulator, tmp_path):
+        """Nhiều GCS files → một staging load + một MERGE; key trùng giữa các files giữ row mới nhất."""
+        os.makedirs(tmp_path / "bronze")
+        uris = []
+        for name, bill_date, ids, extracted_at in (
+            ("compacted", "2024-03-15", [1, 2], datetime(2024, 3, 20)),
+            ("day_15", "2024-03-15", [2, 3], datetime(2024, 3, 21)),
+            ("day_16", "2024-03-16", [4], datetime(2024, 3, 21)),
+        ):
+            rows = [bill_loader._flatten_bill(bill, extracted_at) for bill in _raw_bills(bill_date, ids)]
+            pq.write_table(records_to_table("nhanh/bills", rows), str(tmp_path / "bronze" / f"{name}.parquet"))
+            uris.append(f"gs://bronze/{name}.parquet")
+
+        bill_loader.reload_from_gcs(uris + uris[:1], bill_loader.bills_table_id)
+
+        rows = list(emulator.query(
+            f"SELECT id, extraction_timestamp FROM `{bill_loader.bills_table_id}` ORDER BY id"
+        ).result())
+        assert [row.id for row in rows] == [1, 2, 3, 4]
+        assert rows[1].extraction_timestamp.day == 21
+        load_jobs = [job for job in emulator.jobs if hasattr(job, "output_rows")]
+        assert len(load_jobs) == 1
+
+    def test_bulk_reload_deletes_stale_product_lines(self, bill_loader, emulator, tmp_path):
+        """Bulk reload products xóa lines cũ của partitions được reload như load từng partition."""
+        bills = _raw_bills("2024-03-15", [1]) + _raw_bills("2024-03-16", [2])
+        products = [
+            {"bill_id": 1, "id": 7, "amount": 100.0}, {"bill_id": 1, "id": 8, "amount": 200.0},
+            {"bill_id": 2, "id": 9, "amount": 50.0},
+        ]
+        bill_loader.load_bill_products(products[:2], partition_date=date(2024, 3, 15), bills_data=bills)
+        bill_loader.load_bill_products(products[2:], partition_date=date(2024, 3, 16), bills_data=bills)
+
+        # Bill 1 bị sửa: chỉ còn product 7 trong file GCS của ngày 15
+        os.makedirs(tmp_path / "bronze")
+        rows = [bill_loader._flatten_bill_product(products[0], datetime(2024, 3, 20), date(2024, 3, 15))]
+        pq.write_table(records_to_table("nhanh/bill_products", rows), str(tmp_path / "bronze" / "day_15.parquet"))
+
+        bill_loader.reload_from_gcs(["gs://bronze/day_15.parquet"], bill_loader.products_table_id)
+
+        rows = list(emulator.query(
+            f"SELECT bill_id, product_id FROM `{bill_loader.products_table_id}` ORDER BY bill_id, product_id"
+        ).result())
+        assert [(row.bill_id, row.product_id) for row in rows] == [(1, 7), (2, 9)]
@@ -0,0 +1,106 @@
+"""
+Unit tests cho query cost instrumentation.
+File này test InstrumentedClient (labels, cost tracking, budget guard) với mocked BigQuery client.
+"""
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+from google.cloud import bigquery
+
+from src.shared.bigquery.instrumentation import (
+    InstrumentedClient,
+    QueryBudgetExceeded,
+    QueryCostTracker,
+    sanitize_label,
+)
+
+
+def _mock_job(bytes_processed=1000, bytes_billed=10485760, slot_ms=50):
+    job = MagicMock()
+    job.job_id = "job_1"
+    job.statement_type = "MERGE"
+    job.total_bytes_processed = bytes_processed
+    job.total_bytes_billed = bytes_billed
+    job.slot_millis = slot_ms
+    job.started = None
+    job.ended = None
+    job.cache_hit = False
+    return job
+
+
+class TestInstrumentedClient:
+    """Test suite cho InstrumentedClient."""
+
+    def test_sanitize_label(self):
+        """Label values được chuẩn hóa theo rule của BigQuery."""
+        assert sanitize_label(date(2024, 3, 15)) == "20240315"
+        assert sanitize_label("Bill Products") == "bill_products"
+
+    def test_query_labels_and_records_cost(self):
+        """Job được gắn labels pipeline/entity/day và cost được ghi khi result()."""
+        raw_client = MagicMock()
+        raw_client.query.return_value = _mock_job()
+        tracker = QueryCostTracker()
+        client = InstrumentedClient(raw_client, pipeline="nhanh_bills", tracker=tracker, budget_bytes=0)
+
+        with client.labels(entity="bills", day=date(2024, 3, 15)):
+            client.query("MERGE ...").result()
+
+        job_config = raw_client.query.call_args[1]["job_config"]
+        assert job_config.labels == {"pipeline": "nhanh_bills", "entity": "bills", "day": "20240315"}
+
+        report = tracker.report()
+        assert report["jobs"] == 1
+        assert report["bytes_billed"] == 10485760
+        assert report["by_entity"]["nhanh_bills/bills"]["slot_ms"] == 50
+
+    def test_job_config_labels_are_merged(self):
+        """Labels trong QueryJobConfig được giữ lại cùng label pipeline."""
+        raw_client = MagicMock()
+        client = InstrumentedClient(raw_client, pipeline="watermark", tracker=QueryCostTracker(), budget_bytes=0)
+
+        client.query("SELECT 1", job_config=bigquery.QueryJobConfig(labels={"entity": "bills"}))
+
+        job_config = raw_client.query.call_args[1]["job_config"]
+        assert job_config.labels == {"pipeline": "watermark", "entity": "bills"}
+
+    def test_reused_job_config_is_not_mutated(self):
+        """Config dùng lại giữa các jobs không mang labels của job trước (day) sang job sau."""
+        raw_client = MagicMock()
+        client = InstrumentedClient(raw_client, pipeline="nhanh_bills", tracker=QueryCostTracker(), budget_bytes=0)
+        shared_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("id", "INT64", 1)]
+        )
+
+        with client.labels(entity="bills", day=date(2024, 3, 15)):
+            client.query("SELECT 1", job_config=shared_config)
+        client.query("SELECT 2", job_config=shared_config)
+
+        assert shared_config.labels == {}
+        first_config = raw_client.query.call_args_list[0][1]["job_config"]
+        second_config = raw_client.query.call_args_list[1][1]["job_config"]
+        assert first_config.labels["day"] == "20240315"
+        assert second_config.labels == {"pipeline": "nhanh_bills"}
+        assert second_config.query_parameters[0].value == 1
+
+    def test_budget_guard_aborts_expensive_statement(self):
+        """Dry-run vượt budget → raise và không submit job thật."""
+        raw_client = MagicMock()
+        raw_client.query.return_value = _mock_job(bytes_processed=5000)
+        client = InstrumentedClient(raw_client, pipeline="nhanh_bills", tracker=QueryCostTracker(), budget_bytes=1000)
+
+        with pytest.raises(QueryBudgetExceeded):
+            client.query("DELETE FROM t WHERE TRUE")
+
+        assert raw_client.query.call_count == 1
+        assert raw_client.query.call_args[1]["job_config"].dry_run is True
+
+    def test_delegates_other_methods(self):
+        """Các method khác được delegate cho client gốc."""
+        raw_client = MagicMock()
+        client = InstrumentedClient(raw_client, pipeline="nhanh_bills", tracker=QueryCostTracker(), budget_bytes=0)
+
+        client.get_table("p.d.t")
+
+        raw_client.get_table.assert_called_once_with("p.d.t")
@@ -0,0 +1,70 @@
+"""
+Unit tests cho TableProvisioner.
+File này test create/migrate tables theo TableSpec với mocked BigQuery client.
+"""
+from datetime import date
+from unittest.mock import MagicMock
+
+from google.cloud import bigquery
+
+from src.features.nhanh.bills.components.tables import BILLS_TABLE_SPEC
+from src.shared.bigquery.provisioning import TableProvisioner
+
+
+class TestTableProvisioner:
+    """Test suite cho TableProvisioner."""
+
+    def test_ensure_table_creates_partitioned_clustered_table(self):
+        """Table chưa tồn tại được tạo với partition + clustering từ spec."""
+        client = MagicMock()
+        client.get_table.side_effect = Exception("Not found")
+        provisioner = TableProvisioner(client, dataset="nhanhVN")
+
+        assert provisioner.ensure_table(BILLS_TABLE_SPEC) is True
+
+        table = client.create_table.call_args[0][0]
+        assert table.table_id == "fact_sales_bills_v3_0"
+        assert table.time_partitioning.field == "date"
+        assert table.clustering_fields == ["id", "depotId", "customer_id"]
+
+    def test_ensure_table_skips_existing_table(self):
+        """Table đã tồn tại không bị tạo lại."""
+        client = MagicMock()
+        provisioner = TableProvisioner(client, dataset="nhanhVN")
+
+        assert provisioner.ensure_table(BILLS_TABLE_SPEC) is False
+        client.create_table.assert_not_called()
+
+    def test_recluster_updates_spec_and_rewrites_range(self):
+        """recluster() đổi clustering spec và rewrite data trong khoảng partition."""
+        client = MagicMock()
+        client.get_table.return_value = MagicMock(clustering_fields=["depotId", "type"])
+        client.query.return_value.num_dml_affected_rows = 42
+        provisioner = TableProvisioner(client, dataset="nhanhVN")
+
+        result = provisioner.recluster(
+            BILLS_TABLE_SPEC,
+            from_date=date(2024, 1, 1),
+            to_date=date(2024, 1, 31)
+        )
+
+        assert result["spec_changed"] is True
+        assert result["rows_rewritten"] == 42
+        client.update_table.assert_called_once()
+        assert client.update_table.call_args[0][1] == ["clustering_fields"]
+
+        sql = client.query.call_args[0][0]
+        assert "SET id = id" in sql
+        assert "date >= @from_date AND date <= @to_date" in sql
+        params = client.query.call_args[1]["job_config"].query_parameters
+        assert [p.name for p in params] == ["from_date", "to_date"]
+        assert all(isinstance(p, bigquery.ScalarQueryParameter) for p in params)
+
+    def test_apply_clustering_noop_when_up_to_date(self):
+        """Không update table khi clustering spec đã đúng."""
+        client = MagicMock()
+        client.get_table.return_value = MagicMock(clustering_fields=["id", "depotId", "customer_id"])
+        provisioner = TableProvisioner(client, dataset="nhanhVN")
+
+        assert provisioner.apply_clustering(BILLS_TABLE_SPEC) is False
+        client.update_table.assert_not_called()
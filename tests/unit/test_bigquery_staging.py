@@ -0,0 +1,54 @@
+"""
+Unit tests cho Arrow-native staging loader.
+File này test ArrowStagingLoader với LocalStagingClient (không cần BigQuery project).
+"""
+from datetime import date, datetime
+
+from src.shared.bigquery.staging import ArrowStagingLoader, LocalStagingClient
+from src.shared.parquet import records_to_table
+
+
+class TestArrowStagingLoader:
+    """Test suite cho ArrowStagingLoader."""
+
+    def _bills_table(self):
+        """Build Arrow table cho nhanh/bills với explicit schema."""
+        data = [
+            {"id": 1, "date": date(2024, 3, 15), "payment_total_amount": 100.0,
+             "extraction_timestamp": datetime(2024, 3, 16, 1, 2, 3, 456789)},
+            {"id": 2, "date": date(2024, 3, 15), "payment_total_amount": 250.5,
+             "extraction_timestamp": datetime(2024, 3, 16, 1, 2, 3, 456789)},
+        ]
+        return records_to_table("nhanh/bills", data)
+
+    def test_load_round_trips_table(self):
+        """Arrow table được load nguyên vẹn vào staging table."""
+        client = LocalStagingClient()
+        loader = ArrowStagingLoader(client=client, staging_dataset="bronze")
+        table = self._bills_table()
+
+        staging_id = loader.load(table, "proj.nhanhVN.fact_sales_bills_v3_0")
+
+        assert ".bronze.fact_sales_bills_v3_0_staging_" in staging_id
+        loaded = client.tables[staging_id]
+        assert loaded.num_rows == 2
+        assert loaded.column("id").to_pylist() == [1, 2]
+        assert loaded.schema.field("extraction_timestamp").type.unit == "us"
+
+    def test_staging_ids_are_unique(self):
+        """Mỗi lần load tạo staging table riêng."""
+        loader = ArrowStagingLoader(client=LocalStagingClient(), staging_dataset="bronze")
+        first = loader.staging_table_id("p.d.t")
+        second = loader.staging_table_id("p.d.t")
+        assert first != second
+
+    def test_drop_removes_table(self):
+        """drop() xóa staging table và bỏ qua table không tồn tại."""
+        client = LocalStagingClient()
+        loader = ArrowStagingLoader(client=client, staging_dataset="bronze")
+        staging_id = loader.load(self._bills_table(), "p.d.t")
+
+        loader.drop(staging_id)
+        loader.drop(staging_id)
+
+        assert staging_id not in client.tables
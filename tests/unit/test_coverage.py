@@ -0,0 +1,76 @@
+"""
+Unit tests cho bills coverage diagnostics.
+File này test BillCoverageChecker trên DuckDB emulator + LocalStorageBackend:
+một lượt đọc mỗi source cho cả khoảng ngày, diff trong memory.
+"""
+from datetime import date
+from unittest.mock import patch
+
+from src.features.nhanh.bills.components.coverage import BillCoverageChecker, CoverageReport
+from src.shared.gcs import GCSLoader
+from src.shared.storage import LocalStorageBackend
+
+
+class TestBillCoverageChecker:
+    """Test suite cho BillCoverageChecker."""
+
+    def test_check_counts_all_sources_in_one_pass(self, emulator, tmp_path):
+        """Mỗi BigQuery source một query GROUP BY; GCS dùng manifest hoặc listing theo tháng."""
+        backend = LocalStorageBackend(str(tmp_path), 'bronze')
+        loader = GCSLoader(bucket_name='bronze', backend=backend)
+        for day in (14, 15, 16):
+            loader.upload_parquet(
+                'nhanh/bills',
+                [{"id": day, "date": date(2024, 3, day)}],
+                partition_date=date(2024, 3, day)
+            )
+        # bill_products chưa có manifest: đếm bằng listing
+        for day in (14, 15):
+            backend.put(f'nhanh/bill_products/year=2024/month=03/data_2024-03-{day}.parquet', b'x')
+
+        emulator.query("CREATE TABLE `p.bronze.nhanh_bills_raw` (id INT64, date STRING)").result()
+        emulator.query("CREATE TABLE `p.bronze.nhanh_bill_products_raw` (bill_id INT64)").result()
+        emulator.query("CREATE TABLE `p.d.bills` (id INT64, date DATE)").result()
+        emulator.query("CREATE TABLE `p.d.products` (bill_id INT64, bill_date DATE)").result()
+        emulator.query(
+            "INSERT INTO `p.bronze.nhanh_bills_raw` VALUES (1, '2024-03-14'), (2, '2024-03-15'), (3, '2024-03-16')"
+        ).result()
+        emulator.query("INSERT INTO `p.bronze.nhanh_bill_products_raw` VALUES (1), (1), (2)").result()
+        emulator.query("INSERT INTO `p.d.bills` VALUES (1, DATE '2024-03-14'), (2, DATE '2024-03-15')").result()
+        emulator.query(
+            "INSERT INTO `p.d.products` VALUES (1, DATE '2024-03-14'), (2, DATE '2024-03-15')"
+        ).result()
+
+        checker = BillCoverageChecker(
+            emulator, backend, bronze_dataset='bronze',
+            bills_table_id='p.d.bills', products_table_id='p.d.products'
+        )
+        with patch.object(emulator, 'query', wraps=emulator.query) as query_spy:
+            report = checker.check(date(2024, 3, 13), date(2024, 3, 16))
+
+        assert query_spy.call_count == 4
+        assert report.count('gcs_bills', date(2024, 3, 16)) == 1
+        assert report.count('gcs_products', date(2024, 3, 16)) == 0
+        assert report.count('bronze_products', date(2024, 3, 14)) == 2
+        assert [report.status(day) for day in report.dates] == [
+            'missing_gcs', 'partial_fact', 'ok', 'missing_fact'
+        ]
+        assert report.problem_dates()['missing_fact'] == [date(2024, 3, 16)]
+        assert '2024-03-14' in report.format_matrix()
+
+    def test_failed_source_marks_dates_unknown(self):
+        """Source lỗi (None) → status unknown thay vì báo thiếu data."""
+        report = CoverageReport(
+            dates=[date(2024, 3, 15)],
+            counts={
+                'gcs_bills': {date(2024, 3, 15): 1},
+                'gcs_products': {date(2024, 3, 15): 1},
+                'bronze_bills': None,
+                'bronze_products': {},
+                'fact_bills': {},
+                'fact_products': {},
+            }
+        )
+
+        assert report.status(date(2024, 3, 15)) == 'unknown'
+        assert '?' in report.format_matrix()
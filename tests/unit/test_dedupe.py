@@ -0,0 +1,135 @@
+"""
+Unit tests cho incremental dedupe.
+File này test IncrementalDeduper trên DuckDB emulator: chỉ partitions thay đổi
+từ high-water mark được kiểm tra, và các partitions có duplicate được rewrite
+trong một MERGE. INFORMATION_SCHEMA.PARTITIONS không có trong emulator nên
+_partition_times được patch.
+"""
+from datetime import date, datetime, timezone
+from unittest.mock import patch
+
+import pytest
+from google.cloud import bigquery
+
+from src.shared.bigquery import IncrementalDeduper, TableSpec
+from src.shared.storage import LocalStorageBackend
+
+SPEC = TableSpec(
+    table_name="bills",
+    schema=[bigquery.SchemaField("id", "INT64")],
+    partition_field="date",
+    merge_keys=["id", "date"],
+)
+
+
+@pytest.fixture(autouse=True)
+def bills_table(emulator):
+    emulator.query("CREATE TABLE `p.d.bills` (id INT64, date DATE, amount INT64, extraction_timestamp INT64)").result()
+    emulator.query("""
+        INSERT INTO `p.d.bills` VALUES
+            (1, DATE '2024-03-14', 10, 1), (1, DATE '2024-03-14', 11, 2),
+            (2, DATE '2024-03-15', 20, 1), (2, DATE '2024-03-15', 20, 1), (3, DATE '2024-03-15', 30, 1),
+            (4, DATE '2024-03-16', 40, 1), (4, DATE '2024-03-16', 41, 2)
+    """).result()
+
+
+def _ts(hour):
+    return datetime(2024, 3, 17, hour, tzinfo=timezone.utc)
+
+
+class TestIncrementalDeduper:
+    """Test suite cho IncrementalDeduper."""
+
+    def test_run_rewrites_only_changed_partitions(self, emulator, tmp_path):
+        """Partition không đổi từ high-water mark giữ nguyên duplicate; rows trùng hoàn toàn còn một."""
+        deduper = IncrementalDeduper(
+            emulator, SPEC, LocalStorageBackend(str(tmp_path), 'state'), table_id='p.d.bills'
+        )
+        deduper.save_high_water_mark(_ts(1))
+        partition_times = [
+            {date(2024, 3, 15): _ts(2), date(2024, 3, 16): _ts(3)},
+            # Sau MERGE: partitions đã rewrite có last_modified_time mới
+            {date(2024, 3, 16): _ts(5)},
+        ]
+
+        with patch.object(deduper, '_partition_times', side_effect=partition_times) as mock_times:
+            result = deduper.run()
+
+        assert mock_times.call_args_list[0].args == (_ts(1),)
+        assert result.changed_partitions == [date(2024, 3, 15), date(2024, 3, 16)]
+        assert result.excess_rows == {date(2024, 3, 15): 1, date(2024, 3, 16): 1}
+        assert result.rewritten_partitions == [date(2024, 3, 15), date(2024, 3, 16)]
+        assert deduper.load_high_water_mark() == _ts(5)
+
+        rows = emulator.query("SELECT id, amount FROM `p.d.bills` ORDER BY id, amount").result()
+        assert [(row.id, row.amount) for row in rows] == [(1, 10), (1, 11), (2, 20), (3, 30), (4, 41)]
+
+    def test_concurrent_partitions_stay_after_high_water_mark(self, emulator, tmp_path):
+        """Partition do load khác ghi trong lúc dedupe (chưa kiểm tra) không bị vượt qua bởi high-water mark."""
+        deduper = IncrementalDeduper(
+            emulator, SPEC, LocalStorageBackend(str(tmp_path), 'state'), table_id='p.d.bills'
+        )
+        partition_times = [
+            {date(2024, 3, 16): _ts(3)},
+            # Sau MERGE: 03-16 đã rewrite, 03-20 do load khác ghi trước khi MERGE xong
+            {date(2024, 3, 16): _ts(5), date(2024, 3, 20): _ts(4)},
+        ]
+        with patch.object(deduper, '_partition_times', side_effect=partition_times):
+            result = deduper.run()
+        assert result.rewritten_partitions == [date(2024, 3, 16)]
+        assert result.high_water_mark < _ts(4)
+        assert deduper.load_high_water_mark() == result.high_water_mark
+
+        partition_times = [
+            {date(2024, 3, 14): _ts(6)},
+            {date(2024, 3, 14): _ts(8), date(2024, 3, 21): _ts(9)},
+        ]
+        with patch.object(deduper, '_partition_times', side_effect=partition_times):
+            result = deduper.run()
+        assert result.high_water_mark == _ts(8)
+
+    def test_overlapping_runs_never_move_high_water_mark_backwards(self, emulator, tmp_path):
+        """Run khác ghi mốc lớn hơn giữa lúc đọc và ghi → write bị từ chối, mốc lớn hơn được giữ."""
+        backend = LocalStorageBackend(str(tmp_path), 'state')
+        deduper = IncrementalDeduper(emulator, SPEC, backend, table_id='p.d.bills')
+        other = IncrementalDeduper(emulator, SPEC, backend, table_id='p.d.bills')
+        deduper.save_high_water_mark(_ts(1))
+        put = backend.put
+        interleaved = []
+
+        def put_after_other_run(*args, **kwargs):
+            if not interleaved:
+                interleaved.append(True)
+                other.save_high_water_mark(_ts(6))
+            return put(*args, **kwargs)
+
+        partition_times = [{date(2024, 3, 16): _ts(3)}, {date(2024, 3, 16): _ts(5)}]
+        with patch.object(deduper, '_partition_times', side_effect=partition_times), \
+                patch.object(backend, 'put', side_effect=put_after_other_run):
+            result = deduper.run()
+
+        assert result.high_water_mark == _ts(6)
+        assert deduper.load_high_water_mark() == _ts(6)
+
+        # Mốc nhỏ hơn mốc đang lưu không được ghi
+        assert deduper.save_high_water_mark(_ts(2)) == _ts(6)
+        assert deduper.load_high_water_mark() == _ts(6)
+
+    def test_dry_run_and_no_changes(self, emulator, tmp_path):
+        """dry_run chỉ đếm, không rewrite/lưu high-water mark; không có partition đổi thì không query data."""
+        deduper = IncrementalDeduper(
+            emulator, SPEC, LocalStorageBackend(str(tmp_path), 'state'), table_id='p.d.bills'
+        )
+
+        with patch.object(deduper, '_partition_times', return_value={date(2024, 3, 14): _ts(2)}):
+            result = deduper.run(dry_run=True)
+        assert result.total_excess_rows == 1
+        assert result.rewritten_partitions == []
+        assert deduper.load_high_water_mark() is None
+
+        with patch.object(deduper, '_partition_times', return_value={}), \
+                patch.object(emulator, 'query', wraps=emulator.query) as query_spy:
+            result = deduper.run()
+        assert query_spy.call_count == 0
+        assert result.changed_partitions == []
+        assert list(emulator.query("SELECT COUNT(*) AS cnt FROM `p.d.bills`").result())[0].cnt == 7
@@ -0,0 +1,167 @@
+"""
+Unit tests cho GCS Parquet compaction.
+File này test PartitionCompactor (compact tháng đã đóng, cập nhật manifest),
+day-level replace sau khi compact và bỏ qua upload không đổi data, trên
+LocalStorageBackend (thư mục tạm).
+"""
+from datetime import date, datetime
+from io import BytesIO
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+import pytest
+
+from src.shared.gcs import GCSLoader
+from src.shared.parquet import records_to_table
+from src.shared.storage import LocalStorageBackend
+
+
+def _bills(partition_date, start_id, count):
+    return [{"id": start_id + i, "date": partition_date, "payment_total_amount": 1000.0} for i in range(count)]
+
+
+@pytest.fixture
+def loader(tmp_path):
+    """GCSLoader trên local storage backend."""
+    return GCSLoader(bucket_name='test-bucket', backend=LocalStorageBackend(str(tmp_path), 'test-bucket'))
+
+
+def _parquet_objects(loader):
+    return [info.name for info in loader.backend.list() if info.name.endswith('.parquet')]
+
+
+def _read_object_ids(loader, name):
+    return pq.read_table(BytesIO(loader.backend.get(name))).column("id").to_pylist()
+
+
+class TestPartitionCompactor:
+    """Test suite cho PartitionCompactor."""
+
+    @patch('src.shared.gcs.loader.settings')
+    def test_compact_month_rewrites_days_into_one_file(self, mock_settings, loader):
+        """Các file ngày của tháng được gộp thành một compacted file, manifest trỏ vào row groups."""
+        mock_settings.partition_strategy = 'month'
+        mock_settings.gcs_upload_mode = 'stream'
+        mock_settings.gcs_upload_chunk_size_mb = 1
+        mock_settings.parquet_row_group_size = 1000
+        for day in (1, 2, 3):
+            loader.upload_parquet(
+                'nhanh/bills',
+                _bills(date(2024, 3, day), day * 100, 5),
+                partition_date=date(2024, 3, day),
+                metadata={"record_count": 5, "day": day}
+            )
+
+        result = loader.compactor.compact_month('nhanh/bills', 2024, 3)
+
+        assert result['status'] == 'compacted'
+        assert result['source_objects'] == 3
+        assert result['compacted_objects'] == 1
+        data_files = _parquet_objects(loader)
+        assert len(data_files) == 1 and 'compacted_2024-03_' in data_files[0]
+        assert sorted(_read_object_ids(loader, data_files[0])) == sorted(
+            [100 + i for i in range(5)] + [200 + i for i in range(5)] + [300 + i for i in range(5)]
+        )
+
+        manifest = loader.read_manifest('nhanh/bills')
+        assert manifest.complete
+        assert [entry.row_groups for d in manifest.dates() for entry in manifest.entries(d)] == [[0], [1], [2]]
+        # Upload metadata của từng ngày được giữ lại trong footer của compacted file
+        assert loader.read_partition_metadata('nhanh/bills', date(2024, 3, 2)) == [{"record_count": 5, "day": 2}]
+        rebuilt = loader.manifests.rebuild('nhanh/bills')
+        assert {d: rebuilt.row_count(d) for d in rebuilt.dates()} == {date(2024, 3, day): 5 for day in (1, 2, 3)}
+        assert loader.compactor.compact_month('nhanh/bills', 2024, 3)['status'] == 'already_compacted'
+
+    @patch('src.shared.gcs.loader.settings')
+    def test_reupload_after_compaction_replaces_only_that_day(self, mock_settings, loader):
+        """Late correction cho một ngày đã compact: ngày đó được tách ra, không bị trùng data."""
+        mock_settings.partition_strategy = 'month'
+        mock_settings.gcs_upload_mode = 'stream'
+        mock_settings.gcs_upload_chunk_size_mb = 1
+        mock_settings.parquet_row_group_size = 1000
+        for day in (1, 2, 3):
+            loader.upload_parquet('nhanh/bills', _bills(date(2024, 3, day), day * 100, 5), partition_date=date(2024, 3, day))
+        loader.compactor.compact_month('nhanh/bills', 2024, 3)
+
+        loader.upload_parquet('nhanh/bills', _bills(date(2024, 3, 2), 900, 2), partition_date=date(2024, 3, 2))
+
+        all_ids = []
+        for name in _parquet_objects(loader):
+            all_ids.extend(_read_object_ids(loader, name))
+        assert sorted(all_ids) == sorted([100 + i for i in range(5)] + [900, 901] + [300 + i for i in range(5)])
+
+        manifest = loader.read_manifest('nhanh/bills')
+        assert manifest.row_count(date(2024, 3, 2)) == 2
+        assert not manifest.entries(date(2024, 3, 2))[0].is_compacted
+        assert all(manifest.entries(date(2024, 3, day))[0].is_compacted for day in (1, 3))
+
+    def test_open_month_requires_force(self, loader):
+        """Tháng chưa đóng không được compact nếu không có force."""
+        today = date.today()
+        with pytest.raises(ValueError):
+            loader.compactor.compact_month('nhanh/bills', today.year, today.month)
+
+
+class TestSkipUnchangedUploads:
+    """Test suite cho việc bỏ qua upload khi data của ngày không đổi."""
+
+    @pytest.mark.parametrize("upload_mode", ["stream", "spill"])
+    @patch('src.shared.gcs.loader.settings')
+    def test_rerun_with_same_data_skips_upload(self, mock_settings, upload_mode, loader):
+        """Re-run cùng data (chỉ khác extraction_timestamp) không ghi lại object; data đổi thì ghi."""
+        mock_settings.partition_strategy = 'month'
+        mock_settings.gcs_upload_mode = upload_mode
+        mock_settings.gcs_upload_chunk_size_mb = 1
+        mock_settings.parquet_row_group_size = 1000
+        mock_settings.gcs_skip_unchanged_uploads = True
+
+        def _run(extraction_timestamp, count=5):
+            records = [
+                {**record, "extraction_timestamp": extraction_timestamp}
+                for record in _bills(date(2024, 3, 1), 100, count)
+            ]
+            return loader.upload_parquet(
+                'nhanh/bills', records, partition_date=date(2024, 3, 1),
+                metadata={"extraction_timestamp": extraction_timestamp.isoformat()}
+            )
+
+        path = _run(datetime(2024, 3, 2, 1, 0))
+        generation = loader.backend.stat(path).generation
+
+        assert _run(datetime(2024, 3, 3, 1, 0)) == ""
+        assert loader.backend.stat(path).generation == generation
+
+        assert _run(datetime(2024, 3, 4, 1, 0), count=6) == path
+        assert loader.backend.stat(path).generation > generation
+        assert loader.read_manifest('nhanh/bills').row_count(date(2024, 3, 1)) == 6
+
+    @patch('src.shared.gcs.loader.settings')
+    def test_uncommitted_checksum_does_not_skip(self, mock_settings, loader):
+        """Process dừng giữa upload và load (checksum chưa commit) → lần chạy sau upload và load lại."""
+        mock_settings.partition_strategy = 'month'
+        mock_settings.gcs_upload_mode = 'stream'
+        mock_settings.gcs_upload_chunk_size_mb = 1
+        mock_settings.parquet_row_group_size = 1000
+        mock_settings.gcs_skip_unchanged_uploads = True
+        records = _bills(date(2024, 3, 1), 100, 5)
+
+        def _upload():
+            return loader.upload_parquet(
+                'nhanh/bills', records, partition_date=date(2024, 3, 1), commit_checksum=False
+            )
+
+        # Lần chạy 1: upload xong rồi dừng trước BigQuery load (không commit)
+        path = _upload()
+        entry = loader.read_manifest('nhanh/bills').entries(date(2024, 3, 1))[0]
+        assert entry.content_checksum is None and entry.pending_checksum
+        assert loader.is_unchanged('nhanh/bills', date(2024, 3, 1), records_to_table('nhanh/bills', records)) is False
+
+        # Lần chạy 2: không bị bỏ qua; load xong thì commit
+        assert _upload() == path
+        assert loader.commit_content_checksum('nhanh/bills', date(2024, 3, 1), path) is True
+        entry = loader.read_manifest('nhanh/bills').entries(date(2024, 3, 1))[0]
+        assert entry.content_checksum and entry.pending_checksum is None
+        assert loader.is_unchanged('nhanh/bills', date(2024, 3, 1), records_to_table('nhanh/bills', records)) is True
+
+        # Lần chạy 3: đã load với cùng data → bỏ qua
+        assert _upload() == ""
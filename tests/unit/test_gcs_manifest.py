@@ -0,0 +1,122 @@
+"""
+Unit tests cho GCS partition manifest.
+File này test ManifestStore (read-modify-write với generation precondition) và
+việc GCSLoader dùng manifest thay cho listing.
+"""
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pyarrow as pa
+import pytest
+
+from src.shared.gcs.manifest import ManifestEntry, ManifestStore, PartitionManifest, schema_fingerprint
+from src.shared.storage import LocalStorageBackend
+
+
+@pytest.fixture
+def backend(tmp_path):
+    """Local storage backend (generation precondition giống GCS)."""
+    return LocalStorageBackend(str(tmp_path), 'test-bucket')
+
+
+def _entry(name, rows=10):
+    return ManifestEntry(object_name=name, row_count=rows, size_bytes=100, crc32c="abc==")
+
+
+class TestManifestStore:
+    """Test suite cho ManifestStore."""
+
+    def test_load_missing_manifest_returns_empty(self, backend):
+        """Entity chưa có manifest → manifest rỗng, generation 0."""
+        manifest = ManifestStore(backend).load("nhanh/bills")
+
+        assert not manifest.exists
+        assert manifest.dates() == []
+
+    def test_update_roundtrip(self, backend):
+        """Overwrite thay cả partition, append giữ objects cũ."""
+        store = ManifestStore(backend)
+        day = date(2024, 3, 15)
+
+        store.update("nhanh/bills", lambda m: m.add_entry(day, _entry("a.parquet")))
+        store.update("nhanh/bills", lambda m: m.add_entry(day, _entry("b.parquet", rows=5)))
+        manifest = store.load("nhanh/bills")
+        assert [e.object_name for e in manifest.entries(day)] == ["a.parquet", "b.parquet"]
+        assert manifest.row_count(day) == 15
+
+        store.update("nhanh/bills", lambda m: m.set_partition(day, [_entry("c.parquet")]))
+        manifest = store.load("nhanh/bills")
+        assert [e.object_name for e in manifest.entries(day)] == ["c.parquet"]
+        assert manifest.dates() == [day]
+
+    def test_update_retries_on_concurrent_write(self, backend):
+        """Manifest bị writer khác ghi → retry trên bản mới nhất, không mất entry."""
+        store = ManifestStore(backend)
+        stale = store.load("nhanh/bills")
+
+        # Writer khác ghi trước
+        store.update("nhanh/bills", lambda m: m.add_entry(date(2024, 3, 14), _entry("x.parquet")))
+        store.update("nhanh/bills", lambda m: m.add_entry(date(2024, 3, 15), _entry("y.parquet")), manifest=stale)
+
+        manifest = store.load("nhanh/bills")
+        assert manifest.dates() == [date(2024, 3, 14), date(2024, 3, 15)]
+
+    def test_schema_fingerprint_ignores_metadata(self):
+        """Fingerprint chỉ phụ thuộc columns/types, không phụ thuộc metadata."""
+        schema = pa.schema([("id", pa.int64()), ("date", pa.date32())])
+
+        assert schema_fingerprint(schema) == schema_fingerprint(schema.with_metadata({"k": "v"}))
+        assert schema_fingerprint(schema) != schema_fingerprint(pa.schema([("id", pa.string())]))
+
+
+class TestGCSLoaderManifest:
+    """Test suite cho GCSLoader + manifest."""
+
+    @patch('src.shared.storage.gcs.storage')
+    def test_delete_uses_complete_manifest_instead_of_listing(self, mock_storage):
+        """Manifest complete → lấy file timestamped cũ từ manifest, không list prefix."""
+        from src.shared.gcs import GCSLoader
+
+        loader = GCSLoader(bucket_name='test-bucket')
+        partition_path = 'nhanh/bills/year=2024/month=03/'
+        day = date(2024, 3, 15)
+        manifest = PartitionManifest(entity='nhanh/bills', complete=True)
+        manifest.set_partition(day, [
+            _entry(f'{partition_path}data_2024-03-15.parquet'),
+            _entry(f'{partition_path}data_2024-03-15_20240316_010203_000000.parquet'),
+        ])
+
+        with patch.object(loader, 'delete_objects', return_value=1) as mock_delete:
+            deleted = loader._delete_partition_files(partition_path, date_filter=day, manifest=manifest)
+
+        assert deleted == 1
+        loader.backend.bucket.list_blobs.assert_not_called()
+        mock_delete.assert_called_once_with([f'{partition_path}data_2024-03-15_20240316_010203_000000.parquet'])
+
+    @patch('src.shared.storage.gcs.storage')
+    @patch('src.shared.gcs.loader.settings')
+    def test_upload_records_partition_in_manifest(self, mock_settings, mock_storage):
+        """Upload ghi entry (rows, schema fingerprint) của object vào manifest."""
+        mock_settings.partition_strategy = 'month'
+        mock_settings.gcs_upload_mode = 'spill'
+        mock_settings.parquet_row_group_size = 1000
+
+        from src.shared.gcs import GCSLoader
+
+        loader = GCSLoader(bucket_name='test-bucket')
+        loader.backend.bucket.list_blobs.return_value = []
+        loader.backend.bucket.get_blob.return_value = None
+        loader.manifests = MagicMock()
+        loader.manifests.load.return_value = PartitionManifest(entity='nhanh/bills')
+
+        path = loader.upload_parquet('nhanh/bills', [{'id': 1}, {'id': 2}], partition_date=date(2024, 3, 15))
+
+        entity, mutate = loader.manifests.update.call_args[0]
+        manifest = PartitionManifest(entity='nhanh/bills')
+        mutate(manifest)
+        entries = manifest.entries(date(2024, 3, 15))
+        assert entity == 'nhanh/bills'
+        assert len(entries) == 1
+        assert entries[0].row_count == 2
+        assert entries[0].schema_fingerprint is not None
+        assert path == 'nhanh/bills/year=2024/month=03/data_2024-03-15.parquet'
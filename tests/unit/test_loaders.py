@@ -1,16 +1,55 @@
 """
 Unit tests cho loaders module.
-File này test GCSLoader và WatermarkTracker với mocked GCS/BigQuery clients.
+File này test GCSLoader với mocked GCS client và WatermarkTracker với store trong memory.
 """
 import pytest
 from unittest.mock import Mock, patch, MagicMock
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+
+from src.loaders.watermark import MAX_FLUSH_ATTEMPTS, Watermark, WatermarkStore, WatermarkTracker
+from src.shared.exceptions import WatermarkError
+
+T0 = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+
+def _watermark(entity, extracted_at, updated_at):
+    return Watermark(
+        entity=entity,
+        last_extracted_at=extracted_at,
+        last_successful_run=updated_at,
+        records_count=None,
+        updated_at=updated_at
+    )
+
+
+class _FakeWatermarkStore(WatermarkStore):
+    """Watermark store trong memory; conflicts[i] là watermarks run khác ghi ngay trước lần save thứ i."""
+
+    def __init__(self, watermarks=None, conflicts=()):
+        self.watermarks = dict(watermarks or {})
+        self.conflicts = list(conflicts)
+        self.save_calls = 0
+
+    def load_all(self):
+        return dict(self.watermarks)
+
+    def save(self, updates, expected):
+        if self.conflicts:
+            self.watermarks.update(self.conflicts.pop(0))
+        self.save_calls += 1
+        applied = 0
+        for update in updates:
+            current = self.watermarks.get(update.entity)
+            if (current.updated_at if current else None) == expected.get(update.entity):
+                self.watermarks[update.entity] = update
+                applied += 1
+        return applied
 
 
 class TestGCSLoader:
     """Test suite cho GCSLoader."""
     
-    @patch('src.shared.gcs.loader.storage')
+    @patch('src.shared.storage.gcs.storage')
     @patch('src.shared.gcs.loader.settings')
     def test_get_partition_path_month(self, mock_settings, mock_storage):
         """Test _get_partition_path với strategy='month'."""
@@ -29,7 +68,7 @@ class TestGCSLoader:
         
         assert path == 'bills/year=2024/month=03/'
     
-    @patch('src.shared.gcs.loader.storage')
+    @patch('src.shared.storage.gcs.storage')
     @patch('src.shared.gcs.loader.settings')
     def test_get_partition_path_day(self, mock_settings, mock_storage):
         """Test _get_partition_path với strategy='day'."""
@@ -48,7 +87,7 @@ class TestGCSLoader:
         
         assert path == 'bills/year=2024/month=03/day=15/'
     
-    @patch('src.shared.gcs.loader.storage')
+    @patch('src.shared.storage.gcs.storage')
     @patch('src.shared.gcs.loader.settings')
     def test_upload_json_empty_data(self, mock_settings, mock_storage):
         """Test upload_json với empty data trả về empty string."""
@@ -66,7 +105,7 @@ class TestGCSLoader:
         
         assert result == ''
     
-    @patch('src.shared.gcs.loader.storage')
+    @patch('src.shared.storage.gcs.storage')
     @patch('src.shared.gcs.loader.settings')
     def test_upload_json_success(self, mock_settings, mock_storage):
         """Test upload_json với data thành công."""
@@ -74,9 +113,9 @@ class TestGCSLoader:
         mock_settings.partition_strategy = 'month'
         
         mock_blob = MagicMock()
-        mock_blob.exists.return_value = False
         
         mock_bucket = MagicMock()
+        mock_bucket.get_blob.return_value = None
         mock_bucket.blob.return_value = mock_blob
         
         mock_client = MagicMock()
@@ -94,7 +133,7 @@ class TestGCSLoader:
         assert 'bills/' in result
         mock_blob.upload_from_string.assert_called_once()
     
-    @patch('src.shared.gcs.loader.storage')
+    @patch('src.shared.storage.gcs.storage')
     @patch('src.shared.gcs.loader.settings')
     def test_upload_json_file_exists(self, mock_settings, mock_storage):
         """Test upload_json khi file đã tồn tại (idempotent)."""
@@ -102,9 +141,9 @@ class TestGCSLoader:
         mock_settings.partition_strategy = 'month'
         
         mock_blob = MagicMock()
-        mock_blob.exists.return_value = True  # File already exists
         
         mock_bucket = MagicMock()
+        mock_bucket.get_blob.return_value = MagicMock()  # File already exists
         mock_bucket.blob.return_value = mock_blob
         
         mock_client = MagicMock()
@@ -129,134 +168,52 @@ class TestWatermarkTracker:
     @patch('src.loaders.watermark.bigquery')
     @patch('src.loaders.watermark.settings')
     def test_init_creates_client(self, mock_settings, mock_bigquery):
-        """Test __init__ tạo BigQuery client."""
+        """Test __init__ tạo BigQuery client nhưng không gọi metadata API."""
         mock_settings.gcp_project = 'test-project'
         mock_settings.bronze_dataset = 'bronze'
         
         mock_client = MagicMock()
-        mock_client.get_table.side_effect = Exception("Table not found")
-        mock_client.create_table.return_value = MagicMock()
         mock_bigquery.Client.return_value = mock_client
         
-        from src.loaders.watermark import WatermarkTracker
-        
         tracker = WatermarkTracker()
         
-        assert tracker.dataset_id == 'bronze'
-        assert tracker.table_id == 'extraction_watermarks'
+        assert tracker.store.table_id == 'test-project.bronze.extraction_watermarks'
+        mock_client.get_dataset.assert_not_called()
+        mock_client.get_table.assert_not_called()
+        mock_client.query.assert_not_called()
     
-    @patch('src.loaders.watermark.bigquery')
-    @patch('src.loaders.watermark.settings')
-    def test_get_watermark_exists(self, mock_settings, mock_bigquery):
+    def test_get_watermark_exists(self):
         """Test get_watermark khi có watermark."""
-        mock_settings.gcp_project = 'test-project'
-        mock_settings.bronze_dataset = 'bronze'
-        
-        expected_time = datetime(2024, 3, 15, 10, 0, 0)
-        
-        mock_row = MagicMock()
-        mock_row.last_extracted_at = expected_time
-        
-        mock_result = MagicMock()
-        mock_result.__iter__ = lambda self: iter([mock_row])
-        mock_result.__next__ = lambda self: mock_row
-        
-        mock_job = MagicMock()
-        mock_job.result.return_value = mock_result
-        
-        mock_client = MagicMock()
-        mock_client.get_table.return_value = MagicMock()  # Table exists
-        mock_client.query.return_value = mock_job
-        mock_bigquery.Client.return_value = mock_client
+        expected_time = datetime(2024, 3, 15, 10, 0, 0, tzinfo=timezone.utc)
+        store = _FakeWatermarkStore({'bills': _watermark('bills', expected_time, T0)})
         
-        from src.loaders.watermark import WatermarkTracker
-        
-        tracker = WatermarkTracker()
+        tracker = WatermarkTracker(store=store)
         result = tracker.get_watermark('bills')
         
         assert result == expected_time
     
-    @patch('src.loaders.watermark.bigquery')
-    @patch('src.loaders.watermark.settings')
-    def test_get_watermark_not_exists(self, mock_settings, mock_bigquery):
+    def test_get_watermark_not_exists(self):
         """Test get_watermark khi không có watermark."""
-        mock_settings.gcp_project = 'test-project'
-        mock_settings.bronze_dataset = 'bronze'
-        
-        # Empty result
-        mock_result = MagicMock()
-        mock_result.__iter__ = lambda self: iter([])
-        
-        mock_job = MagicMock()
-        mock_job.result.return_value = mock_result
-        
-        mock_client = MagicMock()
-        mock_client.get_table.return_value = MagicMock()
-        mock_client.query.return_value = mock_job
-        mock_bigquery.Client.return_value = mock_client
-        
-        from src.loaders.watermark import WatermarkTracker
-        
-        tracker = WatermarkTracker()
+        tracker = WatermarkTracker(store=_FakeWatermarkStore())
         result = tracker.get_watermark('bills')
         
         assert result is None
     
-    @patch('src.loaders.watermark.bigquery')
-    @patch('src.loaders.watermark.settings')
-    def test_get_incremental_range_with_watermark(self, mock_settings, mock_bigquery):
+    def test_get_incremental_range_with_watermark(self):
         """Test get_incremental_range khi có watermark."""
-        mock_settings.gcp_project = 'test-project'
-        mock_settings.bronze_dataset = 'bronze'
-        
-        watermark_time = datetime(2024, 3, 15, 10, 0, 0)
-        
-        mock_row = MagicMock()
-        mock_row.last_extracted_at = watermark_time
+        watermark_time = datetime(2024, 3, 15, 10, 0, 0, tzinfo=timezone.utc)
+        store = _FakeWatermarkStore({'bills': _watermark('bills', watermark_time, T0)})
         
-        mock_result = MagicMock()
-        mock_result.__iter__ = lambda self: iter([mock_row])
-        mock_result.__next__ = lambda self: mock_row
-        
-        mock_job = MagicMock()
-        mock_job.result.return_value = mock_result
-        
-        mock_client = MagicMock()
-        mock_client.get_table.return_value = MagicMock()
-        mock_client.query.return_value = mock_job
-        mock_bigquery.Client.return_value = mock_client
-        
-        from src.loaders.watermark import WatermarkTracker
-        
-        tracker = WatermarkTracker()
+        tracker = WatermarkTracker(store=store)
         from_date, to_date = tracker.get_incremental_range('bills')
         
         assert from_date == watermark_time
         assert to_date is not None
         assert to_date > from_date
     
-    @patch('src.loaders.watermark.bigquery')
-    @patch('src.loaders.watermark.settings')
-    def test_get_incremental_range_no_watermark(self, mock_settings, mock_bigquery):
+    def test_get_incremental_range_no_watermark(self):
         """Test get_incremental_range khi không có watermark (uses lookback)."""
-        mock_settings.gcp_project = 'test-project'
-        mock_settings.bronze_dataset = 'bronze'
-        
-        # Empty result - no watermark
-        mock_result = MagicMock()
-        mock_result.__iter__ = lambda self: iter([])
-        
-        mock_job = MagicMock()
-        mock_job.result.return_value = mock_result
-        
-        mock_client = MagicMock()
-        mock_client.get_table.return_value = MagicMock()
-        mock_client.query.return_value = mock_job
-        mock_bigquery.Client.return_value = mock_client
-        
-        from src.loaders.watermark import WatermarkTracker
-        
-        tracker = WatermarkTracker()
+        tracker = WatermarkTracker(store=_FakeWatermarkStore())
         from_date, to_date = tracker.get_incremental_range('bills', lookback_hours=2)
         
         # from_date should be approximately 2 hours ago
@@ -266,3 +223,94 @@ class TestWatermarkTracker:
         # Difference should be approximately 2 hours
         delta = to_date - from_date
         assert 1.9 <= delta.total_seconds() / 3600 <= 2.1
+    
+    def test_flush_retries_after_conflict(self):
+        """Run khác ghi watermark cũ hơn giữa lúc đọc và flush → update được áp dụng lại."""
+        store = _FakeWatermarkStore(
+            {'bills': _watermark('bills', T0, T0)},
+            conflicts=[{'bills': _watermark('bills', T0 + timedelta(hours=1), T0 + timedelta(minutes=5))}]
+        )
+        tracker = WatermarkTracker(store=store)
+        tracker.get_watermark('bills')
+        tracker.update_watermark('bills', T0 + timedelta(hours=2), 10)
+        
+        assert tracker.flush() == 1
+        
+        assert store.save_calls == 2
+        assert store.watermarks['bills'].last_extracted_at == T0 + timedelta(hours=2)
+        assert store.watermarks['bills'].records_count == 10
+        assert tracker.get_watermark('bills') == T0 + timedelta(hours=2)
+    
+    def test_flush_keeps_newer_watermark_from_other_run(self):
+        """Run khác ghi watermark mới hơn → giữ watermark đó, không ghi lại."""
+        newer = _watermark('bills', T0 + timedelta(hours=3), T0 + timedelta(minutes=5))
+        store = _FakeWatermarkStore({'bills': _watermark('bills', T0, T0)}, conflicts=[{'bills': newer}])
+        tracker = WatermarkTracker(store=store)
+        tracker.get_watermark('bills')
+        tracker.update_watermark('bills', T0 + timedelta(hours=2))
+        
+        tracker.flush()
+        
+        assert store.save_calls == 1
+        assert store.watermarks['bills'] == newer
+        assert tracker.get_watermark('bills') == T0 + timedelta(hours=3)
+    
+    def test_flush_raises_when_conflict_persists(self):
+        """Conflict ở mọi lần thử → WatermarkError sau MAX_FLUSH_ATTEMPTS lần save."""
+        conflicts = [
+            {'bills': _watermark('bills', T0, T0 + timedelta(minutes=attempt + 1))}
+            for attempt in range(MAX_FLUSH_ATTEMPTS)
+        ]
+        store = _FakeWatermarkStore(conflicts=conflicts)
+        tracker = WatermarkTracker(store=store)
+        tracker.update_watermark('bills', T0 + timedelta(hours=1))
+        
+        with pytest.raises(WatermarkError):
+            tracker.flush()
+        
+        assert store.save_calls == MAX_FLUSH_ATTEMPTS
+        assert store.watermarks['bills'].last_extracted_at == T0
+
+
+class TestGCSLoaderOverwrite:
+    """Test suite cho deterministic overwrite + batched deletes của GCSLoader."""
+    
+    @patch('src.shared.storage.gcs.storage')
+    @patch('src.shared.gcs.loader.settings')
+    def test_overwrite_uses_generation_precondition(self, mock_settings, mock_storage):
+        """Re-run ghi đè object deterministic với if_generation_match = generation hiện tại."""
+        from datetime import date
+        mock_settings.partition_strategy = 'month'
+        mock_settings.gcs_upload_mode = 'spill'
+        mock_settings.parquet_row_group_size = 1000
+        
+        from src.shared.gcs import GCSLoader
+        
+        loader = GCSLoader(bucket_name='test-bucket')
+        loader.backend.bucket.list_blobs.return_value = []
+        loader.backend.bucket.get_blob.return_value = MagicMock(generation=1234)
+        
+        path = loader.upload_parquet('nhanh/bills', [{'id': 1}], partition_date=date(2024, 3, 15))
+        
+        assert path == 'nhanh/bills/year=2024/month=03/data_2024-03-15.parquet'
+        loader.backend.bucket.list_blobs.assert_called_once_with(
+            prefix='nhanh/bills/year=2024/month=03/data_2024-03-15_'
+        )
+        upload_kwargs = loader.backend.bucket.blob.return_value.upload_from_file.call_args[1]
+        assert upload_kwargs['if_generation_match'] == 1234
+    
+    @patch('src.shared.storage.gcs.storage')
+    @patch('src.shared.gcs.loader.settings')
+    def test_delete_objects_uses_batches(self, mock_settings, mock_storage):
+        """delete_objects gom deletes thành batch requests."""
+        from src.shared.gcs import GCSLoader
+        from src.shared.storage.gcs import DELETE_BATCH_SIZE
+        
+        loader = GCSLoader(bucket_name='test-bucket')
+        names = [f'nhanh/bills/year=2024/month=03/data_2024-03-{i:02d}_x.parquet' for i in range(DELETE_BATCH_SIZE + 5)]
+        
+        deleted = loader.delete_objects(names)
+        
+        assert deleted == len(names)
+        assert loader.backend.client.batch.call_count == 2
+        assert loader.backend.bucket.blob.return_value.delete.call_count == len(names)
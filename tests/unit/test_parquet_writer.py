@@ -0,0 +1,206 @@
+"""
+Unit tests cho streaming Parquet writer.
+File này test StreamingParquetWriter và GCSLoader.upload_parquet (stream/spill mode) với mocked GCS.
+"""
+from datetime import date, datetime
+from io import BytesIO
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+import pytest
+
+from src.shared.parquet.footer import read_upload_metadata
+from src.shared.parquet.writer import StreamingParquetWriter, chunk_records
+
+
+def _bill_records(count):
+    """Generator records cho nhanh/bills (không materialize list)."""
+    for bill_id in range(count):
+        yield {
+            "id": bill_id,
+            "date": date(2024, 3, 15),
+            "payment_total_amount": float(bill_id),
+            "extraction_timestamp": datetime(2024, 3, 16, 1, 2, 3, 456789),
+        }
+
+
+class _FakeUploadStream(BytesIO):
+    """Giả lập BlobWriter: giữ lại nội dung khi close()."""
+
+    def __init__(self):
+        super().__init__()
+        self.uploaded = None
+        self.terminated = False
+
+    def close(self):
+        self.uploaded = self.getvalue()
+        super().close()
+
+    def terminate(self):
+        self.terminated = True
+
+
+class TestStreamingParquetWriter:
+    """Test suite cho StreamingParquetWriter."""
+
+    def test_chunk_records_from_generator(self):
+        """Chia generator thành chunks cố định."""
+        chunks = list(chunk_records(iter(range(7)), 3))
+        assert chunks == [[0, 1, 2], [3, 4, 5], [6]]
+
+    def test_writes_one_row_group_per_chunk(self):
+        """Mỗi chunk row_group_size được ghi thành một row group."""
+        sink = BytesIO()
+        with StreamingParquetWriter(sink, entity="nhanh/bills", row_group_size=10) as writer:
+            written = writer.write_records(_bill_records(25))
+
+        assert written == 25
+        sink.seek(0)
+        parquet_file = pq.ParquetFile(sink)
+        assert parquet_file.metadata.num_row_groups == 3
+        table = parquet_file.read()
+        assert table.column("id").to_pylist() == list(range(25))
+        assert table.schema.field("extraction_timestamp").type.unit == "us"
+
+    def test_applies_entity_write_options(self):
+        """Write options của entity: codec, sort order, dictionary columns được ghi vào file."""
+        sink = BytesIO()
+        records = list(_bill_records(20))[::-1]
+        with StreamingParquetWriter(sink, entity="nhanh/bills") as writer:
+            writer.write_records(records)
+
+        sink.seek(0)
+        parquet_file = pq.ParquetFile(sink)
+        row_group = parquet_file.metadata.row_group(0)
+        id_index = parquet_file.schema_arrow.get_field_index("id")
+        date_index = parquet_file.schema_arrow.get_field_index("date")
+        assert row_group.column(id_index).compression == "ZSTD"
+        assert row_group.sorting_columns[0].column_index == id_index
+        assert "RLE_DICTIONARY" not in row_group.column(id_index).encodings
+        assert "RLE_DICTIONARY" in row_group.column(date_index).encodings
+        assert parquet_file.read().column("id").to_pylist() == list(range(20))
+
+    def test_checksum_independent_of_chunk_order(self):
+        """Cùng data ghi thành nhiều chunks theo thứ tự page khác nhau cho cùng content checksum."""
+        from src.shared.parquet.checksum import table_checksum
+        from src.shared.parquet.tables import records_to_table
+
+        records = list(_bill_records(30))
+        shuffled = records[::7] + records[3::7] + records[1::7] + records[5::7] + \
+            records[2::7] + records[6::7] + records[4::7]
+        assert sorted(r["id"] for r in shuffled) == list(range(30))
+
+        checksums = []
+        for ordered, row_group_size in ((records, 30), (shuffled, 8), (shuffled[::-1], 11)):
+            with StreamingParquetWriter(BytesIO(), entity="nhanh/bills", row_group_size=row_group_size) as writer:
+                writer.write_records(ordered)
+            checksums.append(writer.content_checksum)
+        assert len(set(checksums)) == 1
+        assert checksums[0] == table_checksum(records_to_table("nhanh/bills", shuffled))
+
+        changed = [dict(r) for r in records]
+        changed[4]["payment_total_amount"] = 99.0
+        with StreamingParquetWriter(BytesIO(), entity="nhanh/bills", row_group_size=8) as writer:
+            writer.write_records(changed)
+        assert writer.content_checksum != checksums[0]
+
+    def test_write_options_override(self):
+        """Explicit options override registry (vd: snappy cho entity chưa register)."""
+        from src.shared.parquet.schemas import DEFAULT_WRITE_OPTIONS, get_write_options
+
+        assert get_write_options("nhanh/unknown") is DEFAULT_WRITE_OPTIONS
+        options = get_write_options("nhanh/bills").with_overrides(compression="snappy", row_group_size=5)
+
+        sink = BytesIO()
+        with StreamingParquetWriter(sink, entity="nhanh/bills", options=options) as writer:
+            writer.write_records(_bill_records(12))
+
+        sink.seek(0)
+        metadata = pq.ParquetFile(sink).metadata
+        assert metadata.num_row_groups == 3
+        assert metadata.row_group(0).column(0).compression == "SNAPPY"
+
+
+class TestGCSLoaderStreamingUpload:
+    """Test suite cho GCSLoader.upload_parquet với streaming writer."""
+
+    @patch('src.shared.storage.gcs.storage')
+    @patch('src.shared.gcs.loader.settings')
+    def test_stream_mode_writes_into_upload_stream(self, mock_settings, mock_storage):
+        """Stream mode: Parquet được ghi thẳng vào blob.open('wb')."""
+        mock_settings.partition_strategy = 'month'
+        mock_settings.gcs_upload_mode = 'stream'
+        mock_settings.parquet_row_group_size = 10
+        mock_settings.gcs_upload_chunk_size_mb = 8
+
+        from src.shared.gcs import GCSLoader
+
+        loader = GCSLoader(bucket_name='test-bucket')
+        loader.backend.bucket.list_blobs.return_value = []
+        stream = _FakeUploadStream()
+        loader.backend.bucket.blob.return_value.open.return_value = stream
+
+        path = loader.upload_parquet(
+            'nhanh/bills',
+            _bill_records(25),
+            partition_date=date(2024, 3, 15),
+            metadata={"platform": "nhanh", "record_count": 25}
+        )
+
+        assert path == 'nhanh/bills/year=2024/month=03/data_2024-03-15.parquet'
+        # Metadata nằm trong footer, không có object _metadata/*.json riêng
+        loader.backend.bucket.blob.return_value.upload_from_string.assert_not_called()
+        assert not any('_metadata/' in call.args[0] for call in loader.backend.bucket.blob.call_args_list)
+        table = pq.read_table(BytesIO(stream.uploaded))
+        assert table.num_rows == 25
+        assert read_upload_metadata(BytesIO(stream.uploaded)) == {"platform": "nhanh", "record_count": 25}
+
+    @patch('src.shared.storage.gcs.storage')
+    @patch('src.shared.gcs.loader.settings')
+    def test_spill_mode_uploads_temp_file(self, mock_settings, mock_storage):
+        """Spill mode: Parquet được ghi ra temp file rồi upload_from_file."""
+        mock_settings.partition_strategy = 'month'
+        mock_settings.gcs_upload_mode = 'spill'
+        mock_settings.parquet_row_group_size = 10
+
+        from src.shared.gcs import GCSLoader
+
+        loader = GCSLoader(bucket_name='test-bucket')
+        loader.backend.bucket.list_blobs.return_value = []
+        uploaded = {}
+
+        def _capture(file_obj, size=None, content_type=None, **kwargs):
+            uploaded["table"] = pq.read_table(BytesIO(file_obj.read()))
+            uploaded["size"] = size
+
+        loader.backend.bucket.blob.return_value.upload_from_file.side_effect = _capture
+
+        loader.upload_parquet('nhanh/bills', list(_bill_records(5)), partition_date=date(2024, 3, 15))
+
+        assert uploaded["table"].num_rows == 5
+        assert uploaded["size"] > 0
+
+    @patch('src.shared.storage.gcs.storage')
+    @patch('src.shared.gcs.loader.settings')
+    def test_stream_mode_terminates_upload_on_error(self, mock_settings, mock_storage):
+        """Lỗi khi serialize → resumable upload bị hủy."""
+        mock_settings.partition_strategy = 'month'
+        mock_settings.gcs_upload_mode = 'stream'
+        mock_settings.parquet_row_group_size = 10
+        mock_settings.gcs_upload_chunk_size_mb = 8
+
+        from src.shared.gcs import GCSLoader
+
+        loader = GCSLoader(bucket_name='test-bucket')
+        loader.backend.bucket.list_blobs.return_value = []
+        stream = _FakeUploadStream()
+        loader.backend.bucket.blob.return_value.open.return_value = stream
+
+        def _records():
+            yield from _bill_records(15)
+            raise RuntimeError("extractor failed")
+
+        with pytest.raises(RuntimeError):
+            loader.upload_parquet('nhanh/bills', _records(), partition_date=date(2024, 3, 15))
+
+        assert stream.terminated is True
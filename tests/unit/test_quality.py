@@ -172,6 +172,56 @@ class TestValidateRecords:
         assert result.total_records == 0
         assert result.valid_records == 0
         assert result.success_rate == 0.0
+    
+    def test_batch_errors_keep_record_index(self):
+        """Lỗi từ batch validation được gán đúng index và id của record."""
+        from src.quality.validators import validate_records, BillRecord
+        
+        records = [
+            {'id': 1},
+            {'id': 'abc', 'type': 'x'},  # 2 lỗi trong cùng record
+            {'id': 3},
+            {'date': '2024-01-04'}
+        ]
+        
+        result = validate_records(records, BillRecord)
+        
+        assert [e['index'] for e in result.errors] == [1, 3]
+        assert result.errors[0]['record_id'] == 'abc'
+        assert result.errors[0]['error'].startswith('2 validation errors for BillRecord')
+        assert result.errors[1]['record_id'] == 'unknown'
+    
+    def test_sampled_mode(self):
+        """Mode sampled chỉ validate mỗi N records (hoặc random sample cố định)."""
+        from src.quality.validators import validate_records, BillRecord
+        
+        records = [{'id': i} for i in range(10)]
+        records[5] = {'date': '2024-01-01'}  # Không nằm trong mẫu
+        
+        result = validate_records(records, BillRecord, mode='sampled', sample_every=4)
+        assert result.validated_records == 3  # index 0, 4, 8
+        assert result.invalid_records == 0
+        assert result.success_rate == 1.0
+        
+        sampled = validate_records(records, BillRecord, mode='sampled', sample_size=10, seed=1)
+        assert sampled.validated_records == 10
+        assert sampled.invalid_records == 1
+    
+    def test_strict_on_failure_escalates_to_full(self):
+        """Mẫu có lỗi → validate lại toàn bộ để có đủ danh sách lỗi."""
+        from src.quality.validators import validate_records, BillRecord
+        
+        records = [{'id': i} for i in range(10)]
+        records[0] = {}
+        records[5] = {}
+        
+        result = validate_records(records, BillRecord, mode='strict_on_failure', sample_every=4)
+        
+        assert result.validated_records == 10
+        assert [e['index'] for e in result.errors] == [0, 5]
+        
+        with pytest.raises(ValueError):
+            validate_records(records, BillRecord, mode='unknown')
 
 
 class TestDataQualityChecker:
@@ -314,3 +364,144 @@ class TestDataQualityChecker:
         assert 'total_records' in report_dict
         assert 'checks' in report_dict
         assert 'score' in report_dict
+
+
+class TestArrowDataQualityChecker:
+    """Test suite cho DataQualityChecker trên pa.Table (vectorized)."""
+    
+    RECORDS = [
+        {'id': 1, 'name': 'A', 'amount': 100.0},
+        {'id': 1, 'name': '', 'amount': -5.0},  # Duplicate id, name rỗng, amount âm
+        {'id': 2, 'name': None, 'amount': 20.0},
+        {'id': None, 'name': 'D', 'amount': None}
+    ]
+    
+    def test_same_report_as_dict_records(self):
+        """pa.Table cho cùng QualityReport với list of dicts."""
+        import pyarrow as pa
+        from src.quality.checks import DataQualityChecker
+        
+        def run(records):
+            checker = DataQualityChecker('test', records)
+            checker.check_nulls(['id', 'name', 'missing'])
+            checker.check_duplicates(['id'])
+            checker.check_data_types({'id': int, 'name': str})
+            checker.check_ranges({'amount': (0, None), 'id': (None, 1)})
+            return checker.report.to_dict()
+        
+        from_dicts = run(self.RECORDS)
+        from_table = run(pa.Table.from_pylist(self.RECORDS))
+        
+        assert from_table['total_records'] == 4
+        assert from_table['checks'] == from_dicts['checks']
+        checks = {c['name']: c['details'] for c in from_table['checks']}
+        assert checks['null_check']['null_counts'] == {'id': 1, 'name': 2, 'missing': 4}
+        assert checks['duplicate_check']['duplicate_count'] == 1
+        assert checks['duplicate_check']['examples'] == [{'id': 1}]
+        assert checks['range_check']['out_of_range'] == {'amount': 1, 'id': 1}
+    
+    def test_type_check_uses_column_type(self):
+        """Column sai type: mọi giá trị không null đều tính là lỗi."""
+        import pyarrow as pa
+        from src.quality.checks import DataQualityChecker
+        
+        table = pa.table({'id': pa.array(['1', '2', None]), 'name': pa.array(['A', 'B', 'C'])})
+        checker = DataQualityChecker('test', table)
+        result = checker.check_data_types({'id': int, 'name': str})
+        
+        assert result.passed is False
+        assert result.details['type_errors'] == {'id': 2, 'name': 0}
+    
+    def test_empty_table(self):
+        """Table rỗng: checks pass với 'No records to check'."""
+        import pyarrow as pa
+        from src.quality.checks import DataQualityChecker
+        
+        checker = DataQualityChecker('bills', pa.table({'id': pa.array([], pa.int64())}))
+        report = checker.run_all_checks()
+        
+        assert report.total_records == 0
+        assert report.passed is True
+
+
+class TestStreamingQualityStats:
+    """Test suite cho StreamingQualityStats và quality reports của BillExtractor."""
+    
+    def test_accumulates_pages_into_report(self):
+        """Statistics cộng dồn qua nhiều pages cho cùng kết quả như một lượt."""
+        from src.quality.streaming import StreamingQualityStats
+        
+        stats = StreamingQualityStats(
+            'nhanh/bills',
+            required_fields=['id', 'payment.amount'],
+            amount_fields={'payment.amount': (0, None)},
+            group_field='depotId'
+        )
+        stats.update([
+            {'id': 1, 'depotId': 10, 'payment': {'amount': 100}},
+            {'id': 2, 'depotId': 10, 'payment': None},
+        ])
+        stats.update([
+            {'id': 1, 'depotId': 20, 'payment': {'amount': -50}},
+        ])
+        report = stats.to_report()
+        checks = {check.check_name: check for check in report.checks}
+        
+        assert report.total_records == 3
+        assert checks['null_check'].details['null_counts'] == {'id': 0, 'payment.amount': 1}
+        assert checks['duplicate_check'].details['duplicate_count'] == 1
+        assert checks['duplicate_check'].passed is False
+        assert checks['range_check'].details['out_of_range'] == {'payment.amount': 1}
+        assert report.metrics['amount_min'] == {'payment.amount': -50.0}
+        assert report.metrics['amount_max'] == {'payment.amount': 100.0}
+        assert report.metrics['depotId_counts'] == {'10': 2, '20': 1}
+    
+    def test_extractor_emits_report_per_day(self):
+        """BillExtractor tích lũy statistics theo page và xuất report cho từng ngày."""
+        from unittest.mock import patch
+        from datetime import date
+        
+        pages = [
+            [{'id': 1, 'date': '2024-03-15 09:00:00', 'depotId': 1, 'type': 2, 'mode': 2, 'payment': {'amount': 10}}],
+            [{'id': 2, 'date': '2024-03-16 09:00:00', 'depotId': 1, 'type': 2, 'mode': 2, 'payment': {'amount': 20}},
+             {'id': 2, 'date': '2024-03-16 10:00:00', 'depotId': 1, 'type': 2, 'mode': 2, 'payment': {'amount': 20}}],
+        ]
+        
+        def fetch_paginated(endpoint, body, on_page=None):
+            for page in pages:
+                on_page(page)
+            return [bill for page in pages for bill in page]
+        
+        with patch('src.features.nhanh.bills.components.extractor.NhanhApiClient') as mock_client_cls:
+            from src.features.nhanh.bills.components.extractor import BillExtractor
+            mock_client_cls.return_value.split_date_range.return_value = [
+                (datetime(2024, 3, 15), datetime(2024, 3, 16))
+            ]
+            mock_client_cls.return_value.fetch_paginated.side_effect = fetch_paginated
+            extractor = BillExtractor()
+            bills = extractor.fetch_bills(from_date=datetime(2024, 3, 15), to_date=datetime(2024, 3, 16))
+        
+        assert len(bills) == 3
+        assert sorted(extractor.quality_reports) == [date(2024, 3, 15), date(2024, 3, 16)]
+        assert extractor.quality_reports[date(2024, 3, 15)].passed is True
+        assert extractor.quality_reports[date(2024, 3, 16)].total_records == 2
+        assert extractor.quality_reports[date(2024, 3, 16)].passed is False
+        assert extractor.failed_chunks == []
+    
+    def test_extractor_records_failed_chunks(self):
+        """Chunk fetch lỗi không raise nhưng được ghi vào failed_chunks, không có quality report."""
+        from unittest.mock import patch
+        from datetime import date
+        
+        with patch('src.features.nhanh.bills.components.extractor.NhanhApiClient') as mock_client_cls:
+            from src.features.nhanh.bills.components.extractor import BillExtractor
+            mock_client_cls.return_value.split_date_range.return_value = [
+                (datetime(2024, 3, 15), datetime(2024, 3, 15, 23, 59, 59))
+            ]
+            mock_client_cls.return_value.fetch_paginated.side_effect = RuntimeError("API timeout")
+            extractor = BillExtractor()
+            bills = extractor.fetch_bills(from_date=datetime(2024, 3, 15), to_date=datetime(2024, 3, 15))
+        
+        assert bills == []
+        assert extractor.failed_chunks == [(date(2024, 3, 15), date(2024, 3, 15))]
+        assert extractor.quality_reports == {}
@@ -0,0 +1,73 @@
+"""
+Unit tests cho raw API response archive.
+File này test RawArchive (JSONL zstd theo ngày) và việc BillExtractor archive
+raw bills khi fetch, trên LocalStorageBackend.
+"""
+from datetime import date, datetime
+from unittest.mock import patch
+
+import pytest
+
+from src.shared.gcs import RawArchive
+from src.shared.storage import LocalStorageBackend
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return RawArchive(LocalStorageBackend(str(tmp_path), 'test-bucket'))
+
+
+class TestRawArchive:
+    """Test suite cho RawArchive."""
+
+    def test_write_read_roundtrip(self, archive):
+        """Records được ghi nén zstd và đọc lại nguyên vẹn; ngày chưa archive trả về None."""
+        bills = [
+            {"id": 1, "date": "2024-03-15", "customer": {"name": "Nguyễn Văn A"}, "products": {"7": {"price": 10}}},
+            {"id": 2, "date": "2024-03-15", "payment": None},
+        ]
+
+        path = archive.write('nhanh/bills', date(2024, 3, 15), bills)
+        archive.write('nhanh/bills', date(2024, 3, 16), [])
+
+        assert path == 'raw/nhanh/bills/year=2024/month=03/bills_2024-03-15.jsonl.zst'
+        assert archive.backend.get(path)[:4] == b'\x28\xb5\x2f\xfd'  # zstd magic number
+        assert archive.read('nhanh/bills', date(2024, 3, 15)) == bills
+        assert archive.read('nhanh/bills', date(2024, 3, 16)) == []
+        assert archive.read('nhanh/bills', date(2024, 3, 17)) is None
+
+
+class TestBillExtractorRawArchive:
+    """Test suite cho raw archive trong BillExtractor."""
+
+    @patch('src.features.nhanh.bills.components.extractor.NhanhApiClient')
+    def test_fetch_archives_full_days_and_split_products_from_archive(self, mock_client_cls, archive):
+        """Bills của chunk được archive theo ngày; split_products trên archive cho cùng kết quả."""
+        from src.features.nhanh.bills.components.extractor import BillExtractor
+
+        raw_bills = [
+            {"id": 1, "date": "2024-03-15 09:00:00", "products": [{"id": 5, "quantity": 2}]},
+            {"id": 2, "date": "2024-03-16 10:00:00", "products": []},
+        ]
+        mock_client_cls.return_value.split_date_range.return_value = [
+            (datetime(2024, 3, 15), datetime(2024, 3, 17))
+        ]
+        mock_client_cls.return_value.fetch_paginated.return_value = raw_bills
+        extractor = BillExtractor(raw_archive=archive)
+
+        bills, products = extractor.extract_with_products(
+            from_date=datetime(2024, 3, 15), to_date=datetime(2024, 3, 17)
+        )
+
+        assert archive.read('nhanh/bills', date(2024, 3, 15)) == raw_bills[:1]
+        assert archive.read('nhanh/bills', date(2024, 3, 16)) == raw_bills[1:]
+        assert archive.read('nhanh/bills', date(2024, 3, 17)) == []
+        assert extractor.split_products(archive.read('nhanh/bills', date(2024, 3, 15))) == (bills[:1], products)
+
+        # Filter khác ngoài bill date → data không đầy đủ, không archive
+        mock_client_cls.return_value.split_date_range.return_value = [
+            (datetime(2024, 3, 18), datetime(2024, 3, 18))
+        ]
+        extractor.fetch_bills(from_date=datetime(2024, 3, 18), to_date=datetime(2024, 3, 18), modes=[2])
+        assert mock_client_cls.return_value.fetch_paginated.call_count == 2
+        assert archive.read('nhanh/bills', date(2024, 3, 18)) is None
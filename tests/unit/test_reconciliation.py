@@ -0,0 +1,96 @@
+"""
+Unit tests cho bills reconciliation.
+File này test BillReconciler: reconcile() là full outer join trong memory giữa bills
+và product lines (bill không có line nào, line không có bill, tổng tiền lệch), và
+run() thay partition của ngày trong exceptions table trên DuckDB emulator.
+"""
+from datetime import date
+
+import pyarrow as pa
+
+from src.features.nhanh.bills.components.reconciliation import EXCEPTIONS_SCHEMA, BillReconciler
+
+DAY = date(2024, 3, 15)
+
+
+def _pairs(exceptions):
+    return list(zip(exceptions.column("bill_id").to_pylist(), exceptions.column("reason").to_pylist()))
+
+
+class TestBillReconciler:
+    """Test suite cho BillReconciler."""
+
+    def test_bill_without_product_lines(self):
+        """Bill có tổng tiền nhưng không có product line nào là missing_products; bill 0 đồng không bị đánh dấu."""
+        reconciler = BillReconciler(None, table_id="p.d.exceptions", tolerance=1.0, relative_tolerance=0.001)
+        bills = pa.table({
+            "id": [1, 2, 3],
+            "depotId": [10, 10, 11],
+            "payment_total_amount": [300.0, 0.0, 80.0],
+        })
+        products = pa.table({"bill_id": [1, 1], "amount": [100.0, 200.0]})
+
+        exceptions = reconciler.reconcile(bills, products, DAY)
+
+        assert exceptions.schema == EXCEPTIONS_SCHEMA
+        assert _pairs(exceptions) == [(3, "missing_products")]
+        row = exceptions.to_pylist()[0]
+        assert row["depotId"] == 11
+        assert row["line_count"] is None
+        assert row["difference"] == 80.0
+
+    def test_product_lines_without_bill(self):
+        """Product lines có bill_id không nằm trong bills của ngày là missing_bill, kể cả khi không có bill nào."""
+        reconciler = BillReconciler(None, table_id="p.d.exceptions", tolerance=1.0, relative_tolerance=0.001)
+        products = pa.table({"bill_id": [9, 9, 1], "amount": [10.0, 5.0, 40.0], "discount": [1.0, 0.0, 0.0]})
+
+        exceptions = reconciler.reconcile(pa.table({"id": [1], "payment_total_amount": [40.0]}), products, DAY)
+        assert _pairs(exceptions) == [(9, "missing_bill")]
+        row = exceptions.to_pylist()[0]
+        assert row["bill_date"] == DAY
+        assert row["payment_total_amount"] is None
+        assert (row["line_amount_sum"], row["line_discount_sum"], row["line_count"]) == (15.0, 1.0, 2)
+
+        empty_bills = pa.table({"id": pa.array([], pa.int64())})
+        assert _pairs(reconciler.reconcile(empty_bills, products, DAY)) == [(1, "missing_bill"), (9, "missing_bill")]
+
+    def test_bill_reconciliation_writes_day_exceptions(self, bill_loader, emulator):
+        """Bills lệch tổng product lines được ghi vào exceptions table; chạy lại thay partition của ngày."""
+        bills = [
+            {"id": 1, "depotId": 10, "date": "2024-03-15", "payment": {"amount": 300.0, "discount": 0}},
+            # Khớp sau khi trừ chiết khấu hóa đơn
+            {"id": 2, "depotId": 10, "date": "2024-03-15", "payment": {"amount": 90.0, "discount": 10.0}},
+            {"id": 3, "depotId": 10, "date": "2024-03-15", "payment": {"amount": 500.0}},
+            {"id": 4, "depotId": 11, "date": "2024-03-15", "payment": {"amount": 50.0}},
+        ]
+        products = [
+            {"bill_id": 1, "id": 7, "amount": 100.0}, {"bill_id": 1, "id": 8, "amount": 200.0},
+            {"bill_id": 2, "id": 7, "amount": 100.0},
+            {"bill_id": 3, "id": 7, "amount": 450.0},
+            {"bill_id": 9, "id": 7, "amount": 10.0},
+        ]
+        bill_loader.load_bills(bills, partition_date=date(2024, 3, 15))
+        bill_loader.load_bill_products(products, partition_date=date(2024, 3, 15), bills_data=bills)
+
+        reconciler = BillReconciler(emulator, tolerance=1.0, relative_tolerance=0.001)
+        exceptions = reconciler.run(
+            bill_loader.flattened_tables["nhanh/bills"],
+            bill_loader.flattened_tables["nhanh/bill_products"],
+            date(2024, 3, 15)
+        )
+
+        assert list(zip(exceptions.column("bill_id").to_pylist(), exceptions.column("reason").to_pylist())) == [
+            (3, "amount_mismatch"), (9, "missing_bill"), (4, "missing_products")
+        ]
+        rows = list(emulator.query(
+            f"SELECT bill_id, difference FROM `{reconciler.table_id}` WHERE reason = 'amount_mismatch'"
+        ).result())
+        assert [(row.bill_id, row.difference) for row in rows] == [(3, 50.0)]
+
+        # Chạy lại sau khi sửa data: partition của ngày được thay hoàn toàn
+        reconciler.run(
+            pa.table({"id": [1], "payment_total_amount": [5.0]}),
+            pa.table({"bill_id": [1], "amount": [5.0]}),
+            date(2024, 3, 15)
+        )
+        assert emulator.get_table(reconciler.table_id).num_rows == 0
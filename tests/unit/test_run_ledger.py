@@ -0,0 +1,143 @@
+"""
+Unit tests cho run ledger.
+File này test RunLedger trên DuckDB emulator (một MERGE mỗi flush, entry sau
+cùng của một ngày thắng) và việc BillPipeline bỏ qua các ngày đã completed
+(ngày có API fetch hoặc BigQuery load fail không được ghi là completed).
+"""
+from datetime import date, datetime
+from unittest.mock import MagicMock
+
+from src.config import settings
+from src.loaders.run_ledger import STATUS_COMPLETED, STATUS_FAILED, RunLedger
+
+class TestRunLedger:
+    """Test suite cho RunLedger."""
+
+    def test_flush_merges_entries_in_one_statement(self, emulator):
+        """Ngày failed được ghi đè bởi lần chạy lại completed; chỉ ngày completed được trả về."""
+        assert RunLedger(emulator).completed_days("nhanh/bills", date(2024, 3, 1), date(2024, 3, 31)) == {}
+
+        ledger = RunLedger(emulator)
+        ledger.record("nhanh/bills", date(2024, 3, 1), STATUS_COMPLETED, records_count=10, checksum="abc")
+        ledger.record("nhanh/bills", date(2024, 3, 2), STATUS_FAILED, error="timeout")
+        ledger.record("nhanh/orders", date(2024, 3, 2), STATUS_COMPLETED, records_count=3)
+        jobs_before = len(emulator.jobs)
+        assert ledger.flush() == 3
+        merges = [job for job in emulator.jobs[jobs_before:] if getattr(job, "statement_type", None) == "MERGE"]
+        assert len(merges) == 1
+        assert ledger.pending == []
+
+        completed = RunLedger(emulator).completed_days("nhanh/bills", date(2024, 3, 1), date(2024, 3, 31))
+        assert list(completed) == [date(2024, 3, 1)]
+        assert completed[date(2024, 3, 1)].records_count == 10
+        assert completed[date(2024, 3, 1)].checksum == "abc"
+
+        rerun = RunLedger(emulator)
+        rerun.record("nhanh/bills", date(2024, 3, 2), STATUS_COMPLETED, records_count=7)
+        rerun.flush()
+        completed = rerun.completed_days("nhanh/bills", date(2024, 3, 2), date(2024, 3, 2))
+        assert completed[date(2024, 3, 2)].records_count == 7
+        assert completed[date(2024, 3, 2)].error is None
+        rows = list(emulator.query(f"SELECT COUNT(*) AS cnt FROM `{rerun.table_id}`").result())
+        assert rows[0].cnt == 3
+
+
+class TestPipelineSkipCompleted:
+    """Test BillPipeline.run_extract_load với skip_completed."""
+
+    def _pipeline(self, completed_days=None, run_ledger=None):
+        from src.features.nhanh.bills.pipeline import BillPipeline
+
+        pipeline = BillPipeline.__new__(BillPipeline)
+        pipeline.loader = MagicMock(platform="nhanh", entity="bills", flattened_tables={}, failed_loads=[])
+        pipeline.extractor = MagicMock(quality_reports={}, failed_chunks=[])
+        pipeline.extractor.client.split_date_range_by_day.return_value = [
+            (datetime(2024, 3, day), datetime(2024, 3, day, 23, 59, 59)) for day in (1, 2, 3)
+        ]
+        pipeline.extractor.extract_with_products.return_value = ([{"id": 1}], [])
+        if run_ledger is None:
+            run_ledger = MagicMock()
+            run_ledger.completed_days.return_value = completed_days
+        pipeline.run_ledger = run_ledger
+        return pipeline
+
+    def test_completed_days_are_skipped_unless_forced(self, monkeypatch):
+        """Ngày completed bị bỏ qua với skip_completed; mọi ngày đã chạy được ghi vào ledger và flush một lần."""
+        monkeypatch.setattr(settings, "reconciliation_enabled", False)
+        monkeypatch.setattr(settings, "volume_anomaly_enabled", False)
+        monkeypatch.setattr(settings, "run_ledger_enabled", True)
+
+        pipeline = self._pipeline({date(2024, 3, 1): MagicMock(), date(2024, 3, 2): MagicMock()})
+        result = pipeline.run_extract_load(skip_completed=True)
+        assert result["days_skipped_completed"] == ["2024-03-01", "2024-03-02"]
+        assert result["days_processed"] == 1
+        recorded = [call.args[:3] for call in pipeline.run_ledger.record.call_args_list]
+        assert recorded == [("nhanh/bills", date(2024, 3, 3), STATUS_COMPLETED)]
+        pipeline.run_ledger.flush.assert_called_once()
+
+        pipeline = self._pipeline({date(2024, 3, 1): MagicMock()})
+        result = pipeline.run_extract_load()
+        pipeline.run_ledger.completed_days.assert_not_called()
+        assert result["days_processed"] == 3
+
+    def test_failed_load_is_not_completed(self, monkeypatch, emulator):
+        """Load fail (loader trả về không raise) → ngày ghi failed và được chạy lại ở run sau."""
+        monkeypatch.setattr(settings, "reconciliation_enabled", False)
+        monkeypatch.setattr(settings, "volume_anomaly_enabled", False)
+        monkeypatch.setattr(settings, "run_ledger_enabled", True)
+
+        pipeline = self._pipeline(run_ledger=RunLedger(emulator))
+
+        def _load_bills(data, partition_date):
+            if partition_date == date(2024, 3, 2):
+                pipeline.loader.failed_loads.append("p.d.fact_sales_bills")
+            return ""
+
+        pipeline.loader.load_bills.side_effect = _load_bills
+        result = pipeline.run_extract_load(skip_completed=True)
+        assert result["days_failed_load"] == ["2024-03-02"]
+        assert result["days_processed"] == 2
+
+        completed = RunLedger(emulator).completed_days("nhanh/bills", date(2024, 3, 1), date(2024, 3, 3))
+        assert sorted(completed) == [date(2024, 3, 1), date(2024, 3, 3)]
+
+        pipeline = self._pipeline(run_ledger=RunLedger(emulator))
+        result = pipeline.run_extract_load(skip_completed=True)
+        assert result["days_skipped_completed"] == ["2024-03-01", "2024-03-03"]
+        assert result["days_processed"] == 1
+        assert result["days_failed_load"] == []
+        pipeline.loader.load_bills.assert_called_once()
+        assert pipeline.loader.load_bills.call_args.kwargs["partition_date"] == date(2024, 3, 2)
+
+    def test_failed_fetch_is_not_completed(self, monkeypatch, emulator):
+        """Fetch lỗi (extractor trả về rỗng, không raise) → ngày ghi failed, không observe volume, run sau chạy lại."""
+        monkeypatch.setattr(settings, "reconciliation_enabled", False)
+        monkeypatch.setattr(settings, "volume_anomaly_enabled", True)
+        monkeypatch.setattr(settings, "run_ledger_enabled", True)
+
+        pipeline = self._pipeline(run_ledger=RunLedger(emulator))
+        pipeline.volume_detector = MagicMock()
+
+        def _extract(from_date, to_date, process_by_day):
+            if from_date.date() == date(2024, 3, 2):
+                pipeline.extractor.failed_chunks = [(date(2024, 3, 2), date(2024, 3, 2))]
+                return [], []
+            pipeline.extractor.failed_chunks = []
+            return [{"id": 1}], []
+
+        pipeline.extractor.extract_with_products.side_effect = _extract
+        result = pipeline.run_extract_load(skip_completed=True)
+        assert result["days_failed_extract"] == ["2024-03-02"]
+        assert result["days_processed"] == 2
+        observed = [call.args[0] for call in pipeline.volume_detector.observe.call_args_list]
+        assert observed == [date(2024, 3, 1), date(2024, 3, 3)]
+
+        completed = RunLedger(emulator).completed_days("nhanh/bills", date(2024, 3, 1), date(2024, 3, 3))
+        assert sorted(completed) == [date(2024, 3, 1), date(2024, 3, 3)]
+
+        pipeline = self._pipeline(run_ledger=RunLedger(emulator))
+        pipeline.volume_detector = MagicMock()
+        result = pipeline.run_extract_load(skip_completed=True)
+        assert result["days_skipped_completed"] == ["2024-03-01", "2024-03-03"]
+        assert result["days_processed"] == 1
+        assert result["days_failed_extract"] == []
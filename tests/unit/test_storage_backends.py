@@ -0,0 +1,82 @@
+"""
+Unit tests cho storage backends.
+File này test LocalStorageBackend (generation precondition, stream write, list,
+compose) và việc chọn backend theo settings.
+"""
+from unittest.mock import patch
+
+import pytest
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from src.shared.storage import GCSStorageBackend, LocalStorageBackend, get_storage_backend
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return LocalStorageBackend(str(tmp_path), 'test-bucket')
+
+
+class TestLocalStorageBackend:
+    """Test suite cho LocalStorageBackend."""
+
+    def test_put_respects_generation_precondition(self, backend):
+        """if_generation_match=0 chỉ ghi khi object chưa tồn tại; generation tăng sau mỗi lần ghi."""
+        first = backend.put('a/b.json', b'v1', if_generation_match=0)
+
+        with pytest.raises(PreconditionFailed):
+            backend.put('a/b.json', b'v2', if_generation_match=0)
+        second = backend.put('a/b.json', b'v2', if_generation_match=first.generation)
+
+        assert second.generation > first.generation
+        assert backend.get('a/b.json') == b'v2'
+        with pytest.raises(NotFound):
+            backend.get('a/b.json', generation=first.generation)
+
+    def test_open_write_commits_only_on_commit(self, backend):
+        """Stream write: object chỉ xuất hiện sau commit, abort không để lại gì."""
+        aborted = backend.open_write('data/x.parquet')
+        aborted.write(b'partial')
+        aborted.abort()
+        writer = backend.open_write('data/y.parquet')
+        writer.write(b'abc')
+        writer.write(b'def')
+
+        assert backend.stat('data/y.parquet') is None
+        info = writer.commit()
+        assert info.size == 6 and info.md5_hash
+        assert [item.name for item in backend.list('data/')] == ['data/y.parquet']
+
+    def test_list_compose_delete(self, backend):
+        """List theo prefix (sorted), compose nối bytes, delete bỏ qua object không tồn tại."""
+        backend.put('e/year=2024/month=03/p1', b'12')
+        backend.put('e/year=2024/month=03/p2', b'34')
+        backend.put('e/year=2024/month=04/p3', b'56')
+
+        assert [info.name for info in backend.list('e/year=2024/month=03/')] == [
+            'e/year=2024/month=03/p1', 'e/year=2024/month=03/p2'
+        ]
+        backend.compose(['e/year=2024/month=03/p1', 'e/year=2024/month=03/p2'], 'e/all')
+        assert backend.get('e/all') == b'1234'
+        assert backend.delete(['e/all', 'e/missing']) == 1
+        assert backend.uri('e/all') == 'gs://test-bucket/e/all'
+
+
+class TestGetStorageBackend:
+    """Test suite cho get_storage_backend."""
+
+    @patch('src.shared.storage.settings')
+    def test_backend_selected_by_settings(self, mock_settings, tmp_path):
+        """STORAGE_BACKEND=local → LocalStorageBackend tại LOCAL_STORAGE_ROOT; gcs → GCSStorageBackend."""
+        mock_settings.storage_backend = 'local'
+        mock_settings.local_storage_root = str(tmp_path)
+        backend = get_storage_backend('bronze')
+        assert isinstance(backend, LocalStorageBackend)
+        assert backend.path('x/y') == str(tmp_path / 'bronze' / 'x' / 'y')
+
+        mock_settings.storage_backend = 'gcs'
+        with patch('src.shared.storage.gcs.storage'):
+            assert isinstance(get_storage_backend('bronze'), GCSStorageBackend)
+
+        mock_settings.storage_backend = 's3'
+        with pytest.raises(ValueError):
+            get_storage_backend('bronze')
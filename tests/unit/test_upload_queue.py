@@ -0,0 +1,112 @@
+"""
+Unit tests cho write-behind upload queue.
+File này test UploadQueue (spool, retry, recover sau khi process dừng giữa chừng)
+với GCSLoader trên LocalStorageBackend.
+"""
+from datetime import date
+from io import BytesIO
+from unittest.mock import patch
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.shared.gcs import GCSLoader, UploadQueue
+from src.shared.storage import LocalStorageBackend
+
+
+def _table(start_id, count):
+    return pa.table({
+        "id": pa.array(range(start_id, start_id + count), pa.int64()),
+        "payment_total_amount": pa.array([1000.0] * count),
+    })
+
+
+@pytest.fixture
+def loader(tmp_path):
+    """GCSLoader trên local storage backend."""
+    return GCSLoader(bucket_name='test-bucket', backend=LocalStorageBackend(str(tmp_path / 'storage'), 'test-bucket'))
+
+
+@pytest.fixture
+def spool_dir(tmp_path):
+    return str(tmp_path / 'spool')
+
+
+def _read_ids(loader, name):
+    return pq.read_table(BytesIO(loader.backend.get(name))).column("id").to_pylist()
+
+
+class TestUploadQueue:
+    """Test suite cho UploadQueue."""
+
+    def test_submit_spools_then_uploads_on_flush(self, loader, spool_dir):
+        """submit() trả về object path ngay; flush() đợi upload xong và dọn spool."""
+        queue = UploadQueue(loader, spool_dir, retry_delay=0)
+
+        job = queue.submit('nhanh/bills', _table(1, 3), date(2024, 3, 15), metadata={"record_count": 3})
+        uploaded = queue.close()
+
+        assert uploaded == [job.object_path]
+        assert job.object_path == loader.build_parquet_path('nhanh/bills', date(2024, 3, 15))
+        assert _read_ids(loader, job.object_path) == [1, 2, 3]
+        assert queue.pending() == 0
+
+    def test_retries_with_backoff(self, loader, spool_dir):
+        """Upload lỗi tạm thời được retry; lỗi vượt quá max_retries giữ job trong spool."""
+        upload_table = loader.upload_table
+        attempts = []
+
+        def flaky_upload(**kwargs):
+            attempts.append(kwargs['object_path'])
+            if len(attempts) == 1:
+                raise ConnectionError("reset")
+            return upload_table(**kwargs)
+
+        queue = UploadQueue(loader, spool_dir, max_retries=2, retry_delay=0)
+        with patch.object(loader, 'upload_table', side_effect=flaky_upload):
+            job = queue.submit('nhanh/bills', _table(1, 2), date(2024, 3, 15))
+            assert queue.flush() == [job.object_path]
+        assert attempts == [job.object_path] * 2
+
+        with patch.object(loader, 'upload_table', side_effect=ConnectionError("down")) as mock_upload:
+            queue.submit('nhanh/bills', _table(10, 2), date(2024, 3, 16))
+            assert queue.close() == []
+            assert mock_upload.call_count == 3
+        assert queue.pending() == 1
+
+    def test_recover_uploads_spooled_jobs_and_discards_stale(self, loader, spool_dir):
+        """Queue mới upload lại jobs còn trong spool; job cũ hơn object hiện tại bị bỏ qua."""
+        failing = UploadQueue(loader, spool_dir, max_retries=0, retry_delay=0)
+        with patch.object(loader, 'upload_table', side_effect=ConnectionError("down")):
+            kept = failing.submit('nhanh/bills', _table(1, 2), date(2024, 3, 15))
+            stale = failing.submit('nhanh/bills', _table(5, 2), date(2024, 3, 16))
+            failing.commit_content_checksum(kept)
+            failing.close()
+        assert failing.pending() == 2
+
+        # Lần chạy sau đã ghi ngày 16 với data mới hơn
+        loader.upload_table('nhanh/bills', _table(100, 1), date(2024, 3, 16), object_path=stale.object_path)
+
+        recovered = UploadQueue(loader, spool_dir, retry_delay=0)
+        assert recovered.close() == [kept.object_path]
+        assert recovered.pending() == 0
+        assert _read_ids(loader, kept.object_path) == [1, 2]
+        assert _read_ids(loader, stale.object_path) == [100]
+        # commit_checksum được lưu trong spool và áp dụng khi job được upload lại
+        entries = loader.manifests.load('nhanh/bills').entries(date(2024, 3, 15))
+        assert [entry.pending_checksum for entry in entries] == [None]
+        assert entries[0].content_checksum is not None
+
+    def test_checksum_committed_only_after_load(self, loader, spool_dir):
+        """Checksum của backup chỉ là pending tới khi caller commit (BigQuery load xong)."""
+        queue = UploadQueue(loader, spool_dir, retry_delay=0)
+        job = queue.submit('nhanh/bills', _table(1, 3), date(2024, 3, 15))
+        queue.flush()
+        entry = loader.manifests.load('nhanh/bills').entries(date(2024, 3, 15))[0]
+        assert entry.content_checksum is None and entry.pending_checksum is not None
+
+        queue.commit_content_checksum(job)
+        queue.close()
+        entry = loader.manifests.load('nhanh/bills').entries(date(2024, 3, 15))[0]
+        assert entry.content_checksum is not None and entry.pending_checksum is None